@@ -0,0 +1,15 @@
+# 檔名：conftest.py - 測試共用設定
+#
+# 匯入 backend.app 時會設定日誌檔輸出；測試期間指向暫存目錄，
+# 避免測試中刻意觸發的錯誤寫入專案的 logs/error.log。
+
+import os
+import shutil
+import tempfile
+
+_log_dir = tempfile.mkdtemp(prefix='trading_test_logs_')
+os.environ.setdefault('TRADING_LOG_DIR', _log_dir)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_log_dir, ignore_errors=True)
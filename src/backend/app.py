@@ -4,16 +4,22 @@
 import os
 import sys
 import io
+import time
+import struct
 import logging
 
 # 修法B: 環境變數強制UTF-8 (AI建議3.txt)
 os.environ["PYTHONIOENCODING"] = "utf-8"
 
-# 設定 UTF-8 輸出
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+# 設定 UTF-8 輸出（就地切換編碼；另建 TextIOWrapper 被回收時會關閉原本的輸出）
+for _stream_name in ('stdout', 'stderr'):
+    _stream = getattr(sys, _stream_name)
+    if hasattr(_stream, 'reconfigure'):
+        _stream.reconfigure(encoding='utf-8', errors='replace')
+    else:
+        setattr(sys, _stream_name, io.TextIOWrapper(_stream.buffer, encoding='utf-8', errors='replace'))
 
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, jsonify, send_from_directory, request, g, Response, stream_with_context
 from flask_cors import CORS
 
 # 加入專案路徑到 Python path
@@ -22,34 +28,43 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 src_dir = os.path.join(project_root, 'src')
 sys.path.insert(0, src_dir)
 
-from utils.config import FLASK_HOST, FLASK_PORT, FLASK_DEBUG, PROJECT_ROOT
+from utils.config import (FLASK_HOST, FLASK_PORT, FLASK_DEBUG, PROJECT_ROOT, LOG_DIR, METRICS_CONFIG,
+                          LOGGING_CONFIG, BATCH_CONFIG, CSV_FILES, DEFAULT_TIMEFRAME, SYMBOL_CONFIG,
+                          RELOAD_CONFIG, LIVE_CONFIG)
+from utils.log_config import setup_logging
 from backend.data_processor import DataProcessor
+from backend.symbol_registry import SymbolRegistry, UnknownSymbolError
+from backend.csv_reload import ReloadWatcher
+from backend.request_metrics import request_metrics
+from backend import worker_registry
 
-# 修法A: 統一Logging為UTF-8編碼 (AI建議3.txt)
-LOG_DIR = os.path.join(PROJECT_ROOT, 'logs')
-os.makedirs(LOG_DIR, exist_ok=True)
-
-logger = logging.getLogger()
-logger.handlers.clear()
-
-# 檔案Handler強制UTF-8
-fh = logging.FileHandler(os.path.join(LOG_DIR, 'error.log'), encoding='utf-8')
-fmt = logging.Formatter('[%(levelname)s] %(asctime)s %(name)s: %(message)s')
-fh.setFormatter(fmt)
-
-# Console Handler
-ch = logging.StreamHandler()
-ch.setFormatter(fmt)
-
-logger.addHandler(fh)
-logger.addHandler(ch)
-logger.setLevel(logging.INFO)
+# 修法A: 統一Logging為UTF-8編碼 (AI建議3.txt)，經由佇列非同步輸出
+log_listener = setup_logging(LOG_DIR, LOGGING_CONFIG)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
 # 全域資料處理器和狀態管理
 data_processor = DataProcessor()
+
+def _load_symbol(symbol, files):
+    """載入非預設商品（第一次以 ?symbol= 請求時）"""
+    processor = DataProcessor(data_dir=data_processor.data_dir, csv_files=files, symbol=symbol)
+    processor.load_all_data()
+    return processor
+
+# 多商品註冊表：預設商品即 data_processor，其他商品延遲載入並以 LRU 控制記憶體
+symbol_registry = SymbolRegistry(
+    data_processor.data_dir,
+    default_symbol=data_processor.symbol,
+    pattern=SYMBOL_CONFIG['file_pattern'],
+    loader=_load_symbol,
+    memory_budget_bytes=SYMBOL_CONFIG['memory_budget_mb'] * 1024 * 1024,
+    max_resident=SYMBOL_CONFIG['max_resident_symbols']
+)
+symbol_registry.register(data_processor.symbol, data_processor, CSV_FILES, pinned=True)
+
 loading_status = {
     'is_loading': True,
     'progress': 0,
@@ -64,11 +79,76 @@ loading_status = {
     'details': []
 }
 
+# 請求計時：停用時不註冊 hook，資料處理層的 stage() 也只返回空計時器
+def _begin_request_timing():
+    g.request_start = time.perf_counter()
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    timeframe = (request.view_args or {}).get('timeframe') or request.args.get('timeframe')
+    request_metrics.begin(endpoint, timeframe)
+
+def _end_request_timing(response):
+    request_metrics.observe('total', time.perf_counter() - g.request_start)
+    return response
+
+def _clear_request_timing(exc):
+    request_metrics.end()
+
+if METRICS_CONFIG['enabled']:
+    request_metrics.configure(True, METRICS_CONFIG.get('buckets'))
+    app.before_request(_begin_request_timing)
+    app.after_request(_end_request_timing)
+    app.teardown_request(_clear_request_timing)
+
+@app.route('/api/metrics')
+def get_metrics():
+    """各端點、時間刻度、請求階段的耗時直方圖（Prometheus 文字格式）"""
+    if not request_metrics.enabled:
+        return jsonify({'error': 'Metrics disabled'}), 404
+    body = request_metrics.render_prometheus()
+    
+    # 並行請求合併計數（每個常駐商品一組，以 symbol 標籤區分）
+    by_symbol = {processor.symbol: processor.single_flight.get_stats()
+                 for processor in symbol_registry.resident_processors()}
+    lines = []
+    for key in next(iter(by_symbol.values()), {}):
+        name = f'trading_single_flight_{key}'
+        kind = 'gauge' if key == 'in_flight' else 'counter'
+        suffix = '' if kind == 'gauge' else '_total'
+        lines.append(f'# TYPE {name}{suffix} {kind}')
+        for symbol, stats in by_symbol.items():
+            lines.append(f'{name}{suffix}{{symbol="{symbol}"}} {stats[key]}')
+    if lines:
+        body += '\n'.join(lines) + '\n'
+    
+    return Response(body, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def processor_for(symbol=None):
+    """商品的資料處理器（未常駐時載入；未知商品拋出 UnknownSymbolError）"""
+    return symbol_registry.get(symbol)
+
+def current_processor():
+    """目前請求的資料處理器（?symbol=，POST JSON 亦可帶 symbol）"""
+    symbol = request.args.get('symbol')
+    if symbol is None and request.method == 'POST':
+        payload = request.get_json(silent=True)
+        symbol = payload.get('symbol') if isinstance(payload, dict) else None
+    return processor_for(symbol)
+
+@app.errorhandler(UnknownSymbolError)
+def unknown_symbol(e):
+    return jsonify({'error': str(e), 'symbols': symbol_registry.symbols()}), 404
+
+@app.route('/api/symbols')
+def get_symbols():
+    """可用商品、各商品的時間刻度與常駐狀態"""
+    symbol_registry.refresh()
+    return jsonify(symbol_registry.get_stats())
+
 # API健康檢查端點
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
+    health = {
         'status': 'healthy',
         'service': 'trading-chart-backend',
         'port': FLASK_PORT,
@@ -76,7 +156,26 @@ def health_check():
         'loading_progress': loading_status['progress'],
         'current_step': loading_status['current_step'],
         'timestamp': str(__import__('datetime').datetime.now())
-    }), 200
+    }
+    
+    # 並行請求合併計數、回應快取與常駐狀態（依常駐商品）
+    resident = symbol_registry.resident_processors()
+    health['single_flight'] = {processor.symbol: processor.single_flight.get_stats() for processor in resident}
+    health['http_cache'] = {processor.symbol: processor.response_cache.get_stats() for processor in resident}
+    health['symbols'] = symbol_registry.get_stats()
+    health['residency'] = {processor.symbol: processor.data_cache.get_stats() for processor in resident}
+    
+    # 由 server.py 啟動時附上各 worker 狀態
+    registry, worker_id = worker_registry.get_active()
+    if registry is not None:
+        workers = registry.snapshot()
+        health['worker_id'] = worker_id
+        health['workers'] = workers
+        health['ready_workers'] = sum(1 for w in workers if w['ready'])
+        if health['ready_workers'] < len(workers):
+            health['status'] = 'degraded'
+    
+    return jsonify(health), 200
 
 @app.route('/api/loading-status', methods=['GET'])
 def get_loading_status():
@@ -117,110 +216,238 @@ def static_files(filename):
     frontend_dir = os.path.join(PROJECT_ROOT, 'src', 'frontend')
     return send_from_directory(frontend_dir, filename)
 
+def convert_to_serializable(obj):
+    """確保所有數據都是JSON可序列化的"""
+    import numpy as np
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, dict):
+        return {k: convert_to_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_to_serializable(v) for v in obj]
+    return obj
+
+def json_body(obj) -> bytes:
+    """與 jsonify 相同的緊湊 JSON 編碼"""
+    return f"{app.json.dumps(obj, separators=(',', ':'))}\n".encode('utf-8')
+
+def parse_path_date(value):
+    """路徑中的日期（YYYY-MM-DD）；格式錯誤時拋出 ValueError"""
+    from datetime import datetime
+    
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'日期格式錯誤（需為 YYYY-MM-DD）: {value}')
+
+def historical_json_response(processor, kind, target_date, timeframe, compute, not_found_message):
+    """
+    歷史資料回應：ETag/Last-Modified 驗證與快取的壓縮內容
+    
+    驗證器不需先計算資料，客戶端快取仍有效時直接返回304；
+    快取未命中才呼叫 compute() 並保存 JSON 與壓縮版本。
+    """
+    cache = processor.response_cache
+    validators = processor.get_http_validators(kind, target_date, timeframe)
+    
+    if validators and cache.is_not_modified(validators['etag'], validators['last_modified'],
+                                            request.headers.get('If-None-Match'),
+                                            request.headers.get('If-Modified-Since')):
+        return Response(status=304, headers=cache.validator_headers(
+            validators['etag'], validators['last_modified'], validators['immutable']))
+    
+    entry = cache.get(validators['etag']) if validators else None
+    if entry is None:
+        data = compute()
+        if data is None:
+            return jsonify({'error': not_found_message}), 404
+        
+        with request_metrics.stage('serialization'):
+            serializable_data = convert_to_serializable(data)
+        with request_metrics.stage('json_encoding'):
+            body = json_body(serializable_data)
+        if validators is None:
+            return Response(body, mimetype='application/json')
+        entry = cache.put(validators['etag'], body, validators['last_modified'], validators['immutable'])
+    
+    headers, body = cache.response_parts(entry, request.headers.get('Accept-Encoding'))
+    return Response(body, status=200, headers=headers)
+
+def parse_date_filters(args) -> dict:
+    """解析隨機日期篩選參數（對應 DateSampler.sample）"""
+    def int_list(value):
+        return [int(v) for v in value.split(',') if v.strip()] if value else None
+    
+    is_dst = args.get('is_dst')
+    return {
+        'weekdays': int_list(args.get('weekdays')),
+        'months': int_list(args.get('months')),
+        'is_dst': None if is_dst is None else is_dst.lower() in ('1', 'true', 'yes'),
+        'max_holiday_distance': args.get('max_holiday_distance', type=int),
+        'min_holiday_distance': args.get('min_holiday_distance', type=int),
+        'min_fvgs': args.get('min_fvgs', type=int),
+        'fvg_timeframe': args.get('fvg_timeframe'),
+        'min_continuity': args.get('min_continuity', type=float),
+        'continuity_timeframe': args.get('continuity_timeframe')
+    }
+
+def parse_batch_request(payload: dict, known_timeframes=CSV_FILES):
+    """解析批次請求的日期、時間刻度與輸出格式（格式錯誤時拋出 ValueError）"""
+    from datetime import datetime
+    
+    if not isinstance(payload, dict):
+        raise ValueError('request body must be a JSON object')
+    
+    def as_list(name):
+        # 逗號分隔字串或字串陣列
+        value = payload.get(name)
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [v.strip() for v in value.split(',') if v.strip()]
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f'{name} must be a comma-separated string or a list of strings')
+        return value
+    
+    dates = [datetime.strptime(d, '%Y-%m-%d').date() for d in as_list('dates')]
+    timeframes = as_list('timeframes') or [DEFAULT_TIMEFRAME]
+    output_format = payload.get('format') or BATCH_CONFIG['default_format']
+    
+    if not dates:
+        raise ValueError('dates is required')
+    if len(dates) > BATCH_CONFIG['max_dates']:
+        raise ValueError(f"too many dates (max {BATCH_CONFIG['max_dates']})")
+    unknown = [tf for tf in timeframes if tf not in known_timeframes]
+    if unknown:
+        raise ValueError(f"unknown timeframes: {', '.join(unknown)}")
+    if not isinstance(output_format, str) or output_format not in ('ndjson', 'frames'):
+        raise ValueError(f"unknown format: {output_format}")
+    return dates, timeframes, output_format
+
+@app.route('/api/batch-data', methods=['GET', 'POST'])
+def get_batch_data():
+    """
+    批次取得多個日期與時間刻度的開盤前資料（串流回應）
+    
+    GET  /api/batch-data?dates=2024-01-02,2024-01-03&timeframes=M15,H1&format=ndjson
+    POST /api/batch-data  {"dates": [...], "timeframes": [...], "format": "frames"}
+    
+    每筆紀錄與 /api/data/<date>/<timeframe> 的內容相同，無法取得時為
+    {"date", "timeframe", "error"}。依時間刻度分組輸出。
+    format=ndjson 每行一筆 JSON；format=frames 每筆為4位元組大端長度 + UTF-8 JSON。
+    """
+    processor = current_processor()
+    try:
+        payload = request.get_json(silent=True) if request.method == 'POST' else request.args
+        dates, timeframes, output_format = parse_batch_request({} if payload is None else payload,
+                                                               processor.csv_files)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        for record in processor.get_pre_market_batch(dates, timeframes):
+            if output_format == 'ndjson':
+                yield json_body(record)
+            else:
+                body = app.json.dumps(record, separators=(',', ':')).encode('utf-8')
+                yield struct.pack('>I', len(body)) + body
+    
+    mimetype = 'application/x-ndjson' if output_format == 'ndjson' else 'application/octet-stream'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'X-Record-Count': str(len(dates) * len(timeframes))})
+
+@app.route('/api/random-dates')
+def get_random_dates():
+    """依條件批次抽取隨機日期"""
+    processor = current_processor()
+    try:
+        count = min(request.args.get('count', 1, type=int), 10000)
+        filters = parse_date_filters(request.args)
+        dates = processor.sample_random_dates(count, **filters)
+        return jsonify({
+            'dates': [d.strftime('%Y-%m-%d') for d in dates],
+            'qualifying_days': processor.date_sampler.count(**filters)
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/random-data')
 def get_random_data():
     """取得隨機日期的開盤前資料"""
+    processor = current_processor()
     try:
-        import numpy as np
-        
         # 取得時間刻度參數（預設為 H4）
         timeframe = request.args.get('timeframe', 'M15')
         
         # 驗證時間刻度是否有效
-        available_timeframes = data_processor.get_available_timeframes()
+        available_timeframes = processor.get_available_timeframes()
         if timeframe not in available_timeframes:
             timeframe = 'H4'  # 回到預設值
         
-        print(f"API: Random data request, timeframe: {timeframe}")
+        logger.debug("API: Random data request, timeframe: %s", timeframe)
         
-        # 從統一日期池隨機選擇日期（不依賴特定時間框架）
-        random_date = data_processor.get_random_date()
+        # 從統一日期池隨機選擇日期（不依賴特定時間框架，可附加篩選條件）
+        random_date = processor.get_random_date(**parse_date_filters(request.args))
         
         # 使用指定的時間刻度
-        data = data_processor.get_pre_market_data(random_date, timeframe)
+        data = processor.get_pre_market_data(random_date, timeframe)
         
         if data is None:
             return jsonify({'error': 'Unable to fetch data'}), 500
         
         # 確保所有數據都是JSON可序列化的
-        def convert_to_serializable(obj):
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {k: convert_to_serializable(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_to_serializable(v) for v in obj]
-            return obj
-        
-        serializable_data = convert_to_serializable(data)
-        return jsonify(serializable_data)
+        with request_metrics.stage('serialization'):
+            serializable_data = convert_to_serializable(data)
+        with request_metrics.stage('json_encoding'):
+            return jsonify(serializable_data)
     
     except Exception as e:
-        import traceback
-        print(f"API錯誤: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("API錯誤: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/data/<date>/<timeframe>')
 def get_specific_data(date, timeframe):
     """取得指定日期和時間刻度的資料"""
-    # Debug output for API calls
-    print(f"API Request: {date}/{timeframe}")
+    processor = current_processor()
+    logger.debug("API Request: %s/%s", date, timeframe)
+    try:
+        target_date = parse_path_date(date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        from datetime import datetime
-        import json
-        import numpy as np
-        
-        target_date = datetime.strptime(date, '%Y-%m-%d').date()
-        data = data_processor.get_pre_market_data(target_date, timeframe)
-        
-        if data is None:
-            print(f"No data available for {date}/{timeframe}")
-        
-        if data is None:
-            return jsonify({'error': '無法取得指定資料'}), 404
-        
-        # 確保所有數據都是JSON可序列化的
-        def convert_to_serializable(obj):
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {k: convert_to_serializable(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_to_serializable(v) for v in obj]
-            return obj
-        
-        serializable_data = convert_to_serializable(data)
-        return jsonify(serializable_data)
+        return historical_json_response(
+            processor, 'pre_market', target_date, timeframe,
+            lambda: processor.get_pre_market_data(target_date, timeframe),
+            '無法取得指定資料'
+        )
     
     except Exception as e:
-        import traceback
-        print(f"API錯誤: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("API錯誤: %s", e)
         return jsonify({'error': str(e)}), 500
 
+
 @app.route('/api/timeframes')
 def get_timeframes():
     """取得可用的時間刻度"""
-    return jsonify(data_processor.get_available_timeframes())
+    processor = current_processor()
+    return jsonify(processor.get_available_timeframes())
 
 @app.route('/api/date-range')
 def get_date_range():
     """取得可用日期範圍詳細信息"""
+    processor = current_processor()
     try:
-        if not data_processor.available_dates:
+        if not processor.available_dates:
             return jsonify({'error': '數據未載入'}), 500
         
-        dates_list = sorted(list(data_processor.available_dates))
+        dates_list = sorted(list(processor.available_dates))
         from utils.config import RANDOM_DATE_CONFIG
         
         return jsonify({
@@ -238,92 +465,182 @@ def get_date_range():
 @app.route('/api/playback-data/<date>/<timeframe>')
 def get_playback_data(date, timeframe):
     """取得指定日期的完整交易資料（用於播放）"""
+    processor = current_processor()
     try:
-        from datetime import datetime
-        import numpy as np
-        
-        target_date = datetime.strptime(date, '%Y-%m-%d').date()
-        
-        data = data_processor.get_market_hours_data(target_date, timeframe)
-        
-        if data is None:
-            return jsonify({'error': '無法取得播放資料'}), 404
-        
-        # 確保所有數據都是JSON可序列化的
-        def convert_to_serializable(obj):
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {k: convert_to_serializable(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_to_serializable(v) for v in obj]
-            return obj
-        
-        serializable_data = convert_to_serializable(data)
-        return jsonify(serializable_data)
+        target_date = parse_path_date(date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        return historical_json_response(
+            processor, 'market_hours', target_date, timeframe,
+            lambda: processor.get_market_hours_data(target_date, timeframe),
+            '無法取得播放資料'
+        )
     
     except Exception as e:
-        import traceback
-        print(f"API錯誤: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("API錯誤: %s", e)
         return jsonify({'error': str(e)}), 500
     
+
 @app.route('/api/m1-playback-data/<date>')
 def get_m1_playback_data(date):
     """取得指定日期的 M1 完整交易資料（作為播放基礎）"""
+    processor = current_processor()
+    try:
+        target_date = parse_path_date(date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
-        from datetime import datetime
-        import numpy as np
-        
-        target_date = datetime.strptime(date, '%Y-%m-%d').date()
-        
         # 強制使用 M1 資料
-        data = data_processor.get_market_hours_data(target_date, 'M1')
-        
-        if data is None:
-            return jsonify({'error': '無法取得 M1 播放資料'}), 404
-        
-        # 確保所有數據都是JSON可序列化的
-        def convert_to_serializable(obj):
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {k: convert_to_serializable(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_to_serializable(v) for v in obj]
-            return obj
-        
-        serializable_data = convert_to_serializable(data)
-        return jsonify(serializable_data)
+        return historical_json_response(
+            processor, 'market_hours', target_date, 'M1',
+            lambda: processor.get_market_hours_data(target_date, 'M1'),
+            '無法取得 M1 播放資料'
+        )
     
     except Exception as e:
-        import traceback
-        print(f"API錯誤: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("API錯誤: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+def parse_range_time(value, end: bool = False):
+    """範圍端點：Unix 秒、日期或日期時間字串（只有日期的 end 涵蓋整天；格式錯誤時拋出 ValueError）"""
+    import pandas as pd
+    
+    if value is None or value == '':
+        return None
+    if value.lstrip('-').isdigit():
+        return pd.Timestamp(int(value), unit='s')
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert(None)
+    if end and len(value) == 10:
+        timestamp += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return timestamp
+
+@app.route('/api/range/<timeframe>')
+def get_range_data(timeframe):
+    """
+    任意時間範圍的K線（縮放用），返回點數有上限
+    
+    GET /api/range/M1?start=2024-01-02&end=2024-06-28&max_points=1500
+    
+    範圍內K線數超過 max_points 時返回連續 2^k 根聚合的OHLCV（bars_per_point = 2^k）
+    """
+    processor = current_processor()
+    try:
+        start = parse_range_time(request.args.get('start'))
+        end = parse_range_time(request.args.get('end'), end=True)
+        max_points = request.args.get('max_points', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        result = processor.get_range_data(timeframe, start, end, max_points)
+        if result is None:
+            return jsonify({'error': f'不支援的時間框架: {timeframe}'}), 404
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("API錯誤: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/range-stats/<timeframe>')
+def get_range_stats(timeframe):
+    """
+    任意時間範圍的最高/最低價與收盤價極值（含發生時間）
+
+    GET /api/range-stats/M1?start=2024-01-02T09:30&end=2024-01-02T16:00
+    """
+    processor = current_processor()
+    try:
+        start = parse_range_time(request.args.get('start'))
+        end = parse_range_time(request.args.get('end'), end=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        result = processor.get_range_stats(timeframe, start, end)
+        if result is None:
+            return jsonify({'error': f'不支援的時間框架: {timeframe}'}), 404
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("API錯誤: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fvg-lookup')
+def fvg_lookup():
+    """
+    跨時間刻度查詢未回補且與價格重疊的FVG（只返回相關的缺口）
+
+    GET /api/fvg-lookup?price=16850.25&time=2024-03-05T14:30&timeframes=M15,H1,H4
+    GET /api/fvg-lookup?low=16800&high=16900&start=2024-03-01&end=2024-03-05&type=bullish
+
+    price 查詢包含該價格的FVG，low/high 查詢與價格範圍重疊者；
+    time 查詢該時間點有效者，start/end 查詢範圍內曾經有效者，都未指定時為最新一根K線
+    """
+    processor = current_processor()
+    try:
+        price = request.args.get('price', type=float)
+        low = request.args.get('low', price, type=float)
+        high = request.args.get('high', price, type=float)
+        if low is None or high is None:
+            raise ValueError('需要 price 或 low/high 參數')
+        if request.args.get('time'):
+            start = end = parse_range_time(request.args.get('time'))
+        else:
+            start = parse_range_time(request.args.get('start'))
+            end = parse_range_time(request.args.get('end'), end=True)
+        timeframes = [tf.strip() for tf in request.args.get('timeframes', '').split(',') if tf.strip()]
+        return jsonify(processor.find_fvgs(low, high, start, end, timeframes or None,
+                                           request.args.get('type')))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("API錯誤: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/fvg-confluence')
+def fvg_confluence():
+    """
+    多時間刻度FVG共振區（最小時間刻度的FVG與較大時間刻度FVG在價格與時間上重疊）
+
+    GET /api/fvg-confluence?timeframes=M5,H1,H4&start=2024-03-01&end=2024-03-31&min_timeframes=3
+
+    any_direction=1 時不限相同方向
+    """
+    processor = current_processor()
+    try:
+        timeframes = [tf.strip() for tf in request.args.get('timeframes', '').split(',') if tf.strip()]
+        start = parse_range_time(request.args.get('start'))
+        end = parse_range_time(request.args.get('end'), end=True)
+        min_timeframes = request.args.get('min_timeframes', 2, type=int)
+        same_direction = request.args.get('any_direction', '').lower() not in ('1', 'true')
+        return jsonify(processor.get_fvg_confluence(timeframes or None, start, end,
+                                                    same_direction, min_timeframes))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("API錯誤: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/continuity-summary')
 def get_continuity_summary():
     """取得所有時間框架的K線連續性摘要"""
+    processor = current_processor()
     try:
-        summary = data_processor.get_continuity_summary()
+        summary = processor.get_continuity_summary()
         return jsonify(summary)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/continuity-report/<timeframe>')
 def get_continuity_report(timeframe):
-    """取得特定時間框架的詳細連續性報告"""
+    """取得特定時間框架的詳細連續性報告（支援 ?page=&page_size= 分頁）"""
+    processor = current_processor()
     try:
-        report = data_processor.get_continuity_report(timeframe)
+        page = request.args.get('page', 1, type=int)
+        page_size = min(request.args.get('page_size', 10, type=int), 1000)
+        report = processor.get_continuity_report(timeframe, page, page_size)
         if report is None:
             return jsonify({'error': f'找不到時間框架 {timeframe} 的連續性報告'}), 404
         return jsonify(report)
@@ -333,11 +650,14 @@ def get_continuity_report(timeframe):
 @app.route('/api/date-continuity/<date>/<timeframe>')
 def get_date_continuity(date, timeframe):
     """檢查特定日期和時間框架的K線連續性"""
+    processor = current_processor()
     try:
-        from datetime import datetime
-        target_date = datetime.strptime(date, '%Y-%m-%d').date()
-        
-        result = data_processor.check_date_continuity(target_date, timeframe)
+        target_date = parse_path_date(date)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        result = processor.check_date_continuity(target_date, timeframe)
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -345,21 +665,139 @@ def get_date_continuity(date, timeframe):
 @app.route('/api/data-consistency-check')
 def get_data_consistency_check():
     """檢查各時間刻度資料範圍的一致性"""
+    processor = current_processor()
     try:
-        consistency_report = data_processor.check_data_range_consistency()
+        consistency_report = processor.check_data_range_consistency()
         return jsonify(consistency_report), 200
     except Exception as e:
-        import traceback
-        print(f"資料一致性檢查錯誤: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("資料一致性檢查錯誤: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reload', methods=['POST'])
+def reload_data():
+    """
+    重新載入CSV追加的資料（只解析新增的列）
+    
+    立即更新處理此請求的 worker；prefork 多 worker 時另經共享狀態表通知其他 worker
+    （各 worker 於下一次心跳間隔內重新載入全部常駐商品），回應帶 workers_signalled
+    """
+    processor = current_processor()
+    try:
+        result = processor.reload_appended()
+        registry, _ = worker_registry.get_active()
+        if worker_registry.worker_count() > 1:
+            registry.request_reload()
+            result['workers_signalled'] = registry.slots
+        return jsonify(result), 200
+    except Exception as e:
+        logger.exception("熱重載錯誤: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def parse_live_bars(payload):
+    """即時K線請求內容：單根K線物件、K線陣列或 {"bars": [...]}（格式錯誤時拋出 ValueError）"""
+    bars = payload.get('bars') if isinstance(payload, dict) and 'bars' in payload else payload
+    if isinstance(bars, dict):
+        bars = [bars]
+    if not isinstance(bars, list) or not bars:
+        raise ValueError('bars is required')
+    if len(bars) > LIVE_CONFIG['max_bars_per_request']:
+        raise ValueError(f"too many bars (max {LIVE_CONFIG['max_bars_per_request']})")
+    return bars
+
+def parse_live_timeframes(value, known_timeframes):
+    """訂閱的時間刻度（逗號分隔，未指定時為全部；未知時拋出 ValueError）"""
+    timeframes = [tf.strip() for tf in (value or '').split(',') if tf.strip()]
+    unknown = [tf for tf in timeframes if tf not in known_timeframes]
+    if unknown:
+        raise ValueError(f"unknown timeframes: {', '.join(unknown)}")
+    return timeframes or None
+
+def live_unavailable():
+    """
+    prefork 多 worker 時拒絕即時K線端點（409）
+    
+    即時狀態只存在處理送入請求的 worker，其他 worker 的訂閱者收不到推送，
+    請改用 threaded 模式、單一 worker 或 ASGI 單一行程。
+    """
+    workers = worker_registry.worker_count()
+    if workers > 1:
+        return jsonify({'error': 'live feed requires a single server process',
+                        'workers': workers}), 409
+    return None
+
+def sse_message(event) -> str:
+    """Server-Sent Events 訊息（事件種類在 JSON 的 type 欄位，前端以 onmessage 接收）"""
+    return f"data: {app.json.dumps(event, separators=(',', ':'))}\n\n"
+
+@app.route('/api/live/bars', methods=['POST'])
+def ingest_live_bars():
+    """
+    送入即時M1K線（依時間排序），即時聚合到各時間刻度並推送給訂閱者
+    
+    POST /api/live/bars  {"bars": [{"time": 1700000000, "open", "high", "low", "close", "volume"}]}
+    
+    prefork 多 worker 時返回409（見 live_unavailable）
+    """
+    unavailable = live_unavailable()
+    if unavailable:
+        return unavailable
+    processor = current_processor()
+    try:
+        bars = parse_live_bars(request.get_json(silent=True))
+        return jsonify(processor.get_live_feed().ingest(bars)), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.exception("即時K線送入錯誤: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/live/stream')
+def live_stream():
+    """
+    訂閱即時推送（Server-Sent Events）
+    
+    GET /api/live/stream?timeframes=M1,M15
+    
+    第一則為目前狀態的快照，之後為K線、FVG形成/清除與K線間隔事件（見 LiveFeed.subscribe）。
+    連線期間佔用一個處理執行緒；ASGI 模式由事件迴圈直接處理。prefork 多 worker 時返回409。
+    """
+    unavailable = live_unavailable()
+    if unavailable:
+        return unavailable
+    processor = current_processor()
+    try:
+        timeframes = parse_live_timeframes(request.args.get('timeframes'), processor.csv_files)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    feed = processor.get_live_feed()
+    subscription = feed.subscribe(timeframes)
+    
+    def generate():
+        try:
+            while not subscription.closed:
+                event = subscription.get(LIVE_CONFIG['heartbeat_seconds'])
+                yield ': keep-alive\n\n' if event is None else sse_message(event)
+        finally:
+            feed.unsubscribe(subscription)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/live/status')
+def live_status():
+    """即時K線的處理統計（各時間刻度的K線數、間隔數、待合併K線與清除窗口內的FVG數）"""
+    unavailable = live_unavailable()
+    if unavailable:
+        return unavailable
+    processor = current_processor()
+    return jsonify(processor.get_live_feed().get_stats())
+
 @app.route('/api/clear-cache')
 def clear_cache():
     """清除API響應緩存"""
     try:
-        data_processor._response_cache.clear()
-        data_processor._processed_data_cache.clear()
+        for processor in symbol_registry.resident_processors():
+            processor.response_cache.clear()
         return jsonify({'message': 'Cache cleared successfully', 'status': 'success'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -370,9 +808,8 @@ def update_loading_status(**kwargs):
     global loading_status
     loading_status.update(kwargs)
 
-if __name__ == '__main__':
-    print("=== 交易圖表系統啟動中 ===")
-    
+def initialize_data():
+    """載入全部資料並更新載入狀態（開發伺服器與 server.py 共用）"""
     # 設置載入狀態回調
     data_processor.set_loading_callback(update_loading_status)
     
@@ -380,6 +817,14 @@ if __name__ == '__main__':
     try:
         print("使用傳統載入模式...")
         data_processor.load_all_data()
+        symbol_registry.update_size(data_processor.symbol)
+        
+        # 指定預載的其他商品（server.py 於 fork 前呼叫，各 worker 以寫入時複製共用）
+        for symbol in SYMBOL_CONFIG['preload_symbols']:
+            try:
+                processor_for(symbol)
+            except Exception as e:
+                logger.warning("預載商品 %s 失敗: %s", symbol, e)
         # 載入完成
         update_loading_status(
             is_loading=False,
@@ -393,9 +838,22 @@ if __name__ == '__main__':
             error=str(e),
             current_step=f'載入失敗: {str(e)}'
         )
+
+def start_reload_watcher():
+    """依 RELOAD_CONFIG 啟動追加資料的定期檢查（需在提供服務的行程中呼叫）"""
+    if not RELOAD_CONFIG['watch']:
+        return None
+    return ReloadWatcher(symbol_registry.resident_processors, RELOAD_CONFIG['poll_seconds']).start()
+
+if __name__ == '__main__':
+    print("=== 交易圖表系統啟動中 ===")
+    
+    initialize_data()
+    start_reload_watcher()
     
     print(f"伺服器啟動於: http://{FLASK_HOST}:{FLASK_PORT}")
     print("請在瀏覽器開啟上述網址")
     print("按 Ctrl+C 停止伺服器")
+    print("正式環境請改用: python src/backend/server.py")
     
-    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=FLASK_DEBUG)
\ No newline at end of file
+    app.run(host=FLASK_HOST, port=FLASK_PORT, debug=FLASK_DEBUG)
@@ -0,0 +1,565 @@
+# -*- coding: utf-8 -*-
+# 檔名：asgi_app.py - 非同步（ASGI）API 層
+#
+# 用法（需安裝任一 ASGI 伺服器，例如 uvicorn）:
+#   uvicorn backend.asgi_app:app --app-dir src --port 5001
+#   python src/backend/asgi_app.py
+#
+# 圖表/播放等重運算端點交由有上限的執行緒池處理，相同請求（端點、日期、時間刻度）
+# 同時到達時只計算一次並共用結果；歷史資料端點另以 ETag 返回304或快取的壓縮內容。
+# /api/timeframes、/api/loading-status 等輕量端點直接在事件迴圈上回應，
+# 不會排在重運算請求之後。即時推送（/api/live/stream）由事件迴圈直接串流，
+# 不佔用執行緒。其餘路由轉交既有的 Flask app，回應內容（如 /api/batch-data 的串流）
+# 逐塊送出。重運算端點不經過 Flask 的請求 hook，請求計時（request_metrics）在此記錄。
+
+import asyncio
+import io
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+import backend.app as app_module
+from backend.request_metrics import request_metrics
+from backend.symbol_registry import UnknownSymbolError
+from utils.config import ASGI_CONFIG, LIVE_CONFIG
+
+
+class ServerBusy(Exception):
+    """待處理的重運算請求已達上限"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# 重運算端點：(路徑樣式, 對應的 Flask 路由（指標的 endpoint 標籤）, 處理函式名稱, 是否合併相同請求)
+HEAVY_ROUTES = [
+    (re.compile(r'^/api/data/(?P<date>[^/]+)/(?P<timeframe>[^/]+)$'), '/api/data/<date>/<timeframe>',
+     'pre_market_data', True),
+    (re.compile(r'^/api/playback-data/(?P<date>[^/]+)/(?P<timeframe>[^/]+)$'),
+     '/api/playback-data/<date>/<timeframe>', 'playback_data', True),
+    (re.compile(r'^/api/m1-playback-data/(?P<date>[^/]+)$'), '/api/m1-playback-data/<date>',
+     'm1_playback_data', True),
+    (re.compile(r'^/api/random-data$'), '/api/random-data', 'random_data', False),
+]
+
+# 串流回應在事件迴圈與產生內容的執行緒之間最多暫存的區塊數
+STREAM_BUFFER_CHUNKS = 8
+
+# 可用 ETag 驗證與回應快取的歷史資料端點：處理函式名稱 -> 驗證器種類
+HISTORICAL_KINDS = {
+    'pre_market_data': 'pre_market',
+    'playback_data': 'market_hours',
+    'm1_playback_data': 'market_hours',
+}
+
+# 在事件迴圈上直接執行的輕量 Flask 路由
+LIGHT_PATHS = {'/api/timeframes', '/api/loading-status', '/api/health', '/api/metrics'}
+
+
+class AsyncAPI:
+    """
+    ASGI 應用
+
+    Args:
+        flask_app: 既有的 Flask app（未由本層處理的路由轉交給它）
+        max_workers: 重運算執行緒池大小
+        max_pending: 同時等待/執行中的重運算上限（超過時返回503）
+        fallback_workers: 轉交 Flask 的執行緒池大小
+        load_on_startup: lifespan 啟動時於背景載入資料
+    """
+
+    def __init__(self, flask_app, max_workers: int = 4, max_pending: int = 64,
+                 fallback_workers: int = 8, load_on_startup: bool = True):
+        self.flask_app = flask_app
+        self.max_pending = max_pending
+        self.load_on_startup = load_on_startup
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi-heavy')
+        self.fallback_executor = ThreadPoolExecutor(max_workers=fallback_workers,
+                                                    thread_name_prefix='asgi-wsgi')
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._pending = 0
+        self._loading_task = None
+        self.stats = {'executed': 0, 'coalesced': 0, 'rejected': 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    # ------------------------------------------------------------------ 生命週期
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.load_on_startup:
+                    # 背景載入，期間 /api/loading-status 仍可即時回應
+                    loop = asyncio.get_running_loop()
+                    self._loading_task = loop.run_in_executor(None, self._load_and_watch)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.fallback_executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    def _load_and_watch():
+        app_module.initialize_data()
+        app_module.start_reload_watcher()
+
+    # ------------------------------------------------------------------ HTTP
+
+    async def _http(self, scope, receive, send):
+        path = scope['path']
+        method = scope['method']
+
+        if method == 'GET':
+            if path == '/api/async-stats':
+                await self._send_json(send, 200, self.get_stats())
+                return
+            if path == '/api/live/stream':
+                await self._live_stream(scope, receive, send)
+                return
+            for pattern, rule, handler_name, coalesce in HEAVY_ROUTES:
+                match = pattern.match(path)
+                if match:
+                    query = parse_query(scope.get('query_string', b''))
+                    labels = (rule, match.group('timeframe') if 'timeframe' in pattern.groupindex
+                              else query.get('timeframe'))
+                    started = time.perf_counter()
+                    try:
+                        await self._heavy(send, scope, query, labels, handler_name, match.groupdict(), coalesce)
+                    finally:
+                        request_metrics.observe('total', time.perf_counter() - started, *labels)
+                    return
+
+        body = await self._read_body(receive)
+        # 指定尚未常駐的商品時可能需要載入資料，不在事件迴圈上執行
+        if path in LIGHT_PATHS and (path != '/api/timeframes' or app_module.symbol_registry.is_resident(
+                parse_query(scope.get('query_string', b'')).get('symbol'))):
+            await self._send(send, *call_wsgi(self.flask_app, scope, body))
+        else:
+            await self._stream_wsgi(scope, body, send)
+
+    async def _heavy(self, send, scope, query: Dict, labels: Tuple, handler_name: str, params: Dict,
+                     coalesce: bool):
+        handler = getattr(self, f'_compute_{handler_name}')
+
+        try:
+            if 'date' in params:
+                params['date'] = app_module.parse_path_date(params['date'])
+            processor = await self._processor(query.get('symbol'))
+            key = ((handler_name, processor.symbol, params.get('date'), params.get('timeframe'))
+                   if coalesce else None)
+
+            # 304 判斷與快取查詢不需計算資料，直接在事件迴圈上完成
+            validators = self._validators(processor, handler_name, params)
+            if validators is not None:
+                build = self._labeled(labels, lambda: self._cache_put(processor, handler, params, query, validators))
+                await self._send_cached(send, scope, processor, validators, build)
+                return
+            compute = self._labeled(labels, lambda: handler(processor, params, query))
+            status, body = await self.run_coalesced(key, compute)
+        except ServerBusy:
+            await self._send_json(send, 503, {'error': 'Server busy, please retry'},
+                                  extra_headers=[(b'retry-after', b'1')])
+            return
+        except HTTPError as e:
+            await self._send_json(send, e.status, {'error': str(e)})
+            return
+        except UnknownSymbolError as e:
+            await self._send_json(send, 404, {'error': str(e),
+                                              'symbols': app_module.symbol_registry.symbols()})
+            return
+        except ValueError as e:
+            await self._send_json(send, 400, {'error': str(e)})
+            return
+        except Exception as e:
+            app_module.logger.exception("API錯誤: %s", e)
+            await self._send_json(send, 500, {'error': str(e)})
+            return
+
+        await self._send(send, status, [(b'content-type', b'application/json')], body)
+
+    async def run_coalesced(self, key: Optional[Tuple], fn: Callable):
+        """
+        在重運算執行緒池執行 fn；key 相同的同時請求共用同一次計算
+
+        計算結果掛在執行緒池的 future 上，發起請求的客戶端中途斷線也不影響其他等待者。
+        """
+        if key is not None:
+            running = self._inflight.get(key)
+            if running is not None:
+                self.stats['coalesced'] += 1
+                return await asyncio.shield(running)
+
+        if self._pending >= self.max_pending:
+            self.stats['rejected'] += 1
+            raise ServerBusy()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, fn)
+        self._pending += 1
+        self.stats['executed'] += 1
+        if key is not None:
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._release(key, f))
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def _labeled(labels: Tuple, fn: Callable) -> Callable:
+        """在執行緒池內以請求標籤執行 fn，資料處理層的 stage() 計時才會記錄"""
+        def run():
+            request_metrics.begin(*labels)
+            try:
+                return fn()
+            finally:
+                request_metrics.end()
+        return run
+
+    async def _processor(self, symbol: Optional[str]):
+        """商品的資料處理器；尚未常駐時在執行緒池載入（同一商品只載入一次）"""
+        registry = app_module.symbol_registry
+        if registry.is_resident(symbol):
+            return registry.get(symbol)
+        key = ('symbol', (symbol or registry.default_symbol).upper())
+        return await self.run_coalesced(key, lambda: registry.get(symbol))
+
+    async def _live_stream(self, scope, receive, send):
+        """即時推送（Server-Sent Events）：事件由送入K線的執行緒放入佇列並喚醒事件迴圈"""
+        query = parse_query(scope.get('query_string', b''))
+        loop = asyncio.get_running_loop()
+        try:
+            processor = await self._processor(query.get('symbol'))
+            timeframes = app_module.parse_live_timeframes(query.get('timeframes'), processor.csv_files)
+            feed = await loop.run_in_executor(self.fallback_executor, processor.get_live_feed)
+        except UnknownSymbolError as e:
+            await self._send_json(send, 404, {'error': str(e), 'symbols': app_module.symbol_registry.symbols()})
+            return
+        except ValueError as e:
+            await self._send_json(send, 400, {'error': str(e)})
+            return
+
+        wake = asyncio.Event()
+        subscription = feed.subscribe(timeframes, notify=lambda: loop.call_soon_threadsafe(wake.set))
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+        try:
+            while not subscription.closed and not disconnected.done():
+                wake.clear()
+                events = subscription.drain()
+                if events:
+                    body = ''.join(app_module.sse_message(event) for event in events)
+                    await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+                waiter = asyncio.ensure_future(wake.wait())
+                done, _ = await asyncio.wait({waiter, disconnected}, timeout=LIVE_CONFIG['heartbeat_seconds'],
+                                             return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+                if not done:
+                    await send({'type': 'http.response.body', 'body': b': keep-alive\n\n', 'more_body': True})
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        except OSError:
+            pass  # 客戶端已斷線
+        finally:
+            feed.unsubscribe(subscription)
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def _send_cached(self, send, scope, processor, validators: Dict, build: Callable):
+        cache = processor.response_cache
+        request_headers = header_map(scope)
+        if cache.is_not_modified(validators['etag'], validators['last_modified'],
+                                 request_headers.get('if-none-match'),
+                                 request_headers.get('if-modified-since')):
+            headers = cache.validator_headers(validators['etag'], validators['last_modified'],
+                                              validators['immutable'])
+            await self._send(send, 304, encode_headers(headers), b'')
+            return
+
+        entry = cache.get(validators['etag'])
+        if entry is None:
+            entry = await self.run_coalesced(('etag', validators['etag']), build)
+        headers, body = cache.response_parts(entry, request_headers.get('accept-encoding'))
+        await self._send(send, 200, encode_headers(headers), body)
+
+    def _release(self, key: Optional[Tuple], future: asyncio.Future):
+        self._pending -= 1
+        if key is not None and self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()  # 所有等待者都已離開時避免「例外未被取得」警告
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, pending=self._pending, inflight_keys=len(self._inflight),
+                    max_pending=self.max_pending)
+
+    # ------------------------------------------------------------------ 重運算（於執行緒池內執行）
+
+    @staticmethod
+    def _validators(processor, handler_name: str, params: Dict) -> Optional[Dict]:
+        kind = HISTORICAL_KINDS.get(handler_name)
+        if kind is None:
+            return None
+        return processor.get_http_validators(kind, params['date'], params.get('timeframe', 'M1'))
+
+    @staticmethod
+    def _cache_put(processor, handler: Callable, params: Dict, query: Dict, validators: Dict):
+        _, body = handler(processor, params, query)
+        return processor.response_cache.put(
+            validators['etag'], body, validators['last_modified'], validators['immutable'])
+
+    def _compute_pre_market_data(self, processor, params: Dict, query: Dict) -> Tuple[int, bytes]:
+        data = processor.get_pre_market_data(params['date'], params['timeframe'])
+        if data is None:
+            raise HTTPError(404, '無法取得指定資料')
+        return 200, self._encode(data)
+
+    def _compute_playback_data(self, processor, params: Dict, query: Dict) -> Tuple[int, bytes]:
+        data = processor.get_market_hours_data(params['date'], params['timeframe'])
+        if data is None:
+            raise HTTPError(404, '無法取得播放資料')
+        return 200, self._encode(data)
+
+    def _compute_m1_playback_data(self, processor, params: Dict, query: Dict) -> Tuple[int, bytes]:
+        data = processor.get_market_hours_data(params['date'], 'M1')
+        if data is None:
+            raise HTTPError(404, '無法取得 M1 播放資料')
+        return 200, self._encode(data)
+
+    def _compute_random_data(self, processor, params: Dict, query: Dict) -> Tuple[int, bytes]:
+        timeframe = query.get('timeframe', 'M15')
+        if timeframe not in processor.get_available_timeframes():
+            timeframe = 'H4'  # 回到預設值
+        try:
+            filters = app_module.parse_date_filters(query)
+            random_date = processor.get_random_date(**filters)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        data = processor.get_pre_market_data(random_date, timeframe)
+        if data is None:
+            raise HTTPError(500, 'Unable to fetch data')
+        return 200, self._encode(data)
+
+    def _encode(self, data) -> bytes:
+        with request_metrics.stage('json_encoding'):
+            return self._dumps(data)
+
+    def _dumps(self, data) -> bytes:
+        """與 Flask jsonify 相同的 JSON 編碼"""
+        return f"{self.flask_app.json.dumps(data, separators=(',', ':'))}\n".encode('utf-8')
+
+    # ------------------------------------------------------------------ 傳送
+
+    async def _stream_wsgi(self, scope, body: bytes, send):
+        """
+        在轉交執行緒池執行 Flask 並逐塊送出回應
+
+        整個 WSGI 回應在同一個執行緒內迭代（stream_with_context 的請求環境不跨執行緒），
+        區塊經有上限的佇列交給事件迴圈；佇列滿時產生端等待，客戶端讀取慢時不會整份暫存。
+        客戶端斷線後產生端在下一個區塊停止並關閉 WSGI 回應。
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+        stopped = threading.Event()
+        done = object()
+
+        def produce():
+            chunks = iter_wsgi(self.flask_app, scope, body)
+            try:
+                for item in chunks:
+                    if stopped.is_set():
+                        return
+                    asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+                item = done
+            except Exception as e:
+                item = e
+            finally:
+                chunks.close()
+            if not stopped.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        producer = loop.run_in_executor(self.fallback_executor, produce)
+        started = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                if isinstance(item, Exception):
+                    if started:
+                        raise item  # 已送出標頭，只能中斷連線
+                    app_module.logger.error("API錯誤: %s", item, exc_info=item)
+                    await self._send_json(send, 500, {'error': str(item)})
+                    break
+                if not started:
+                    status, headers = item
+                    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                    started = True
+                else:
+                    await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+        finally:
+            # 提前結束（斷線或錯誤）時釋放可能正等待佇列空位的產生端
+            stopped.set()
+            while not queue.empty():
+                queue.get_nowait()
+        await producer
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _send_json(self, send, status: int, payload, extra_headers: List = None):
+        headers = [(b'content-type', b'application/json')] + (extra_headers or [])
+        await self._send(send, status, headers, self._dumps(payload))
+
+    @staticmethod
+    async def _send(send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        headers = [(k, v) for k, v in headers if k.lower() != b'content-length']
+        headers.append((b'content-length', str(len(body)).encode('ascii')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class _QueryArgs(dict):
+    """提供 Flask request.args 相同的 get(key, default, type) 介面"""
+
+    def get(self, key, default=None, type=None):
+        if key not in self:
+            return default
+        value = self[key]
+        if type is None:
+            return value
+        try:
+            return type(value)
+        except (TypeError, ValueError):
+            return default
+
+
+def parse_query(query_string: bytes) -> _QueryArgs:
+    from urllib.parse import parse_qsl
+    return _QueryArgs(parse_qsl(query_string.decode('latin-1'), keep_blank_values=True))
+
+
+def header_map(scope) -> Dict[str, str]:
+    """ASGI 請求標頭（小寫名稱，重複標頭以逗號合併）"""
+    headers = {}
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        headers[key] = f'{headers[key]},{value}' if key in headers else value
+    return headers
+
+
+def encode_headers(headers: List[Tuple[str, str]]) -> List[Tuple[bytes, bytes]]:
+    return [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+
+def wsgi_environ(scope, body: bytes) -> Dict:
+    """由 ASGI scope 與請求內容建立 WSGI environ"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server_name),
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[key] = value
+        else:
+            key = f'HTTP_{key}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def iter_wsgi(wsgi_app, scope, body: bytes) -> Iterator:
+    """
+    以 ASGI scope 呼叫 WSGI app，依序產生 (status, headers) 與各個非空內容區塊
+
+    結束或提前關閉（close()）時呼叫 WSGI 回應的 close()。
+    """
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    result = wsgi_app(wsgi_environ(scope, body), start_response)
+    try:
+        chunks = iter(result)
+        # start_response 可延到產生第一個區塊時才呼叫（PEP 3333）
+        first = []
+        while 'status' not in response:
+            first.append(next(chunks))
+        yield response['status'], response['headers']
+        for chunk in first:
+            if chunk:
+                yield chunk
+        for chunk in chunks:
+            if chunk:
+                yield chunk
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+def call_wsgi(wsgi_app, scope, body: bytes) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """以 ASGI scope 呼叫 WSGI app，返回 (status, headers, 完整內容)"""
+    chunks = iter_wsgi(wsgi_app, scope, body)
+    status, headers = next(chunks)
+    return status, headers, b''.join(chunks)
+
+
+app = AsyncAPI(app_module.app,
+               max_workers=ASGI_CONFIG['max_workers'],
+               max_pending=ASGI_CONFIG['max_pending'],
+               fallback_workers=ASGI_CONFIG['fallback_workers'])
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("需要 ASGI 伺服器：pip install uvicorn")
+        sys.exit(1)
+    uvicorn.run(app, host=ASGI_CONFIG['host'], port=ASGI_CONFIG['port'], log_level='warning')
@@ -4,8 +4,11 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta, date
 from typing import Dict, List, Optional, Tuple, Callable
+import json
 import logging
+import os
 import pytz
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import multiprocessing as mp
@@ -14,6 +17,10 @@ try:
     from .trading_hours import TradingHoursDetector
 except ImportError:
     from trading_hours import TradingHoursDetector
+from utils.config import CACHE_DIR
+from utils.continuity_config import PERFORMANCE_TARGETS, AUTO_MODE_CONFIG, get_optimal_mode
+
+logger = logging.getLogger(__name__)
 
 class ProgressBar:
     """進度條工具類"""
@@ -70,6 +77,62 @@ class ProgressBar:
         else:
             return f"{seconds/3600:.1f}時"
 
+class ThroughputHistory:
+    """
+    連續性檢查速度紀錄
+    
+    以 {timeframe: {mode: K線/秒}} 格式保存各策略的實測速度（指數移動平均），
+    並持久化為JSON，供下次啟動時的自動模式參考
+    """
+    
+    def __init__(self, filepath: Optional[str] = None, alpha: float = 0.3):
+        self.filepath = filepath
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._data = self._load()
+    
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        """讀取持久化的速度紀錄"""
+        if not self.filepath or not os.path.exists(self.filepath):
+            return {}
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"讀取連續性速度紀錄失敗: {str(e)}")
+            return {}
+    
+    def _save(self):
+        """寫入速度紀錄（先寫暫存檔再替換，避免半寫入）"""
+        if not self.filepath:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.filepath), exist_ok=True)
+            tmp_path = self.filepath + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.filepath)
+        except OSError as e:
+            logging.warning(f"寫入連續性速度紀錄失敗: {str(e)}")
+    
+    def get(self, timeframe: str, mode: str) -> Optional[float]:
+        """取得指定策略的歷史速度（K線/秒），無紀錄時返回None"""
+        return self._data.get(timeframe, {}).get(mode)
+    
+    def record(self, timeframe: str, mode: str, candles: int, elapsed: float):
+        """記錄一次實測結果"""
+        if candles <= 0 or elapsed <= 0:
+            return
+        speed = candles / elapsed
+        with self._lock:
+            modes = self._data.setdefault(timeframe, {})
+            previous = modes.get(mode)
+            modes[mode] = speed if previous is None else (
+                self.alpha * speed + (1 - self.alpha) * previous
+            )
+            self._save()
+
+
 class CandleContinuityCheckerV2:
     """
     K線連續性檢查器V2 - 優化版本
@@ -78,12 +141,16 @@ class CandleContinuityCheckerV2:
     
     def __init__(self, start_date: Optional[date] = None, 
                  optimization_mode: str = 'smart',
-                 show_progress: bool = True):
+                 show_progress: bool = True,
+                 throughput_history: Optional[ThroughputHistory] = None,
+                 gap_list_limit: Optional[int] = 10):
         """
         Args:
             start_date: 數據分析起始日期
-            optimization_mode: 優化模式 ('basic', 'smart', 'parallel', 'vectorized', 'hybrid')
+            optimization_mode: 優化模式 ('basic', 'smart', 'parallel', 'vectorized', 'hybrid', 'auto')
             show_progress: 是否顯示進度條
+            throughput_history: 自動模式使用的速度紀錄（預設持久化於 CACHE_DIR）
+            gap_list_limit: 報告中每類間隔列表的最大筆數（None表示返回完整列表）
         """
         self.timeframe_intervals = {
             'M1': 1, 'M5': 5, 'M15': 15, 
@@ -94,6 +161,14 @@ class CandleContinuityCheckerV2:
         self.trading_detector = TradingHoursDetector()
         self.optimization_mode = optimization_mode
         self.show_progress = show_progress
+        self.gap_list_limit = gap_list_limit
+        
+        if throughput_history is None and optimization_mode == 'auto':
+            throughput_history = ThroughputHistory(
+                os.path.join(CACHE_DIR, AUTO_MODE_CONFIG['throughput_file']),
+                alpha=AUTO_MODE_CONFIG['throughput_ema_alpha']
+            )
+        self.throughput_history = throughput_history
         
         # 預先計算的假日集合（加速查詢）
         self._precompute_holidays()
@@ -126,25 +201,208 @@ class CandleContinuityCheckerV2:
             date(2022, 7, 4), date(2023, 7, 4), date(2024, 7, 4), date(2025, 7, 4),
         ]
         self.holiday_set.update(us_holidays)
+        
+        # 以1970-01-01為原點的日序數陣列，供向量化查詢使用
+        epoch_ordinal = date(1970, 1, 1).toordinal()
+        self.holiday_ordinals = np.array(
+            sorted(d.toordinal() - epoch_ordinal for d in self.holiday_set),
+            dtype=np.int64
+        )
     
     def check_continuity(self, df: pd.DataFrame, timeframe: str) -> Dict:
         """主要檢查入口，根據優化模式選擇不同算法"""
         
-        print(f"\n使用優化模式: {self.optimization_mode}")
+        logger.debug("使用優化模式: %s", self.optimization_mode)
         
-        if self.optimization_mode == 'basic':
+        if self.optimization_mode == 'auto':
+            return self._check_auto(df, timeframe)
+        return self._run_mode(self.optimization_mode, df, timeframe)
+    
+    def _run_mode(self, mode: str, df: pd.DataFrame, timeframe: str) -> Dict:
+        """依策略名稱執行對應的檢查算法"""
+        if mode == 'basic':
             return self._check_basic(df, timeframe)
-        elif self.optimization_mode == 'smart':
+        elif mode == 'smart':
             return self._check_smart(df, timeframe)
-        elif self.optimization_mode == 'parallel':
+        elif mode == 'parallel':
             return self._check_parallel(df, timeframe)
-        elif self.optimization_mode == 'vectorized':
+        elif mode == 'vectorized':
             return self._check_vectorized(df, timeframe)
-        elif self.optimization_mode == 'hybrid':
+        elif mode == 'hybrid':
             return self._check_hybrid(df, timeframe)
         else:
             return self._check_basic(df, timeframe)
     
+    def select_auto_strategy(self, data_size: int, timeframe: str) -> Dict:
+        """
+        自動模式的策略選擇
+        
+        以 get_optimal_mode 的建議為起點（不在候選策略內時改用第一個候選策略）；
+        若有歷史實測速度，選擇預估用時最短的策略。最快的已測策略仍低於目標速度時，
+        嘗試尚未測量的候選策略。以實測速度預估的用時超出 PERFORMANCE_TARGETS 的
+        時間預算時，改為採樣檢查；沒有實測速度時先完整檢查一次取得實測值
+        （目標速度只是下限，不能據以判斷會超出預算）。
+        
+        Returns:
+            Dict: {'mode', 'expected_speed', 'predicted_seconds', 'budget_seconds',
+                   'sample_size'(None表示完整檢查), 'source'}
+        """
+        target = PERFORMANCE_TARGETS.get(timeframe, {})
+        budget = target.get('max_time_seconds')
+        min_speed = target.get('min_speed_klines_per_sec')
+        
+        candidates = AUTO_MODE_CONFIG['candidate_modes']
+        prior_mode = get_optimal_mode(data_size, timeframe)
+        if prior_mode not in candidates:
+            prior_mode = candidates[0]
+        mode = prior_mode
+        source = 'size_heuristic'
+        speed = None
+        
+        if self.throughput_history is not None:
+            speed = self.throughput_history.get(timeframe, prior_mode)
+            # 先前未測量過建議策略時，先採用它以取得實測值
+            if speed is not None:
+                measured = {m: self.throughput_history.get(timeframe, m) for m in candidates}
+                unmeasured = [m for m, v in measured.items() if not v]
+                measured = {m: v for m, v in measured.items() if v}
+                mode = max(measured, key=measured.get)
+                speed = measured[mode]
+                source = 'measured_throughput'
+                
+                if min_speed and speed < min_speed and unmeasured:
+                    mode = unmeasured[0]
+                    speed = None
+                    source = 'exploration'
+        
+        expected_speed = speed or min_speed
+        predicted = data_size / expected_speed if expected_speed else None
+        
+        sample_size = None
+        if budget and speed is not None and predicted > budget:
+            allowed = int(budget * expected_speed * AUTO_MODE_CONFIG['sample_budget_ratio'])
+            sample_size = max(AUTO_MODE_CONFIG['min_sample_size'], allowed)
+            if sample_size >= data_size:
+                sample_size = None
+        
+        return {
+            'mode': mode,
+            'expected_speed': expected_speed,
+            'predicted_seconds': predicted,
+            'budget_seconds': budget,
+            'sample_size': sample_size,
+            'source': source
+        }
+    
+    def _check_auto(self, df: pd.DataFrame, timeframe: str) -> Dict:
+        """
+        自動模式: 依數據量與歷史速度選擇策略，並執行時間預算
+        """
+        start_time = time.time()
+        
+        plan = self.select_auto_strategy(len(df), timeframe)
+        mode = plan['mode']
+        
+        if plan['sample_size']:
+            result = self._check_sampled(df, timeframe, mode, plan['sample_size'])
+        else:
+            result = self._run_mode(mode, df, timeframe)
+        
+        elapsed = time.time() - start_time
+        if result.get('status') != 'completed':
+            return result
+        
+        checked = result['performance']['total_processed']
+        if self.throughput_history is not None and checked >= AUTO_MODE_CONFIG['min_record_size']:
+            self.throughput_history.record(timeframe, mode, checked, elapsed)
+        
+        target = PERFORMANCE_TARGETS.get(timeframe, {})
+        speed = checked / elapsed if elapsed > 0 else float('inf')
+        budget_met = plan['budget_seconds'] is None or elapsed <= plan['budget_seconds']
+        speed_met = speed >= target.get('min_speed_klines_per_sec', 0)
+        
+        result['optimization_mode'] = mode
+        result['auto'] = {
+            'strategy': mode,
+            'selection_source': plan['source'],
+            'sampled': bool(plan['sample_size']),
+            'sample_size': plan['sample_size'],
+            'predicted_seconds': round(plan['predicted_seconds'], 3) if plan['predicted_seconds'] is not None else None,
+            'budget_seconds': plan['budget_seconds'],
+            'elapsed_seconds': round(elapsed, 3),
+            'speed_klines_per_sec': round(speed, 1) if elapsed > 0 else None,
+            'budget_met': budget_met,
+            'speed_met': speed_met,
+            'target_met': budget_met and speed_met
+        }
+        return result
+    
+    def _check_sampled(self, df: pd.DataFrame, timeframe: str, mode: str,
+                       sample_size: int) -> Dict:
+        """
+        採樣檢查: 在全時段均勻選取多個連續區塊分別檢查後合併
+        
+        連續性百分比依採樣結果估算，報告中標示 sampled=True
+        """
+        start_time = time.time()
+        
+        data = self._prepare_data(df, timeframe)
+        if len(data) < 2:
+            return self._insufficient_data_response(len(data))
+        
+        num_blocks = max(1, min(AUTO_MODE_CONFIG['sample_blocks'], sample_size // 2))
+        block_len = max(2, sample_size // num_blocks)
+        starts = np.unique(np.linspace(0, max(0, len(data) - block_len), num_blocks).astype(int))
+        
+        totals = {'total_candles': 0, 'total_data_gaps': 0, 'total_trading_gaps': 0,
+                  'total_missing_data': 0, 'total_duplicates': 0}
+        data_gaps, trading_gaps, duplicates = [], [], []
+        
+        for block_start in starts:
+            block = data.iloc[block_start:block_start + block_len]
+            block_result = self._run_mode(mode, block, timeframe)
+            if block_result.get('status') != 'completed':
+                continue
+            for key in totals:
+                totals[key] += block_result['summary'][key]
+            data_gaps.extend(block_result['data_gaps'])
+            trading_gaps.extend(block_result['trading_gaps'])
+            duplicates.extend(block_result['duplicates'])
+        
+        elapsed = time.time() - start_time
+        checked = totals['total_candles']
+        expected_total = checked + totals['total_missing_data']
+        continuity_percentage = (checked / expected_total * 100) if expected_total > 0 else 0
+        candles_per_second = checked / elapsed if elapsed > 0 else 0
+        
+        return {
+            'status': 'completed',
+            'timeframe': timeframe,
+            'optimization_mode': mode,
+            'sampled': True,
+            'performance': {
+                'elapsed_time': f"{elapsed:.2f}秒",
+                'processing_speed': f"{candles_per_second:.0f} K線/秒",
+                'total_processed': checked
+            },
+            'summary': {
+                **totals,
+                'total_candles': len(data),
+                'sampled_candles': checked,
+                'sample_ratio': round(checked / len(data), 4),
+                'continuity_percentage': round(continuity_percentage, 2),
+                'time_range': {
+                    'start': str(data['DateTime'].min()),
+                    'end': str(data['DateTime'].max())
+                }
+            },
+            'data_gaps': data_gaps[:self.gap_list_limit],
+            'trading_gaps': trading_gaps[:self.gap_list_limit],
+            'duplicates': duplicates[:self.gap_list_limit],
+            'recommendations': ['採樣檢查（超出時間預算），連續性為估算值'] +
+                               self._generate_recommendations(data_gaps, duplicates, timeframe)
+        }
+    
     def _check_basic(self, df: pd.DataFrame, timeframe: str) -> Dict:
         """
         方案1: 基礎優化版本
@@ -200,7 +458,7 @@ class CandleContinuityCheckerV2:
         """
         方案2: 智能跳躍檢查
         - 跳過已知的正常停盤時段
-        - 批量處理連續正常區間
+        - 以 (start, end) 索引對表示交易時段，段內使用向量化比較
         """
         start_time = time.time()
         
@@ -209,10 +467,11 @@ class CandleContinuityCheckerV2:
             return self._insufficient_data_response(len(data))
         
         expected_interval = timedelta(minutes=self.timeframe_intervals[timeframe])
+        expected_ns = int(expected_interval.total_seconds() * 1e9)
         
         # 智能分段：識別連續交易時段
         segments = self._identify_trading_segments(data, timeframe)
-        total_checks = sum(len(seg) - 1 for seg in segments if len(seg) > 1)
+        total_checks = sum(end - start - 1 for start, end in segments if end - start > 1)
         
         progress = ProgressBar(total_checks, f"智能檢查 {timeframe}") if self.show_progress else None
         
@@ -221,42 +480,45 @@ class CandleContinuityCheckerV2:
         trading_gaps = []
         data_gaps = []
         
+        times = data['DateTime'].to_numpy(dtype='datetime64[ns]')
+        diffs = np.diff(times.astype(np.int64))
+        
+        # 段內相鄰兩根K線：i-1 與 i 屬於同一段
+        in_segment = np.zeros(len(diffs), dtype=bool)
+        for seg_start, seg_end in segments:
+            in_segment[seg_start:seg_end - 1] = True
+        
         # 只檢查每個交易時段內部的連續性
-        for segment in segments:
-            if len(segment) < 2:
-                continue
-                
-            for i in range(1, len(segment)):
-                current_time = segment.iloc[i]['DateTime']
-                previous_time = segment.iloc[i-1]['DateTime']
-                actual_interval = current_time - previous_time
-                
-                if actual_interval == timedelta(0):
-                    duplicates.append(self._create_duplicate_info(i, current_time))
-                elif actual_interval > expected_interval:
-                    # 段內異常才是真正的數據缺失
-                    gap_info = self._analyze_gap(
-                        previous_time, current_time, actual_interval,
-                        expected_interval, i, timeframe
-                    )
-                    data_gaps.append(gap_info)
-                    gaps.append(gap_info)
-                
-                if progress:
-                    progress.update(1)
+        for pos in np.flatnonzero(in_segment & (diffs == 0)):
+            i = int(pos) + 1
+            duplicates.append(self._create_duplicate_info(i, data['DateTime'].iloc[i]))
+        
+        for pos in np.flatnonzero(in_segment & (diffs > expected_ns)):
+            i = int(pos) + 1
+            previous_time = data['DateTime'].iloc[i - 1]
+            current_time = data['DateTime'].iloc[i]
+            # 段內異常才是真正的數據缺失
+            gap_info = self._analyze_gap(
+                previous_time, current_time, current_time - previous_time,
+                expected_interval, i, timeframe
+            )
+            data_gaps.append(gap_info)
+            gaps.append(gap_info)
+        
+        if progress:
+            progress.update(total_checks)
         
         # 段間間隔都是正常停盤
-        for i in range(1, len(segments)):
-            if len(segments[i-1]) > 0 and len(segments[i]) > 0:
-                gap_info = self._analyze_gap(
-                    segments[i-1].iloc[-1]['DateTime'],
-                    segments[i].iloc[0]['DateTime'],
-                    segments[i].iloc[0]['DateTime'] - segments[i-1].iloc[-1]['DateTime'],
-                    expected_interval, 0, timeframe
-                )
-                gap_info['is_normal_gap'] = True
-                gap_info['reason'] = '交易時段間隔'
-                trading_gaps.append(gap_info)
+        for (_, prev_end), (next_start, _) in zip(segments, segments[1:]):
+            previous_time = data['DateTime'].iloc[prev_end - 1]
+            current_time = data['DateTime'].iloc[next_start]
+            gap_info = self._analyze_gap(
+                previous_time, current_time, current_time - previous_time,
+                expected_interval, next_start, timeframe
+            )
+            gap_info['is_normal_gap'] = True
+            gap_info['reason'] = '交易時段間隔'
+            trading_gaps.append(gap_info)
         
         elapsed = time.time() - start_time
         return self._generate_report(data, gaps, duplicates, trading_gaps,
@@ -362,28 +624,13 @@ class CandleContinuityCheckerV2:
                 if idx == 0:
                     continue
                     
-                current_time = data.loc[idx, 'DateTime']
-                previous_time = data.loc[idx-1, 'DateTime']
-                
-                # 快速判斷是否為週末或假日
-                is_weekend = current_time.weekday() >= 5 or previous_time.weekday() >= 5
-                is_holiday = (current_time.date() in self.holiday_set or 
-                            previous_time.date() in self.holiday_set)
-                
-                # 快速判斷是否跨越收盤時間
-                is_close_time = (previous_time.hour >= 17 and current_time.hour < 17)
-                
-                is_normal = is_weekend or is_holiday or is_close_time
-                
-                gap_info = {
-                    'start_time': previous_time,
-                    'end_time': current_time,
-                    'gap_minutes': time_diffs[idx],
-                    'is_normal_gap': is_normal,
-                    'reason': self._get_gap_reason(is_weekend, is_holiday, is_close_time)
-                }
+                # 快速判斷週末、假日或跨越收盤時間（與混合策略共用）
+                gap_info = self._analyze_gap_fast(
+                    data.loc[idx-1, 'DateTime'], data.loc[idx, 'DateTime'], time_diffs[idx],
+                    expected_minutes, idx, timeframe
+                )
                 
-                if is_normal:
+                if gap_info['is_normal_gap']:
                     trading_gaps.append(gap_info)
                 else:
                     data_gaps.append(gap_info)
@@ -391,7 +638,7 @@ class CandleContinuityCheckerV2:
         
         # 處理重複
         duplicates = [
-            {'index': idx, 'time': data.loc[idx, 'DateTime']}
+            self._create_duplicate_info(idx, data.loc[idx, 'DateTime'])
             for idx in duplicate_indices
         ]
         
@@ -421,9 +668,9 @@ class CandleContinuityCheckerV2:
         
         expected_minutes = self.timeframe_intervals[timeframe]
         
-        # 階段1: 向量化快速掃描
+        # 階段1: 向量化快速掃描（重複時間戳與超過預期間隔者，判斷與向量化策略相同）
         time_diffs = data['DateTime'].diff().dt.total_seconds() / 60
-        anomaly_mask = (time_diffs != expected_minutes) & (time_diffs > 0)
+        anomaly_mask = (time_diffs == 0) | (time_diffs > expected_minutes)
         anomaly_indices = data.index[anomaly_mask].tolist()
         
         if self.show_progress:
@@ -559,32 +806,43 @@ class CandleContinuityCheckerV2:
         else:
             return '數據缺失'
     
-    def _identify_trading_segments(self, data: pd.DataFrame, timeframe: str) -> List[pd.DataFrame]:
-        """識別連續交易時段"""
-        segments = []
-        current_segment = []
+    def _trading_time_mask(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        向量化計算每根K線是否位於交易時間
+        
+        以陣列運算取代逐行判斷：非週末、非假日、非17點收盤時段
+        """
+        times = data['DateTime'].to_numpy(dtype='datetime64[ns]')
+        day_ordinals = times.astype('datetime64[D]').astype(np.int64)
+        
+        # 1970-01-01 為週四 (weekday=3)
+        weekdays = (day_ordinals + 3) % 7
+        hours = (times - times.astype('datetime64[D]')).astype('timedelta64[h]').astype(np.int64)
+        
+        is_holiday = np.isin(day_ordinals, self.holiday_ordinals, assume_unique=False)
+        
+        return (weekdays < 5) & ~is_holiday & (hours != 17)
+    
+    def _identify_trading_segments(self, data: pd.DataFrame, timeframe: str) -> List[Tuple[int, int]]:
+        """
+        識別連續交易時段
         
-        for i, row in data.iterrows():
-            dt = row['DateTime']
-            
-            # 判斷是否在交易時間
-            is_trading_time = (
-                dt.weekday() < 5 and  # 非週末
-                dt.date() not in self.holiday_set and  # 非假日
-                not (dt.hour == 17 and dt.minute >= 0)  # 非收盤時間
-            )
-            
-            if is_trading_time:
-                current_segment.append(row)
-            else:
-                if current_segment:
-                    segments.append(pd.DataFrame(current_segment))
-                    current_segment = []
+        Returns:
+            List[Tuple[int, int]]: 每個交易時段的 (start, end) 位置索引（end 不含），
+            需要時可用 data.iloc[start:end] 取得該段視圖
+        """
+        if len(data) == 0:
+            return []
+        
+        mask = self._trading_time_mask(data)
         
-        if current_segment:
-            segments.append(pd.DataFrame(current_segment))
+        # 找出 mask 由 False->True 與 True->False 的轉折點
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
         
-        return segments
+        return [(int(start), int(end)) for start, end in zip(starts, ends)]
     
     def _check_chunk(self, chunk: pd.DataFrame, expected_interval: timedelta, 
                     timeframe: str) -> Dict:
@@ -660,9 +918,9 @@ class CandleContinuityCheckerV2:
                     'end': str(data['DateTime'].max())
                 }
             },
-            'data_gaps': data_gaps[:10],  # 只返回前10個以減少數據量
-            'trading_gaps': trading_gaps[:10],
-            'duplicates': duplicates[:10],
+            'data_gaps': data_gaps[:self.gap_list_limit],  # 預設只返回前10個以減少數據量
+            'trading_gaps': trading_gaps[:self.gap_list_limit],
+            'duplicates': duplicates[:self.gap_list_limit],
             'recommendations': self._generate_recommendations(data_gaps, duplicates, timeframe)
         }
     
@@ -0,0 +1,228 @@
+# 檔名：continuity_store.py - K線連續性報告持久化與增量檢查
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+from utils.config import CACHE_DIR, CACHE_VERSION
+
+GAP_LIST_KEYS = ('data_gaps', 'trading_gaps', 'duplicates')
+SUMMARY_COUNT_KEYS = ('total_data_gaps', 'total_trading_gaps', 'total_missing_data', 'total_duplicates')
+
+
+def hash_timestamps(times: np.ndarray) -> str:
+    """計算時間序列的雜湊值（用於確認已檢查前綴未被修改）"""
+    values = np.ascontiguousarray(times.astype('datetime64[ns]').view(np.int64))
+    return hashlib.blake2b(values.tobytes(), digest_size=16).hexdigest()
+
+
+def _to_jsonable(value: Any) -> Any:
+    """將間隔記錄中的 Timestamp / numpy 數值轉換為JSON格式"""
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return str(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+class ContinuityReportStore:
+    """
+    連續性報告存儲
+
+    每個時間框架保存完整的間隔列表與水位線（最後檢查的時間戳、已檢查K線數
+    及已檢查前綴的雜湊值）。再次檢查時若前綴未變，只檢查水位線之後的新K線
+    並合併到既有報告，否則重新執行完整檢查。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.path.join(CACHE_DIR, 'continuity')
+        self.reports = {}  # {timeframe: report}
+        self._lock = threading.Lock()
+
+    def _report_path(self, timeframe: str) -> str:
+        return os.path.join(self.cache_dir, f'{timeframe}.json')
+
+    def load(self, timeframe: str) -> Optional[Dict]:
+        """讀取持久化的報告"""
+        path = self._report_path(timeframe)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"讀取連續性報告失敗 [{timeframe}]: {str(e)}")
+            return None
+
+        watermark = report.get('watermark') or {}
+        if watermark.get('cache_version') != CACHE_VERSION:
+            return None
+        return report
+
+    def save(self, timeframe: str, report: Dict):
+        """寫入報告（先寫暫存檔再替換）"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._report_path(timeframe)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"寫入連續性報告失敗 [{timeframe}]: {str(e)}")
+
+    def get(self, timeframe: str) -> Optional[Dict]:
+        """取得記憶體中的報告"""
+        return self.reports.get(timeframe)
+
+    def update(self, timeframe: str, df: pd.DataFrame, checker) -> Dict:
+        """
+        更新指定時間框架的報告
+
+        Args:
+            timeframe: 時間框架
+            df: 已按 DateTime 排序的完整K線資料
+            checker: CandleContinuityCheckerV2 實例（需返回完整間隔列表）
+
+        Returns:
+            Dict: 合併後的報告，'incremental' 欄位說明本次檢查方式
+        """
+        with self._lock:
+            previous = self.reports.get(timeframe) or self.load(timeframe)
+            times = df['DateTime'].to_numpy(dtype='datetime64[ns]')
+
+            checked_rows = self._valid_prefix_rows(previous, times)
+            if checked_rows is not None and checked_rows == len(times):
+                report = previous
+                report['incremental'] = {'mode': 'cached', 'new_candles': 0}
+            elif checked_rows is not None:
+                # 從最後一根已檢查K線開始，確保邊界上的間隔被檢查到
+                tail = df.iloc[checked_rows - 1:]
+                tail_result = checker.check_continuity(tail, timeframe)
+                if tail_result.get('status') != 'completed' or tail_result.get('sampled'):
+                    report = self._full_check(timeframe, df, times, checker)
+                else:
+                    report = self._merge(previous, tail_result, checker, timeframe)
+                    report['watermark'] = self._make_watermark(times, report)
+                    report['incremental'] = {'mode': 'incremental', 'new_candles': len(times) - checked_rows}
+            else:
+                report = self._full_check(timeframe, df, times, checker)
+
+            self.reports[timeframe] = report
+            if report.get('status') == 'completed' and report['incremental']['mode'] != 'cached':
+                self.save(timeframe, report)
+            return report
+
+    def _valid_prefix_rows(self, previous: Optional[Dict], times: np.ndarray) -> Optional[int]:
+        """檢查既有水位線是否仍適用，返回已檢查的K線數；不適用時返回None"""
+        if not previous or previous.get('status') != 'completed':
+            return None
+        watermark = previous.get('watermark')
+        if not watermark:
+            return None
+
+        checked_rows = watermark['checked_rows']
+        if checked_rows < 1 or checked_rows > len(times):
+            return None
+        if str(pd.Timestamp(times[checked_rows - 1])) != watermark['last_timestamp']:
+            return None
+        if hash_timestamps(times[:checked_rows]) != watermark['prefix_hash']:
+            return None
+        return checked_rows
+
+    def _make_watermark(self, times: np.ndarray, report: Dict) -> Optional[Dict]:
+        """建立水位線（採樣檢查的報告不建立水位線）"""
+        if report.get('status') != 'completed' or report.get('sampled') or len(times) == 0:
+            return None
+        return {
+            'last_timestamp': str(pd.Timestamp(times[-1])),
+            'checked_rows': int(len(times)),
+            'prefix_hash': hash_timestamps(times),
+            'cache_version': CACHE_VERSION,
+            'updated_at': datetime.now().isoformat()
+        }
+
+    def _full_check(self, timeframe: str, df: pd.DataFrame, times: np.ndarray, checker) -> Dict:
+        """完整檢查並建立新的水位線"""
+        report = _to_jsonable(checker.check_continuity(df, timeframe))
+        report['watermark'] = self._make_watermark(times, report)
+        report['incremental'] = {'mode': 'full', 'new_candles': int(len(times))}
+        return report
+
+    def _merge(self, previous: Dict, tail_result: Dict, checker, timeframe: str) -> Dict:
+        """將尾段檢查結果合併到既有報告"""
+        tail_result = _to_jsonable(tail_result)
+        prev_summary = previous['summary']
+        tail_summary = tail_result['summary']
+
+        # 尾段第0根即既有報告的最後一根K線
+        offset = prev_summary['total_candles'] - 1
+        report = dict(previous)
+        for key in GAP_LIST_KEYS:
+            shifted = []
+            for item in tail_result.get(key, []):
+                item = dict(item)
+                for index_key in ('index', 'previous_index', 'start_index', 'end_index'):
+                    if index_key in item:
+                        item[index_key] += offset
+                shifted.append(item)
+            report[key] = list(previous.get(key, [])) + shifted
+
+        summary = dict(prev_summary)
+        summary['total_candles'] = prev_summary['total_candles'] + tail_summary['total_candles'] - 1
+        for key in SUMMARY_COUNT_KEYS:
+            summary[key] = prev_summary.get(key, 0) + tail_summary.get(key, 0)
+        expected_total = summary['total_candles'] + summary['total_missing_data']
+        summary['continuity_percentage'] = round(
+            summary['total_candles'] / expected_total * 100 if expected_total > 0 else 0, 2
+        )
+        summary['time_range'] = {
+            'start': prev_summary['time_range']['start'],
+            'end': tail_summary['time_range']['end']
+        }
+
+        report['summary'] = summary
+        report['performance'] = tail_result.get('performance', previous.get('performance'))
+        report['recommendations'] = checker._generate_recommendations(
+            report['data_gaps'], report['duplicates'], timeframe
+        )
+        return report
+
+
+def paginate_report(report: Dict, page: int = 1, page_size: int = 10) -> Dict:
+    """
+    返回報告的分頁視圖：間隔列表只保留指定頁，並附上分頁資訊
+    """
+    page = max(1, page)
+    page_size = max(1, page_size)
+    start = (page - 1) * page_size
+
+    view = {k: v for k, v in report.items() if k not in GAP_LIST_KEYS}
+    totals = {}
+    for key in GAP_LIST_KEYS:
+        items = report.get(key, [])
+        totals[key] = len(items)
+        view[key] = items[start:start + page_size]
+
+    view['pagination'] = {
+        'page': page,
+        'page_size': page_size,
+        'totals': totals,
+        'total_pages': max(1, -(-max(totals.values(), default=0) // page_size))
+    }
+    return view
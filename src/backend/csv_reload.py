@@ -0,0 +1,122 @@
+# 檔名：csv_reload.py - 追加CSV的偵測、只讀取新增尾段與定期重新載入
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TAIL_HASH_BYTES = 4096  # 以已載入內容最後這段位元組確認檔案只有追加
+
+
+def _hash_range(f, start: int, end: int) -> str:
+    f.seek(start)
+    return hashlib.blake2b(f.read(end - start), digest_size=16).hexdigest()
+
+
+def csv_file_state(filepath: str) -> Dict:
+    """
+    讀取CSV前記錄的檔案狀態（在 read_csv 之前取得，讀取期間追加的列之後會被重複讀到，
+    由呼叫端依時間去重，不會遺漏）
+
+    Returns:
+        Dict: {'size', 'mtime_ns', 'tail_hash'}
+    """
+    stat = os.stat(filepath)
+    with open(filepath, 'rb') as f:
+        tail_hash = _hash_range(f, max(0, stat.st_size - TAIL_HASH_BYTES), stat.st_size)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'tail_hash': tail_hash}
+
+
+def read_appended_rows(filepath: str, state: Dict) -> Tuple[str, Optional[pd.DataFrame], Dict]:
+    """
+    只解析上次載入之後追加的完整列
+
+    Args:
+        filepath: CSV 路徑
+        state: 上次的 csv_file_state
+
+    Returns:
+        (mode, rows, new_state)
+        mode: 'unchanged' | 'appended' | 'rewritten'（檔案變小或已載入部分被修改，需完整載入）
+        rows: 追加的列（含原檔標頭欄位），僅 mode == 'appended' 時不為 None
+        new_state: 已消化到的位置（最後一列不完整時保留到下次）
+    """
+    stat = os.stat(filepath)
+    if stat.st_size == state['size'] and stat.st_mtime_ns == state['mtime_ns']:
+        return 'unchanged', None, state
+
+    with open(filepath, 'rb') as f:
+        if stat.st_size < state['size'] or \
+                _hash_range(f, max(0, state['size'] - TAIL_HASH_BYTES), state['size']) != state['tail_hash']:
+            return 'rewritten', None, state
+
+        f.seek(0)
+        header = f.readline()
+        f.seek(max(0, state['size'] - 1))
+        previous = f.read(1) if state['size'] else b'\n'
+        chunk = f.read(stat.st_size - state['size'])
+
+    # 上次載入的最後一列沒有換行時，新內容的第一段屬於該列
+    if previous != b'\n':
+        newline = chunk.find(b'\n')
+        chunk = chunk[newline + 1:] if newline >= 0 else b''
+    # 最後一列尚未寫完時留待下次
+    complete = chunk.rfind(b'\n') + 1
+    consumed = stat.st_size - (len(chunk) - complete)
+    chunk = chunk[:complete]
+
+    with open(filepath, 'rb') as f:
+        new_state = {'size': consumed, 'mtime_ns': stat.st_mtime_ns,
+                     'tail_hash': _hash_range(f, max(0, consumed - TAIL_HASH_BYTES), consumed)}
+    if not chunk.strip():
+        return 'unchanged', None, new_state
+    return 'appended', pd.read_csv(io.BytesIO(header + chunk)), new_state
+
+
+class ReloadWatcher:
+    """
+    定期檢查資料處理器的CSV是否有追加並重新載入
+
+    prefork 模式下每個 worker 各自執行（fork 不會複製執行緒），各 worker 的資料各自更新。
+    """
+
+    def __init__(self, processors: Callable[[], Iterable], interval: float):
+        """
+        Args:
+            processors: 返回要檢查的資料處理器（需提供 reload_appended()）
+            interval: 檢查間隔（秒）
+        """
+        self.processors = processors
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'ReloadWatcher':
+        self._thread = threading.Thread(target=self._run, name='csv-reload-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            reload_all(self.processors())
+
+
+def reload_all(processors: Iterable):
+    """逐一重新載入資料處理器的追加資料（單一處理器失敗只記錄，不影響其他處理器）"""
+    for processor in processors:
+        try:
+            result = processor.reload_appended()
+            if result['reloaded']:
+                logger.info("已重新載入追加資料 [%s]: %s", processor.symbol,
+                            {tf: info['new_rows'] for tf, info in result['reloaded'].items()})
+        except Exception as e:
+            logger.exception("重新載入追加資料失敗 [%s]: %s", processor.symbol, e)
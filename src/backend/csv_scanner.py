@@ -0,0 +1,142 @@
+# 檔名：csv_scanner.py - CSV 日期欄位快速掃描
+
+import logging
+import mmap
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+DATE_WIDTH = 10  # MM/DD/YYYY
+DATE_FORMAT = '%m/%d/%Y'
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def scan_csv_dates(filepath: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Dict:
+    """
+    掃描CSV的 Date 欄位，取得精確的交易日集合與記錄數
+
+    以記憶體映射讀取檔案，向量化找出每行起點並擷取固定寬度的日期前綴，
+    不經過 pandas 解析完整檔案。檔案格式不符（Date 非第一欄或非固定寬度）
+    時退回只讀取 Date 欄位的 pandas 解析。
+
+    Args:
+        filepath: CSV 檔案路徑
+        chunk_bytes: 每次處理的位元組數（限制暫存陣列大小）
+
+    Returns:
+        Dict: {'dates': set(date), 'date_rows': {date: 記錄數}, 'row_count': int,
+               'start_date': date, 'end_date': date, 'method': 'mmap' | 'pandas'}
+    """
+    result = _scan_mmap(filepath, chunk_bytes)
+    if result is None:
+        result = _scan_pandas(filepath)
+
+    dates = result['date_rows']
+    result['dates'] = set(dates)
+    result['start_date'] = min(dates) if dates else None
+    result['end_date'] = max(dates) if dates else None
+    return result
+
+
+def _scan_mmap(filepath: str, chunk_bytes: int) -> Optional[Dict]:
+    """記憶體映射掃描，格式不符時返回None"""
+    if os.path.getsize(filepath) == 0:
+        return None
+
+    # 離開時關閉映射與檔案：Windows 上映射中的檔案無法被替換或改寫（熱重載需要）。
+    # 關閉前不能留有指向映射的陣列，因此掃描中的例外在此處理（退回 pandas 掃描），
+    # 不帶著引用映射的 traceback 離開
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        buf = np.frombuffer(mapped, dtype=np.uint8)
+        try:
+            return _scan_buffer(buf, chunk_bytes)
+        except Exception as e:
+            logger.warning(f"記憶體映射掃描失敗，改用 pandas [{filepath}]: {str(e)}")
+            return None
+        finally:
+            del buf
+
+
+def _scan_buffer(buf: np.ndarray, chunk_bytes: int) -> Optional[Dict]:
+    """掃描已映射的檔案內容，格式不符時返回None（只建立暫時的切片，不保留映射的參照）"""
+    size = len(buf)
+
+    # 標題列
+    header_end = _find_byte(buf, ord('\n'), 0, min(size, 4096))
+    if header_end is None:
+        return None
+    header = bytes(buf[:header_end]).decode('utf-8', errors='replace').lstrip('\ufeff').strip()
+    if header.split(',')[0].strip() != 'Date':
+        return None
+
+    offsets = np.arange(DATE_WIDTH + 1)
+    key_counts = {}
+    row_count = 0
+
+    pos = header_end + 1
+    while pos < size:
+        end = min(size, pos + chunk_bytes)
+        newlines = np.flatnonzero(buf[pos:end] == ord('\n')) + pos
+
+        if end < size:
+            # 只處理區塊內完整的行，最後不完整的行留給下一區塊
+            if not len(newlines):
+                return None  # 單行超過區塊大小，格式不符
+            starts = np.concatenate(([pos], newlines[:-1] + 1))
+            next_pos = int(newlines[-1]) + 1
+        else:
+            starts = np.concatenate(([pos], newlines + 1))
+            starts = starts[starts < size]
+            next_pos = size
+
+        # 略過空行
+        first_bytes = buf[starts]
+        starts = starts[(first_bytes != ord('\r')) & (first_bytes != ord('\n'))]
+        if len(starts):
+            if starts[-1] + DATE_WIDTH >= size:
+                return None
+            prefixes = buf[starts[:, None] + offsets]
+            if not (prefixes[:, DATE_WIDTH] == ord(',')).all():
+                return None
+
+            keys = np.ascontiguousarray(prefixes[:, :DATE_WIDTH]).view(f'S{DATE_WIDTH}').ravel()
+            # 檔案依時間排序，相同日期連續出現：以變化點切分，避免排序
+            run_starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+            run_counts = np.diff(np.append(run_starts, len(keys)))
+            for key, count in zip(keys[run_starts], run_counts):
+                key_counts[key] = key_counts.get(key, 0) + int(count)
+            row_count += len(starts)
+
+        pos = next_pos
+
+    try:
+        date_rows = {
+            datetime.strptime(key.decode('ascii'), DATE_FORMAT).date(): count
+            for key, count in key_counts.items()
+        }
+    except ValueError:
+        return None
+
+    return {'date_rows': date_rows, 'row_count': row_count, 'method': 'mmap'}
+
+
+def _scan_pandas(filepath: str) -> Dict:
+    """只讀取 Date 欄位的 pandas 掃描"""
+    df_dates = pd.read_csv(filepath, usecols=['Date'])
+    parsed = pd.to_datetime(df_dates['Date'], format=DATE_FORMAT).dt.date
+    counts = parsed.value_counts()
+    return {
+        'date_rows': {d: int(c) for d, c in counts.items()},
+        'row_count': len(df_dates),
+        'method': 'pandas'
+    }
+
+
+def _find_byte(buf: np.ndarray, value: int, start: int, end: int) -> Optional[int]:
+    hits = np.flatnonzero(buf[start:end] == value)
+    return int(hits[0]) + start if len(hits) else None
@@ -5,26 +5,52 @@ import numpy as np
 import os
 import random
 import logging
+import threading
+import time
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 
 from utils.config import (DATA_DIR, CSV_FILES, LOG_DIR, RANDOM_DATE_CONFIG,
                           FVG_CLEARING_WINDOW, CACHE_MAX_SIZE, 
                           MAX_RECORDS_LIMIT, MEMORY_OPTIMIZATION_THRESHOLD, 
-                          FULL_DATA_LOADING, ANALYSIS_CANDLE_COUNT)
+                          FULL_DATA_LOADING, ANALYSIS_CANDLE_COUNT, CACHE_DIR,
+                          HTTP_CACHE_CONFIG, SYMBOL_CONFIG, LIVE_CONFIG, RANGE_CONFIG,
+                          FVG_INDEX_CONFIG)
+from utils.continuity_config import AUTO_MODE_CONFIG
 from utils.time_utils import datetime_to_timestamp, validate_timestamp
 try:
-    from utils.loading_config import LOADING_CONFIG, OPTIMIZED_DTYPES, MEMORY_CONFIG, FVG_PERFORMANCE_CONFIG
+    from utils.loading_config import (LOADING_CONFIG, OPTIMIZED_DTYPES, MEMORY_CONFIG, FVG_PERFORMANCE_CONFIG,
+                                      PRICE_ENCODING_CONFIG)
     USE_PERFORMANCE_OPTIMIZATION = True
 except ImportError:
     USE_PERFORMANCE_OPTIMIZATION = False
     LOADING_CONFIG = {"use_vectorization": False, "enable_caching": False}
     OPTIMIZED_DTYPES = {}
+    PRICE_ENCODING_CONFIG = {"enabled": False}
+    MEMORY_CONFIG = {"clear_unused_data": False}
     print("注意: 性能優化配置不可用，使用默認設置")
 from backend.time_utils import TimeConverter
 from backend.fvg_detector_simple import FVGDetectorSimple
 from backend.us_holidays import holiday_detector
-from backend.candle_continuity_checker_v2 import CandleContinuityCheckerV2
+from backend.candle_continuity_checker_v2 import CandleContinuityCheckerV2, ThroughputHistory
+from backend.continuity_store import ContinuityReportStore, paginate_report
+from backend.gap_index import GapIntervalIndex
+from backend.date_sampler import DateSampler
+from backend.csv_scanner import scan_csv_dates
+from backend.trading_days import TradingDayMatrix, day_ordinals_from_times, EPOCH_ORDINAL
+from backend.request_metrics import request_metrics
+from backend.single_flight import SingleFlight
+from backend.http_cache import HistoricalResponseCache
+from backend.tick_encoding import encode_price_columns, decode_prices, decode_price
+from backend.frame_residency import FrameResidency
+from backend.csv_reload import csv_file_state, read_appended_rows
+from backend.live_feed import LiveFeed
+from backend.ohlc_pyramid import OHLCPyramid, range_positions
+from backend.range_index import RangeExtremaIndex
+from backend.fvg_index import FVGPriceIndex
+from backend.fvg_confluence import FVGConfluence
+
+logger = logging.getLogger(__name__)
 
 # 設定 logging
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -35,25 +61,79 @@ logging.basicConfig(
 )
 
 class DataProcessor:
-    def __init__(self):
-        self.data_cache = {}  # {timeframe: DataFrame}
+    def __init__(self, data_dir: Optional[str] = None, cache_dir: Optional[str] = None,
+                 csv_files: Optional[Dict[str, str]] = None, symbol: Optional[str] = None):
+        """
+        Args:
+            data_dir: CSV 資料目錄（預設 DATA_DIR）
+            cache_dir: 持久化報告與速度紀錄目錄（預設 CACHE_DIR，非預設商品為 CACHE_DIR/symbols/<商品>）
+            csv_files: {timeframe: 檔名}（預設 CSV_FILES）
+            symbol: 商品代號（預設 SYMBOL_CONFIG['default_symbol']）
+        """
+        self.symbol = (symbol or SYMBOL_CONFIG['default_symbol']).upper()
+        self.csv_files = dict(csv_files or CSV_FILES)
+        self.data_dir = data_dir or DATA_DIR
+        if cache_dir is None:
+            is_default = self.symbol == SYMBOL_CONFIG['default_symbol'].upper()
+            cache_dir = CACHE_DIR if is_default else os.path.join(CACHE_DIR, 'symbols', self.symbol)
+        self.cache_dir = cache_dir
+        # {timeframe: DataFrame}；超過 MEMORY_CONFIG 預算時最久未用的時間刻度換出到磁碟，存取時重新映射
+        self.data_cache = FrameResidency(
+            os.path.join(self.cache_dir, MEMORY_CONFIG.get('spill_dir_name', 'frames')),
+            budget_bytes=int(MEMORY_CONFIG.get('timeframe_budget_mb', 0) * 1024 * 1024),
+            enabled=MEMORY_CONFIG.get('clear_unused_data', False)
+        )
         self.time_converter = TimeConverter()
         self.available_dates = set()
+        self.date_sampler = None  # DateSampler：可用日期的排序日序數陣列與每日特徵
+        self.day_ordinals = {}  # {timeframe: 交易日序數陣列}
+        self.trading_days = None  # TradingDayMatrix：各時間刻度交易日位元矩陣
+        self.available_ordinals = np.empty(0, dtype=np.int32)  # 可用日期交集（排序日序數）
+        self._consistency_report = None  # 一致性報告快取
         self.fvg_detector_simple = FVGDetectorSimple(clearing_window=FVG_CLEARING_WINDOW)  # 簡化版本（無複雜時間轉換）
         self.vwap_available = {}  # 追蹤各時間框架是否有 VWAP 資料
+        self.tick_sizes = {}  # {timeframe: 跳動點大小}，價格欄位以 int32 跳動點儲存的時間刻度
+        self.pyramids = {}  # {timeframe: OHLCPyramid}，任意時間範圍查詢的多解析度聚合
+        self.range_indexes = {}  # {timeframe: RangeExtremaIndex}，區間高低點查詢
+        self.fvg_indexes = {}  # {timeframe: FVGPriceIndex}，全歷史FVG（第一次查詢時建立）
         
         # 簡化緩存系統 - 只保留基本數據緩存
         self._cache_max_size = CACHE_MAX_SIZE  # 緩存最大條目數
         self._preload_days = 7  # 減少預載入天數 (從30降到7天)
         
-        # 統一使用V2連續性檢查器，移除選擇邏輯
-        print("使用V2優化連續性檢查器 (統一配置)")
+        # 統一使用V2連續性檢查器，由auto模式依數據量與歷史速度選擇策略
+        print("使用V2優化連續性檢查器 (自動模式)")
         self.continuity_checker = CandleContinuityCheckerV2(
-            optimization_mode='smart',  # 固定使用smart模式
-            show_progress=False         # 後端不需要進度條
+            optimization_mode='auto',   # 依PERFORMANCE_TARGETS自動選擇/採樣
+            show_progress=False,        # 後端不需要進度條
+            gap_list_limit=None,        # 保留完整間隔列表，由API分頁返回
+            throughput_history=ThroughputHistory(
+                os.path.join(self.cache_dir, AUTO_MODE_CONFIG['throughput_file']),
+                alpha=AUTO_MODE_CONFIG['throughput_ema_alpha']
+            )
         )
             
-        self.continuity_reports = {}  # 儲存連續性檢查報告
+        # 連續性報告持久化於 cache_dir，重啟或資料追加時只檢查水位線之後的K線
+        self.continuity_store = ContinuityReportStore(os.path.join(self.cache_dir, 'continuity'))
+        self.continuity_reports = self.continuity_store.reports  # 儲存連續性檢查報告
+        self.gap_indexes = {}  # {timeframe: GapIntervalIndex}，供日期/視窗連續性查詢
+        
+        # 相同 (端點, 日期, 時間刻度) 的並行請求合併為一次計算
+        self.single_flight = SingleFlight()
+        
+        # 歷史資料 HTTP 快取：資料檔版本（ETag 來源）與預先壓縮的回應內容
+        self.data_versions = {}  # {timeframe: {'fingerprint', 'last_modified', 'last_date'}}
+        
+        # 追加資料熱重載：載入時的檔案狀態與每個FVG形成日（日期抽樣器特徵的增量來源）
+        self.file_states = {}  # {timeframe: csv_file_state}
+        self.fvg_days = {}  # {timeframe: FVG形成日序數陣列}
+        self._reload_lock = threading.Lock()
+        self.live_feed = None  # LiveFeed：第一次送入或訂閱即時K線時建立
+        self.response_cache = HistoricalResponseCache(
+            max_bytes=HTTP_CACHE_CONFIG['max_bytes'],
+            min_compress_bytes=HTTP_CACHE_CONFIG['min_compress_bytes'],
+            gzip_level=HTTP_CACHE_CONFIG['gzip_level']
+        )
         
     def set_loading_callback(self, callback_func):
         """設置載入狀態回調函數"""
@@ -102,79 +182,32 @@ class DataProcessor:
         print("階段1: 快速掃描所有時間刻度的日期範圍...")
         
         date_ranges = {}
-        total_files = len(CSV_FILES)
+        total_files = len(self.csv_files)
         current_file = 0
         
-        for timeframe, filename in CSV_FILES.items():
+        for timeframe, filename in self.csv_files.items():
             current_file += 1
-            filepath = os.path.join(DATA_DIR, filename)
+            filepath = os.path.join(self.data_dir, filename)
             
             print(f"\n[{current_file}/{total_files}] 掃描: {filename}")
             print(f"   路徑: {filepath}")
             
             try:
-                # 只讀取前幾行來判斷格式
-                sample_df = pd.read_csv(filepath, nrows=5)
-                
-                if 'Time' in sample_df.columns:
-                    # M1, M5, M15, H1, H4 格式 - 使用超快速採樣策略
-                    print(f"   使用採樣策略掃描大文件...")
-                    
-                    # 讀取頭部和尾部來獲得日期範圍
-                    head_df = pd.read_csv(filepath, usecols=['Date', 'Time'], nrows=1000)
-                    
-                    # 使用文件大小快速估算行數（避免讀取整個文件）
-                    import os
-                    file_size = os.path.getsize(filepath)
-                    estimated_lines = max(1000, file_size // 100)  # 粗略估算：每行約100字節
-                    
-                    # 讀取尾部
-                    tail_df = pd.read_csv(filepath, usecols=['Date', 'Time'], 
-                                        skiprows=range(1, max(1, estimated_lines - 1000)), 
-                                        header=0)
-                    
-                    # 合併頭尾資料
-                    df_dates = pd.concat([head_df, tail_df], ignore_index=True)
-                    df_dates['DateTime'] = pd.to_datetime(df_dates['Date'] + ' ' + df_dates['Time'], 
-                                                        format='%m/%d/%Y %H:%M')
-                    
-                    print(f"   採樣方式：頭部1000行 + 尾部1000行，估算文件約{estimated_lines:,}行")
-                else:
-                    # D1 格式 - 文件較小，直接讀取
-                    df_dates = pd.read_csv(filepath, usecols=['Date'])
-                    df_dates['DateTime'] = pd.to_datetime(df_dates['Date'], format='%m/%d/%Y')
-                    estimated_lines = len(df_dates)
+                # 精確掃描：記憶體映射只擷取每行的日期前綴，不做完整 pandas 解析
+                scan = scan_csv_dates(filepath)
+                start_date = scan['start_date']
+                end_date = scan['end_date']
+                unique_dates = scan['dates']
+                total_records = scan['row_count']
                 
-                df_dates['Date_Only'] = df_dates['DateTime'].dt.date
-                
-                # 獲取日期範圍（使用採樣數據估算）
-                start_date = df_dates['Date_Only'].min()
-                end_date = df_dates['Date_Only'].max()
-                
-                # 對於採樣的數據，估算完整的日期集合
-                if 'Time' in sample_df.columns:
-                    # 估算：從開始到結束日期之間的所有交易日
-                    from datetime import timedelta
-                    estimated_dates = set()
-                    current_date = start_date
-                    while current_date <= end_date:
-                        # 假設週一到週五都是交易日（簡化估算）
-                        if current_date.weekday() < 5:
-                            estimated_dates.add(current_date)
-                        current_date += timedelta(days=1)
-                    unique_dates = estimated_dates
-                    print(f"   使用估算策略：{len(unique_dates):,} 個估算交易日")
-                else:
-                    # D1 數據直接使用真實日期
-                    unique_dates = set(df_dates['Date_Only'].unique())
-                
-                total_records = estimated_lines
+                print(f"   掃描方式: {scan['method']}")
                 
                 date_ranges[timeframe] = {
                     'start_date': start_date,
                     'end_date': end_date,
                     'unique_dates': unique_dates,
-                    'total_records': total_records
+                    'total_records': total_records,
+                    'date_rows': scan['date_rows']
                 }
                 
                 print(f"   時間範圍: {start_date} ~ {end_date}")
@@ -189,21 +222,16 @@ class DataProcessor:
         # 計算所有時間刻度的交集
         print("\n階段2: 計算日期交集...")
         if date_ranges:
-            all_dates = list(date_ranges.values())
-            intersection_dates = all_dates[0]['unique_dates']
-            
-            for i, timeframe in enumerate(CSV_FILES.keys()):
-                if timeframe in date_ranges:
-                    dates = date_ranges[timeframe]['unique_dates']
-                    old_count = len(intersection_dates)
-                    intersection_dates &= dates
-                    new_count = len(intersection_dates)
-                    print(f"   {timeframe}: {old_count:,} -> {new_count:,} 天 (交集)")
-            
-            # 儲存結果
-            self.available_dates = intersection_dates
+            self.day_ordinals = {
+                timeframe: np.array(sorted(d.toordinal() for d in info['unique_dates']), dtype=np.int32)
+                for timeframe, info in date_ranges.items()
+            }
             self.date_ranges = date_ranges
             
+            # 儲存結果（位元矩陣交集）
+            self._rebuild_trading_days()
+            intersection_dates = self.available_dates
+            
             # 顯示最終結果
             min_date = min(intersection_dates)
             max_date = max(intersection_dates)
@@ -232,8 +260,9 @@ class DataProcessor:
         print("交易圖表系統 - 資料載入程序啟動")
         print("=" * 60)
         
-        total_files = len(CSV_FILES)
+        total_files = len(self.csv_files)
         current_file = 0
+        self.day_ordinals = {}  # 先前掃描的結果不沿用：載入失敗的時間刻度不參與交集
         
         # 初始化載入狀態
         self._update_loading_status(
@@ -245,9 +274,9 @@ class DataProcessor:
             start_time=start_time
         )
         
-        for timeframe, filename in CSV_FILES.items():
+        for timeframe, filename in self.csv_files.items():
             current_file += 1
-            filepath = os.path.join(DATA_DIR, filename)
+            filepath = os.path.join(self.data_dir, filename)
             
             # 統一載入模式
             loading_mode = "標準載入"
@@ -279,7 +308,8 @@ class DataProcessor:
             try:
                 print(f"   正在讀取 CSV...")
                 
-                # 統一載入策略：讀取數據並應用K線限制
+                # 統一載入策略：讀取數據並應用K線限制（檔案狀態於讀取前記錄，供熱重載比對）
+                file_state = csv_file_state(filepath)
                 df = pd.read_csv(filepath)
                 original_count = len(df)
                 
@@ -332,15 +362,7 @@ class DataProcessor:
                 # 資料清理與轉換
                 print(f"   正在處理時間欄位...")
                 
-                if 'Time' in df.columns:
-                    # 有 Time 欄位的情況（M1, M5, M15, H1, H4）
-                    df['DateTime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], 
-                                                  format='%m/%d/%Y %H:%M')
-                else:
-                    # 沒有 Time 欄位的情況（D1），假設為每日開盤時間
-                    df['DateTime'] = pd.to_datetime(df['Date'], format='%m/%d/%Y')
-                    
-                df['Date_Only'] = df['DateTime'].dt.date
+                self._add_time_columns(df)
                 
                 # 排序
                 print(f"   正在排序資料...")
@@ -354,27 +376,20 @@ class DataProcessor:
                 print(f"   時間範圍: {start_date} ~ {end_date}")
                 print(f"   交易日數: {unique_dates:,} 天")
                 
+                # 可選：價格以整數跳動點儲存
+                if PRICE_ENCODING_CONFIG['enabled']:
+                    self._encode_prices(timeframe, df)
+                
                 # 儲存到快取
                 self.data_cache[timeframe] = df
+                self.pyramids[timeframe] = OHLCPyramid.build(df)
+                self.data_versions[timeframe] = self._file_version(filepath, df)
+                self.range_indexes[timeframe] = self._range_index(timeframe, df,
+                                                                  self.data_versions[timeframe]['fingerprint'])
+                self.file_states[timeframe] = file_state
                 
-                # 收集可用日期
-                dates = set(df['Date_Only'].unique())
-                
-                # 應用固定起始日期配置
-                if RANDOM_DATE_CONFIG['start_date']:
-                    from datetime import datetime as dt
-                    fixed_start_date = dt.strptime(RANDOM_DATE_CONFIG['start_date'], '%Y-%m-%d').date()
-                    dates = {d for d in dates if d >= fixed_start_date}
-                    print(f"   應用固定起始日期 {fixed_start_date}: 過濾後 {len(dates):,} 天")
-                
-                if not self.available_dates:
-                    self.available_dates = dates
-                    print(f"   初始化可用日期: {len(dates):,} 天")
-                else:
-                    old_count = len(self.available_dates)
-                    self.available_dates &= dates  # 取交集
-                    new_count = len(self.available_dates)
-                    print(f"   更新可用日期: {old_count:,} -> {new_count:,} 天")
+                # 收集交易日序數（交集於全部載入後以位元矩陣計算）
+                self.day_ordinals[timeframe] = day_ordinals_from_times(df['DateTime'])
                 
                 # 記憶體使用估算
                 memory_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
@@ -400,13 +415,16 @@ class DataProcessor:
                 )
                 continue
         
+        # 以位元矩陣計算所有時間刻度的日期交集
+        self._rebuild_trading_days()
+        
         print("\n" + "=" * 60)
         if not self.available_dates:
             print("載入失敗：沒有找到任何可用的交易日期")
             raise ValueError("沒有找到任何可用的交易日期")
         
         # 統計資訊
-        total_memory = sum(df.memory_usage(deep=True).sum() for df in self.data_cache.values()) / (1024 * 1024)
+        total_memory = self.memory_usage_bytes() / (1024 * 1024)
         total_records = sum(len(df) for df in self.data_cache.values())
         
         print(f"資料載入完成！")
@@ -425,6 +443,10 @@ class DataProcessor:
         print(f"\n[INFO] 執行K線連續性檢查...")
         self.perform_continuity_check()
         
+        # 建立隨機日期抽樣器（含每日FVG數量與連續性特徵）
+        print(f"\n正在建立日期抽樣器...")
+        self._build_date_sampler()
+        
         # 新增：預載入常用數據以提升響應速度
         print(f"\n正在預載入常用數據...")
         self._preload_common_data()
@@ -433,149 +455,350 @@ class DataProcessor:
         print("系統準備就緒，等待用戶連線...")
         print()
     
-    def check_data_range_consistency(self) -> Dict:
-        """檢查各時間刻度資料範圍的一致性
+    def reload_appended(self) -> Dict:
+        """
+        熱重載：只解析CSV上次載入後追加的列並更新記憶體資料
+        
+        以檔案大小、修改時間與已載入尾段的雜湊判斷是否只有追加。新資料、交易日矩陣、
+        可用日期、FVG形成日、連續性報告（水位線增量檢查）與間隔索引先在一旁建立，
+        完成後才以參考替換；既有物件不就地修改，進行中的請求繼續使用舊的資料。
         
         Returns:
-            Dict: 包含詳細的一致性檢查報告
+            Dict: {'reloaded': {tf: {'new_rows', 'total_rows', 'last_time'}},
+                   'skipped': {tf: 原因}, 'available_dates', 'elapsed_ms'}
         """
-        print("=== 檢查各時間刻度資料範圍一致性 ===")
-        
-        timeframe_info = {}
-        all_timeframes = ['D1', 'H4', 'H1', 'M15', 'M5', 'M1']
-        loaded_timeframes = []
-        
-        # 1. 檢查各時間刻度載入狀態和日期範圍
-        for tf in all_timeframes:
-            if tf in self.data_cache and not self.data_cache[tf].empty:
-                df = self.data_cache[tf]
-                dates = set(df['Date_Only'].unique())
-                dates_list = sorted(list(dates))
+        start = time.perf_counter()
+        with self._reload_lock:
+            staged, skipped = {}, {}
+            for timeframe, filename in self.csv_files.items():
+                state = self.file_states.get(timeframe)
+                if timeframe not in self.data_cache or state is None:
+                    continue
+                filepath = os.path.join(self.data_dir, filename)
+                try:
+                    mode, rows, new_state = read_appended_rows(filepath, state)
+                    if mode == 'rewritten':
+                        skipped[timeframe] = '檔案已被改寫（非追加），需重新啟動以完整載入'
+                        continue
+                    appended = self._append_rows(timeframe, rows) if mode == 'appended' else None
+                except (OSError, ValueError, KeyError) as e:
+                    skipped[timeframe] = str(e)
+                    continue
                 
-                timeframe_info[tf] = {
-                    'loaded': True,
-                    'dates': dates,
-                    'date_count': len(dates),
-                    'min_date': dates_list[0],
-                    'max_date': dates_list[-1],
-                    'data_rows': len(df)
-                }
-                loaded_timeframes.append(tf)
-                print(f"{tf}: {dates_list[0]} ~ {dates_list[-1]} ({len(dates)}天, {len(df)}筆資料)")
+                if appended is None:
+                    self.file_states[timeframe] = new_state
+                else:
+                    staged[timeframe] = (appended, new_state, filepath)
+            
+            for timeframe, reason in skipped.items():
+                logging.warning(f"熱重載略過 {timeframe}: {reason}")
+            
+            reloaded = self._swap_appended(staged) if staged else {}
+            return {
+                'reloaded': reloaded,
+                'skipped': skipped,
+                'available_dates': len(self.available_dates),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+            }
+    
+    def get_live_feed(self) -> LiveFeed:
+        """即時K線的送入與推送（第一次呼叫時由目前資料的尾段建立增量狀態）"""
+        with self._reload_lock:
+            if self.live_feed is None:
+                self.live_feed = LiveFeed(self, merge_seconds=LIVE_CONFIG['merge_seconds'],
+                                          subscriber_queue=LIVE_CONFIG['subscriber_queue'])
+            return self.live_feed
+    
+    def merge_live_bars(self) -> Dict:
+        """
+        將已收盤的即時K線併入歷史資料（與熱重載相同的增量更新與參考替換）
+        
+        Returns:
+            Dict: {'merged': {tf: {'new_rows', 'total_rows', 'last_time'}}, 'available_dates', 'elapsed_ms'}
+        """
+        start = time.perf_counter()
+        with self._reload_lock:
+            staged = {}
+            if self.live_feed is not None:
+                for timeframe, rows in self.live_feed.take_pending().items():
+                    try:
+                        appended = self._append_rows(timeframe, rows, replace_last=True)
+                    except (ValueError, KeyError, TypeError) as e:
+                        logging.error(f"即時K線合併失敗 [{timeframe}]，捨棄 {len(rows)} 根: {str(e)}")
+                        continue
+                    if appended is not None:
+                        filepath = os.path.join(self.data_dir, self.csv_files[timeframe])
+                        staged[timeframe] = (appended, self.file_states.get(timeframe), filepath)
+            
+            merged = self._swap_appended(staged) if staged else {}
+            return {
+                'merged': merged,
+                'available_dates': len(self.available_dates),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+            }
+    
+    def _append_rows(self, timeframe: str, rows: pd.DataFrame,
+                     replace_last: bool = False) -> Optional[Tuple[pd.DataFrame, int]]:
+        """
+        新列轉為與已載入資料相同的欄位型別並接在後面
+        
+        Args:
+            replace_last: 第一根新列與已載入最後一根同時間時取代它（即時K線更新了尚未收盤的K線）
+        
+        Returns:
+            (合併後的新 DataFrame, 新列起始位置)；沒有比最後一根更新的K線時為 None
+        """
+        old = self.data_cache[timeframe]
+        self._add_time_columns(rows)
+        rows = rows.sort_values('DateTime')
+        if len(old) and len(rows):
+            last_time = old['DateTime'].iloc[-1]
+            if replace_last and rows['DateTime'].iloc[0] == last_time:
+                old = old.iloc[:-1]
             else:
-                timeframe_info[tf] = {
-                    'loaded': False,
-                    'dates': set(),
-                    'date_count': 0,
-                    'min_date': None,
-                    'max_date': None,
-                    'data_rows': 0
-                }
-                print(f"{tf}: 未載入")
+                rows = rows[rows['DateTime'] > last_time]
+        if rows.empty:
+            return None
         
-        if not loaded_timeframes:
-            print("[ERROR] 錯誤：沒有任何時間刻度載入成功")
-            return {'error': 'no_data_loaded', 'timeframe_info': timeframe_info}
+        rows = rows.reindex(columns=old.columns)
+        if timeframe in self.tick_sizes:
+            encode_price_columns(rows, self.tick_sizes[timeframe])
+        rows = rows.astype(old.dtypes.to_dict())
         
-        # 2. 計算所有載入時間刻度的日期交集
-        print("\n--- 計算日期交集 ---")
-        intersection_dates = timeframe_info[loaded_timeframes[0]]['dates'].copy()
+        merged = pd.concat([old, rows], ignore_index=True)
+        data_limit = FULL_DATA_LOADING.get(timeframe, 10000)
+        if data_limit != -1 and len(merged) > data_limit:
+            merged = merged.tail(data_limit).reset_index(drop=True)
+        return merged, len(merged) - len(rows)
+    
+    def _swap_appended(self, staged: Dict) -> Dict:
+        """建立追加後的衍生結構並一次替換（需持有 _reload_lock）"""
+        day_ordinals = dict(self.day_ordinals)
+        fvg_days = dict(self.fvg_days)
+        gap_indexes = dict(self.gap_indexes)
+        data_versions = dict(self.data_versions)
+        pyramids = dict(self.pyramids)
+        range_indexes = dict(self.range_indexes)
+        reloaded = {}
         
-        for tf in loaded_timeframes[1:]:
-            old_count = len(intersection_dates)
-            intersection_dates &= timeframe_info[tf]['dates']
-            new_count = len(intersection_dates)
-            print(f"與 {tf} 交集後：{old_count} -> {new_count} 天")
+        for timeframe, ((frame, offset), _, filepath) in staged.items():
+            new_rows = frame.iloc[offset:]
+            trimmed = offset < len(self.data_cache[timeframe])  # 超過 FULL_DATA_LOADING 上限時前段被截掉
+            
+            if trimmed:
+                day_ordinals[timeframe] = day_ordinals_from_times(frame['DateTime'])
+            else:
+                day_ordinals[timeframe] = np.union1d(day_ordinals[timeframe],
+                                                     day_ordinals_from_times(new_rows['DateTime']))
+            
+            if timeframe in fvg_days:
+                if trimmed:
+                    fvg_days[timeframe] = self._fvg_formation_days(frame)
+                else:
+                    fvg_days[timeframe] = np.concatenate([
+                        fvg_days[timeframe], self._fvg_formation_days(frame, first_right=max(2, offset))
+                    ])
+            
+            # 連續性報告依水位線只檢查新K線
+            try:
+                report = self.continuity_store.update(timeframe, frame, self.continuity_checker)
+                gap_index = self._make_gap_index(frame, report)
+                if gap_index is None:
+                    gap_indexes.pop(timeframe, None)
+                else:
+                    gap_indexes[timeframe] = gap_index
+            except Exception as e:
+                logging.error(f"熱重載連續性檢查失敗 [{timeframe}]: {str(e)}")
+                gap_indexes.pop(timeframe, None)
+            
+            # 多解析度K線與區間極值索引只延伸尾端，且只保留在記憶體（完整載入時才保存索引），
+            # 避免每次熱重載/即時合併都重建全歷史並重寫索引檔
+            data_versions[timeframe] = self._file_version(filepath, frame)
+            if trimmed or timeframe not in pyramids:
+                pyramids[timeframe] = OHLCPyramid.build(frame)
+            else:
+                pyramids[timeframe] = pyramids[timeframe].extend(frame)
+            if trimmed or timeframe not in range_indexes:
+                range_indexes[timeframe] = RangeExtremaIndex.build(frame, RANGE_CONFIG['index_block_size'])
+            else:
+                range_indexes[timeframe] = range_indexes[timeframe].extend(frame)
+            reloaded[timeframe] = {
+                'new_rows': len(new_rows),
+                'total_rows': len(frame),
+                'last_time': str(frame['DateTime'].iloc[-1])
+            }
         
-        intersection_list = sorted(list(intersection_dates))
+        trading_days = TradingDayMatrix(day_ordinals)
+        available_ordinals = trading_days.intersection(start_date=self._fixed_start_date())
+        sampler = self._carry_over_sampler(available_ordinals, fvg_days, gap_indexes)
         
-        # 3. 應用配置過濾
-        filtered_dates = intersection_dates.copy()
+        # 替換：每個屬性都換成新物件
+        for timeframe, ((frame, offset), state, _) in staged.items():
+            self.data_cache.replace_appended(timeframe, frame, frame.iloc[offset:])
+            self.file_states[timeframe] = state
+        self.day_ordinals = day_ordinals
+        self.fvg_days = fvg_days
+        self.gap_indexes = gap_indexes
+        self.data_versions = data_versions
+        self.pyramids = pyramids
+        self.range_indexes = range_indexes
+        self.trading_days = trading_days
+        self.available_ordinals = available_ordinals
+        self.available_dates = {date.fromordinal(int(o)) for o in available_ordinals}
+        self.date_sampler = sampler
+        self._consistency_report = None
+        return reloaded
+    
+    @staticmethod
+    def _add_time_columns(df: pd.DataFrame):
+        """由 Date/Time 欄位建立 DateTime 與 Date_Only（就地）"""
+        if 'Time' in df.columns:
+            # 有 Time 欄位的情況（M1, M5, M15, H1, H4）
+            df['DateTime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], 
+                                          format='%m/%d/%Y %H:%M')
+        else:
+            # 沒有 Time 欄位的情況（D1），假設為每日開盤時間
+            df['DateTime'] = pd.to_datetime(df['Date'], format='%m/%d/%Y')
+            
+        df['Date_Only'] = df['DateTime'].dt.date
+    
+    def _fixed_start_date(self) -> Optional[date]:
+        """RANDOM_DATE_CONFIG 的固定起始日期"""
         if RANDOM_DATE_CONFIG['start_date']:
-            from datetime import datetime as dt
-            fixed_start_date = dt.strptime(RANDOM_DATE_CONFIG['start_date'], '%Y-%m-%d').date()
-            filtered_dates = {d for d in filtered_dates if d >= fixed_start_date}
-            print(f"應用固定起始日期 {fixed_start_date}：{len(intersection_dates)} -> {len(filtered_dates)} 天")
-        
-        # 4. 檢查各時間刻度缺失的日期
-        print("\n--- 各時間刻度缺失日期分析 ---")
-        for tf in loaded_timeframes:
-            missing_dates = intersection_dates - timeframe_info[tf]['dates']
-            if missing_dates:
-                missing_list = sorted(list(missing_dates))[:5]  # 只顯示前5個
-                print(f"{tf} 缺失日期：{len(missing_dates)}天 (例如: {missing_list})")
-            else:
-                print(f"{tf} [PASS] 完整包含所有交集日期")
-        
-        # 5. 生成報告
-        final_filtered_list = sorted(list(filtered_dates))
-        
-        report = {
-            'timeframe_info': timeframe_info,
-            'loaded_timeframes': loaded_timeframes,
-            'intersection_dates': intersection_list,
-            'filtered_dates': final_filtered_list,
-            'intersection_count': len(intersection_list),
-            'filtered_count': len(final_filtered_list),
-            'consistency_issues': []
-        }
+            return datetime.strptime(RANDOM_DATE_CONFIG['start_date'], '%Y-%m-%d').date()
+        return None
+    
+    def _rebuild_trading_days(self):
+        """重建交易日位元矩陣與可用日期交集（已有抽樣器時保留其每日特徵）"""
+        if len(self.data_cache):
+            # 載入失敗的時間刻度不參與交集（僅掃描、未載入資料時保留掃描結果）
+            self.day_ordinals = {tf: days for tf, days in self.day_ordinals.items() if tf in self.data_cache}
+        for timeframe, df in self.data_cache.items():
+            if timeframe not in self.day_ordinals:
+                self.day_ordinals[timeframe] = day_ordinals_from_times(df['DateTime'])
+        
+        self.trading_days = TradingDayMatrix(self.day_ordinals)
+        self.available_ordinals = self.trading_days.intersection(start_date=self._fixed_start_date())
+        self.available_dates = {date.fromordinal(int(o)) for o in self.available_ordinals}
+        self._consistency_report = None
+        self.date_sampler = self._carry_over_sampler(self.available_ordinals, self.fvg_days, self.gap_indexes)
+        
+        for timeframe in self.trading_days.timeframes:
+            print(f"   {timeframe}: {len(self.day_ordinals[timeframe]):,} 個交易日")
+        print(f"   可用日期交集: {len(self.available_ordinals):,} 天")
+    
+    def check_data_range_consistency(self, refresh: bool = False) -> Dict:
+        """檢查各時間刻度資料範圍的一致性
+        
+        以交易日位元矩陣計算交集與各時間刻度相對於聯集的缺失日期，
+        報告快取於記憶體，資料變更（重建矩陣）後才重新計算。
+        
+        Args:
+            refresh: 是否強制重新計算
+        
+        Returns:
+            Dict: 包含詳細的一致性檢查報告
+        """
+        if self._consistency_report is not None and not refresh:
+            return self._consistency_report
+        
+        if self.trading_days is None or refresh:
+            self._rebuild_trading_days()
+        
+        if not self.trading_days.timeframes:
+            return {'error': 'no_data_loaded', 'timeframe_info': {}}
         
-        # 6. 檢查一致性問題
-        if len(final_filtered_list) == 0:
-            report['consistency_issues'].append('交集為空：沒有任何日期在所有時間刻度中都存在')
-        elif len(final_filtered_list) < 10:
-            report['consistency_issues'].append(f'交集過小：只有 {len(final_filtered_list)} 天可用')
-        
-        for tf in loaded_timeframes:
-            missing_count = len(intersection_dates - timeframe_info[tf]['dates'])
-            if missing_count > 0:
-                report['consistency_issues'].append(f'{tf} 缺失 {missing_count} 天的交集日期')
-        
-        print(f"\n=== 檢查結果 ===")
-        print(f"載入的時間刻度：{len(loaded_timeframes)}/{len(all_timeframes)}")
-        print(f"原始交集：{len(intersection_list)} 天")
-        print(f"配置過濾後：{len(final_filtered_list)} 天")
-        if final_filtered_list:
-            print(f"可用範圍：{final_filtered_list[0]} ~ {final_filtered_list[-1]}")
-        
-        if report['consistency_issues']:
-            print("[WARN] 發現一致性問題：")
-            for issue in report['consistency_issues']:
-                print(f"   - {issue}")
+        self._consistency_report = self.trading_days.consistency_report(
+            start_date=self._fixed_start_date(),
+            data_rows={tf: len(df) for tf, df in self.data_cache.items()},
+            all_timeframes=['D1', 'H4', 'H1', 'M15', 'M5', 'M1']
+        )
+        return self._consistency_report
+    
+    def _build_date_sampler(self, with_features: bool = True):
+        """
+        將可用日期交集建立為 DateSampler，並計算每日特徵
+        
+        Args:
+            with_features: 是否計算各時間刻度的每日FVG數量與連續性
+        """
+        if len(self.available_ordinals):
+            sampler = DateSampler(self.available_ordinals)
         else:
-            print("[PASS] 資料範圍一致性良好")
+            sampler = DateSampler.from_dates(self.available_dates)
         
-        return report
-
-    def get_random_date(self) -> date:
+        if with_features:
+            for timeframe, df in self.data_cache.items():
+                try:
+                    self.fvg_days[timeframe] = self._fvg_formation_days(df)
+                    sampler.set_fvg_counts(timeframe, self.fvg_days[timeframe])
+                    
+                    if timeframe in self.gap_indexes:
+                        sampler.set_continuity(timeframe, self.gap_indexes[timeframe])
+                except Exception as e:
+                    logging.error(f"建立 {timeframe} 日期特徵失敗: {str(e)}")
+            print(f"   日期抽樣器: {len(sampler):,} 天, 特徵 {len(sampler.features)} 欄")
+        
+        self.date_sampler = sampler
+    
+    def _carry_over_sampler(self, available_ordinals: np.ndarray, fvg_days: Dict,
+                            gap_indexes: Dict) -> Optional[DateSampler]:
+        """以新的可用日期重建抽樣器並沿用每日FVG數量與連續性特徵（尚未建立抽樣器時為None）"""
+        if self.date_sampler is None:
+            return None
+        sampler = DateSampler(available_ordinals)
+        for timeframe, days in fvg_days.items():
+            sampler.set_fvg_counts(timeframe, days)
+        for timeframe, gap_index in gap_indexes.items():
+            sampler.set_continuity(timeframe, gap_index)
+        return sampler
+    
+    def _fvg_formation_days(self, df: pd.DataFrame, first_right: int = 2) -> np.ndarray:
+        """FVG形成日（右側K線位置 >= first_right 者）的日序數"""
+        window = df.iloc[first_right - 2:]
+        indices = self.fvg_detector_simple.find_formation_indices(window)
+        formation_idx = np.concatenate([indices['bullish'], indices['bearish']])
+        times = window['DateTime'].to_numpy(dtype='datetime64[ns]')[formation_idx]
+        return times.astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+    
+    def get_random_date(self, **filters) -> date:
         """從所有時間刻度的日期交集中隨機選擇一個交易日期
         
         新邏輯：
         1. 載入完整歷史資料
-        2. 計算所有時間刻度的日期交集
+        2. 計算所有時間刻度的日期交集（排序日序數陣列）
         3. 顯示交集範圍給使用者
-        4. 從交集中隨機選擇一個日期
+        4. 從交集中隨機選擇一個日期（可依每日特徵篩選，見 DateSampler.sample）
         5. 之後再從該日期往前取400根K線
         """
-        import random
-        
-        print("\n[INFO] Random date selection starting...")
-        
         # 直接使用已載入的可用日期 (跳過詳細一致性檢查)
         if not self.available_dates:
             raise ValueError("No available dates loaded")
         
-        filtered_dates = list(self.available_dates)
+        if self.date_sampler is None:
+            self._build_date_sampler(with_features=False)
         
-        # 隨機選擇日期
-        selected_date = random.choice(filtered_dates)
+        picks = self.date_sampler.sample(1, **filters)
+        if not picks:
+            raise ValueError(f"No available dates match filters: {filters}")
         
-        print(f"\n[INFO] Available date range: {len(filtered_dates)} days")
-        print(f"[INFO] Selected date: {selected_date}")
-        print(f"[INFO] Will extract 400 candles from this date")
+        selected_date = picks[0]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Selected date: %s (from %s qualifying days)",
+                         selected_date, f"{self.date_sampler.count(**filters):,}")
         
         return selected_date
     
+    def sample_random_dates(self, count: int, **filters) -> List[date]:
+        """批次抽取隨機日期（可重複），供訓練/批次工具使用"""
+        if not self.available_dates:
+            raise ValueError("No available dates loaded")
+        
+        if self.date_sampler is None:
+            self._build_date_sampler(with_features=False)
+        
+        return self.date_sampler.sample(count, **filters)
+    
     def detect_fvgs(self, df: pd.DataFrame, timeframe: str) -> List[Dict]:
         """
         檢測 FVG (使用簡化檢測器)
@@ -591,30 +814,25 @@ class DataProcessor:
             # 確保資料按時間排序
             df = df.sort_values('DateTime').reset_index(drop=True)
             
-            print(f"   正在檢測 {timeframe} FVG (使用簡化檢測器)...")
-            
-            # 使用簡化檢測器 - 直接使用DataFrame，無複雜轉換
-            fvgs = self.fvg_detector_simple.detect_fvgs(df, timeframe=timeframe)
+            # 使用簡化檢測器 - 欄式結果，不建立逐筆的K線細節字典
+            fvgs = self.fvg_detector_simple.detect_fvg_table(df, timeframe=timeframe,
+                                                             tick_size=self.tick_sizes.get(timeframe))
             
-            # 轉換為前端格式
-            formatted_fvgs = self.fvg_detector_simple.convert_for_frontend(fvgs)
+            # 轉換為前端格式（整欄轉換）
+            formatted_fvgs = fvgs.to_frontend()
             
-            # 獲取統計信息
-            stats = self.fvg_detector_simple.get_statistics()
-            
-            print(f"   {timeframe} FVG 簡化檢測完成:")
-            print(f"     - 總檢測: {stats['basic_stats']['total_detected']} 個")
-            print(f"     - 多頭: {stats['basic_stats']['bullish_detected']} 個")
-            print(f"     - 空頭: {stats['basic_stats']['bearish_detected']} 個") 
-            print(f"     - 有效: {stats['basic_stats']['valid_count']} 個")
-            print(f"     - 已清除: {stats['basic_stats']['cleared_count']} 個")
-            print(f"     - 前端顯示: {len(formatted_fvgs)} 個")
+            # 統計信息只在 DEBUG 時計算
+            if logger.isEnabledFor(logging.DEBUG):
+                basic = self.fvg_detector_simple.get_statistics()['basic_stats']
+                logger.debug("%s FVG 簡化檢測完成: 總檢測 %d, 多頭 %d, 空頭 %d, 有效 %d, 已清除 %d, 前端顯示 %d",
+                             timeframe, basic['total_detected'], basic['bullish_detected'],
+                             basic['bearish_detected'], basic['valid_count'],
+                             basic['cleared_count'], len(formatted_fvgs))
             
             return formatted_fvgs
             
         except Exception as e:
-            print(f"   FVG 檢測失敗: {str(e)}")
-            logging.error(f"FVG detection failed for {timeframe}: {str(e)}")
+            logger.error("FVG detection failed for %s: %s", timeframe, e)
             return []
     
     def load_specific_date_data(self, target_date: date, timeframe: str) -> Optional[pd.DataFrame]:
@@ -629,12 +847,12 @@ class DataProcessor:
             DataFrame: 包含目標日期前400根K線的資料
         """
         try:
-            filename = CSV_FILES.get(timeframe)
+            filename = self.csv_files.get(timeframe)
             if not filename:
                 print(f"錯誤：無效的時間刻度 {timeframe}")
                 return None
             
-            filepath = os.path.join(DATA_DIR, filename)
+            filepath = os.path.join(self.data_dir, filename)
             print(f"按需載入 {timeframe} 資料於 {target_date}...")
             
             # 讀取檔案
@@ -669,10 +887,40 @@ class DataProcessor:
             print(f"按需載入失敗: {str(e)}")
             return None
 
+    @staticmethod
+    def _file_version(filepath: str, df: pd.DataFrame) -> Dict:
+        """資料檔版本：檔案大小、修改時間與載入筆數組成的指紋"""
+        stat = os.stat(filepath)
+        return {
+            'fingerprint': f'{stat.st_size:x}-{stat.st_mtime_ns:x}-{len(df):x}',
+            'last_modified': stat.st_mtime,
+            'last_date': df['Date_Only'].iloc[-1] if len(df) else None
+        }
+    
+    def get_http_validators(self, kind: str, target_date: date, timeframe: str) -> Optional[Dict]:
+        """
+        歷史資料回應的 HTTP 驗證器
+        
+        Returns:
+            Dict: {'etag', 'last_modified', 'immutable'}；快取啟用且時間刻度已載入時才返回，否則None
+            （最後一個交易日之前的資料視為不可變）
+        """
+        version = self.data_versions.get(timeframe)
+        if not HTTP_CACHE_CONFIG['enabled'] or version is None:
+            return None
+        return {
+            'etag': self.response_cache.make_etag(kind, str(target_date), timeframe, version['fingerprint'],
+                                                 self.symbol),
+            'last_modified': version['last_modified'],
+            'immutable': version['last_date'] is not None and target_date < version['last_date']
+        }
+    
     def get_pre_market_data(self, target_date: date, timeframe: str = 'H4') -> Optional[Dict]:
         """
         取得指定日期開盤前的資料 (智能載入版本)
         
+        相同 (日期, 時間刻度) 的並行請求只計算一次並共用結果（呼叫端不應修改返回的字典）
+        
         Args:
             target_date: 目標日期
             timeframe: 時間刻度 (M1, M5, M15, H1, H4, D1)
@@ -680,6 +928,13 @@ class DataProcessor:
         Returns:
             Dict: 包含圖表資料和相關資訊
         """
+        return self.single_flight.do(
+            ('pre_market', target_date, timeframe),
+            lambda: self._build_pre_market_data(target_date, timeframe)
+        )
+    
+    def _build_pre_market_data(self, target_date: date, timeframe: str) -> Optional[Dict]:
+        """計算開盤前資料（由 get_pre_market_data 經 single-flight 呼叫）"""
         # 智能載入：如果資料未在快取中，則按需載入
         if timeframe not in self.data_cache:
             print(f"時間刻度 {timeframe} 未載入，執行按需載入...")
@@ -690,12 +945,18 @@ class DataProcessor:
         else:
             df = self.data_cache[timeframe]
         
-        # 檢查該時間框架是否包含目標日期的數據
-        timeframe_dates = set(df['Date_Only'].unique())
-        if target_date not in timeframe_dates:
+        # 檢查該時間框架是否包含目標日期的數據（排序交易日序數陣列二分搜尋，不掃描整個資料表）
+        with request_metrics.stage('date_lookup'):
+            timeframe_days = self.day_ordinals.get(timeframe)
+            if timeframe_days is None:
+                timeframe_days = day_ordinals_from_times(df['DateTime'])
+            position = int(np.searchsorted(timeframe_days, target_date.toordinal()))
+            found = position < len(timeframe_days) and timeframe_days[position] == target_date.toordinal()
+        if not found:
             # 使用交集策略後，這種情況不應該發生
             # 如果發生了，說明隨機日期選擇邏輯有問題
-            available_range = f"{min(timeframe_dates)} ~ {max(timeframe_dates)}" if timeframe_dates else "空"
+            available_range = (f"{date.fromordinal(int(timeframe_days[0]))} ~ "
+                               f"{date.fromordinal(int(timeframe_days[-1]))}") if len(timeframe_days) else "空"
             error_msg = (f"資料一致性錯誤：日期 {target_date} 不存在於時間框架 {timeframe} 中 "
                         f"(可用範圍: {available_range})。這表示隨機日期選擇邏輯有問題，"
                         f"應該只從所有時間框架的交集中選擇日期。")
@@ -703,131 +964,213 @@ class DataProcessor:
             return None
         
         try:
-            print(f"開始處理 {timeframe} 時間刻度的資料 (目標日期: {target_date})")
+            logger.debug("開始處理 %s 時間刻度的資料 (目標日期: %s)", timeframe, target_date)
             
             # 新邏輯：從目標日期往前取400根K線
-            # 1. 找到目標日期在資料中的位置
-            target_date_data = df[df['Date_Only'] == target_date]
+            # 1-2. 目標日期最後一筆資料的位置：隔日零時之前的最後一根K線（時間已排序）
+            with request_metrics.stage('date_lookup'):
+                next_day = np.datetime64(target_date, 'D') + np.timedelta64(1, 'D')
+                times = df['DateTime'].to_numpy(dtype='datetime64[ns]')
+                target_end_index = int(np.searchsorted(times, next_day, side='left')) - 1
             
-            if target_date_data.empty:
+            if target_end_index < 0 or times[target_end_index] < np.datetime64(target_date, 'D'):
                 # 這種情況不應該發生，因為已經通過交集檢查
                 logging.error(f"交集檢查通過但找不到目標日期 {target_date} 在 {timeframe} 中的資料")
                 return None
             
-            # 2. 找到目標日期的最後一筆資料的索引
-            target_end_index = target_date_data.index[-1]
-            
             # 3. 從該索引往前取N根K線用於分析
             from utils.config import ANALYSIS_CANDLE_COUNT
             candle_count = ANALYSIS_CANDLE_COUNT
             start_index = max(0, target_end_index - candle_count + 1)
             
-            result_data = df.iloc[start_index:target_end_index + 1].copy()
+            with request_metrics.stage('slice'):
+                result_data = df.iloc[start_index:target_end_index + 1].copy()
             
-            print(f"   從索引 {start_index} 到 {target_end_index}，共取得 {len(result_data)} 根K線")
-            print(f"   時間範圍：{result_data['DateTime'].min()} ~ {result_data['DateTime'].max()}")
-            print(f"   日期範圍：{result_data['Date_Only'].min()} ~ {result_data['Date_Only'].max()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("從索引 %d 到 %d，共取得 %d 根K線，時間範圍：%s ~ %s",
+                             start_index, target_end_index, len(result_data),
+                             result_data['DateTime'].iloc[0], result_data['DateTime'].iloc[-1])
             
-            # 執行400根K線的連續性檢查
-            try:
-                continuity_result = self.continuity_checker.check_continuity(result_data, timeframe)
-                continuity_percentage = continuity_result.get('summary', {}).get('continuity_percentage', 0)
-                gap_count = continuity_result.get('summary', {}).get('gap_count', 0)
-                
-                if continuity_percentage < 95:  # 連續性低於95%時警告
-                    print(f"   ⚠️  K線連續性警告: {continuity_percentage:.1f}% (發現 {gap_count} 個間隙)")
-                else:
-                    print(f"   ✓ K線連續性良好: {continuity_percentage:.1f}%")
-                    
-                # 將連續性資訊添加到結果中
-                continuity_info = {
-                    'continuity_percentage': continuity_percentage,
-                    'gap_count': gap_count,
-                    'check_status': 'good' if continuity_percentage >= 95 else 'warning'
-                }
-            except Exception as e:
-                print(f"   ⚠️  連續性檢查失敗: {str(e)}")
-                continuity_info = {
-                    'continuity_percentage': -1,
-                    'gap_count': -1,
-                    'check_status': 'error',
-                    'error': str(e)
-                }
+            # 400根K線的連續性：由間隔索引做範圍查詢，不在請求中重新檢查
+            with request_metrics.stage('continuity_check'):
+                continuity_info = self._window_continuity_info(
+                    timeframe, result_data['DateTime'].iloc[0], result_data['DateTime'].iloc[-1]
+                )
             
             # 檢測 FVG
-            fvgs = self.detect_fvgs(result_data, timeframe)
+            with request_metrics.stage('fvg_detection'):
+                fvgs = self.detect_fvgs(result_data, timeframe)
             
             # 準備圖表資料格式
-            chart_data = []
-            for _, row in result_data.iterrows():
-                data_point = {
-                    'time': datetime_to_timestamp(row['DateTime']),
-                    'open': float(row['Open']),
-                    'high': float(row['High']),
-                    'low': float(row['Low']),
-                    'close': float(row['Close']),
-                    'volume': int(row['Volume'])
-                }
-                
-                # 只有當該時間框架有 VWAP 資料時才包含
-                if self.vwap_available.get(timeframe, False):
-                    data_point['vwap'] = float(row['VWAP'])
-                
-                chart_data.append(data_point)
-            
-            # 計算紐約開盤時間資訊
-            ny_open_taipei = self.time_converter.get_ny_market_open_taipei_time(target_date)
-            is_dst = self.time_converter.is_dst_in_ny(target_date)
+            with request_metrics.stage('serialization'):
+                chart_data = self._chart_points(result_data, timeframe)
+                return self._pre_market_payload(target_date, timeframe, chart_data, fvgs, continuity_info)
             
-            # 計算盤前時間（開盤前30分鐘）
-            pre_market_time = ny_open_taipei - timedelta(minutes=30)
-            
-            # 計算收盤時間（台北時間）- 紐約16:00
-            ny_close_time = datetime.combine(target_date, datetime.min.time().replace(hour=16, minute=0))
-            ny_close = self.time_converter.ny_tz.localize(ny_close_time)
-            ny_close_taipei = ny_close.astimezone(self.time_converter.taipei_tz)
+        except Exception as e:
+            logger.exception("處理日期 %s 資料時發生錯誤: %s", target_date, e)
+            return None
+    
+    def get_pre_market_batch(self, dates: List[date], timeframes: List[str]) -> Iterator[Dict]:
+        """
+        批次取得多個日期與時間刻度的開盤前資料（逐筆產生，供串流回應）
+        
+        每個時間刻度只對K線日序數做一次 searchsorted 即定位所有日期的窗口，
+        FVG 以窗口聯集一次檢測；每筆結果與 get_pre_market_data 相同。
+        依時間刻度分組輸出，無法取得的組合產生含 'error' 欄位的紀錄。
+        
+        Args:
+            dates: 目標日期列表
+            timeframes: 時間刻度列表
             
-            # 檢查假日狀態
-            holiday_status = holiday_detector.get_trading_status(target_date)
+        Yields:
+            Dict: 單一 (日期, 時間刻度) 的圖表資料或錯誤紀錄
+        """
+        for timeframe in timeframes:
+            df = self.data_cache.get(timeframe)
+            if df is None:
+                for target_date in dates:
+                    yield self._batch_error(target_date, timeframe, f"時間刻度 {timeframe} 未載入")
+                continue
             
-            # 構建響應數據
-            result = {
-                'date': target_date.strftime('%Y-%m-%d'),
-                'timeframe': timeframe,
-                'data': chart_data,
-                'fvgs': fvgs,  # 新增 FVG 資料
-                'pre_market_time': pre_market_time.strftime('%Y-%m-%d %H:%M:%S'),
-                'ny_open_taipei': ny_open_taipei.strftime('%Y-%m-%d %H:%M:%S'),
-                'ny_close_taipei': ny_close_taipei.strftime('%Y-%m-%d %H:%M:%S'),  # 修復Missing欄位
+            # 一次定位所有日期：各日期最後一根K線的位置與往前 ANALYSIS_CANDLE_COUNT 根的起點
+            with request_metrics.stage('date_lookup'):
+                bar_days = (df['DateTime'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+                            .astype(np.int64) + EPOCH_ORDINAL)
+                requested = np.array([d.toordinal() for d in dates], dtype=np.int64)
+                ends = np.searchsorted(bar_days, requested, side='right') - 1
+                found = (ends >= 0) & (bar_days[np.maximum(ends, 0)] == requested)
+                starts = np.maximum(0, ends - ANALYSIS_CANDLE_COUNT + 1)
+            
+            windows = [(int(starts[i]), int(ends[i])) for i in np.flatnonzero(found)]
+            with request_metrics.stage('fvg_detection'):
+                try:
+                    window_fvgs = iter(self.fvg_detector_simple.detect_fvgs_windows(
+                        df, windows, timeframe, tick_size=self.tick_sizes.get(timeframe)))
+                except Exception as e:
+                    logger.error("FVG batch detection failed for %s: %s", timeframe, e)
+                    window_fvgs = iter([[] for _ in windows])
+            
+            for i, target_date in enumerate(dates):
+                if not found[i]:
+                    yield self._batch_error(target_date, timeframe,
+                                            f"日期 {target_date} 不存在於時間框架 {timeframe} 中")
+                    continue
+                
+                start_index, end_index = int(starts[i]), int(ends[i])
+                fvgs = next(window_fvgs)
+                try:
+                    with request_metrics.stage('continuity_check'):
+                        continuity_info = self._window_continuity_info(
+                            timeframe, df['DateTime'].iloc[start_index], df['DateTime'].iloc[end_index]
+                        )
+                    with request_metrics.stage('serialization'):
+                        chart_data = self._chart_points(df.iloc[start_index:end_index + 1], timeframe)
+                        record = self._pre_market_payload(target_date, timeframe, chart_data, fvgs, continuity_info)
+                except Exception as e:
+                    logger.exception("處理日期 %s 資料時發生錯誤: %s", target_date, e)
+                    record = self._batch_error(target_date, timeframe, str(e))
+                yield record
+    
+    @staticmethod
+    def _batch_error(target_date: date, timeframe: str, message: str) -> Dict:
+        return {'date': target_date.strftime('%Y-%m-%d'), 'timeframe': timeframe, 'error': message}
+    
+    def _chart_points(self, frame: pd.DataFrame, timeframe: str) -> List[Dict]:
+        """K線轉為圖表資料格式（整欄轉換，不逐列迭代）"""
+        times = frame['DateTime'].to_numpy(dtype='datetime64[ns]').astype('datetime64[s]').astype(np.int64).tolist()
+        opens = self._price_array(frame, 'Open', timeframe).tolist()
+        highs = self._price_array(frame, 'High', timeframe).tolist()
+        lows = self._price_array(frame, 'Low', timeframe).tolist()
+        closes = self._price_array(frame, 'Close', timeframe).tolist()
+        volumes = frame['Volume'].to_numpy().astype(np.int64).tolist()
+        
+        chart_data = [
+            {'time': t, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for t, o, h, l, c, v in zip(times, opens, highs, lows, closes, volumes)
+        ]
+        
+        # 只有當該時間框架有 VWAP 資料時才包含
+        if self.vwap_available.get(timeframe, False):
+            for point, vwap in zip(chart_data, frame['VWAP'].to_numpy(dtype=np.float64).tolist()):
+                point['vwap'] = vwap
+        
+        return chart_data
+    
+    def _price_array(self, frame: pd.DataFrame, column: str, timeframe: str) -> np.ndarray:
+        """價格欄位的 float64 陣列（跳動點編碼的時間刻度在此才解碼）"""
+        tick_size = self.tick_sizes.get(timeframe)
+        if tick_size is None:
+            return frame[column].to_numpy(dtype=np.float64)
+        return decode_prices(frame[column].to_numpy(), tick_size)
+    
+    def _encode_prices(self, timeframe: str, df: pd.DataFrame):
+        """依 PRICE_ENCODING_CONFIG 將價格欄位就地轉為 int32 跳動點（無法編碼時保留浮點數）"""
+        tick_size = PRICE_ENCODING_CONFIG['tick_sizes'].get(self.symbol)
+        if tick_size is None:
+            print(f"   未設定 {self.symbol} 的跳動點大小，價格保留浮點數")
+            return
+        try:
+            encode_price_columns(df, tick_size)
+        except ValueError as e:
+            print(f"   價格無法以跳動點編碼，保留浮點數: {e}")
+            return
+        self.tick_sizes[timeframe] = tick_size
+        if 'Volume' in df.columns and OPTIMIZED_DTYPES.get('Volume'):
+            volume = df['Volume'].to_numpy()
+            if len(volume) == 0 or volume.max() <= np.iinfo(np.int32).max:
+                df['Volume'] = volume.astype(OPTIMIZED_DTYPES['Volume'])
+        print(f"   價格以 int32 跳動點儲存 (tick={tick_size})")
+    
+    def _pre_market_payload(self, target_date: date, timeframe: str, chart_data: List[Dict],
+                            fvgs: List[Dict], continuity_info: Dict) -> Dict:
+        """組合開盤前資料的回應內容（單日與批次查詢共用）"""
+        # 計算紐約開盤時間資訊
+        ny_open_taipei = self.time_converter.get_ny_market_open_taipei_time(target_date)
+        is_dst = self.time_converter.is_dst_in_ny(target_date)
+        
+        # 計算盤前時間（開盤前30分鐘）
+        pre_market_time = ny_open_taipei - timedelta(minutes=30)
+        
+        # 計算收盤時間（台北時間）- 紐約16:00
+        ny_close_time = datetime.combine(target_date, datetime.min.time().replace(hour=16, minute=0))
+        ny_close = self.time_converter.ny_tz.localize(ny_close_time)
+        ny_close_taipei = ny_close.astimezone(self.time_converter.taipei_tz)
+        
+        # 檢查假日狀態
+        holiday_status = holiday_detector.get_trading_status(target_date)
+        
+        # 構建響應數據（圖表資料與 FVG 已是原生型別，只轉換其餘欄位）
+        return {
+            'date': target_date.strftime('%Y-%m-%d'),
+            'timeframe': timeframe,
+            'data': chart_data,
+            'fvgs': fvgs,  # 新增 FVG 資料
+            'pre_market_time': pre_market_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ny_open_taipei': ny_open_taipei.strftime('%Y-%m-%d %H:%M:%S'),
+            'ny_close_taipei': ny_close_taipei.strftime('%Y-%m-%d %H:%M:%S'),  # 修復Missing欄位
+            'is_dst': is_dst,
+            'candle_count': len(chart_data),
+            # 新增假日資訊
+            'holiday_info': self._convert_to_json_serializable(holiday_status),
+            # 新增K線連續性資訊
+            'continuity_info': self._convert_to_json_serializable(continuity_info),
+            # 新增時區資訊
+            'timezone_info': {
                 'is_dst': is_dst,
-                'candle_count': len(chart_data),
-                # 新增假日資訊
-                'holiday_info': holiday_status,
-                # 新增K線連續性資訊
-                'continuity_info': continuity_info,
-                # 新增時區資訊
-                'timezone_info': {
-                    'is_dst': is_dst,
-                    'ny_offset': -4 if is_dst else -5,
-                    'taipei_offset': 8,
-                    'ny_open_time': ny_open_taipei.strftime('%H:%M'),
-                    'ny_close_time': ny_close_taipei.strftime('%H:%M'),  # 新增收盤時間
-                    'pre_market_time': pre_market_time.strftime('%H:%M')
-                }
+                'ny_offset': -4 if is_dst else -5,
+                'taipei_offset': 8,
+                'ny_open_time': ny_open_taipei.strftime('%H:%M'),
+                'ny_close_time': ny_close_taipei.strftime('%H:%M'),  # 新增收盤時間
+                'pre_market_time': pre_market_time.strftime('%H:%M')
             }
-            
-            # 轉換為JSON可序列化格式並直接返回
-            return self._convert_to_json_serializable(result)
-            
-        except Exception as e:
-            logging.error(f"處理日期 {target_date} 資料時發生錯誤: {str(e)}")
-            print(f"處理錯誤: {str(e)}")
-            return None
+        }
     
     def get_market_hours_data(self, target_date: date, timeframe: str = 'H4') -> Optional[Dict]:
         """
         取得指定日期開盤後的完整資料（用於播放功能）
         
+        相同 (日期, 時間刻度) 的並行請求只計算一次並共用結果（呼叫端不應修改返回的字典）
+        
         Args:
             target_date: 目標日期
             timeframe: 時間刻度 (M1, M5, M15, H1, H4, D1)
@@ -835,7 +1178,14 @@ class DataProcessor:
         Returns:
             Dict: 包含完整交易日資料
         """
-        print(f"處理播放資料請求: {target_date} ({timeframe})")
+        return self.single_flight.do(
+            ('market_hours', target_date, timeframe),
+            lambda: self._build_market_hours_data(target_date, timeframe)
+        )
+    
+    def _build_market_hours_data(self, target_date: date, timeframe: str) -> Optional[Dict]:
+        """計算開盤後資料（由 get_market_hours_data 經 single-flight 呼叫）"""
+        logger.debug("處理播放資料請求: %s (%s)", target_date, timeframe)
         
         if timeframe not in self.data_cache:
             logging.error(f"時間刻度 {timeframe} 的資料未載入")
@@ -852,8 +1202,7 @@ class DataProcessor:
             ny_close = self.time_converter.ny_tz.localize(ny_close_time)
             taipei_close = ny_close.astimezone(self.time_converter.taipei_tz)
             
-            print(f"紐約開盤: {ny_open.strftime('%Y-%m-%d %H:%M')} (台北時間)")
-            print(f"紐約收盤: {taipei_close.strftime('%Y-%m-%d %H:%M')} (台北時間)")
+            logger.debug("紐約開盤: %s, 紐約收盤: %s (台北時間)", ny_open, taipei_close)
             
             # 取得開盤到收盤的所有資料（可能跨日）
             market_data = df[
@@ -882,41 +1231,25 @@ class DataProcessor:
                 logging.error(f"日期 {target_date} 沒有交易資料")
                 return None
             
-            print(f"開盤後記錄: {len(market_data)} 筆")
-            print(f"資料時間範圍: {market_data['DateTime'].min()} ~ {market_data['DateTime'].max()}")
+            logger.debug("開盤後記錄: %d 筆", len(market_data))
             
             # 限制數據量以提升性能：使用分析K線數量限制
             max_candles = ANALYSIS_CANDLE_COUNT
             
             if len(market_data) > max_candles:
                 market_data = market_data.tail(max_candles)
-                print(f"數據量限制: 從開盤後記錄中取最近 {len(market_data)} 筆")
+                logger.debug("數據量限制: 從開盤後記錄中取最近 %d 筆", len(market_data))
             
             # 數據量驗證：最終確保不超過限制
             if len(market_data) > max_candles:
                 market_data = market_data.tail(max_candles)
-                print(f"[WARNING] 最終數據量驗證：截取最新 {len(market_data)} 根K線")
+                logger.warning("最終數據量驗證：截取最新 %d 根K線", len(market_data))
             
             # 檢測 FVG
             fvgs = self.detect_fvgs(market_data, timeframe)
             
             # 準備圖表資料格式
-            chart_data = []
-            for _, row in market_data.iterrows():
-                data_point = {
-                    'time': datetime_to_timestamp(row['DateTime']),
-                    'open': float(row['Open']),
-                    'high': float(row['High']),
-                    'low': float(row['Low']),
-                    'close': float(row['Close']),
-                    'volume': int(row['Volume'])
-                }
-                
-                # 只有當該時間框架有 VWAP 資料時才包含
-                if self.vwap_available.get(timeframe, False):
-                    data_point['vwap'] = float(row['VWAP'])
-                
-                chart_data.append(data_point)
+            chart_data = self._chart_points(market_data, timeframe)
             
             # 計算紐約開盤時間資訊
             is_dst = self.time_converter.is_dst_in_ny(target_date)
@@ -941,12 +1274,262 @@ class DataProcessor:
             return self._convert_to_json_serializable(result)
             
         except Exception as e:
-            logging.error(f"處理播放資料時發生錯誤: {str(e)}")
-            print(f"錯誤詳情: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("處理播放資料時發生錯誤: %s", e)
             return None
 
+    def memory_usage_bytes(self) -> int:
+        """常駐K線資料、多解析度聚合與區間極值索引的堆積記憶體用量（位元組，不含已換出或映射的部分）"""
+        return (self.data_cache.resident_bytes() + sum(p.nbytes() for p in self.pyramids.values())
+                + sum(index.nbytes() for index in self.range_indexes.values()))
+    
+    def get_range_data(self, timeframe: str, start=None, end=None,
+                       max_points: Optional[int] = None) -> Optional[Dict]:
+        """
+        任意時間範圍的K線；範圍內K線數超過 max_points 時返回多解析度聚合
+        
+        Args:
+            timeframe: 時間刻度
+            start / end: 範圍（含兩端，pd.Timestamp；None 表示資料起點/終點）
+            max_points: 返回點數上限（預設與上限見 RANGE_CONFIG）
+            
+        Returns:
+            Dict: {'timeframe', 'level', 'bars_per_point', 'total_bars', 'count', 'data'}；
+            時間刻度未載入時為 None。每點格式與圖表資料相同，bars_per_point > 1 時
+            兩端的點可能包含範圍外的K線。
+        """
+        if timeframe not in self.data_cache:
+            return None
+        max_points = min(max(1, int(max_points or RANGE_CONFIG['default_max_points'])),
+                         RANGE_CONFIG['max_points_limit'])
+        frame = self.data_cache[timeframe]
+        pyramid = self.pyramids.get(timeframe)
+        if pyramid is None or pyramid.length != len(frame):
+            # 熱重載替換期間讀到不同版本時，依目前的資料重建
+            pyramid = OHLCPyramid.build(frame)
+        
+        lo, hi = range_positions(frame['DateTime'].to_numpy(dtype='datetime64[ns]'), start, end)
+        level = pyramid.level_for(lo, hi, max_points)
+        if level == 0:
+            data = self._chart_points(frame.iloc[lo:hi], timeframe)
+        else:
+            data = self._pyramid_points(pyramid.slice(level, lo, hi), timeframe)
+        return {
+            'symbol': self.symbol,
+            'timeframe': timeframe,
+            'level': level,
+            'bars_per_point': 1 << level,
+            'total_bars': hi - lo,
+            'count': len(data),
+            'data': data
+        }
+    
+    def _pyramid_points(self, arrays: Dict[str, np.ndarray], timeframe: str) -> List[Dict]:
+        """多解析度聚合轉為圖表資料格式"""
+        tick_size = self.tick_sizes.get(timeframe)
+        columns = [arrays['time'].tolist()]
+        for name in ('open', 'high', 'low', 'close'):
+            values = arrays[name]
+            values = values.astype(np.float64) if tick_size is None else decode_prices(values, tick_size)
+            columns.append(values.tolist())
+        columns.append(arrays['volume'].tolist())
+        return [
+            {'time': t, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for t, o, h, l, c, v in zip(*columns)
+        ]
+
+    def _range_index(self, timeframe: str, frame: pd.DataFrame, fingerprint: str) -> RangeExtremaIndex:
+        """讀取資料指紋相同的區間極值索引，否則重新建立並保存（保存失敗時只保留在記憶體）"""
+        block = RANGE_CONFIG['index_block_size']
+        if not RANGE_CONFIG['persist_index']:
+            return RangeExtremaIndex.build(frame, block)
+        path = os.path.join(self.cache_dir, 'range_index', timeframe)
+        index = RangeExtremaIndex.load(path, fingerprint, len(frame), block)
+        if index is not None:
+            return index
+        index = RangeExtremaIndex.build(frame, block)
+        try:
+            index.save(path, fingerprint)
+            return RangeExtremaIndex.load(path, fingerprint, len(frame), block) or index
+        except OSError as e:
+            logging.warning(f"保存區間極值索引失敗 [{timeframe}]: {str(e)}")
+            return index
+    
+    def get_range_stats(self, timeframe: str, start=None, end=None) -> Optional[Dict]:
+        """
+        任意時間範圍的最高/最低價與收盤價極值（sparse table 索引，查詢成本與範圍長度無關）
+        
+        Args:
+            timeframe: 時間刻度
+            start / end: 範圍（含兩端，pd.Timestamp；None 表示資料起點/終點）
+            
+        Returns:
+            Dict: {'symbol', 'timeframe', 'bars', 'start', 'end', 'open', 'close',
+            'high', 'low', 'close_high', 'close_low'}，極值為 {'price', 'time'}（相同價格取最早一根）；
+            範圍內沒有K線時價格欄位為 None。時間刻度未載入時為 None。
+        """
+        if timeframe not in self.data_cache:
+            return None
+        frame = self.data_cache[timeframe]
+        index = self.range_indexes.get(timeframe)
+        if index is None or index.rows != len(frame):
+            # 熱重載替換期間讀到不同版本時，依目前的資料重建
+            index = RangeExtremaIndex.build(frame, RANGE_CONFIG['index_block_size'])
+        
+        times = frame['DateTime'].to_numpy(dtype='datetime64[ns]')
+        lo, hi = range_positions(times, start, end)
+        result = {'symbol': self.symbol, 'timeframe': timeframe, 'bars': hi - lo}
+        if hi <= lo:
+            result.update(dict.fromkeys(('start', 'end', 'open', 'close', 'high', 'low',
+                                         'close_high', 'close_low')))
+            return result
+        
+        tick_size = self.tick_sizes.get(timeframe)
+        
+        def price(column: str, position: int) -> float:
+            value = frame[column].to_numpy()[position]
+            return float(value) if tick_size is None else decode_price(int(value), tick_size)
+        
+        def seconds(position: int) -> int:
+            return int(times[position].astype('datetime64[s]').astype(np.int64))
+        
+        def extreme(name: str, column: str) -> Dict:
+            position = index.query(name, frame, lo, hi)
+            return {'price': price(column, position), 'time': seconds(position)}
+        
+        result.update({
+            'start': seconds(lo),
+            'end': seconds(hi - 1),
+            'open': price('Open', lo),
+            'close': price('Close', hi - 1),
+            'high': extreme('high_max', 'High'),
+            'low': extreme('low_min', 'Low'),
+            'close_high': extreme('close_max', 'Close'),
+            'close_low': extreme('close_min', 'Close')
+        })
+        return result
+
+    def get_fvg_index(self, timeframe: str) -> FVGPriceIndex:
+        """全歷史FVG索引；資料版本改變（熱重載/即時K線合併）後重新建立，並行的建立請求合併為一次"""
+        version = self.data_versions[timeframe]['fingerprint']
+        index = self.fvg_indexes.get(timeframe)
+        if index is not None and index.version == version:
+            return index
+        
+        def build() -> FVGPriceIndex:
+            table = self.fvg_detector_simple.detect_history_table(
+                self.data_cache[timeframe], timeframe, tick_size=self.tick_sizes.get(timeframe))
+            built = FVGPriceIndex(table, version)
+            indexes = dict(self.fvg_indexes)
+            indexes[timeframe] = built
+            self.fvg_indexes = indexes
+            return built
+        
+        return self.single_flight.do(('fvg-index', self.symbol, timeframe, version), build)
+    
+    def find_fvgs(self, low: float, high: float, start=None, end=None,
+                  timeframes: Optional[List[str]] = None, fvg_type: Optional[str] = None) -> Dict:
+        """
+        跨時間刻度查詢時間範圍內未回補、且價格區間與 [low, high] 重疊的FVG
+        
+        Args:
+            low / high: 價格範圍（相同時即為包含該價格的FVG）
+            start / end: 時間範圍（含兩端，pd.Timestamp）；都為 None 時為最新一根K線的時間
+            timeframes: 時間刻度（預設 FVG_INDEX_CONFIG['timeframes']）
+            fvg_type: 'bullish' / 'bearish'，None 表示兩者
+            
+        Returns:
+            Dict: {'symbol', 'start', 'end', 'low', 'high', 'counts', 'count', 'truncated', 'fvgs'}；
+            fvgs 為前端格式加上 'timeframe'，依形成時間排序，status/clearedAt 為全歷史的最終狀態
+            
+        Raises:
+            ValueError: 時間刻度未載入或參數錯誤
+        """
+        timeframes = list(timeframes or FVG_INDEX_CONFIG['timeframes'])
+        missing = [tf for tf in timeframes if tf not in self.data_cache]
+        if missing:
+            raise ValueError(f"不支援的時間框架: {', '.join(missing)}")
+        if fvg_type not in (None, 'bullish', 'bearish'):
+            raise ValueError(f"不支援的FVG類型: {fvg_type}")
+        low, high = min(low, high), max(low, high)
+        
+        if start is None and end is None:
+            latest = max(self.data_cache[tf]['DateTime'].iloc[-1] for tf in timeframes)
+            start = end = latest
+        start_seconds = -2 ** 62 if start is None else int(pd.Timestamp(start).value // 10 ** 9)
+        end_seconds = 2 ** 62 if end is None else int(pd.Timestamp(end).value // 10 ** 9)
+        bullish = None if fvg_type is None else fvg_type == 'bullish'
+        
+        fvgs, counts = [], {}
+        for timeframe in timeframes:
+            index = self.get_fvg_index(timeframe)
+            rows = index.query(start_seconds, end_seconds, low, high, bullish)
+            counts[timeframe] = len(rows)
+            for fvg in index.records(rows[-FVG_INDEX_CONFIG['max_results']:]):
+                fvg['timeframe'] = timeframe
+                fvgs.append(fvg)
+        fvgs.sort(key=lambda fvg: fvg['formationTime'])
+        fvgs = fvgs[-FVG_INDEX_CONFIG['max_results']:]
+        return {
+            'symbol': self.symbol,
+            'start': None if start is None else start_seconds,
+            'end': None if end is None else end_seconds,
+            'low': low,
+            'high': high,
+            'counts': counts,
+            'count': len(fvgs),
+            'truncated': sum(counts.values()) > len(fvgs),
+            'fvgs': fvgs
+        }
+
+    def get_fvg_confluence(self, timeframes: Optional[List[str]] = None, start=None, end=None,
+                           same_direction: bool = True, min_timeframes: int = 2) -> Dict:
+        """
+        多時間刻度FVG共振：最小時間刻度的FVG與其他時間刻度FVG在價格與有效時間上同時重疊
+        
+        Args:
+            timeframes: 時間刻度（預設 FVG_INDEX_CONFIG['confluence_timeframes']，最小者為錨點）
+            start / end: 只返回錨點形成時間在範圍內（含兩端，pd.Timestamp）的共振區
+            same_direction: 只配對相同方向的FVG
+            min_timeframes: 共振區至少涵蓋的時間刻度數（含錨點，>= 2）
+            
+        Returns:
+            Dict: {'symbol', 'anchor', 'timeframes', 'total', 'count', 'truncated', 'elapsed_ms', 'zones'}；
+            zones 格式見 FVGConfluence.zones()，依錨點形成時間排序
+            
+        Raises:
+            ValueError: 時間刻度未載入或參數錯誤
+        """
+        timeframes = list(dict.fromkeys(timeframes or FVG_INDEX_CONFIG['confluence_timeframes']))
+        missing = [tf for tf in timeframes if tf not in self.data_cache]
+        if missing:
+            raise ValueError(f"不支援的時間框架: {', '.join(missing)}")
+        if len(timeframes) < 2:
+            raise ValueError("至少需要兩個時間框架")
+        if not 2 <= min_timeframes <= len(timeframes):
+            raise ValueError(f"min_timeframes 需介於 2 與 {len(timeframes)} 之間")
+        
+        started = time.perf_counter()
+        intervals = self.fvg_detector_simple.timeframe_intervals
+        timeframes.sort(key=lambda tf: intervals.get(tf, 0))
+        indexes = {tf: self.get_fvg_index(tf) for tf in timeframes}
+        confluence = FVGConfluence(indexes, timeframes[0], same_direction=same_direction,
+                                   min_timeframes=min_timeframes)
+        
+        start_seconds = None if start is None else int(pd.Timestamp(start).value // 10 ** 9)
+        end_seconds = None if end is None else int(pd.Timestamp(end).value // 10 ** 9)
+        selected = confluence.select(start_seconds, end_seconds)
+        zones = confluence.zones(selected[-FVG_INDEX_CONFIG['max_results']:])
+        return {
+            'symbol': self.symbol,
+            'anchor': timeframes[0],
+            'timeframes': timeframes,
+            'total': len(selected),
+            'count': len(zones),
+            'truncated': len(selected) > len(zones),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'zones': zones
+        }
+
     def get_available_timeframes(self) -> List[str]:
         """取得可用的時間刻度"""
         return list(self.data_cache.keys())
@@ -970,17 +1553,28 @@ class DataProcessor:
                 
                 # 智能檢查：根據數據量選擇策略
                 if hasattr(self.continuity_checker, 'check_continuity'):
-                    # V2 優化版本
-                    if data_size > 100000:
-                        print(f"   {timeframe:>3}: 大數據集({data_size:,}根) - 使用優化檢查...")
-                    else:
-                        print(f"   {timeframe:>3}: 檢查中... ({data_size:,}根)")
+                    # V2 優化版本（auto模式自行選擇策略）
+                    print(f"   {timeframe:>3}: 檢查中... ({data_size:,}根)")
                         
-                    result = self.continuity_checker.check_continuity(df, timeframe)
-                    self.continuity_reports[timeframe] = result
+                    result = self.continuity_store.update(timeframe, df, self.continuity_checker)
+                    self._build_gap_index(timeframe, result)
                     
                     if result['status'] == 'completed':
                         summary = result['summary']
+                        
+                        incremental = result.get('incremental', {})
+                        if incremental.get('mode') == 'cached':
+                            print(f"        └─ 使用已持久化報告（無新K線）")
+                        elif incremental.get('mode') == 'incremental':
+                            print(f"        └─ 增量檢查: {incremental['new_candles']:,} 根新K線")
+                        
+                        # 自動模式的策略與目標達成情況
+                        auto_info = result.get('auto')
+                        if auto_info:
+                            sampled_note = f", 採樣 {auto_info['sample_size']:,} 根" if auto_info['sampled'] else ""
+                            target_note = "達成" if auto_info['target_met'] else "未達成"
+                            print(f"        └─ 策略: {auto_info['strategy']}{sampled_note}, "
+                                  f"預算 {auto_info['budget_seconds']}秒, 性能目標{target_note}")
                         continuity_pct = summary['continuity_percentage']
                         data_gaps = summary.get('total_data_gaps', summary.get('total_gaps', 0))
                         missing_data = summary.get('total_missing_data', summary.get('total_missing_candles', 0))
@@ -1038,19 +1632,78 @@ class DataProcessor:
                     'total_candles': len(df)
                 }
     
-    def get_continuity_report(self, timeframe: str) -> Optional[Dict]:
-        """取得特定時間框架的連續性報告"""
-        return self.continuity_reports.get(timeframe)
+    def get_continuity_report(self, timeframe: str, page: int = 1, page_size: int = 10) -> Optional[Dict]:
+        """
+        取得特定時間框架的連續性報告（間隔列表分頁返回）
+        
+        Args:
+            timeframe: 時間框架
+            page: 頁碼（從1開始）
+            page_size: 每頁筆數
+        """
+        report = self.continuity_reports.get(timeframe)
+        if report is None or report.get('status') != 'completed':
+            return report
+        return paginate_report(report, page, page_size)
+    
+    def _build_gap_index(self, timeframe: str, report: Dict):
+        """由完整歷史的連續性報告建立間隔區間索引"""
+        gap_index = self._make_gap_index(self.data_cache[timeframe], report)
+        if gap_index is None:
+            self.gap_indexes.pop(timeframe, None)
+        else:
+            self.gap_indexes[timeframe] = gap_index
+    
+    @staticmethod
+    def _make_gap_index(df: pd.DataFrame, report: Dict) -> Optional[GapIntervalIndex]:
+        if not report or report.get('status') != 'completed':
+            return None
+        return GapIntervalIndex.build(
+            df['DateTime'],
+            report.get('data_gaps', []),
+            complete=not report.get('sampled', False)
+        )
+    
+    def _window_continuity_info(self, timeframe: str, start_time, end_time) -> Dict:
+        """查詢K線視窗的連續性資訊（間隔索引範圍查詢）"""
+        gap_index = self.gap_indexes.get(timeframe)
+        if gap_index is None:
+            return {
+                'continuity_percentage': -1,
+                'gap_count': -1,
+                'check_status': 'unavailable'
+            }
+        
+        stats = gap_index.query(start_time, end_time)
+        continuity_percentage = stats['continuity_percentage']
+        return {
+            'continuity_percentage': continuity_percentage,
+            'gap_count': stats['gap_count'],
+            'missing_candles': stats['missing_candles'],
+            'check_status': 'good' if continuity_percentage >= 95 else 'warning'
+        }
     
     def check_date_continuity(self, target_date: date, timeframe: str) -> Dict:
-        """檢查特定日期的K線連續性"""
+        """檢查特定日期的K線連續性（間隔索引範圍查詢）"""
         if timeframe not in self.data_cache:
             raise ValueError(f"不支援的時間框架: {timeframe}")
         
-        df = self.data_cache[timeframe]
-        date_str = target_date.strftime('%Y-%m-%d')
+        gap_index = self.gap_indexes.get(timeframe)
+        if gap_index is None:
+            # 尚未建立索引時，只檢查該日的資料
+            df = self.data_cache[timeframe]
+            day_data = df[df['Date_Only'] == target_date]
+            return self.continuity_checker.check_continuity(day_data, timeframe)
         
-        return self.continuity_checker.check_continuity(df, timeframe, date_str)
+        return {
+            'status': 'completed',
+            'timeframe': timeframe,
+            'date': target_date.strftime('%Y-%m-%d'),
+            'summary': gap_index.query_date(target_date),
+            'data_gaps': gap_index.gaps_between(
+                pd.Timestamp(target_date), pd.Timestamp(target_date) + timedelta(days=1) - pd.Timedelta(1, 'ns')
+            )
+        }
     
     def get_continuity_summary(self) -> Dict:
         """取得所有時間框架的連續性摘要"""
@@ -1058,11 +1711,12 @@ class DataProcessor:
         
         for timeframe, report in self.continuity_reports.items():
             if report and report['status'] == 'completed':
+                missing_candles = report['summary'].get('total_missing_data', 0)
                 summary[timeframe] = {
                     'continuity_percentage': report['summary']['continuity_percentage'],
-                    'total_gaps': report['summary']['total_gaps'],
-                    'missing_candles': report['summary']['total_missing_candles'],
-                    'status': self.continuity_checker.quick_check(self.data_cache[timeframe], timeframe)
+                    'total_gaps': report['summary'].get('total_data_gaps', 0),
+                    'missing_candles': missing_candles,
+                    'status': 'good' if missing_candles == 0 else 'warning' if missing_candles < 100 else 'poor'
                 }
             else:
                 summary[timeframe] = {'status': 'error'}
@@ -0,0 +1,181 @@
+# 檔名：date_sampler.py - 可用日期隨機抽樣器
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.us_holidays import holiday_detector
+
+
+class DateSampler:
+    """
+    可用日期抽樣器
+
+    可用日期（各時間刻度交集）以排序後的 int32 日序數陣列保存，並預先計算
+    每日特徵欄位（星期、月份、夏令時間、與最近假日的距離、各時間刻度的
+    FVG數量與連續性）。無條件抽樣為 O(1)；條件抽樣的合格索引會被快取，
+    同一組條件之後的抽樣同樣為 O(1)。
+    """
+
+    MAX_CACHED_FILTERS = 64
+
+    def __init__(self, ordinals: np.ndarray, seed: Optional[int] = None):
+        """
+        Args:
+            ordinals: 已排序、不重複的 date.toordinal() 陣列
+            seed: 隨機種子（None 表示不固定）
+        """
+        self.ordinals = np.asarray(ordinals, dtype=np.int32)
+        self.rng = np.random.default_rng(seed)
+        self.features = {}       # {name: 與 ordinals 對齊的陣列}
+        self._filter_cache = {}  # {filters_key: 合格位置陣列}
+
+        self._compute_calendar_features()
+
+    @classmethod
+    def from_dates(cls, dates: Iterable[date], seed: Optional[int] = None) -> 'DateSampler':
+        """由日期集合建立抽樣器"""
+        ordinals = np.unique(np.fromiter((d.toordinal() for d in dates), dtype=np.int32))
+        return cls(ordinals, seed=seed)
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def to_date(self, ordinal: int) -> date:
+        return date.fromordinal(int(ordinal))
+
+    def dates(self) -> List[date]:
+        return [date.fromordinal(int(o)) for o in self.ordinals]
+
+    # ===== 特徵欄位 =====
+
+    def _compute_calendar_features(self):
+        """計算星期、月份、夏令時間、假日距離"""
+        if len(self.ordinals) == 0:
+            return
+
+        # date.fromordinal(1) 為週一 (weekday=0)
+        self.features['weekday'] = ((self.ordinals - 1) % 7).astype(np.int8)
+
+        index = pd.DatetimeIndex([date.fromordinal(int(o)) for o in self.ordinals])
+        self.features['month'] = index.month.to_numpy(dtype=np.int8)
+
+        # 以紐約當地中午判斷夏令時間
+        noon = (index + pd.Timedelta(hours=12)).tz_localize('America/New_York')
+        self.features['is_dst'] = np.array([bool(ts.dst()) for ts in noon], dtype=bool)
+
+        # 與最近市場假日的天數距離
+        first, last = date.fromordinal(int(self.ordinals[0])), date.fromordinal(int(self.ordinals[-1]))
+        holidays = sorted(
+            d.toordinal()
+            for year in range(first.year - 1, last.year + 2)
+            for d in holiday_detector._get_holidays_for_year(year)
+        )
+        holidays = np.array(holidays, dtype=np.int32)
+        pos = np.searchsorted(holidays, self.ordinals)
+        after = np.abs(holidays[np.minimum(pos, len(holidays) - 1)] - self.ordinals)
+        before = np.abs(self.ordinals - holidays[np.maximum(pos - 1, 0)])
+        self.features['holiday_distance'] = np.minimum(after, before).astype(np.int16)
+
+    def set_fvg_counts(self, timeframe: str, formation_ordinals: np.ndarray):
+        """
+        設定每日FVG數量特徵
+
+        Args:
+            timeframe: 時間刻度
+            formation_ordinals: 每個FVG形成日的日序數
+        """
+        formation_ordinals = np.sort(np.asarray(formation_ordinals, dtype=np.int32))
+        counts = (np.searchsorted(formation_ordinals, self.ordinals, side='right') -
+                  np.searchsorted(formation_ordinals, self.ordinals, side='left'))
+        self.features[f'fvg_count_{timeframe}'] = counts.astype(np.int32)
+        self._filter_cache.clear()
+
+    def set_continuity(self, timeframe: str, gap_index):
+        """由 GapIntervalIndex 批次計算每日連續性百分比特徵"""
+        epoch_ordinal = date(1970, 1, 1).toordinal()
+        day_ns = 86400 * 10 ** 9
+        starts = (self.ordinals.astype(np.int64) - epoch_ordinal) * day_ns
+        ends = starts + day_ns - 1
+        self.features[f'continuity_{timeframe}'] = gap_index.query_ranges(starts, ends).astype(np.float32)
+        self._filter_cache.clear()
+
+    # ===== 抽樣 =====
+
+    def _qualifying_positions(self, filters: Dict) -> np.ndarray:
+        """取得符合條件的位置（快取）"""
+        key = tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple, set)) else v)
+                           for k, v in filters.items()))
+        cached = self._filter_cache.get(key)
+        if cached is not None:
+            return cached
+
+        mask = np.ones(len(self.ordinals), dtype=bool)
+
+        weekdays = filters.get('weekdays')
+        if weekdays is not None:
+            mask &= np.isin(self.features['weekday'], list(weekdays))
+
+        months = filters.get('months')
+        if months is not None:
+            mask &= np.isin(self.features['month'], list(months))
+
+        is_dst = filters.get('is_dst')
+        if is_dst is not None:
+            mask &= self.features['is_dst'] == bool(is_dst)
+
+        if filters.get('max_holiday_distance') is not None:
+            mask &= self.features['holiday_distance'] <= filters['max_holiday_distance']
+        if filters.get('min_holiday_distance') is not None:
+            mask &= self.features['holiday_distance'] >= filters['min_holiday_distance']
+
+        if filters.get('min_fvgs') is not None:
+            column = f"fvg_count_{filters.get('fvg_timeframe', 'M15')}"
+            if column not in self.features:
+                raise ValueError(f"沒有 {column} 特徵，無法依FVG數量篩選")
+            mask &= self.features[column] >= filters['min_fvgs']
+
+        if filters.get('min_continuity') is not None:
+            column = f"continuity_{filters.get('continuity_timeframe', 'M1')}"
+            if column not in self.features:
+                raise ValueError(f"沒有 {column} 特徵，無法依連續性篩選")
+            mask &= self.features[column] > filters['min_continuity']
+
+        positions = np.flatnonzero(mask)
+        if len(self._filter_cache) >= self.MAX_CACHED_FILTERS:
+            self._filter_cache.clear()
+        self._filter_cache[key] = positions
+        return positions
+
+    def sample(self, count: int = 1, **filters) -> List[date]:
+        """
+        隨機抽取日期（可重複）
+
+        Args:
+            count: 抽取數量
+            **filters: weekdays, months, is_dst, max_holiday_distance, min_holiday_distance,
+                       min_fvgs (+ fvg_timeframe), min_continuity (+ continuity_timeframe)
+
+        Returns:
+            List[date]: 抽出的日期；沒有合格日期時返回空列表
+        """
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if not filters:
+            if len(self.ordinals) == 0:
+                return []
+            picks = self.ordinals[self.rng.integers(0, len(self.ordinals), size=count)]
+        else:
+            positions = self._qualifying_positions(filters)
+            if len(positions) == 0:
+                return []
+            picks = self.ordinals[positions[self.rng.integers(0, len(positions), size=count)]]
+        return [date.fromordinal(int(o)) for o in picks]
+
+    def count(self, **filters) -> int:
+        """符合條件的日期數量"""
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if not filters:
+            return len(self.ordinals)
+        return len(self._qualifying_positions(filters))
@@ -0,0 +1,299 @@
+# 檔名：frame_residency.py - 時間刻度K線資料的記憶體預算與磁碟換出
+
+import atexit
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+
+
+def write_columnar(df: pd.DataFrame, path: str) -> int:
+    """
+    將 DataFrame 以欄式格式寫入目錄（每欄一個 .npy 與 meta.json）
+
+    數值/時間欄位原樣保存；datetime.date 物件欄位存為 datetime64[D]；
+    字串欄位存為固定寬度 Unicode 陣列。
+
+    Returns:
+        int: 寫入的位元組數
+
+    Raises:
+        ValueError: 含不支援的欄位型別、字串/日期欄位含缺值，或索引不是預設 RangeIndex
+    """
+    if not (isinstance(df.index, pd.RangeIndex) and df.index.equals(pd.RangeIndex(len(df)))):
+        raise ValueError("只支援預設 RangeIndex")
+
+    columns, arrays = [], []
+    for i, name in enumerate(df.columns):
+        column = df[name]
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind != 'O':
+            kind, values = 'array', column.to_numpy()
+        elif column.isna().any():
+            raise ValueError(f"欄位 {name} 含缺值")
+        elif pd.api.types.infer_dtype(column, skipna=False) == 'string':
+            kind, values = 'str', column.to_numpy(dtype=str)
+        elif pd.api.types.infer_dtype(column, skipna=False) == 'date':
+            kind, values = 'date', column.to_numpy().astype('datetime64[D]')
+        else:
+            raise ValueError(f"欄位 {name} 的型別 {column.dtype} 不支援換出")
+        columns.append({'name': name, 'kind': kind, 'dtype': str(column.dtype), 'file': f'{i}.npy'})
+        arrays.append(values)
+
+    os.makedirs(path, exist_ok=True)
+    written = 0
+    for spec, values in zip(columns, arrays):
+        np.save(os.path.join(path, spec['file']), values, allow_pickle=False)
+        written += values.nbytes
+    with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'rows': len(df), 'columns': columns}, f, ensure_ascii=False)
+    return written
+
+
+def map_columnar(path: str) -> Tuple[pd.DataFrame, int]:
+    """
+    重新映射 write_columnar 寫出的目錄
+
+    數值/時間欄位以寫入時複製（mmap_mode='c'）映射，不佔用堆積記憶體，
+    修改只影響本行程的私有分頁；字串與日期欄位還原為原本的型別。
+
+    Returns:
+        (DataFrame, 映射的位元組數)
+    """
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    data, mapped = {}, 0
+    for spec in meta['columns']:
+        values = np.load(os.path.join(path, spec['file']), mmap_mode='c', allow_pickle=False)
+        if len(values) != meta['rows']:
+            raise ValueError(f"{spec['file']} 筆數不符")
+        if spec['kind'] == 'array':
+            data[spec['name']] = values.view(np.ndarray)  # 仍由映射的分頁承載
+            mapped += values.nbytes
+        elif spec['kind'] == 'date' or spec['dtype'] == 'object':
+            data[spec['name']] = values.astype(object)
+        else:
+            data[spec['name']] = pd.array(values, dtype=spec['dtype'])
+    return pd.DataFrame(data, copy=False), mapped
+
+
+class _Entry:
+    __slots__ = ('frame', 'heap_bytes', 'mapped_bytes', 'last_access', 'spill_path', 'unspillable')
+
+    def __init__(self):
+        self.frame = None
+        self.heap_bytes = 0
+        self.mapped_bytes = 0
+        self.last_access = 0
+        self.spill_path = None      # 換出的欄式目錄（資料替換時失效）
+        self.unspillable = None     # 無法換出的原因
+
+
+class FrameResidency(MutableMapping):
+    """
+    {timeframe: DataFrame} 的記憶體預算管理
+
+    用法與 dict 相同（DataProcessor.data_cache）。常駐資料的堆積記憶體超過預算時，
+    最久未存取的時間刻度寫成欄式檔案（第一次換出時寫入，之後直接捨棄）並釋放；
+    下次存取時重新映射，數值欄位由作業系統分頁快取承載，不計入預算。
+
+    換出檔案放在 spill_root 下各行程自己的暫存目錄（prefork 的 worker 不互相覆寫，
+    可沿用父行程 fork 前已換出的檔案），行程結束時刪除。
+    """
+
+    def __init__(self, spill_root: str, budget_bytes: int, enabled: bool = True):
+        """
+        Args:
+            spill_root: 換出檔案的根目錄
+            budget_bytes: 常駐資料的堆積記憶體預算（<= 0 表示不限制）
+            enabled: False 時只記錄用量，不換出
+        """
+        self.spill_root = spill_root
+        self.budget_bytes = budget_bytes
+        self.enabled = enabled and budget_bytes > 0
+
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        self._clock = 0
+        self._spill_dir = None
+        self._spill_pid = None
+        self.stats = {'hits': 0, 'remaps': 0, 'evictions': 0, 'spill_writes': 0, 'spill_bytes': 0}
+
+    # ------------------------------------------------------------------ dict 介面
+
+    def __getitem__(self, timeframe: str) -> pd.DataFrame:
+        with self._lock:
+            entry = self._entries[timeframe]
+            self._touch(entry)
+            if entry.frame is not None:
+                self.stats['hits'] += 1
+                return entry.frame
+
+            frame, mapped = map_columnar(entry.spill_path)
+            self._set_frame(entry, frame, mapped)
+            self.stats['remaps'] += 1
+            logger.debug("時間刻度 %s 已自 %s 重新映射", timeframe, entry.spill_path)
+            self._enforce_budget(keep=timeframe)
+            return frame
+
+    def __setitem__(self, timeframe: str, frame: pd.DataFrame):
+        with self._lock:
+            entry = self._entries.get(timeframe)
+            if entry is None:
+                entry = self._entries[timeframe] = _Entry()
+            else:
+                self._discard_spill(entry)
+            self._touch(entry)
+            self._set_frame(entry, frame, 0)
+            entry.unspillable = None
+            self._enforce_budget(keep=timeframe)
+
+    def replace_appended(self, timeframe: str, frame: pd.DataFrame, appended: pd.DataFrame):
+        """
+        以「原資料 + appended」的新 DataFrame 替換（熱重載）
+
+        原資料常駐且未映射時，記憶體用量只加上新列，不重新掃描整個字串欄位。
+        """
+        with self._lock:
+            entry = self._entries.get(timeframe)
+            if entry is None or entry.frame is None or entry.mapped_bytes or \
+                    len(frame) != len(entry.frame) + len(appended):
+                self[timeframe] = frame
+                return
+            heap_bytes = entry.heap_bytes + int(appended.memory_usage(deep=True, index=False).sum())
+            self._discard_spill(entry)
+            self._touch(entry)
+            entry.frame = frame
+            entry.heap_bytes = heap_bytes
+            entry.unspillable = None
+            self._enforce_budget(keep=timeframe)
+
+    def __delitem__(self, timeframe: str):
+        with self._lock:
+            self._discard_spill(self._entries.pop(timeframe))
+
+    def __contains__(self, timeframe) -> bool:
+        return timeframe in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------ 常駐管理
+
+    def is_resident(self, timeframe: str) -> bool:
+        entry = self._entries.get(timeframe)
+        return entry is not None and entry.frame is not None
+
+    def resident_bytes(self) -> int:
+        """常駐資料的堆積記憶體（不含映射的欄位）"""
+        with self._lock:
+            return sum(e.heap_bytes for e in self._entries.values() if e.frame is not None)
+
+    def evict(self, timeframe: str) -> bool:
+        """立即換出指定時間刻度；無法換出時返回 False"""
+        with self._lock:
+            entry = self._entries.get(timeframe)
+            return entry is not None and entry.frame is not None and self._evict(timeframe, entry)
+
+    def close(self):
+        """刪除本行程的換出目錄"""
+        with self._lock:
+            if self._spill_dir is not None and self._spill_pid == os.getpid():
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = self._spill_pid = None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                enabled=self.enabled,
+                budget_bytes=self.budget_bytes,
+                resident_bytes=self.resident_bytes(),
+                timeframes={
+                    timeframe: {
+                        'resident': entry.frame is not None,
+                        'heap_bytes': entry.heap_bytes,
+                        'mapped_bytes': entry.mapped_bytes,
+                        'spilled': entry.spill_path is not None,
+                        'unspillable': entry.unspillable
+                    }
+                    for timeframe, entry in self._entries.items()
+                }
+            )
+
+    def _touch(self, entry: _Entry):
+        self._clock += 1
+        entry.last_access = self._clock
+
+    @staticmethod
+    def _set_frame(entry: _Entry, frame: pd.DataFrame, mapped: int):
+        entry.frame = frame
+        entry.mapped_bytes = mapped
+        entry.heap_bytes = int(frame.memory_usage(deep=True).sum()) - mapped
+
+    def _enforce_budget(self, keep: str):
+        """超過預算時依最久未存取順序換出（需持有鎖）"""
+        if not self.enabled:
+            return
+        candidates = sorted(
+            (entry.last_access, timeframe) for timeframe, entry in self._entries.items()
+            if entry.frame is not None and timeframe != keep and entry.unspillable is None
+        )
+        for _, timeframe in candidates:
+            if self.resident_bytes() <= self.budget_bytes:
+                return
+            self._evict(timeframe, self._entries[timeframe])
+
+        if self.resident_bytes() > self.budget_bytes:
+            logger.warning("常駐K線資料 %.1f MB 超過預算 %.1f MB（無可換出的時間刻度）",
+                           self.resident_bytes() / 1048576, self.budget_bytes / 1048576)
+
+    def _evict(self, timeframe: str, entry: _Entry) -> bool:
+        if entry.spill_path is None:
+            path = os.path.join(self._own_spill_dir(), f'{timeframe}-{entry.last_access}')
+            try:
+                written = write_columnar(entry.frame, path)
+            except (ValueError, OSError) as e:
+                shutil.rmtree(path, ignore_errors=True)
+                entry.unspillable = str(e)
+                logger.warning("時間刻度 %s 無法換出，保持常駐: %s", timeframe, e)
+                return False
+            entry.spill_path = path
+            self.stats['spill_writes'] += 1
+            self.stats['spill_bytes'] += written
+
+        entry.frame = None
+        entry.heap_bytes = entry.mapped_bytes = 0
+        self.stats['evictions'] += 1
+        logger.info("時間刻度 %s 已換出至 %s", timeframe, entry.spill_path)
+        return True
+
+    def _own_spill_dir(self) -> str:
+        """本行程的換出目錄（fork 後的子行程另建自己的目錄）"""
+        if self._spill_pid != os.getpid():
+            os.makedirs(self.spill_root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix=f'{os.getpid()}-', dir=self.spill_root)
+            self._spill_pid = os.getpid()
+            atexit.register(self.close)
+        return self._spill_dir
+
+    def _discard_spill(self, entry: _Entry):
+        """資料被替換時刪除本行程寫出的舊換出檔案（父行程的檔案只捨棄參考）"""
+        path, entry.spill_path = entry.spill_path, None
+        if path is not None and self._spill_pid == os.getpid() and \
+                os.path.dirname(path) == self._spill_dir:
+            shutil.rmtree(path, ignore_errors=True)
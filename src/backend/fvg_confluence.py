@@ -0,0 +1,177 @@
+# 檔名：fvg_confluence.py - 多時間刻度FVG共振（價格與時間同時重疊）
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.fvg_index import FVGPriceIndex
+
+
+class FVGConfluence:
+    """
+    以基準時間刻度的FVG為錨點，找出價格與有效時間同時重疊的其他時間刻度FVG
+
+    有效時間與 FVGPriceIndex 相同（[形成時間, 清除時間或延伸結束)），價格區間為
+    [bottom, top]，兩端相接也算重疊。每個其他時間刻度以排序端點掃描（sort-and-sweep）：
+    其他時間刻度的FVG依形成時間排序，且有效期長度有上限，因此與錨點時間重疊者
+    必定落在形成時間 (錨點形成 - max_duration, 錨點結束) 這一段，全部錨點一次以
+    searchsorted 取得各自的候選範圍，展開為候選配對後以向量化條件過濾，不使用巢狀迴圈。
+
+    結果以配對陣列（依錨點排序）保存，zones() 才轉為字典。
+    """
+
+    def __init__(self, indexes: Dict[str, FVGPriceIndex], anchor: str,
+                 same_direction: bool = True, min_timeframes: int = 2):
+        """
+        Args:
+            indexes: {timeframe: FVGPriceIndex}（需包含 anchor）
+            anchor: 錨點時間刻度（通常為最小者）
+            same_direction: 只配對相同方向（多頭/空頭）的FVG
+            min_timeframes: 共振區至少涵蓋的時間刻度數（含錨點）
+        """
+        self.indexes = indexes
+        self.anchor = anchor
+        self.others = [tf for tf in indexes if tf != anchor]
+        base = indexes[anchor]
+
+        empty = np.empty(0, dtype=np.int64)
+        anchor_rows, timeframe_ids, rows = [empty], [empty], [empty]
+        for k, timeframe in enumerate(self.others):
+            a, b = self._overlapping_pairs(base, indexes[timeframe], same_direction)
+            anchor_rows.append(a)
+            timeframe_ids.append(np.full(len(a), k, dtype=np.int64))
+            rows.append(b)
+        anchor_rows, timeframe_ids, rows = (np.concatenate(anchor_rows), np.concatenate(timeframe_ids),
+                                            np.concatenate(rows))
+
+        # 依 (錨點, 時間刻度, 形成順序) 排序，同一錨點的配對相鄰
+        order = np.lexsort((rows, timeframe_ids, anchor_rows))
+        self.pair_anchor = anchor_rows[order]
+        self.pair_timeframe = timeframe_ids[order]
+        self.pair_row = rows[order]
+
+        # 每個錨點的配對區段與涵蓋的時間刻度數（含錨點）
+        n = len(self.pair_anchor)
+        new_anchor = np.ones(n, dtype=bool)
+        new_anchor[1:] = self.pair_anchor[1:] != self.pair_anchor[:-1]
+        new_timeframe = new_anchor.copy()
+        new_timeframe[1:] |= self.pair_timeframe[1:] != self.pair_timeframe[:-1]
+        starts = np.flatnonzero(new_anchor)
+        timeframe_counts = (np.add.reduceat(new_timeframe.astype(np.int64), starts) + 1) if n else empty
+        keep = timeframe_counts >= min_timeframes
+
+        self.zone_starts = starts[keep]
+        self.zone_ends = np.r_[starts[1:], len(self.pair_anchor)][keep].astype(np.int64)
+        self.zone_anchor = self.pair_anchor[self.zone_starts]
+        self.zone_timeframe_count = timeframe_counts[keep]
+        self._common_ranges()
+
+    @staticmethod
+    def _overlapping_pairs(base: FVGPriceIndex, other: FVGPriceIndex, same_direction: bool):
+        """base 與 other 中時間與價格都重疊的 (base 列, other 列) 配對"""
+        if not len(base) or not len(other):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        lo = np.searchsorted(other.formed, base.formed - other.max_duration, side='right')
+        hi = np.searchsorted(other.formed, base.until, side='left')
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        a = np.repeat(np.arange(len(base), dtype=np.int64), counts)
+        offsets = np.arange(total, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        b = np.repeat(lo, counts).astype(np.int64) + offsets
+
+        mask = ((other.until[b] > base.formed[a])
+                & (other.bottom[b] <= base.top[a]) & (other.top[b] >= base.bottom[a]))
+        if same_direction:
+            mask &= other.table.bullish[b] == base.table.bullish[a]
+        return a[mask], b[mask]
+
+    def _common_ranges(self):
+        """每個共振區內所有FVG的共同價格/時間範圍（沒有共同部分時 bottom > top 或 start >= end）"""
+        base = self.indexes[self.anchor]
+        n = len(self.pair_row)
+        bottom, top = np.empty(n), np.empty(n)
+        formed, until = np.empty(n, dtype=np.int64), np.empty(n, dtype=np.int64)
+        for k, timeframe in enumerate(self.others):
+            index = self.indexes[timeframe]
+            mask = self.pair_timeframe == k
+            rows = self.pair_row[mask]
+            bottom[mask], top[mask] = index.bottom[rows], index.top[rows]
+            formed[mask], until[mask] = index.formed[rows], index.until[rows]
+
+        anchor = self.zone_anchor
+        if len(self.zone_starts):
+            # reduceat 以區段起點分段；未保留的錨點區段夾在中間，以 zone_ends 截斷
+            self.zone_bottom = np.maximum(base.bottom[anchor], self._segment(np.maximum, bottom))
+            self.zone_top = np.minimum(base.top[anchor], self._segment(np.minimum, top))
+            self.zone_start = np.maximum(base.formed[anchor], self._segment(np.maximum, formed))
+            self.zone_end = np.minimum(base.until[anchor], self._segment(np.minimum, until))
+        else:
+            self.zone_bottom = self.zone_top = np.empty(0)
+            self.zone_start = self.zone_end = np.empty(0, dtype=np.int64)
+
+    def _segment(self, ufunc, values: np.ndarray) -> np.ndarray:
+        """每個共振區 [zone_starts, zone_ends) 的 ufunc 歸約"""
+        bounds = np.empty(2 * len(self.zone_starts), dtype=np.int64)
+        bounds[0::2], bounds[1::2] = self.zone_starts, self.zone_ends
+        # reduceat 的最後一個邊界不能等於長度：在尾端補一個值
+        padded = np.r_[values, values[:1]]
+        return ufunc.reduceat(padded, bounds)[0::2]
+
+    def __len__(self) -> int:
+        return len(self.zone_starts)
+
+    def select(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """錨點形成時間在 [start, end]（Unix 秒）內的共振區位置"""
+        formed = self.indexes[self.anchor].formed[self.zone_anchor]
+        lo = 0 if start is None else int(np.searchsorted(formed, start, side='left'))
+        hi = len(formed) if end is None else int(np.searchsorted(formed, end, side='right'))
+        return np.arange(lo, hi)
+
+    def zones(self, selected: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """
+        共振區字典
+
+        每區包含錨點FVG（前端格式）、各時間刻度重疊的FVG（前端格式加上 timeframe、
+        overlapTop/overlapBottom 與是否完全包含錨點 containsAnchor），以及所有FVG的
+        共同價格範圍 top/bottom 與共同有效時間 start/end（沒有共同部分時為 None）。
+        """
+        selected = np.arange(len(self)) if selected is None else np.asarray(selected, dtype=np.int64)
+        base = self.indexes[self.anchor]
+        anchors = base.records(self.zone_anchor[selected])
+
+        # 每個時間刻度的配對記錄一次轉換
+        pair_positions = (np.concatenate([np.arange(self.zone_starts[z], self.zone_ends[z]) for z in selected])
+                          if len(selected) else np.empty(0, dtype=np.int64))
+        pair_records = {}
+        for k, timeframe in enumerate(self.others):
+            positions = pair_positions[self.pair_timeframe[pair_positions] == k]
+            index = self.indexes[timeframe]
+            for position, record in zip(positions.tolist(), index.records(self.pair_row[positions])):
+                record['timeframe'] = timeframe
+                pair_records[position] = record
+
+        result = []
+        for z, anchor in zip(selected.tolist(), anchors):
+            anchor['timeframe'] = self.anchor
+            matches = []
+            for position in range(int(self.zone_starts[z]), int(self.zone_ends[z])):
+                match = pair_records[position]
+                match['overlapTop'] = min(match['topPrice'], anchor['topPrice'])
+                match['overlapBottom'] = max(match['bottomPrice'], anchor['bottomPrice'])
+                match['containsAnchor'] = (match['topPrice'] >= anchor['topPrice']
+                                           and match['bottomPrice'] <= anchor['bottomPrice'])
+                matches.append(match)
+            bottom, top = float(self.zone_bottom[z]), float(self.zone_top[z])
+            start, end = int(self.zone_start[z]), int(self.zone_end[z])
+            result.append({
+                'type': anchor['type'],
+                'timeframes': [self.anchor] + sorted({m['timeframe'] for m in matches}, key=self.others.index),
+                'top': top if top >= bottom else None,
+                'bottom': bottom if top >= bottom else None,
+                'start': start if end > start else None,
+                'end': end if end > start else None,
+                'anchor': anchor,
+                'matches': matches
+            })
+        return result
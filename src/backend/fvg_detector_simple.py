@@ -3,10 +3,11 @@
 
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import sys
 import os
+import logging
 
 # 添加utils路徑
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,6 +15,9 @@ utils_dir = os.path.join(os.path.dirname(current_dir), 'utils')
 sys.path.insert(0, utils_dir)
 
 from time_utils import normalize_timestamp, validate_timestamp, datetime_to_timestamp
+from backend.fvg_table import FVGTable
+
+logger = logging.getLogger(__name__)
 
 class FVGDetectorSimple:
     """
@@ -47,7 +51,7 @@ class FVGDetectorSimple:
     
     def detect_fvgs(self, df: pd.DataFrame, timeframe: str = 'M15') -> List[Dict[str, Any]]:
         """
-        檢測所有FVG - 簡化版本
+        檢測所有FVG - 舊版巢狀字典格式（含三根K線細節，供除錯使用）
         
         Args:
             df: K線數據，必須包含 ['DateTime', 'Open', 'High', 'Low', 'Close'] 列
@@ -56,185 +60,148 @@ class FVGDetectorSimple:
         Returns:
             FVG清單
         """
-        if len(df) < 3:
-            return []
+        return self.detect_fvg_table(df, timeframe).to_dicts()
+    
+    def detect_fvg_table(self, df: pd.DataFrame, timeframe: str = 'M15',
+                         tick_size: Optional[float] = None) -> FVGTable:
+        """
+        檢測所有FVG - 欄式結果
         
-        # 防止堆棧溢出：限制數據量
+        形成條件（右側K線形成時確認，L=i-2, C=i-1, R=i）：
+        - 多頭: C.Close > C.Open AND C.Close > L.High AND L.High < R.Low
+        - 空頭: C.Close < C.Open AND C.Close < L.Low AND L.Low > R.High
+        清除條件：形成後 clearing_window 根內收盤回到 L.High 以下（多頭）/ L.Low 以上（空頭）
+        
+        Args:
+            df: K線數據，必須包含 ['DateTime', 'Open', 'High', 'Low', 'Close'] 列
+            timeframe: 時間框架（用於計算延伸時間）
+            tick_size: 價格欄位為整數跳動點時的跳動點大小（比較直接在整數上進行）
+            
+        Returns:
+            FVGTable: 位置相對於排序後（最多最近1000根）的K線
+        """
+        # 限制數據量：只檢測最近1000根
         if len(df) > 1000:
-            print(f"   [FVG檢測] 數據量過大 ({len(df)} 根K線)，限制為最近1000根")
-            df = df.tail(1000).copy()
+            logger.debug("[FVG檢測] 數據量過大 (%d 根K線)，限制為最近1000根", len(df))
+            df = df.tail(1000)
         
         # 確保數據按時間排序
         df = df.sort_values('DateTime').reset_index(drop=True)
         
-        fvgs = []
-        
-        # 滑動窗口檢測FVG (需要至少3根K線: L, C, R)
-        # 正確順序：i-2(左), i-1(中), i(右) - 因為FVG是在右邊K線形成時才確認
-        for i in range(2, len(df)):
-            L = df.iloc[i - 2]  # Left candle (i-2)
-            C = df.iloc[i - 1]  # Center candle (i-1)
-            R = df.iloc[i]      # Right candle (i) - 當前K線
-            
-            # 檢查多頭FVG: C.Close > C.Open AND C.Close > L.High AND L.High < R.Low
-            if (C['Close'] > C['Open'] and 
-                C['Close'] > L['High'] and 
-                L['High'] < R['Low']):
-                
-                fvg = self._create_fvg(
-                    fvg_type='bullish',
-                    L=L, C=C, R=R,
-                    l_idx=i-2, c_idx=i-1, r_idx=i,
-                    timeframe=timeframe
-                )
-                fvgs.append(fvg)
-                self.stats['bullish_detected'] += 1
-            
-            # 檢查空頭FVG: C.Close < C.Open AND C.Close < L.Low AND L.Low > R.High
-            elif (C['Close'] < C['Open'] and 
-                  C['Close'] < L['Low'] and 
-                  L['Low'] > R['High']):
-                
-                fvg = self._create_fvg(
-                    fvg_type='bearish', 
-                    L=L, C=C, R=R,
-                    l_idx=i-2, c_idx=i-1, r_idx=i,
-                    timeframe=timeframe
-                )
-                fvgs.append(fvg)
-                self.stats['bearish_detected'] += 1
-        
-        self.stats['total_detected'] = len(fvgs)
-        self.stats['valid_count'] = len(fvgs)
+        formations = self.find_formation_indices(df)
+        table = FVGTable.from_formations(df, formations['bullish'], formations['bearish'],
+                                         self._extend_seconds(timeframe), self.clearing_window,
+                                         tick_size=tick_size)
         
-        # 檢查清除條件
-        fvgs = self._check_all_clearing(fvgs, df)
-        
-        return fvgs
+        counts = table.counts()
+        self.stats.update(total_detected=counts['total'], bullish_detected=counts['bullish'],
+                          bearish_detected=counts['bearish'], valid_count=counts['total'],
+                          cleared_count=counts['cleared'])
+        return table
     
-    def _create_fvg(self, fvg_type: str, L, C, R, l_idx: int, c_idx: int, r_idx: int, timeframe: str) -> Dict[str, Any]:
+    def detect_history_table(self, df: pd.DataFrame, timeframe: str,
+                             tick_size: Optional[float] = None) -> FVGTable:
         """
-        創建FVG記錄 - 簡化版本
+        檢測全部歷史資料的FVG（不限制為最近1000根，不更新統計）
+
+        Args:
+            df: 已按時間排序的K線數據
+            timeframe: 時間框架（用於計算延伸時間）
+            tick_size: 價格欄位為整數跳動點時的跳動點大小
         """
-        # 計算開始和結束時間 - 直接使用DateTime
-        start_time = L['DateTime']
+        formations = self.find_formation_indices(df)
+        return FVGTable.from_formations(df, formations['bullish'], formations['bearish'],
+                                        self._extend_seconds(timeframe), self.clearing_window,
+                                        tick_size=tick_size)
+
+    def find_formation_indices(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        向量化找出FVG形成位置（不限數據量，不建立FVG記錄）
         
-        # 修正：計算結束時間應該是 L時間 + (40根K線 × 時間間隔)
-        # 這樣M1時間框架的FVG延伸為40根K線，不是40分鐘
-        interval_minutes = self.timeframe_intervals.get(timeframe, 15)  # 預設15分鐘
-        end_time = start_time + timedelta(minutes=interval_minutes * self.clearing_window)
+        條件與 detect_fvgs 相同，返回右側K線(R)的位置索引
         
-        if fvg_type == 'bullish':
-            return {
-                'type': 'bullish',
-                'start_time': datetime_to_timestamp(start_time),
-                'end_time': datetime_to_timestamp(end_time),
-                'formation_time': datetime_to_timestamp(R['DateTime']),
-                'start_price': float(L['High']),  # 多頭FVG的下邊界
-                'end_price': float(R['Low']),    # 多頭FVG的上邊界
-                'gap_size': float(R['Low'] - L['High']),
-                'gap_percentage': float((R['Low'] - L['High']) / L['High']),
-                'clearing_trigger_price': float(L['High']),  # 多頭FVG清除條件：收盤價突破L.High
-                'status': 'valid',
-                'left_candle': {
-                    'index': l_idx,
-                    'datetime': start_time.isoformat(),
-                    'open': float(L['Open']),
-                    'high': float(L['High']),
-                    'low': float(L['Low']),
-                    'close': float(L['Close'])
-                },
-                'center_candle': {
-                    'index': c_idx,
-                    'datetime': C['DateTime'].isoformat(),
-                    'open': float(C['Open']),
-                    'high': float(C['High']),
-                    'low': float(C['Low']),
-                    'close': float(C['Close'])
-                },
-                'right_candle': {
-                    'index': r_idx,
-                    'datetime': R['DateTime'].isoformat(),
-                    'open': float(R['Open']),
-                    'high': float(R['High']),
-                    'low': float(R['Low']),
-                    'close': float(R['Close'])
-                }
-            }
-        else:  # bearish
-            return {
-                'type': 'bearish',
-                'start_time': datetime_to_timestamp(start_time),
-                'end_time': datetime_to_timestamp(end_time),
-                'formation_time': datetime_to_timestamp(R['DateTime']),
-                'start_price': float(R['High']),  # 空頭FVG的上邊界
-                'end_price': float(L['Low']),    # 空頭FVG的下邊界
-                'gap_size': float(L['Low'] - R['High']),
-                'gap_percentage': float((L['Low'] - R['High']) / R['High']),
-                'clearing_trigger_price': float(L['Low']),  # 空頭FVG清除條件：收盤價跌破L.Low
-                'status': 'valid',
-                'left_candle': {
-                    'index': l_idx,
-                    'datetime': start_time.isoformat(),
-                    'open': float(L['Open']),
-                    'high': float(L['High']),
-                    'low': float(L['Low']),
-                    'close': float(L['Close'])
-                },
-                'center_candle': {
-                    'index': c_idx,
-                    'datetime': C['DateTime'].isoformat(),
-                    'open': float(C['Open']),
-                    'high': float(C['High']),
-                    'low': float(C['Low']),
-                    'close': float(C['Close'])
-                },
-                'right_candle': {
-                    'index': r_idx,
-                    'datetime': R['DateTime'].isoformat(),
-                    'open': float(R['Open']),
-                    'high': float(R['High']),
-                    'low': float(R['Low']),
-                    'close': float(R['Close'])
-                }
-            }
-    
-    def _check_all_clearing(self, fvgs: List[Dict[str, Any]], df: pd.DataFrame) -> List[Dict[str, Any]]:
-        """
-        檢查所有FVG的清除狀態 - 簡化版本
-        """
-        for fvg in fvgs:
-            formation_idx = fvg['right_candle']['index']
+        Args:
+            df: 已按時間排序的K線數據
             
-            # 檢查後續K線是否清除此FVG
-            for i in range(formation_idx + 1, min(formation_idx + 1 + self.clearing_window, len(df))):
-                candle = df.iloc[i]
-                
-                if fvg['type'] == 'bullish':
-                    # 多頭FVG: 收盤價回落到 L.High 以下 (價格回填gap)
-                    if candle['Close'] <= fvg['clearing_trigger_price']:
-                        fvg['status'] = 'cleared'
-                        fvg['cleared_at'] = datetime_to_timestamp(candle['DateTime'])
-                        fvg['cleared_by_price'] = float(candle['Close'])
-                        fvg['cleared_at_index'] = i
-                        self.stats['cleared_count'] += 1
-                        break
-                else:  # bearish
-                    # 空頭FVG: 收盤價回升到 L.Low 以上 (價格回填gap)
-                    if candle['Close'] >= fvg['clearing_trigger_price']:
-                        fvg['status'] = 'cleared'
-                        fvg['cleared_at'] = datetime_to_timestamp(candle['DateTime'])
-                        fvg['cleared_by_price'] = float(candle['Close'])
-                        fvg['cleared_at_index'] = i
-                        self.stats['cleared_count'] += 1
-                        break
+        Returns:
+            Dict: {'bullish': 位置陣列, 'bearish': 位置陣列}
+        """
+        if len(df) < 3:
+            empty = np.empty(0, dtype=np.int64)
+            return {'bullish': empty, 'bearish': empty}
+        
+        o = df['Open'].to_numpy()
+        h = df['High'].to_numpy()
+        l = df['Low'].to_numpy()
+        c = df['Close'].to_numpy()
+        
+        # L = [:-2], C = [1:-1], R = [2:]
+        bullish = (c[1:-1] > o[1:-1]) & (c[1:-1] > h[:-2]) & (h[:-2] < l[2:])
+        bearish = ~bullish & (c[1:-1] < o[1:-1]) & (c[1:-1] < l[:-2]) & (l[:-2] > h[2:])
         
-        return fvgs
+        return {
+            'bullish': np.flatnonzero(bullish) + 2,
+            'bearish': np.flatnonzero(bearish) + 2
+        }
     
-    def convert_for_frontend(self, fvgs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def detect_fvgs_windows(self, df: pd.DataFrame, windows: List[Tuple[int, int]],
+                            timeframe: str = 'M15',
+                            tick_size: Optional[float] = None) -> List[List[Dict[str, Any]]]:
+        """
+        批次檢測多個K線窗口的FVG（前端格式）
+
+        重疊或相鄰的窗口先合併為區段，每個區段只建立一次 FVGTable；
+        各窗口再以 FVGTable.window 依位置篩選並截斷清除狀態。結果與逐窗口呼叫
+        detect_fvgs + convert_for_frontend 相同（含最近1000根K線的限制）。
+
+        Args:
+            df: 已按時間排序的完整K線數據
+            windows: [(start, end)] 位置範圍（含兩端）
+            timeframe: 時間框架（用於計算延伸時間）
+            tick_size: 價格欄位為整數跳動點時的跳動點大小
+
+        Returns:
+            List[List[Dict]]: 與 windows 同順序的 FVG 清單
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in windows]
+
+        # 合併重疊/相鄰窗口：[區段起點, 區段終點, [窗口編號]]
+        segments = []
+        for k in sorted(range(len(windows)), key=lambda k: windows[k]):
+            start, end = windows[k]
+            if segments and start <= segments[-1][1] + 1:
+                segments[-1][1] = max(segments[-1][1], end)
+                segments[-1][2].append(k)
+            else:
+                segments.append([start, end, [k]])
+
+        extend_seconds = self._extend_seconds(timeframe)
+        for seg_start, seg_end, members in segments:
+            segment = df.iloc[seg_start:seg_end + 1]
+            formations = self.find_formation_indices(segment)
+            table = FVGTable.from_formations(segment, formations['bullish'], formations['bearish'],
+                                             extend_seconds, self.clearing_window, tick_size=tick_size)
+            for k in members:
+                start, end = windows[k]
+                start = max(start, end - 999)  # 與 detect_fvgs 的數據量限制一致
+                results[k] = table.window(start - seg_start, end - seg_start).to_frontend()
+
+        return results
+
+    def _extend_seconds(self, timeframe: str) -> int:
+        """FVG 延伸時間：L時間 + 40根K線 × 時間間隔（M1 延伸40根K線，不是40分鐘）"""
+        return self.timeframe_intervals.get(timeframe, 15) * self.clearing_window * 60
+
+    def convert_for_frontend(self, fvgs) -> List[Dict[str, Any]]:
         """
         轉換為前端格式 - 簡化版本
+        
+        Args:
+            fvgs: FVGTable（整欄轉換）或舊版 FVG 字典列表
         """
+        if isinstance(fvgs, FVGTable):
+            return fvgs.to_frontend()
+        
         frontend_fvgs = []
         
         for fvg in fvgs:
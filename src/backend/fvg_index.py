@@ -0,0 +1,58 @@
+# 檔名：fvg_index.py - 依時間與價格查詢未回補FVG的索引
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.fvg_table import FVGTable, COLUMNS
+
+
+class FVGPriceIndex:
+    """
+    單一時間刻度全歷史 FVG 的時間/價格索引
+
+    每個 FVG 的有效區間為 [形成時間, 清除時間)，未清除者到延伸結束時間（endTime）為止；
+    價格區間為 [bottom, top]。表格依形成時間排序，而有效區間長度有上限
+    （max_duration，不超過延伸時間），因此在時間範圍 [start, end] 內有效的 FVG
+    必定落在形成時間 (start - max_duration, end] 這一段：兩次二分搜尋定位後，
+    只需對這一小段（約為 clearing_window 根K線內形成的 FVG 數）做價格過濾，
+    查詢成本為 O(log n + 候選數)，與全歷史 FVG 數量無關。
+    """
+
+    __slots__ = ('version', 'table', 'formed', 'until', 'bottom', 'top', 'max_duration')
+
+    def __init__(self, table: FVGTable, version: Optional[str] = None):
+        table = FVGTable(None, table.tick_size, **{name: getattr(table, name) for name in COLUMNS})  # 不持有K線資料
+        self.version = version
+        self.table = table
+        self.formed = table.formation_time
+        self.until = np.where(table.cleared, table.cleared_at, table.end_time)
+        start_price = table._prices(table.start_price)
+        end_price = table._prices(table.end_price)
+        self.bottom = np.minimum(start_price, end_price)
+        self.top = np.maximum(start_price, end_price)
+        self.max_duration = int((self.until - self.formed).max()) if len(table) else 0
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def query(self, start: int, end: int, low: float, high: float,
+              bullish: Optional[bool] = None) -> np.ndarray:
+        """
+        時間範圍 [start, end]（Unix 秒）內曾經有效、且價格區間與 [low, high] 重疊的 FVG
+
+        low == high 時即為包含價格 low 的 FVG。
+
+        Returns:
+            np.ndarray: 列位置（依形成時間排序）
+        """
+        lo = int(np.searchsorted(self.formed, start - self.max_duration, side='right'))
+        hi = int(np.searchsorted(self.formed, end, side='right'))
+        mask = ((self.until[lo:hi] > start) & (self.bottom[lo:hi] <= high) & (self.top[lo:hi] >= low))
+        if bullish is not None:
+            mask &= self.table.bullish[lo:hi] == bullish
+        return lo + np.flatnonzero(mask)
+
+    def records(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """指定列的前端格式（與 FVGTable.to_frontend 相同）"""
+        return self.table.take(rows).to_frontend()
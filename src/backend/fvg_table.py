@@ -0,0 +1,224 @@
+# 檔名：fvg_table.py - 欄式（struct-of-arrays）FVG 結果
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.tick_encoding import decode_price, decode_prices
+
+# 每個 FVG 一列的欄位
+COLUMNS = ('bullish', 'left', 'right',
+           'start_time', 'end_time', 'formation_time',
+           'start_price', 'end_price', 'gap_size', 'gap_percentage', 'trigger_price',
+           'cleared_index', 'cleared_at', 'cleared_by_price')
+
+
+class FVGTable:
+    """
+    欄式 FVG 結果
+
+    每個欄位是一個 NumPy 陣列（每個 FVG 一列），由形成位置一次向量化建立；
+    前端格式以整欄 tolist() 轉換，舊版含三根K線細節的巢狀字典只在除錯呼叫
+    to_dicts()/record() 時才建立。
+
+    位置欄位（left/right/cleared_index）是相對於 source 的位置。
+    tick_size 不為 None 時，source 的價格為整數跳動點：形成與清除判斷直接比較整數，
+    價格欄位保持跳動點數，輸出時才轉回浮點數。
+    """
+
+    __slots__ = ('source', 'tick_size') + COLUMNS
+
+    def __init__(self, source: Optional[pd.DataFrame], tick_size: Optional[float] = None,
+                 **columns: np.ndarray):
+        self.source = source
+        self.tick_size = tick_size
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_formations(cls, df: pd.DataFrame, bullish_right: np.ndarray, bearish_right: np.ndarray,
+                        extend_seconds: int, clearing_window: int,
+                        tick_size: Optional[float] = None) -> 'FVGTable':
+        """
+        由形成位置（右側K線）建立
+
+        Args:
+            df: 已按時間排序的K線數據
+            bullish_right / bearish_right: 多頭/空頭 FVG 的右側K線位置
+            extend_seconds: FVG 延伸時間（秒）
+            clearing_window: 形成後檢查清除的K線數
+            tick_size: df 價格為整數跳動點時的跳動點大小
+        """
+        right = np.concatenate([bullish_right, bearish_right]).astype(np.int64)
+        bullish = np.zeros(len(right), dtype=bool)
+        bullish[:len(bullish_right)] = True
+        order = np.argsort(right, kind='stable')
+        right, bullish = right[order], bullish[order]
+        left = right - 2
+
+        # 價格欄位維持資料原本的 dtype 運算，與逐筆比較的結果一致
+        h = df['High'].to_numpy()
+        l = df['Low'].to_numpy()
+        c = df['Close'].to_numpy()
+        seconds = df['DateTime'].to_numpy(dtype='datetime64[ns]').astype('datetime64[s]').astype(np.int64)
+
+        start_price = np.where(bullish, h[left], h[right])
+        end_price = np.where(bullish, l[right], l[left])
+        gap_size = np.where(bullish, l[right] - h[left], l[left] - h[right])
+        trigger_price = np.where(bullish, h[left], l[left])
+
+        # 清除：形成後 clearing_window 根內第一根收盤回填缺口的K線
+        last = len(df) - 1
+        cleared_index = np.full(len(right), -1, dtype=np.int64)
+        for step in range(1, clearing_window + 1):
+            idx = right + step
+            pending = (idx <= last) & (cleared_index < 0)
+            if not pending.any():
+                break
+            close = c[np.minimum(idx, last)]
+            hit = pending & np.where(bullish, close <= trigger_price, close >= trigger_price)
+            cleared_index[hit] = idx[hit]
+
+        base_price = np.where(bullish, h[left], h[right])
+        if tick_size is None:
+            gap_percentage = gap_size / base_price
+        else:
+            gap_percentage = decode_prices(gap_size, tick_size) / decode_prices(base_price, tick_size)
+
+        cleared = cleared_index >= 0
+        safe = np.where(cleared, cleared_index, 0)
+        return cls(
+            df, tick_size,
+            bullish=bullish, left=left, right=right,
+            start_time=seconds[left],
+            end_time=seconds[left] + extend_seconds,
+            formation_time=seconds[right],
+            start_price=start_price, end_price=end_price, gap_size=gap_size,
+            gap_percentage=gap_percentage,
+            trigger_price=trigger_price,
+            cleared_index=cleared_index,
+            cleared_at=np.where(cleared, seconds[safe], 0),
+            cleared_by_price=np.where(cleared, c[safe], 0)
+        )
+
+    def __len__(self) -> int:
+        return len(self.right)
+
+    @property
+    def cleared(self) -> np.ndarray:
+        return self.cleared_index >= 0
+
+    def take(self, rows) -> 'FVGTable':
+        """選取部分列（布林遮罩或位置陣列）"""
+        return FVGTable(self.source, self.tick_size, **{name: getattr(self, name)[rows] for name in COLUMNS})
+
+    def window(self, start: int, end: int) -> 'FVGTable':
+        """
+        只看 source[start:end+1] 時的結果：三根K線都在範圍內的 FVG，
+        且只計入 end 之前（含）的清除
+        """
+        table = self.take((self.left >= start) & (self.right <= end))
+        after_end = table.cleared_index > end
+        if after_end.any():
+            table.cleared_index = np.where(after_end, -1, table.cleared_index)
+            table.cleared_at = np.where(after_end, 0, table.cleared_at)
+            table.cleared_by_price = np.where(after_end, 0, table.cleared_by_price)
+        return table
+
+    def counts(self) -> Dict[str, int]:
+        bullish = int(self.bullish.sum())
+        return {'total': len(self), 'bullish': bullish, 'bearish': len(self) - bullish,
+                'cleared': int(self.cleared.sum())}
+
+    # ------------------------------------------------------------------ 輸出
+
+    def _prices(self, values: np.ndarray) -> np.ndarray:
+        """價格欄位轉為 float64（跳動點編碼時解碼）"""
+        if self.tick_size is None:
+            return values.astype(np.float64)
+        return decode_prices(values, self.tick_size)
+
+    def _price(self, value) -> float:
+        if self.tick_size is None:
+            return float(value)
+        return decode_price(value, self.tick_size)
+
+    def to_frontend(self) -> List[Dict[str, Any]]:
+        """前端格式（欄位與 FVGDetectorSimple.convert_for_frontend 相同）"""
+        start_price = self._prices(self.start_price)
+        end_price = self._prices(self.end_price)
+        rows = zip(
+            np.where(self.bullish, 'bullish', 'bearish').tolist(),
+            self.start_time.tolist(), self.end_time.tolist(), self.formation_time.tolist(),
+            start_price.tolist(), end_price.tolist(),
+            np.maximum(start_price, end_price).tolist(), np.minimum(start_price, end_price).tolist(),
+            self._prices(self.gap_size).tolist(), self.gap_percentage.astype(np.float64).tolist(),
+            self._prices(self.trigger_price).tolist()
+        )
+        fvgs = [
+            {
+                'type': fvg_type,
+                'startTime': start_time,
+                'endTime': end_time,
+                'formationTime': formation_time,
+                'startPrice': start,
+                'endPrice': end,
+                'topPrice': top,
+                'bottomPrice': bottom,
+                'status': 'valid',
+                'gapSize': gap,
+                'gapPercentage': percentage,
+                'clearingTriggerPrice': trigger
+            }
+            for fvg_type, start_time, end_time, formation_time, start, end, top, bottom,
+                gap, percentage, trigger in rows
+        ]
+
+        cleared = np.flatnonzero(self.cleared)
+        if len(cleared):
+            cleared_at = self.cleared_at[cleared].tolist()
+            cleared_by = self._prices(self.cleared_by_price[cleared]).tolist()
+            for n, at, price in zip(cleared.tolist(), cleared_at, cleared_by):
+                fvgs[n].update(status='cleared', clearedAt=at, clearedByPrice=price)
+        return fvgs
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """舊版巢狀字典（含左/中/右K線細節），供除錯使用"""
+        return [self.record(n) for n in range(len(self))]
+
+    def record(self, n: int) -> Dict[str, Any]:
+        """第 n 個 FVG 的舊版巢狀字典"""
+        left = int(self.left[n])
+        fvg = {
+            'type': 'bullish' if self.bullish[n] else 'bearish',
+            'start_time': int(self.start_time[n]),
+            'end_time': int(self.end_time[n]),
+            'formation_time': int(self.formation_time[n]),
+            'start_price': self._price(self.start_price[n]),
+            'end_price': self._price(self.end_price[n]),
+            'gap_size': self._price(self.gap_size[n]),
+            'gap_percentage': float(self.gap_percentage[n]),
+            'clearing_trigger_price': self._price(self.trigger_price[n]),
+            'status': 'valid',
+            'left_candle': self._candle(left),
+            'center_candle': self._candle(left + 1),
+            'right_candle': self._candle(left + 2)
+        }
+        if self.cleared_index[n] >= 0:
+            fvg.update(status='cleared',
+                       cleared_at=int(self.cleared_at[n]),
+                       cleared_by_price=self._price(self.cleared_by_price[n]),
+                       cleared_at_index=int(self.cleared_index[n]))
+        return fvg
+
+    def _candle(self, position: int) -> Dict[str, Any]:
+        row = self.source.iloc[position]
+        return {
+            'index': position,
+            'datetime': row['DateTime'].isoformat(),
+            'open': self._price(row['Open']),
+            'high': self._price(row['High']),
+            'low': self._price(row['Low']),
+            'close': self._price(row['Close'])
+        }
@@ -0,0 +1,122 @@
+# 檔名：gap_index.py - K線間隔區間索引
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+class GapIntervalIndex:
+    """
+    間隔區間索引
+
+    由一次完整歷史連續性檢查的間隔列表建立，以排序後的起訖時間陣列與
+    缺失K線前綴和回答任意時間範圍的連續性查詢（每次查詢為數次二分搜尋）。
+    """
+
+    def __init__(self, bar_times: np.ndarray, gap_starts: np.ndarray, gap_ends: np.ndarray,
+                 gap_missing: np.ndarray, complete: bool = True):
+        """
+        Args:
+            bar_times: 已排序的K線時間（int64 納秒）
+            gap_starts: 間隔起點時間（int64 納秒，依 gap_ends 排序）
+            gap_ends: 間隔終點時間（int64 納秒，已排序）
+            gap_missing: 每個間隔缺失的K線數
+            complete: 間隔列表是否完整（採樣檢查的報告不完整）
+        """
+        self.bar_times = bar_times
+        self.gap_starts = gap_starts
+        self.gap_ends = gap_ends
+        self.complete = complete
+        # 前綴和：cum_missing[k] 為前k個間隔的缺失總數
+        self.cum_missing = np.concatenate(([0], np.cumsum(gap_missing, dtype=np.int64)))
+
+    @classmethod
+    def build(cls, bar_times: Union[pd.Series, np.ndarray], gaps: List[Dict],
+              complete: bool = True) -> 'GapIntervalIndex':
+        """
+        由K線時間與連續性報告的 data_gaps 建立索引
+        """
+        if isinstance(bar_times, pd.Series):
+            bar_times = bar_times.to_numpy(dtype='datetime64[ns]')
+        times = np.asarray(bar_times, dtype='datetime64[ns]').view(np.int64)
+
+        if gaps:
+            starts = pd.to_datetime([g['start_time'] for g in gaps]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+            ends = pd.to_datetime([g['end_time'] for g in gaps]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+            missing = np.array([max(0, int(g.get('missing_candles', 0))) for g in gaps], dtype=np.int64)
+            order = np.argsort(ends, kind='stable')
+            starts, ends, missing = starts[order], ends[order], missing[order]
+        else:
+            starts = ends = missing = np.empty(0, dtype=np.int64)
+
+        return cls(times, starts, ends, missing, complete=complete)
+
+    @staticmethod
+    def _to_ns(value: Union[datetime, pd.Timestamp, np.datetime64]) -> int:
+        return int(pd.Timestamp(value).as_unit('ns').value)
+
+    def query(self, start: Union[datetime, pd.Timestamp], end: Union[datetime, pd.Timestamp]) -> Dict:
+        """
+        查詢 [start, end] 範圍的連續性
+
+        範圍內的K線數以K線時間二分搜尋取得；間隔以其終點K線歸屬，
+        終點落在 (start, end] 內的間隔計入該範圍。
+        """
+        start_ns = self._to_ns(start)
+        end_ns = self._to_ns(end)
+
+        candles = int(np.searchsorted(self.bar_times, end_ns, side='right') -
+                      np.searchsorted(self.bar_times, start_ns, side='left'))
+
+        lo = int(np.searchsorted(self.gap_ends, start_ns, side='right'))
+        hi = int(np.searchsorted(self.gap_ends, end_ns, side='right'))
+        gap_count = max(0, hi - lo)
+        missing = int(self.cum_missing[hi] - self.cum_missing[lo]) if gap_count else 0
+
+        expected_total = candles + missing
+        percentage = (candles / expected_total * 100) if expected_total > 0 else 0
+
+        return {
+            'total_candles': candles,
+            'gap_count': gap_count,
+            'missing_candles': missing,
+            'continuity_percentage': round(percentage, 2),
+            'index_complete': self.complete
+        }
+
+    def query_ranges(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """
+        批次查詢多個 [start, end] 範圍的連續性百分比（int64 納秒陣列）
+        """
+        candles = (np.searchsorted(self.bar_times, ends, side='right') -
+                   np.searchsorted(self.bar_times, starts, side='left'))
+        lo = np.searchsorted(self.gap_ends, starts, side='right')
+        hi = np.searchsorted(self.gap_ends, ends, side='right')
+        missing = np.where(hi > lo, self.cum_missing[hi] - self.cum_missing[lo], 0)
+
+        expected_total = candles + missing
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage = np.where(expected_total > 0, candles / expected_total * 100, 0.0)
+        return np.round(percentage, 2)
+
+    def query_date(self, target_date: date) -> Dict:
+        """查詢單一日期（00:00 ~ 次日00:00前）的連續性"""
+        day_start = pd.Timestamp(target_date)
+        day_end = day_start + timedelta(days=1) - pd.Timedelta(1, 'ns')
+        return self.query(day_start, day_end)
+
+    def gaps_between(self, start: Union[datetime, pd.Timestamp],
+                     end: Union[datetime, pd.Timestamp]) -> List[Dict]:
+        """列出終點落在 (start, end] 內的間隔"""
+        lo = int(np.searchsorted(self.gap_ends, self._to_ns(start), side='right'))
+        hi = int(np.searchsorted(self.gap_ends, self._to_ns(end), side='right'))
+        return [
+            {
+                'start_time': str(pd.Timestamp(self.gap_starts[i])),
+                'end_time': str(pd.Timestamp(self.gap_ends[i])),
+                'missing_candles': int(self.cum_missing[i + 1] - self.cum_missing[i])
+            }
+            for i in range(lo, hi)
+        ]
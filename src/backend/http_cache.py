@@ -0,0 +1,184 @@
+# 檔名：http_cache.py - 歷史資料端點的 HTTP 快取（ETag、304、預先壓縮）
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.config import CACHE_VERSION
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'  # 最新交易日仍可能追加K線，每次需以 ETag 驗證
+
+
+class CachedBody:
+    """一個 ETag 對應的 JSON 內容與各壓縮格式"""
+    __slots__ = ('etag', 'identity', 'encoded', 'last_modified', 'immutable')
+
+    def __init__(self, etag: str, identity: bytes, encoded: Dict[str, bytes],
+                 last_modified: float, immutable: bool):
+        self.etag = etag
+        self.identity = identity
+        self.encoded = encoded
+        self.last_modified = last_modified
+        self.immutable = immutable
+
+    @property
+    def size(self) -> int:
+        return len(self.identity) + sum(len(b) for b in self.encoded.values())
+
+
+class HistoricalResponseCache:
+    """
+    歷史資料回應快取
+
+    ETag 由資料檔指紋、端點、日期、時間刻度與 CACHE_VERSION 計算，不需先算出內容；
+    客戶端帶 If-None-Match 時直接返回304。內容第一次產生時即壓縮成 gzip
+    （已安裝時另含 brotli、zstd），之後依 Accept-Encoding 直接送出快取的位元組。
+    快取以 LRU 方式限制總位元組數。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, min_compress_bytes: int = 1024,
+                 gzip_level: int = 6):
+        self.max_bytes = max_bytes
+        self.min_compress_bytes = min_compress_bytes
+        self.gzip_level = gzip_level
+        self._entries: 'OrderedDict[str, CachedBody]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'evictions': 0}
+
+    # ------------------------------------------------------------------ 驗證器
+
+    @staticmethod
+    def make_etag(kind: str, date_str: str, timeframe: str, fingerprint: str, symbol: str = '') -> str:
+        """強 ETag（含引號）"""
+        raw = f'{kind}|{symbol}|{date_str}|{timeframe}|{fingerprint}|{CACHE_VERSION}'.encode('utf-8')
+        return '"' + hashlib.blake2b(raw, digest_size=16).hexdigest() + '"'
+
+    def is_not_modified(self, etag: str, last_modified: Optional[float],
+                        if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """依 If-None-Match（優先）或 If-Modified-Since 判斷是否返回304"""
+        if if_none_match:
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            matched = '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+        elif if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            matched = int(last_modified) <= since
+        else:
+            return False
+
+        if matched:
+            with self._lock:
+                self.stats['not_modified'] += 1
+        return matched
+
+    # ------------------------------------------------------------------ 快取
+
+    def get(self, etag: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(etag)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, etag: str, body: bytes, last_modified: float, immutable: bool) -> CachedBody:
+        """壓縮並保存內容（超過上限時淘汰最久未使用的項目）"""
+        entry = CachedBody(etag, body, self._compress(body), last_modified, immutable)
+        with self._lock:
+            old = self._entries.pop(etag, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[etag] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats['evictions'] += 1
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._bytes,
+                        encodings=['gzip'] + (['br'] if brotli else []) + (['zstd'] if zstandard else []))
+
+    def _compress(self, body: bytes) -> Dict[str, bytes]:
+        if len(body) < self.min_compress_bytes:
+            return {}
+        encoded = {'gzip': gzip.compress(body, compresslevel=self.gzip_level, mtime=0)}
+        if brotli is not None:
+            encoded['br'] = brotli.compress(body, quality=5)
+        if zstandard is not None:
+            encoded['zstd'] = zstandard.ZstdCompressor(level=6).compress(body)
+        return encoded
+
+    # ------------------------------------------------------------------ 回應
+
+    @staticmethod
+    def validator_headers(etag: str, last_modified: Optional[float], immutable: bool) -> List[Tuple[str, str]]:
+        headers = [
+            ('ETag', etag),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL),
+            ('Vary', 'Accept-Encoding')
+        ]
+        if last_modified is not None:
+            stamp = datetime.fromtimestamp(int(last_modified), timezone.utc)
+            headers.append(('Last-Modified', format_datetime(stamp, usegmt=True)))
+        return headers
+
+    def response_parts(self, entry: CachedBody,
+                       accept_encoding: Optional[str]) -> Tuple[List[Tuple[str, str]], bytes]:
+        """依 Accept-Encoding 選擇壓縮格式，返回 (headers, body)"""
+        headers = self.validator_headers(entry.etag, entry.last_modified, entry.immutable)
+        headers.append(('Content-Type', 'application/json'))
+        encoding = choose_encoding(accept_encoding, entry.encoded)
+        if encoding is None:
+            return headers, entry.identity
+        headers.append(('Content-Encoding', encoding))
+        return headers, entry.encoded[encoding]
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Dict[str, bytes]) -> Optional[str]:
+    """依客戶端 q 值與壓縮比偏好（zstd > br > gzip）選擇格式"""
+    if not accept_encoding or not available:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+
+    for encoding in ('zstd', 'br', 'gzip'):
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if encoding in available and q > 0:
+            return encoding
+    return None
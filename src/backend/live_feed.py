@@ -0,0 +1,485 @@
+# 檔名：live_feed.py - 即時M1K線的增量聚合、FVG/連續性更新與推送
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.fvg_table import FVGTable
+
+logger = logging.getLogger(__name__)
+
+# 各時間刻度的K線秒數（K線時間為區間起點，與 resample 的對齊方式相同）
+TIMEFRAME_SECONDS = {'M1': 60, 'M5': 300, 'M15': 900, 'M30': 1800, 'H1': 3600, 'H4': 14400, 'D1': 86400}
+BAR_FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+EPOCH = datetime(1970, 1, 1)
+
+
+def parse_bar(raw: Dict) -> List:
+    """
+    解析一根M1K線
+
+    Args:
+        raw: {'time', 'open', 'high', 'low', 'close', 'volume'}；time 為 Unix 秒
+             （與圖表資料相同，CSV 的當地時間視為 UTC）或 ISO 格式字串，需對齊整分鐘
+
+    Returns:
+        [time, open, high, low, close, volume]
+
+    Raises:
+        ValueError: 欄位缺少、型別錯誤、未對齊整分鐘或 OHLC 不一致
+    """
+    try:
+        t = raw['time']
+        t = int(pd.Timestamp(t).value // 10 ** 9) if isinstance(t, str) else int(t)
+        o, h, l, c = (float(raw[key]) for key in ('open', 'high', 'low', 'close'))
+        v = int(raw.get('volume', 0))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"K線格式錯誤: {raw!r}") from e
+    if t % 60:
+        raise ValueError(f"K線時間未對齊整分鐘: {raw['time']!r}")
+    if not (l <= min(o, c) and h >= max(o, c)):
+        raise ValueError(f"K線價格不一致: {raw!r}")
+    return [t, o, h, l, c, v]
+
+
+def bar_dict(bar: List) -> Dict:
+    return dict(zip(BAR_FIELDS, bar))
+
+
+class _BarBuffer:
+    """已收盤、尚未併入歷史資料的K線（欄式陣列，容量倍增，攤銷 O(1) 追加）"""
+
+    def __init__(self, capacity: int = 256):
+        self.times = np.empty(capacity, dtype=np.int64)
+        self.prices = np.empty((capacity, 4), dtype=np.float64)
+        self.volumes = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+
+    def append(self, bar: List):
+        if self.size == len(self.times):
+            capacity = 2 * len(self.times)
+            self.times = np.resize(self.times, capacity)
+            self.prices = np.resize(self.prices, (capacity, 4))
+            self.volumes = np.resize(self.volumes, capacity)
+        self.times[self.size] = bar[0]
+        self.prices[self.size] = bar[1:5]
+        self.volumes[self.size] = bar[5]
+        self.size += 1
+
+    def to_rows(self, with_time: bool) -> pd.DataFrame:
+        """轉為與CSV相同的欄位（Date[,Time],Open,High,Low,Close,Volume）"""
+        times = pd.to_datetime(self.times[:self.size], unit='s')
+        rows = pd.DataFrame({'Date': times.strftime('%m/%d/%Y')})
+        if with_time:
+            rows['Time'] = times.strftime('%H:%M')
+        for n, column in enumerate(('Open', 'High', 'Low', 'Close')):
+            rows[column] = self.prices[:self.size, n]
+        rows['Volume'] = self.volumes[:self.size]
+        return rows
+
+
+class _TimeframeState:
+    __slots__ = ('timeframe', 'seconds', 'with_time', 'forming', 'held', 'recent', 'active',
+                 'last_time', 'candles', 'gap_counts', 'pending')
+
+    def __init__(self, timeframe: str, with_time: bool):
+        self.timeframe = timeframe
+        self.seconds = TIMEFRAME_SECONDS[timeframe]
+        self.with_time = with_time
+        self.forming = None         # 尚未收盤的K線
+        self.held = None            # 歷史資料最後一根（可能尚未收盤，第一根即時K線到達時決定）
+        self.recent = deque(maxlen=3)  # 最近三根已收盤K線（FVG形成判斷）
+        self.active = []            # 仍在清除檢查窗口內的FVG：[已檢查根數, 是否多頭, 清除價, 前端格式]
+        self.last_time = None       # 最後一根已收盤K線時間
+        self.candles = 0
+        self.gap_counts = {'data_gaps': 0, 'trading_gaps': 0}
+        self.pending = _BarBuffer()
+
+
+class LiveSubscription:
+    """
+    推送事件的訂閱（事件由送入K線的執行緒放入，連線處理端取出）
+
+    待送事件超過上限時訂閱被中斷（closed），不會拖慢送入端。
+    """
+
+    def __init__(self, timeframes: Optional[Iterable[str]], maxsize: int,
+                 notify: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            timeframes: 只接收這些時間刻度的事件（None 表示全部）
+            maxsize: 待送事件上限
+            notify: 有新事件或訂閱中斷時呼叫（於送入端的執行緒，不可阻塞）
+        """
+        self.timeframes = set(timeframes) if timeframes else None
+        self.queue = queue.Queue(maxsize)
+        self.notify = notify
+        self.closed = False
+
+    def wants(self, event: Dict) -> bool:
+        return self.timeframes is None or event.get('timeframe') in self.timeframes
+
+    def put(self, events: List[Dict]) -> bool:
+        try:
+            for event in events:
+                self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+        finally:
+            self._notify()
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """取出一個事件；timeout 秒內沒有事件時返回 None"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[Dict]:
+        events = []
+        while True:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self.closed = True
+        self._notify()
+
+    def _notify(self):
+        if self.notify is not None:
+            try:
+                self.notify()
+            except RuntimeError:  # 連線端的事件迴圈已關閉
+                self.closed = True
+
+
+class LiveFeed:
+    """
+    即時M1K線的送入、聚合與推送
+
+    每根M1K線只更新各時間刻度尚未收盤的K線、最近三根K線（FVG形成）、清除窗口內的FVG
+    與上一根K線時間（連續性），處理成本與歷史資料長度無關。已收盤的K線暫存於欄式緩衝區，
+    每 merge_seconds 秒由背景執行緒交給 DataProcessor.merge_live_bars() 併入歷史資料
+    （沿用熱重載的增量更新與參考替換）。
+
+    高時間刻度的K線在收到該區間最後一分鐘或下一個區間的K線時收盤；
+    歷史資料最後一根若與第一根即時K線屬於同一區間，視為尚未收盤並繼續更新。
+    """
+
+    def __init__(self, processor, merge_seconds: float = 60, subscriber_queue: int = 10000):
+        """
+        Args:
+            processor: DataProcessor（已載入資料）
+            merge_seconds: 自動併入歷史資料的間隔（<= 0 不自動合併）
+            subscriber_queue: 每個訂閱者的待送事件上限
+        """
+        self.processor = processor
+        self.merge_seconds = merge_seconds
+        self.subscriber_queue = subscriber_queue
+        self.clearing_window = processor.fvg_detector_simple.clearing_window
+
+        self._lock = threading.Lock()
+        self._subscribers: List[LiveSubscription] = []
+        self._merge_thread = None
+        self._last_merge = time.monotonic()
+        self._last_time = None  # 最後一根M1時間（拒絕重複或過時的K線）
+        self.stats = {'bars': 0, 'rejected': 0, 'finalized': 0, 'fvgs_formed': 0, 'fvgs_cleared': 0,
+                      'gaps': 0, 'merges': 0, 'merged_bars': 0, 'dropped_subscribers': 0,
+                      'ingest_seconds': 0.0}
+        self._states: Dict[str, _TimeframeState] = {}
+        for timeframe in processor.csv_files:
+            if timeframe in TIMEFRAME_SECONDS and timeframe in processor.data_cache:
+                self._states[timeframe] = self._seed(timeframe)
+        if 'M1' in self._states:
+            self._last_time = self._states['M1'].last_time
+
+    # ------------------------------------------------------------------ 送入
+
+    def ingest(self, raw_bars: List[Dict]) -> Dict:
+        """
+        送入依時間排序的M1K線（全部通過格式檢查後才處理）
+
+        Returns:
+            Dict: {'accepted', 'rejected'（不晚於最後一根的重複/過時K線）, 'events', 'last_time'}
+
+        Raises:
+            ValueError: K線格式錯誤
+        """
+        bars = [parse_bar(raw) for raw in raw_bars]
+        start = time.perf_counter()
+        with self._lock:
+            events, accepted = [], 0
+            for bar in bars:
+                if self._last_time is not None and bar[0] <= self._last_time:
+                    continue
+                self._last_time = bar[0]
+                accepted += 1
+                for state in self._states.values():
+                    self._apply(state, bar, events)
+            self._publish(events)
+
+            self.stats['bars'] += accepted
+            self.stats['rejected'] += len(bars) - accepted
+            self.stats['ingest_seconds'] += time.perf_counter() - start
+            self._maybe_merge()
+            return {'accepted': accepted, 'rejected': len(bars) - accepted, 'events': len(events),
+                    'last_time': self._last_time}
+
+    def _apply(self, state: _TimeframeState, bar: List, events: List[Dict]):
+        """一根M1K線更新一個時間刻度（需持有鎖）"""
+        bucket = bar[0] - bar[0] % state.seconds
+        if state.held is not None:
+            held, state.held = state.held, None
+            if held[0] == bucket:
+                state.forming = held
+            else:
+                self._finalize(state, held, [], store=False)
+        if state.last_time is not None and bucket <= state.last_time:
+            return  # 該區間已收盤（歷史資料的高時間刻度比M1新）
+
+        if state.forming is not None and state.forming[0] != bucket:
+            self._finalize(state, state.forming, events)
+        if state.forming is None:
+            state.forming = [bucket] + bar[1:]
+        else:
+            forming = state.forming
+            forming[2] = max(forming[2], bar[2])
+            forming[3] = min(forming[3], bar[3])
+            forming[4] = bar[4]
+            forming[5] += bar[5]
+
+        if bar[0] + 60 >= bucket + state.seconds:
+            self._finalize(state, state.forming, events)
+        else:
+            events.append({'type': 'bar', 'timeframe': state.timeframe, 'final': False,
+                           'bar': bar_dict(state.forming)})
+
+    def _finalize(self, state: _TimeframeState, bar: List, events: List[Dict], store: bool = True):
+        """K線收盤：暫存待合併並更新連續性與FVG"""
+        state.forming = None
+        if store:
+            state.pending.append(bar)
+            self.stats['finalized'] += 1
+            events.append({'type': 'bar', 'timeframe': state.timeframe, 'final': True, 'bar': bar_dict(bar)})
+        self._update_continuity(state, bar, events)
+        self._update_fvgs(state, bar, events)
+
+    def _update_continuity(self, state: _TimeframeState, bar: List, events: List[Dict]):
+        if state.last_time is not None and bar[0] - state.last_time > state.seconds:
+            gap = self.processor.continuity_checker._analyze_gap_fast(
+                EPOCH + timedelta(seconds=state.last_time), EPOCH + timedelta(seconds=bar[0]),
+                (bar[0] - state.last_time) / 60, state.seconds // 60, state.candles, state.timeframe
+            )
+            state.gap_counts['trading_gaps' if gap['is_normal_gap'] else 'data_gaps'] += 1
+            self.stats['gaps'] += 1
+            events.append({'type': 'gap', 'timeframe': state.timeframe, 'gap': {
+                'start_time': state.last_time,
+                'end_time': bar[0],
+                'gap_minutes': gap['gap_minutes'],
+                'missing_candles': gap['missing_candles'],
+                'is_normal_gap': gap['is_normal_gap'],
+                'reason': gap['reason']
+            }})
+        state.last_time = bar[0]
+        state.candles += 1
+
+    def _update_fvgs(self, state: _TimeframeState, bar: List, events: List[Dict]):
+        """
+        清除：形成後 clearing_window 根內第一根收盤回填缺口的K線（與 FVGTable 相同）
+        形成：最近三根K線（L, C, R）符合 FVGDetectorSimple 的條件
+        """
+        close = bar[4]
+        still_active = []
+        for fvg in state.active:
+            fvg[0] += 1
+            if (close <= fvg[2]) if fvg[1] else (close >= fvg[2]):
+                self.stats['fvgs_cleared'] += 1
+                events.append({'type': 'fvg', 'timeframe': state.timeframe, 'event': 'cleared',
+                               'fvg': dict(fvg[3], status='cleared', clearedAt=bar[0], clearedByPrice=close)})
+            elif fvg[0] < self.clearing_window:
+                still_active.append(fvg)
+        state.active = still_active
+
+        state.recent.append(bar)
+        if len(state.recent) < 3:
+            return
+        left, center, right = state.recent
+        if center[4] > center[1] and center[4] > left[2] and left[2] < right[3]:
+            bullish = True
+        elif center[4] < center[1] and center[4] < left[3] and left[3] > right[2]:
+            bullish = False
+        else:
+            return
+
+        record = self._fvg_record(state.timeframe, bullish, left, right)
+        state.active.append([0, bullish, record['clearingTriggerPrice'], record])
+        self.stats['fvgs_formed'] += 1
+        events.append({'type': 'fvg', 'timeframe': state.timeframe, 'event': 'formed', 'fvg': record})
+
+    def _fvg_record(self, timeframe: str, bullish: bool, left: List, right: List) -> Dict:
+        """前端格式（欄位與 FVGTable.to_frontend 相同）"""
+        if bullish:
+            start_price, end_price, trigger_price = left[2], right[3], left[2]
+            gap_size, base_price = right[3] - left[2], left[2]
+        else:
+            start_price, end_price, trigger_price = right[2], left[3], left[3]
+            gap_size, base_price = left[3] - right[2], right[2]
+        return {
+            'type': 'bullish' if bullish else 'bearish',
+            'startTime': left[0],
+            'endTime': left[0] + self.processor.fvg_detector_simple._extend_seconds(timeframe),
+            'formationTime': right[0],
+            'startPrice': start_price,
+            'endPrice': end_price,
+            'topPrice': max(start_price, end_price),
+            'bottomPrice': min(start_price, end_price),
+            'status': 'valid',
+            'gapSize': gap_size,
+            'gapPercentage': gap_size / base_price,
+            'clearingTriggerPrice': trigger_price
+        }
+
+    def _seed(self, timeframe: str) -> _TimeframeState:
+        """由歷史資料最後幾根K線建立增量狀態（只讀取尾段）"""
+        frame = self.processor.data_cache[timeframe]
+        state = _TimeframeState(timeframe, 'Time' in frame.columns)
+        tail = frame.iloc[-(self.clearing_window + 3):]
+        if tail.empty:
+            return state
+
+        times = tail['DateTime'].to_numpy(dtype='datetime64[ns]').astype('datetime64[s]').astype(np.int64)
+        prices = [self.processor._price_array(tail, column, timeframe) for column in ('Open', 'High', 'Low', 'Close')]
+        bars = [list(row) for row in zip(times.tolist(), *(p.tolist() for p in prices),
+                                         tail['Volume'].to_numpy().astype(np.int64).tolist())]
+        if timeframe != 'M1':
+            state.held = bars.pop()
+        state.candles = len(frame) - (state.held is not None)
+        if not bars:
+            return state
+        state.recent.extend(bars[-3:])
+        state.last_time = bars[-1][0]
+
+        # 清除窗口內尚未清除的FVG（與批次檢測相同的規則）
+        df = pd.DataFrame({'DateTime': pd.to_datetime([b[0] for b in bars], unit='s'),
+                           'Open': [b[1] for b in bars], 'High': [b[2] for b in bars],
+                           'Low': [b[3] for b in bars], 'Close': [b[4] for b in bars]})
+        detector = self.processor.fvg_detector_simple
+        formations = detector.find_formation_indices(df)
+        table = FVGTable.from_formations(df, formations['bullish'], formations['bearish'],
+                                         detector._extend_seconds(timeframe), self.clearing_window)
+        records = table.to_frontend()
+        for n in range(len(table)):
+            checked = len(df) - 1 - int(table.right[n])
+            if not table.cleared[n] and checked < self.clearing_window:
+                state.active.append([checked, bool(table.bullish[n]), records[n]['clearingTriggerPrice'], records[n]])
+        return state
+
+    # ------------------------------------------------------------------ 合併
+
+    def take_pending(self) -> Dict[str, pd.DataFrame]:
+        """取出已收盤、尚未合併的K線（CSV欄位格式）"""
+        with self._lock:
+            buffers = {}
+            for timeframe, state in self._states.items():
+                if state.pending.size:
+                    buffers[timeframe] = (state.pending, state.with_time)
+                    self.stats['merged_bars'] += state.pending.size
+                    state.pending = _BarBuffer()
+            if buffers:
+                self.stats['merges'] += 1
+        return {timeframe: buffer.to_rows(with_time) for timeframe, (buffer, with_time) in buffers.items()}
+
+    def _maybe_merge(self):
+        """距上次合併超過 merge_seconds 時於背景執行緒合併（需持有鎖）"""
+        if self.merge_seconds <= 0 or time.monotonic() - self._last_merge < self.merge_seconds:
+            return
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return
+        self._last_merge = time.monotonic()
+        self._merge_thread = threading.Thread(target=self._merge, name='live-merge', daemon=True)
+        self._merge_thread.start()
+
+    def _merge(self):
+        try:
+            result = self.processor.merge_live_bars()
+            if result['merged']:
+                logger.info("即時K線已併入歷史資料 [%s]: %s", self.processor.symbol,
+                            {tf: info['new_rows'] for tf, info in result['merged'].items()})
+        except Exception as e:
+            logger.exception("即時K線合併失敗 [%s]: %s", self.processor.symbol, e)
+
+    # ------------------------------------------------------------------ 推送
+
+    def subscribe(self, timeframes: Optional[Iterable[str]] = None,
+                  notify: Optional[Callable[[], None]] = None) -> LiveSubscription:
+        """
+        訂閱推送事件；第一個事件為目前狀態的快照（type='snapshot'）
+
+        事件：
+            {'type': 'bar', 'timeframe', 'final', 'bar'}：K線更新（final=True 表示已收盤）
+            {'type': 'fvg', 'timeframe', 'event': 'formed'|'cleared', 'fvg'}：前端格式的FVG
+            {'type': 'gap', 'timeframe', 'gap'}：K線間隔（連續性）
+        """
+        subscription = LiveSubscription(timeframes, self.subscriber_queue, notify)
+        with self._lock:
+            subscription.put([self._snapshot(subscription.timeframes)])
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LiveSubscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+        subscription.closed = True
+
+    def _publish(self, events: List[Dict]):
+        """於鎖內放入各訂閱者的佇列（保持事件順序）；佇列已滿的訂閱者中斷"""
+        if not events:
+            return
+        for subscription in list(self._subscribers):
+            matched = [event for event in events if subscription.wants(event)]
+            if matched and (subscription.closed or not subscription.put(matched)):
+                self._subscribers.remove(subscription)
+                self.stats['dropped_subscribers'] += 1
+                subscription.close()
+                logger.warning("即時推送訂閱者待送事件過多，已中斷 [%s]", self.processor.symbol)
+
+    def _snapshot(self, timeframes: Optional[set]) -> Dict:
+        snapshot = {}
+        for timeframe, state in self._states.items():
+            if timeframes is not None and timeframe not in timeframes:
+                continue
+            forming = state.forming or state.held
+            snapshot[timeframe] = {
+                'forming': bar_dict(forming) if forming is not None else None,
+                'last_time': state.last_time,
+                'active_fvgs': [fvg[3] for fvg in state.active],
+                'continuity': dict(state.gap_counts, total_candles=state.candles)
+            }
+        return {'type': 'snapshot', 'symbol': self.processor.symbol, 'timeframes': snapshot}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                symbol=self.processor.symbol,
+                last_time=self._last_time,
+                subscribers=len(self._subscribers),
+                avg_us_per_bar=round(self.stats['ingest_seconds'] / max(1, self.stats['bars']) * 1e6, 1),
+                timeframes={
+                    timeframe: dict(state.gap_counts, total_candles=state.candles,
+                                    pending_bars=state.pending.size, active_fvgs=len(state.active),
+                                    last_time=state.last_time)
+                    for timeframe, state in self._states.items()
+                }
+            )
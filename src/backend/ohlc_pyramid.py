@@ -0,0 +1,117 @@
+# 檔名：ohlc_pyramid.py - 多解析度OHLCV（任意時間範圍的縮放查詢）
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+
+class OHLCPyramid:
+    """
+    單一時間刻度的多解析度OHLCV
+
+    第 k 層（k >= 1）的第 i 點聚合原始K線中位置 [i·2^k, (i+1)·2^k) 的連續K線
+    （time/open 取第一根、close 取最後一根、high/low 取極值、volume 加總），
+    每層由上一層兩兩合併建立，總大小約等於原始資料。第 0 層即原始K線，不另外保存。
+
+    查詢時選擇涵蓋範圍所需點數不超過 max_points 的最細層，返回的點數有上限，
+    與範圍內的原始K線數無關。價格維持原本的 dtype（跳動點編碼時為整數跳動點）。
+    """
+
+    __slots__ = ('length', 'levels')
+
+    def __init__(self, length: int, levels: List[Dict[str, np.ndarray]]):
+        self.length = length
+        self.levels = levels  # levels[k - 1] 為第 k 層
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame) -> 'OHLCPyramid':
+        """由已按時間排序的K線建立（DateTime/Open/High/Low/Close/Volume）"""
+        level = cls._base_level(frame)
+        levels = []
+        while len(level['time']) > 1:
+            level = cls._halve(level)
+            levels.append(level)
+        return cls(len(frame), levels)
+
+    def extend(self, frame: pd.DataFrame) -> 'OHLCPyramid':
+        """
+        K線只在尾端追加時的新金字塔（不修改本金字塔）
+
+        第 k 層前 length >> k 點只涵蓋原有K線、維持不變，其後的點由上一層的尾段
+        兩兩合併重算，每層只處理新增部分；結果與對整個 frame 重新 build 相同。
+
+        Args:
+            frame: 前 length 根與建立本金字塔時相同的K線
+        """
+        if len(frame) < self.length:
+            raise ValueError(f'frame is shorter than the pyramid ({len(frame)} < {self.length})')
+        # 第 k 層由上一層從位置 2·(length >> k) 起的尾段合併；第0層只取這段原始K線
+        start = (self.length >> 1) << 1
+        level, level_start = self._base_level(frame.iloc[start:]), start
+        levels = []
+        while level_start + len(level['time']) > 1:
+            k = len(levels) + 1
+            keep = self.length >> k
+            offset = 2 * keep - level_start
+            merged = self._halve({name: values[offset:] for name, values in level.items()})
+            if keep:
+                merged = {name: np.concatenate([self.levels[k - 1][name][:keep], merged[name]]) for name in FIELDS}
+            levels.append(merged)
+            level, level_start = merged, 0
+        return OHLCPyramid(len(frame), levels)
+
+    @staticmethod
+    def _base_level(frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+        return {
+            'time': frame['DateTime'].to_numpy(dtype='datetime64[ns]').astype('datetime64[s]').astype(np.int64),
+            'open': frame['Open'].to_numpy(),
+            'high': frame['High'].to_numpy(),
+            'low': frame['Low'].to_numpy(),
+            'close': frame['Close'].to_numpy(),
+            'volume': frame['Volume'].to_numpy().astype(np.int64)
+        }
+
+    @staticmethod
+    def _halve(level: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """相鄰兩點合併（奇數長度時最後一點單獨成為一點）"""
+        n = len(level['time'])
+        first = np.arange(0, n, 2)
+        last = np.minimum(first + 1, n - 1)
+        volume = level['volume'][first].copy()
+        volume[:n // 2] += level['volume'][1::2]
+        return {
+            'time': level['time'][first],
+            'open': level['open'][first],
+            'high': np.maximum(level['high'][first], level['high'][last]),
+            'low': np.minimum(level['low'][first], level['low'][last]),
+            'close': level['close'][last],
+            'volume': volume
+        }
+
+    def level_for(self, lo: int, hi: int, max_points: int) -> int:
+        """位置範圍 [lo, hi) 以不超過 max_points 點表示的最細層（層數約 log2(K線數)，查詢成本固定）"""
+        if hi <= lo:
+            return 0
+        for k in range(len(self.levels) + 1):
+            if ((hi - 1) >> k) - (lo >> k) + 1 <= max_points:
+                return k
+        return len(self.levels)
+
+    def slice(self, level: int, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        """第 level 層（>= 1）涵蓋位置 [lo, hi) 的點（兩端的點可能包含範圍外的K線）"""
+        arrays = self.levels[level - 1]
+        start, stop = lo >> level, ((hi - 1) >> level) + 1
+        return {name: arrays[name][start:stop] for name in FIELDS}
+
+    def nbytes(self) -> int:
+        return sum(values.nbytes for level in self.levels for values in level.values())
+
+
+def range_positions(times: np.ndarray, start, end) -> Tuple[int, int]:
+    """已排序時間陣列中 [start, end]（含兩端）的位置範圍 [lo, hi)"""
+    lo = 0 if start is None else int(np.searchsorted(times, np.datetime64(start, 'ns'), side='left'))
+    hi = len(times) if end is None else int(np.searchsorted(times, np.datetime64(end, 'ns'), side='right'))
+    return lo, max(lo, hi)
@@ -0,0 +1,202 @@
+# 檔名：range_index.py - 任意位置範圍的高低點/收盤極值查詢（分塊 sparse table）
+
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+
+# 表名 -> (欄位, 是否取最大值)
+TABLES = {
+    'high_max': ('High', True),
+    'low_min': ('Low', False),
+    'close_max': ('Close', True),
+    'close_min': ('Close', False)
+}
+
+
+class RangeExtremaIndex:
+    """
+    單一時間刻度 High/Low/Close 的區間極值索引
+
+    K線依位置每 block 根分為一塊，sparse table 的第 k 列第 i 格保存
+    第 [i, i + 2^k) 塊中極值所在的K線位置。查詢 [lo, hi) 時完整塊的部分由
+    兩格重疊的表格 O(1) 取得，兩端不完整的塊（各少於 block 根）直接掃描，
+    成本與範圍長度無關。表格只保存位置（int32），值由查詢時傳入的K線取得，
+    因此也能返回極值發生的時間；相同極值取最早的一根。
+
+    大小約為 4 × (n / block) × log2(n / block) × 4 位元組（M1 兩百萬根約 7 MB）。
+    """
+
+    __slots__ = ('rows', 'block', 'tables')
+
+    def __init__(self, rows: int, block: int, tables: Dict[str, np.ndarray]):
+        self.rows = rows
+        self.block = block
+        self.tables = tables  # {表名: shape (層數, 塊數) 的位置陣列}
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, block: int = 64) -> 'RangeExtremaIndex':
+        """由已按時間排序的K線建立（需含 High/Low/Close 欄位）"""
+        rows = len(frame)
+        tables = {}
+        for name, (column, is_max) in TABLES.items():
+            tables[name] = cls._build_table(frame[column].to_numpy(), block, is_max)
+        return cls(rows, block, tables)
+
+    def extend(self, frame: pd.DataFrame) -> 'RangeExtremaIndex':
+        """
+        K線只在尾端追加時的新索引（不修改本索引）
+
+        只重算涵蓋最後一個不完整塊與新增塊的格子：第 k 層為最後約 2^k + 新增塊數格，
+        結果與對整個 frame 重新 build 相同。
+
+        Args:
+            frame: 前 rows 根與建立本索引時相同的K線
+        """
+        if len(frame) < self.rows:
+            raise ValueError(f'frame is shorter than the index ({len(frame)} < {self.rows})')
+        first_block = self.rows // self.block
+        tables = {}
+        for name, (column, is_max) in TABLES.items():
+            tables[name] = self._build_table(frame[column].to_numpy(), self.block, is_max,
+                                             self.tables[name], first_block)
+        return RangeExtremaIndex(len(frame), self.block, tables)
+
+    @staticmethod
+    def _build_table(values: np.ndarray, block: int, is_max: bool,
+                     previous: Optional[np.ndarray] = None, first_block: int = 0) -> np.ndarray:
+        """建立表格；給定 previous 時沿用其中只涵蓋 first_block 之前各塊的格子"""
+        n = len(values)
+        blocks = -(-n // block)
+        if blocks == 0:
+            return np.empty((0, 0), dtype=np.int32)
+
+        # 最後一塊以最後一根的值補齊：相同值取最早位置，補齊的格子不會被選中
+        tail = values[first_block * block:]
+        padded = np.empty((blocks - first_block) * block, dtype=values.dtype)
+        padded[:len(tail)] = tail
+        padded[len(tail):] = values[-1]
+        grid = padded.reshape(blocks - first_block, block)
+        first = grid.argmax(axis=1) if is_max else grid.argmin(axis=1)
+        first = first.astype(np.int32) + np.arange(first_block * block, blocks * block, block, dtype=np.int32)
+
+        levels = blocks.bit_length()
+        table = np.zeros((levels, blocks), dtype=np.int32)
+        if previous is not None and previous.size:
+            table[:previous.shape[0], :previous.shape[1]] = previous
+        table[0, first_block:] = first
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            count = blocks - (1 << k) + 1
+            start = max(0, first_block - (1 << k) + 1)  # 之前的格子不含 first_block 之後的塊
+            left = table[k - 1, start:count]
+            right = table[k - 1, start + half:half + count]
+            better = values[right] > values[left] if is_max else values[right] < values[left]
+            table[k, start:count] = np.where(better, right, left)
+        return table
+
+    def query(self, name: str, frame: pd.DataFrame, lo: int, hi: int) -> Optional[int]:
+        """
+        位置範圍 [lo, hi) 中極值所在的位置
+
+        Args:
+            name: TABLES 中的表名
+            frame: 建立索引時的K線（長度需等於 rows）
+
+        Returns:
+            int: 極值K線的位置；範圍為空時為 None
+        """
+        lo, hi = int(lo), int(hi)
+        if hi <= lo:
+            return None
+        column, is_max = TABLES[name]
+        values = frame[column].to_numpy()
+        pick = np.argmax if is_max else np.argmin
+        block = self.block
+        if hi - lo <= 2 * block:
+            return lo + int(pick(values[lo:hi]))
+
+        first_block, end_block = -(-lo // block), hi // block  # 完整塊 [first_block, end_block)
+        candidates = []
+        if lo < first_block * block:
+            candidates.append(lo + int(pick(values[lo:first_block * block])))
+        k = (end_block - first_block).bit_length() - 1
+        table = self.tables[name]
+        candidates.append(int(table[k, first_block]))
+        candidates.append(int(table[k, end_block - (1 << k)]))
+        if end_block * block < hi:
+            candidates.append(end_block * block + int(pick(values[end_block * block:hi])))
+
+        best = candidates[0]
+        for position in candidates[1:]:
+            value, current = values[position], values[best]
+            if (value > current if is_max else value < current) or (value == current and position < best):
+                best = position
+        return best
+
+    def nbytes(self) -> int:
+        """堆積上的表格大小（由檔案映射的表格不計入）"""
+        return sum(table.nbytes for table in self.tables.values() if not isinstance(table, np.memmap))
+
+    def save(self, path: str, fingerprint: str):
+        """
+        寫入目錄（每個表一個 .npy 與 meta.json）
+
+        檔名含資料指紋，每個檔案先寫暫存檔再替換：其他行程（prefork worker）
+        已映射的檔案不會被截斷或覆寫。
+
+        Raises:
+            OSError: 寫入失敗
+        """
+        os.makedirs(path, exist_ok=True)
+        tag = ''.join(c if c.isalnum() else '_' for c in fingerprint)
+        files = {}
+        for name, table in self.tables.items():
+            files[name] = f'{name}-{tag}.npy'
+            table_path = os.path.join(path, files[name])
+            with open(f'{table_path}.{os.getpid()}.tmp', 'wb') as f:
+                np.save(f, table, allow_pickle=False)
+            os.replace(f'{table_path}.{os.getpid()}.tmp', table_path)
+        meta_path = os.path.join(path, META_FILE)
+        with open(f'{meta_path}.{os.getpid()}.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'rows': self.rows, 'block': self.block, 'files': files},
+                      f, ensure_ascii=False)
+        os.replace(f'{meta_path}.{os.getpid()}.tmp', meta_path)
+
+        # 清除其他版本的表格（Windows 上仍被映射的檔案無法刪除，下次再清）
+        for filename in os.listdir(path):
+            if filename.endswith('.npy') and filename not in files.values():
+                try:
+                    os.remove(os.path.join(path, filename))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str, rows: int, block: int) -> Optional['RangeExtremaIndex']:
+        """讀取 save 寫出的目錄（唯讀映射）；不存在、指紋/筆數/分塊不符或檔案損壞時返回 None"""
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get('fingerprint'), meta.get('rows'), meta.get('block')) != (fingerprint, rows, block):
+                return None
+            blocks = -(-rows // block)
+            tables = {}
+            for name in TABLES:
+                table = np.load(os.path.join(path, meta['files'][name]), mmap_mode='r', allow_pickle=False)
+                if table.dtype != np.int32 or table.shape != (blocks.bit_length(), blocks):
+                    return None
+                tables[name] = table
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"讀取區間極值索引失敗 [{path}]: {str(e)}")
+            return None
+        return cls(rows, block, tables)
@@ -0,0 +1,169 @@
+# 檔名：request_metrics.py - 請求階段計時與 Prometheus 指標
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# 預設直方圖邊界（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _NullStage:
+    """停用時的空計時器：不取時間、不加鎖"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """單一階段計時器"""
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: 'RequestMetrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class RequestMetrics:
+    """
+    請求層級計時
+
+    以 (endpoint, timeframe, stage) 為鍵保存固定邊界的直方圖（各區間計數、總和、次數），
+    endpoint 與 timeframe 由 begin() 設為執行緒區域標籤，資料處理層只需標記階段名稱。
+    同一請求內同名階段可能執行多次（如批次端點每筆紀錄各一次），先在執行緒區域累計，
+    end() 時每個階段以本次請求的總耗時記錄一次，直方圖的次數即請求數。
+    停用時 stage() 返回共用的空計時器，不產生任何計時或鎖定成本。
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[Tuple[str, str, str], List] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, enabled: bool, buckets: Optional[Tuple[float, ...]] = None):
+        """切換啟用狀態或更換直方圖邊界（更換邊界會清空既有資料）"""
+        if buckets is not None and tuple(sorted(buckets)) != self.buckets:
+            with self._lock:
+                self.buckets = tuple(sorted(buckets))
+                self._histograms.clear()
+        self.enabled = enabled
+
+    def begin(self, endpoint: str, timeframe: Optional[str] = None):
+        """設定目前執行緒的請求標籤並開始累計各階段耗時"""
+        self._local.labels = (endpoint, timeframe or '')
+        self._local.totals = {}
+
+    def end(self):
+        """結束目前執行緒的請求：每個階段以累計耗時記錄一次"""
+        labels = getattr(self._local, 'labels', None)
+        totals = getattr(self._local, 'totals', None)
+        self._local.labels = None
+        self._local.totals = None
+        if labels is None or not totals or not self.enabled:
+            return
+        for stage, seconds in totals.items():
+            self._record(labels[0], labels[1], stage, seconds)
+
+    def stage(self, name: str):
+        """
+        階段計時器（context manager）
+
+        Example:
+            with request_metrics.stage('fvg_detection'):
+                fvgs = detect(...)
+        """
+        if not self.enabled or getattr(self._local, 'labels', None) is None:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def observe(self, stage: str, seconds: float, endpoint: Optional[str] = None,
+                timeframe: Optional[str] = None):
+        """
+        記錄一次階段耗時
+
+        未指定標籤時計入目前執行緒請求的累計（end() 時記錄）；指定標籤時直接記錄，
+        供不在請求執行緒內計時的呼叫端（如 ASGI 層的 total）使用。
+        """
+        if not self.enabled:
+            return
+        if endpoint is None:
+            totals = getattr(self._local, 'totals', None)
+            if totals is None:
+                return
+            totals[stage] = totals.get(stage, 0.0) + seconds
+            return
+        self._record(endpoint, timeframe, stage, seconds)
+
+    def _record(self, endpoint: str, timeframe: Optional[str], stage: str, seconds: float):
+        key = (endpoint, timeframe or '', stage)
+
+        slot = bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                # [各區間計數（最後一格為 +Inf）, 總和, 次數]
+                hist = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][slot] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[Tuple[str, str, str], Dict]:
+        """返回各直方圖的複本：{key: {'counts', 'sum', 'count'}}"""
+        with self._lock:
+            return {key: {'counts': list(h[0]), 'sum': h[1], 'count': h[2]}
+                    for key, h in self._histograms.items()}
+
+    def render_prometheus(self, name: str = 'trading_request_stage_seconds') -> str:
+        """輸出 Prometheus 文字格式"""
+        lines = [
+            f'# HELP {name} Time spent in each request stage.',
+            f'# TYPE {name} histogram'
+        ]
+        bounds = [_format_bound(b) for b in self.buckets] + ['+Inf']
+
+        for (endpoint, timeframe, stage), hist in sorted(self.snapshot().items()):
+            labels = (f'endpoint="{_escape(endpoint)}",timeframe="{_escape(timeframe)}",'
+                      f'stage="{_escape(stage)}"')
+            cumulative = 0
+            for bound, count in zip(bounds, hist['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {hist["sum"]:.9f}')
+            lines.append(f'{name}_count{{{labels}}} {hist["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_bound(value: float) -> str:
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 全域指標實例（由 app.py 依設定啟用）
+request_metrics = RequestMetrics(enabled=False)
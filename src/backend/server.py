@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+# 檔名：server.py - 正式服務入口（多 worker、預先載入資料）
+#
+# 用法:
+#   python src/backend/server.py                       # 依 SERVER_CONFIG
+#   python src/backend/server.py --workers 8 --timeout 60 --host 0.0.0.0
+#
+# prefork 模式（Linux/macOS）：master 載入資料一次後 fork N 個 worker，
+# 資料以 copy-on-write 共享；各 worker 以多執行緒處理請求，master 監控心跳與
+# 請求逾時並重啟異常 worker。
+# threaded 模式（Windows 或 --mode threaded）：單一行程多執行緒，
+# 已安裝 waitress 時使用 waitress，否則使用 werkzeug 多執行緒伺服器。
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+import backend.app as app_module
+from backend.csv_reload import reload_all
+from backend.worker_registry import (WorkerRegistry, RequestTracker, start_heartbeat, set_active,
+                                     start_reload_listener)
+from utils.config import SERVER_CONFIG, LOGGING_CONFIG
+from utils.log_config import setup_logging
+
+
+def _handler_class(timeout: float):
+    """連線讀取逾時的請求處理器（避免慢速客戶端佔住執行緒）"""
+    class TimeoutRequestHandler(WSGIRequestHandler):
+        def log_request(self, code='-', size='-'):
+            pass  # 存取紀錄交由 /api/metrics
+
+    TimeoutRequestHandler.timeout = timeout
+    return TimeoutRequestHandler
+
+
+def _run_worker(sock: socket.socket, registry: WorkerRegistry, slot: int, config: dict):
+    """worker 行程：在繼承的監聽 socket 上以多執行緒處理請求"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 由 master 處理
+    signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+
+    # fork 不會複製日誌監聽執行緒，worker 需重新建立
+    app_module.log_listener = setup_logging(app_module.LOG_DIR, LOGGING_CONFIG)
+
+    set_active(registry, slot)
+    start_heartbeat(registry, slot, config['heartbeat_interval'])
+    # POST /api/reload 經共享狀態表通知所有 worker
+    start_reload_listener(registry, lambda: reload_all(app_module.symbol_registry.resident_processors()),
+                          config['heartbeat_interval'])
+    app_module.start_reload_watcher()
+
+    server = make_server(config['host'], config['port'],
+                         RequestTracker(app_module.app, registry, slot),
+                         threaded=True, fd=sock.fileno(),
+                         request_handler=_handler_class(config['request_timeout']))
+    registry.set(slot, ready=1)
+    server.serve_forever()
+
+
+def serve_prefork(config: dict):
+    """master 載入資料後 fork worker，並監控 worker 存活、心跳與請求逾時"""
+    workers = config['workers']
+    timeout = config['request_timeout']
+
+    sock = socket.create_server((config['host'], config['port']), backlog=2048)
+    sock.set_inheritable(True)
+    registry = WorkerRegistry(workers)
+
+    # 資料已載入：凍結現有物件，減少 worker 中因 GC 造成的 copy-on-write
+    gc.collect()
+    gc.freeze()
+
+    children = {}  # {pid: slot}
+
+    def spawn(slot: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(sock, registry, slot, config)
+            finally:
+                os._exit(0)
+        registry.reset(slot, pid)
+        children[pid] = slot
+
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"prefork 服務啟動於 http://{config['host']}:{config['port']} "
+          f"({workers} workers, 請求逾時 {timeout}s)")
+
+    while not stopping:
+        # 回收已結束的 worker 並重啟
+        while children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            slot = children.pop(pid, None)
+            if slot is not None and not stopping:
+                print(f"worker {slot} (pid {pid}) 已結束，重新啟動")
+                spawn(slot)
+
+        # 請求逾時或心跳停止的 worker：強制結束，下一輪重啟
+        now = time.time()
+        for pid, slot in list(children.items()):
+            oldest = registry.get(slot, 'oldest_request_start')
+            heartbeat = registry.get(slot, 'heartbeat')
+            if (oldest and now - oldest > timeout) or now - heartbeat > timeout:
+                print(f"worker {slot} (pid {pid}) 超過 {timeout}s 無回應，強制重啟")
+                registry.set(slot, ready=0)
+                os.kill(pid, signal.SIGKILL)
+
+        time.sleep(config['heartbeat_interval'])
+
+    print("正在停止 workers...")
+    for pid in list(children):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in list(children):
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+def serve_threaded(config: dict):
+    """單一行程多執行緒服務"""
+    registry = WorkerRegistry(1)
+    registry.reset(0, os.getpid())
+    set_active(registry, 0)
+    start_heartbeat(registry, 0, config['heartbeat_interval'])
+    app_module.start_reload_watcher()
+    wsgi_app = RequestTracker(app_module.app, registry, 0)
+
+    try:
+        import waitress
+    except ImportError:
+        waitress = None
+
+    registry.set(0, ready=1)
+    if waitress is not None:
+        print(f"waitress 服務啟動於 http://{config['host']}:{config['port']} "
+              f"({config['threads']} threads)")
+        waitress.serve(wsgi_app, host=config['host'], port=config['port'],
+                       threads=config['threads'], channel_timeout=config['request_timeout'])
+    else:
+        print(f"多執行緒服務啟動於 http://{config['host']}:{config['port']}")
+        server = make_server(config['host'], config['port'], wsgi_app, threaded=True,
+                             request_handler=_handler_class(config['request_timeout']))
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易圖表系統正式服務')
+    parser.add_argument('--host', default=SERVER_CONFIG['host'])
+    parser.add_argument('--port', type=int, default=SERVER_CONFIG['port'])
+    parser.add_argument('--mode', choices=['auto', 'prefork', 'threaded'], default=SERVER_CONFIG['mode'])
+    parser.add_argument('--workers', type=int, default=SERVER_CONFIG['workers'])
+    parser.add_argument('--threads', type=int, default=SERVER_CONFIG['threads'])
+    parser.add_argument('--timeout', type=float, default=SERVER_CONFIG['request_timeout'],
+                        help='單一請求逾時秒數')
+    args = parser.parse_args()
+
+    config = dict(SERVER_CONFIG, host=args.host, port=args.port, workers=max(1, args.workers),
+                  threads=max(1, args.threads), request_timeout=args.timeout)
+    mode = args.mode
+    if mode == 'auto':
+        mode = 'prefork' if hasattr(os, 'fork') else 'threaded'
+    if mode == 'prefork' and not hasattr(os, 'fork'):
+        print("此平台不支援 fork，改用 threaded 模式")
+        mode = 'threaded'
+
+    print("=== 交易圖表系統（正式服務）啟動中 ===")
+    app_module.initialize_data()
+
+    if mode == 'prefork':
+        serve_prefork(config)
+    else:
+        serve_threaded(config)
+
+
+if __name__ == '__main__':
+    main()
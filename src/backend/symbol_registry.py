@@ -0,0 +1,203 @@
+# 檔名：symbol_registry.py - 多商品資料註冊與常駐管理
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownSymbolError(KeyError):
+    """資料目錄中沒有此商品的檔案"""
+
+    def __init__(self, symbol: str):
+        super().__init__(symbol)
+        self.symbol = symbol
+
+    def __str__(self):
+        return f"未知的商品: {self.symbol}"
+
+
+def discover_symbol_files(data_dir: str, pattern: str) -> Dict[str, Dict[str, str]]:
+    """
+    掃描資料目錄，依檔名樣式找出各商品、各時間刻度的檔案
+
+    Args:
+        data_dir: 資料目錄
+        pattern: 含 symbol、timeframe 具名群組的正規表示式
+
+    Returns:
+        Dict: {symbol: {timeframe: 檔名}}（同一時間刻度有多個檔案時取檔名排序最後者）
+    """
+    regex = re.compile(pattern)
+    found: Dict[str, Dict[str, str]] = {}
+    try:
+        filenames = sorted(os.listdir(data_dir))
+    except FileNotFoundError:
+        return found
+
+    for filename in filenames:
+        match = regex.match(filename)
+        if not match:
+            continue
+        symbol, timeframe = match.group('symbol').upper(), match.group('timeframe')
+        previous = found.setdefault(symbol, {}).get(timeframe)
+        if previous is not None:
+            logger.warning("%s %s 有多個檔案，使用 %s（忽略 %s）", symbol, timeframe, filename, previous)
+        found[symbol][timeframe] = filename
+    return found
+
+
+class SymbolRegistry:
+    """
+    商品註冊表
+
+    預設商品於啟動時載入並固定常駐；其他商品在第一次請求時才載入（同一商品的並行
+    請求只載入一次），常駐商品以 LRU 管理，總記憶體超過預算或數量超過上限時
+    淘汰最久未使用者，下次請求時重新載入。
+    """
+
+    def __init__(self, data_dir: str, default_symbol: str, pattern: str,
+                 loader: Callable[[str, Dict[str, str]], Any],
+                 memory_budget_bytes: int, max_resident: int):
+        """
+        Args:
+            data_dir: 資料目錄
+            default_symbol: 預設商品（未指定 symbol 參數時使用）
+            pattern: 檔名樣式（見 discover_symbol_files）
+            loader: loader(symbol, {timeframe: 檔名}) -> 已載入的資料處理器
+                    （需提供 memory_usage_bytes()）
+            memory_budget_bytes: 常駐商品的記憶體預算
+            max_resident: 常駐商品數上限
+        """
+        self.data_dir = data_dir
+        self.default_symbol = default_symbol.upper()
+        self.pattern = pattern
+        self.loader = loader
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_resident = max_resident
+
+        self._lock = threading.Lock()
+        self._resident: 'OrderedDict[str, Any]' = OrderedDict()
+        self._bytes: Dict[str, int] = {}
+        self._pinned = set()
+        self._loading = SingleFlight()
+        self.files = discover_symbol_files(data_dir, pattern)
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0}
+
+    def refresh(self):
+        """重新掃描資料目錄（新增商品檔案後呼叫）"""
+        files = discover_symbol_files(self.data_dir, self.pattern)
+        with self._lock:
+            for symbol in self._pinned:  # 固定常駐的商品沿用登錄時的檔案設定
+                files[symbol] = self.files.get(symbol, {})
+            self.files = files
+
+    def register(self, symbol: str, processor: Any, files: Dict[str, str], pinned: bool = True):
+        """登錄已載入的資料處理器（預設商品於啟動時登錄且不淘汰）"""
+        symbol = symbol.upper()
+        with self._lock:
+            self.files[symbol] = dict(files)
+            self._resident[symbol] = processor
+            self._bytes[symbol] = 0
+            if pinned:
+                self._pinned.add(symbol)
+
+    def update_size(self, symbol: str):
+        """資料載入完成後重新計算常駐記憶體"""
+        symbol = symbol.upper()
+        with self._lock:
+            processor = self._resident.get(symbol)
+        if processor is not None:
+            size = processor.memory_usage_bytes()
+            with self._lock:
+                self._bytes[symbol] = size
+                self._evict(keep=symbol)
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self.files)
+
+    def resident_processors(self) -> List[Any]:
+        with self._lock:
+            return list(self._resident.values())
+
+    def is_resident(self, symbol: Optional[str]) -> bool:
+        symbol = (symbol or self.default_symbol).upper()
+        with self._lock:
+            return symbol in self._resident
+
+    def get(self, symbol: Optional[str] = None) -> Any:
+        """
+        取得商品的資料處理器（未常駐時載入）
+
+        Raises:
+            UnknownSymbolError: 資料目錄中沒有此商品
+        """
+        symbol = (symbol or self.default_symbol).upper()
+        with self._lock:
+            processor = self._resident.get(symbol)
+            if processor is not None:
+                self._resident.move_to_end(symbol)
+                self.stats['hits'] += 1
+                return processor
+            files = self.files.get(symbol)
+        if not files:
+            raise UnknownSymbolError(symbol)
+        return self._loading.do(symbol, lambda: self._load(symbol, files))
+
+    def _load(self, symbol: str, files: Dict[str, str]) -> Any:
+        print(f"載入商品 {symbol} ({len(files)} 個時間刻度)...")
+        processor = self.loader(symbol, files)
+        size = processor.memory_usage_bytes()
+        with self._lock:
+            self._resident[symbol] = processor
+            self._bytes[symbol] = size
+            self.stats['loads'] += 1
+            self._evict(keep=symbol)
+        return processor
+
+    def _evict(self, keep: str):
+        """超過預算或數量上限時淘汰最久未使用的商品（需持有鎖）"""
+        def over_budget():
+            return (sum(self._bytes.values()) > self.memory_budget_bytes
+                    or len(self._resident) > self.max_resident)
+
+        for symbol in list(self._resident):
+            if not over_budget():
+                break
+            if symbol == keep or symbol in self._pinned:
+                continue
+            del self._resident[symbol]
+            self._bytes.pop(symbol, None)
+            self.stats['evictions'] += 1
+            logger.info("商品 %s 已自記憶體淘汰", symbol)
+
+        if over_budget():
+            logger.warning("常駐商品記憶體 %.1f MB 超過預算 %.1f MB（無可淘汰的商品）",
+                           sum(self._bytes.values()) / 1048576, self.memory_budget_bytes / 1048576)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                default_symbol=self.default_symbol,
+                resident=list(self._resident),
+                resident_bytes=sum(self._bytes.values()),
+                memory_budget_bytes=self.memory_budget_bytes,
+                max_resident=self.max_resident,
+                symbols={
+                    symbol: {
+                        'timeframes': sorted(files),
+                        'resident': symbol in self._resident,
+                        'pinned': symbol in self._pinned,
+                        'bytes': self._bytes.get(symbol, 0)
+                    }
+                    for symbol, files in sorted(self.files.items())
+                }
+            )
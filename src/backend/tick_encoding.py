@@ -0,0 +1,59 @@
+# 檔名：tick_encoding.py - 價格的整數跳動點（tick）編碼
+
+from decimal import Decimal
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+_INT32 = np.iinfo(np.int32)
+
+
+def tick_decimals(tick_size: float) -> int:
+    """跳動點的小數位數（0.25 -> 2）"""
+    return max(0, -Decimal(str(tick_size)).normalize().as_tuple().exponent)
+
+
+def encode_prices(values, tick_size: float) -> np.ndarray:
+    """
+    浮點價格轉為 int32 跳動點數
+
+    Raises:
+        ValueError: 價格不在跳動點格線上、含 NaN 或超出 int32 範圍
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ticks = np.rint(values / tick_size)
+    if not np.isfinite(ticks).all():
+        raise ValueError("價格含 NaN 或無限值")
+    off_grid = np.abs(ticks * tick_size - values) > tick_size * 1e-6
+    if off_grid.any():
+        raise ValueError(f"{int(off_grid.sum())} 筆價格不是 {tick_size} 的整數倍，例如 {values[off_grid][0]}")
+    if len(ticks) and (ticks.min() < _INT32.min or ticks.max() > _INT32.max):
+        raise ValueError("跳動點數超出 int32 範圍")
+    return ticks.astype(np.int32)
+
+
+def decode_prices(ticks, tick_size: float) -> np.ndarray:
+    """跳動點數轉回 float64 價格（四捨五入到跳動點的小數位數，與直接解析 CSV 的值相同）"""
+    return np.round(np.asarray(ticks, dtype=np.float64) * tick_size, tick_decimals(tick_size))
+
+
+def decode_price(tick: int, tick_size: float) -> float:
+    return round(int(tick) * tick_size, tick_decimals(tick_size))
+
+
+def encode_price_columns(df: pd.DataFrame, tick_size: float,
+                         columns: Sequence[str] = PRICE_COLUMNS) -> None:
+    """
+    將 DataFrame 的價格欄位就地轉為 int32 跳動點數
+
+    先驗證全部欄位再寫入，任一欄位無法編碼時 DataFrame 保持不變。
+
+    Raises:
+        ValueError: 任一欄位無法編碼
+    """
+    encoded = {column: encode_prices(df[column].to_numpy(), tick_size) for column in columns}
+    for column, ticks in encoded.items():
+        df[column] = ticks
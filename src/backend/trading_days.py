@@ -0,0 +1,138 @@
+# 檔名：trading_days.py - 各時間刻度交易日位元矩陣
+
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_ordinals_from_times(times) -> np.ndarray:
+    """將K線時間轉為排序、不重複的 date.toordinal() 陣列"""
+    if isinstance(times, pd.Series):
+        times = times.to_numpy(dtype='datetime64[ns]')
+    days = np.asarray(times, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    return (np.unique(days) + EPOCH_ORDINAL).astype(np.int32)
+
+
+class TradingDayMatrix:
+    """
+    交易日位元矩陣
+
+    每個時間刻度一列、每個日序數（自共同起點起算）一欄的布林矩陣。
+    交集、聯集與各時間刻度的缺失日期皆為向量化的位元運算。
+    """
+
+    def __init__(self, day_ordinals: Dict[str, np.ndarray]):
+        """
+        Args:
+            day_ordinals: {timeframe: 交易日的 date.toordinal() 陣列}
+        """
+        self.timeframes = [tf for tf, days in day_ordinals.items() if len(days)]
+        if self.timeframes:
+            self.epoch = int(min(day_ordinals[tf].min() for tf in self.timeframes))
+            span = int(max(day_ordinals[tf].max() for tf in self.timeframes)) - self.epoch + 1
+        else:
+            self.epoch, span = 0, 0
+
+        self.matrix = np.zeros((len(self.timeframes), span), dtype=bool)
+        for row, tf in enumerate(self.timeframes):
+            self.matrix[row, np.asarray(day_ordinals[tf], dtype=np.int64) - self.epoch] = True
+
+    def _rows(self, timeframes: Optional[List[str]]) -> np.ndarray:
+        if timeframes is None:
+            return self.matrix
+        return self.matrix[[self.timeframes.index(tf) for tf in timeframes if tf in self.timeframes]]
+
+    def _to_ordinals(self, mask: np.ndarray) -> np.ndarray:
+        return (np.flatnonzero(mask) + self.epoch).astype(np.int32)
+
+    def days(self, timeframe: str) -> np.ndarray:
+        """指定時間刻度的交易日序數"""
+        return self._to_ordinals(self.matrix[self.timeframes.index(timeframe)])
+
+    def intersection_mask(self, timeframes: Optional[List[str]] = None,
+                          start_date: Optional[date] = None) -> np.ndarray:
+        rows = self._rows(timeframes)
+        mask = rows.all(axis=0) if len(rows) else np.zeros(self.matrix.shape[1], dtype=bool)
+        if start_date is not None:
+            mask = mask.copy()
+            mask[:max(0, start_date.toordinal() - self.epoch)] = False
+        return mask
+
+    def intersection(self, timeframes: Optional[List[str]] = None,
+                     start_date: Optional[date] = None) -> np.ndarray:
+        """所有（或指定）時間刻度共同擁有的交易日序數"""
+        return self._to_ordinals(self.intersection_mask(timeframes, start_date))
+
+    def union_mask(self) -> np.ndarray:
+        return self.matrix.any(axis=0)
+
+    def missing(self, timeframe: str) -> np.ndarray:
+        """其他時間刻度有資料、但此時間刻度缺少的交易日序數"""
+        row = self.matrix[self.timeframes.index(timeframe)]
+        return self._to_ordinals(self.union_mask() & ~row)
+
+    def consistency_report(self, start_date: Optional[date] = None,
+                           data_rows: Optional[Dict[str, int]] = None,
+                           all_timeframes: Optional[List[str]] = None,
+                           sample_size: int = 5) -> Dict:
+        """
+        產生資料範圍一致性報告（JSON 格式）
+
+        Args:
+            start_date: 固定起始日期（過濾交集）
+            data_rows: 各時間刻度的K線數
+            all_timeframes: 預期的全部時間刻度（未載入者標示 loaded=False）
+            sample_size: 每個時間刻度列出的缺失日期範例數
+        """
+        all_timeframes = all_timeframes or self.timeframes
+        data_rows = data_rows or {}
+        union = self.union_mask()
+        intersection = self.intersection_mask()
+        filtered = self.intersection_mask(start_date=start_date)
+
+        timeframe_info = {}
+        issues = []
+        for tf in all_timeframes:
+            if tf not in self.timeframes:
+                timeframe_info[tf] = {'loaded': False, 'date_count': 0, 'min_date': None,
+                                      'max_date': None, 'data_rows': 0, 'missing_count': 0,
+                                      'missing_sample': []}
+                continue
+
+            row = self.matrix[self.timeframes.index(tf)]
+            present = np.flatnonzero(row)
+            missing = np.flatnonzero(union & ~row)
+            timeframe_info[tf] = {
+                'loaded': True,
+                'date_count': int(len(present)),
+                'min_date': str(date.fromordinal(int(present[0]) + self.epoch)),
+                'max_date': str(date.fromordinal(int(present[-1]) + self.epoch)),
+                'data_rows': int(data_rows.get(tf, 0)),
+                'missing_count': int(len(missing)),
+                'missing_sample': [str(date.fromordinal(int(d) + self.epoch)) for d in missing[:sample_size]]
+            }
+            if len(missing):
+                issues.append(f'{tf} 缺失 {len(missing)} 天（其他時間刻度有資料）')
+
+        intersection_list = [str(date.fromordinal(int(o))) for o in self._to_ordinals(intersection)]
+        filtered_list = [str(date.fromordinal(int(o))) for o in self._to_ordinals(filtered)]
+
+        if not filtered_list:
+            issues.insert(0, '交集為空：沒有任何日期在所有時間刻度中都存在')
+        elif len(filtered_list) < 10:
+            issues.insert(0, f'交集過小：只有 {len(filtered_list)} 天可用')
+
+        return {
+            'timeframe_info': timeframe_info,
+            'loaded_timeframes': list(self.timeframes),
+            'intersection_dates': intersection_list,
+            'filtered_dates': filtered_list,
+            'intersection_count': len(intersection_list),
+            'filtered_count': len(filtered_list),
+            'union_count': int(union.sum()),
+            'consistency_issues': issues
+        }
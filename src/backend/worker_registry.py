@@ -0,0 +1,194 @@
+# 檔名：worker_registry.py - 多 worker 服務的共享狀態表
+
+import mmap
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 每個 worker 一列，欄位依序為：
+FIELDS = ('pid', 'ready', 'started_at', 'heartbeat', 'requests', 'in_flight',
+          'oldest_request_start', 'restarts')
+_COLUMN = {name: i for i, name in enumerate(FIELDS)}
+
+
+class WorkerRegistry:
+    """
+    worker 狀態表
+
+    以匿名共享記憶體保存 float64 矩陣，master 在 fork 前建立後由各 worker 繼承；
+    每個 worker 只寫自己的列，master 與 /api/health 讀取全部列。
+    另有一個共享的重新載入世代計數：任一 worker 遞增後，各 worker 的
+    start_reload_listener 執行緒看到變化即重新載入追加資料。
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._buffer = mmap.mmap(-1, max(1, slots * len(FIELDS) * 8))
+        self.table = np.frombuffer(self._buffer, dtype=np.float64).reshape(slots, len(FIELDS))
+        self._control_buffer = mmap.mmap(-1, 8)
+        self._control = np.frombuffer(self._control_buffer, dtype=np.int64)
+
+    def reset(self, slot: int, pid: int):
+        """master 啟動（或重啟）worker 時重設該列"""
+        restarts = self.table[slot, _COLUMN['restarts']]
+        if self.table[slot, _COLUMN['pid']]:
+            restarts += 1
+        row = np.zeros(len(FIELDS))
+        row[_COLUMN['pid']] = pid
+        row[_COLUMN['started_at']] = time.time()
+        row[_COLUMN['heartbeat']] = time.time()
+        row[_COLUMN['restarts']] = restarts
+        self.table[slot] = row
+
+    def set(self, slot: int, **values):
+        for name, value in values.items():
+            self.table[slot, _COLUMN[name]] = value
+
+    def get(self, slot: int, name: str) -> float:
+        return float(self.table[slot, _COLUMN[name]])
+
+    def request_reload(self) -> int:
+        """要求所有 worker 重新載入（同時遞增時可能只增加一次，重新載入本身可重複執行）"""
+        self._control[0] += 1
+        return int(self._control[0])
+
+    def reload_generation(self) -> int:
+        return int(self._control[0])
+
+    def snapshot(self) -> List[Dict]:
+        """各 worker 狀態（JSON 格式）"""
+        now = time.time()
+        rows = self.table.copy()
+        workers = []
+        for slot, row in enumerate(rows):
+            oldest = row[_COLUMN['oldest_request_start']]
+            workers.append({
+                'worker_id': slot,
+                'pid': int(row[_COLUMN['pid']]),
+                'ready': bool(row[_COLUMN['ready']]),
+                'uptime_seconds': round(now - row[_COLUMN['started_at']], 1) if row[_COLUMN['started_at']] else 0,
+                'heartbeat_age_seconds': round(now - row[_COLUMN['heartbeat']], 2) if row[_COLUMN['heartbeat']] else None,
+                'requests': int(row[_COLUMN['requests']]),
+                'in_flight': int(row[_COLUMN['in_flight']]),
+                'oldest_request_seconds': round(now - oldest, 2) if oldest else 0,
+                'restarts': int(row[_COLUMN['restarts']])
+            })
+        return workers
+
+
+class RequestTracker:
+    """
+    WSGI 中介層：記錄 worker 的請求數、進行中請求與最舊請求的開始時間
+
+    master 依最舊請求時間判斷 worker 是否超過請求逾時。
+    """
+
+    def __init__(self, app, registry: WorkerRegistry, slot: int):
+        self.app = app
+        self.registry = registry
+        self.slot = slot
+        self._lock = threading.Lock()
+        self._active: Dict[int, float] = {}
+        self._next_token = 0
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._active[token] = time.time()
+            self._publish(count_request=True)
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self._release(token)
+            raise
+        # 串流回應（批次 NDJSON、SSE）在 app 返回後才逐塊送出：伺服器呼叫 close() 時才算結束
+        return _TrackedResponse(result, lambda: self._release(token))
+
+    def _release(self, token: int):
+        with self._lock:
+            if self._active.pop(token, None) is not None:
+                self._publish()
+
+    def _publish(self, count_request: bool = False):
+        slot = self.slot
+        if count_request:
+            self.registry.set(slot, requests=self.registry.get(slot, 'requests') + 1)
+        self.registry.set(slot, in_flight=len(self._active),
+                          oldest_request_start=min(self._active.values()) if self._active else 0)
+
+
+class _TrackedResponse:
+    """包裝 WSGI 回應：close() 時先關閉原回應再呼叫 on_close（只呼叫一次）"""
+
+    def __init__(self, result, on_close):
+        self.result = result
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self.result)
+
+    def close(self):
+        try:
+            if hasattr(self.result, 'close'):
+                self.result.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+def start_heartbeat(registry: WorkerRegistry, slot: int, interval: float) -> threading.Thread:
+    """背景執行緒定期更新 heartbeat"""
+    def beat():
+        while True:
+            registry.set(slot, heartbeat=time.time())
+            time.sleep(interval)
+
+    thread = threading.Thread(target=beat, name=f'worker-{slot}-heartbeat', daemon=True)
+    thread.start()
+    return thread
+
+
+def start_reload_listener(registry: WorkerRegistry, reload: Callable[[], None],
+                          interval: float) -> threading.Thread:
+    """
+    背景執行緒定期檢查重新載入世代，有變化時呼叫 reload()
+
+    起始世代視為0：master 不重新載入，重新啟動的 worker 繼承的是啟動時的資料，
+    曾經要求過重新載入時會立即補上。reload() 不在心跳執行緒執行，避免耗時的
+    重新載入延誤心跳而被 master 判定為無回應。
+    """
+    def listen():
+        seen = 0
+        while True:
+            generation = registry.reload_generation()
+            if generation != seen:
+                seen = generation
+                reload()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=listen, name='reload-listener', daemon=True)
+    thread.start()
+    return thread
+
+
+# 目前行程所屬的狀態表與列（由 server.py 設定，開發伺服器下為None）
+_active: Tuple[Optional[WorkerRegistry], Optional[int]] = (None, None)
+
+
+def set_active(registry: WorkerRegistry, slot: int):
+    global _active
+    _active = (registry, slot)
+
+
+def get_active() -> Tuple[Optional[WorkerRegistry], Optional[int]]:
+    return _active
+
+
+def worker_count() -> int:
+    """提供服務的 worker 行程數（未由 server.py 設定時為1）"""
+    registry, _ = _active
+    return registry.slots if registry is not None else 1
@@ -0,0 +1,372 @@
+# 檔名：run_benchmarks.py - 效能基準測試套件
+#
+# 以合成資料量測載入、查詢、FVG檢測、連續性檢查與 API 端到端延遲，
+# 結果連同 commit hash 寫成 JSON，可用 --compare 與前次結果比較。
+#
+# 用法:
+#   python src/benchmarks/run_benchmarks.py                 # 完整測試
+#   python src/benchmarks/run_benchmarks.py --quick         # 小資料量快速測試
+#   python src/benchmarks/run_benchmarks.py --compare benchmark_results/xxx.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+import numpy as np
+import pandas as pd
+
+from utils.config import CSV_FILES, PROJECT_ROOT
+from benchmarks.synthetic_data import write_dataset, generate_bars, generate_m1, resample_ohlcv
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, 'benchmark_results')
+
+FULL_SETTINGS = {
+    'days': 120,
+    'fvg_sizes': [1_000, 100_000, 2_000_000],
+    'confluence_days': 730,
+    'continuity_rows': 200_000,
+    'query_dates': 20,
+    'api_requests': 50,
+    'repeat': 5
+}
+
+QUICK_SETTINGS = {
+    'days': 21,
+    'fvg_sizes': [1_000, 100_000],
+    'confluence_days': 120,
+    'continuity_rows': 20_000,
+    'query_dates': 5,
+    'api_requests': 10,
+    'repeat': 3
+}
+
+# basic 模式逐行檢查，限制其資料量避免單次測試過久
+SLOW_MODE_ROWS = {'basic': 20_000}
+
+
+def measure(fn: Callable, repeat: int) -> Dict:
+    """重複執行並返回耗時統計（秒）"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return _summarize(times)
+
+
+def _summarize(times: List[float]) -> Dict:
+    ordered = sorted(times)
+    return {
+        'runs': len(times),
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        'max': ordered[-1]
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """隱藏被測程式的載入進度輸出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def git_metadata() -> Dict:
+    """目前 commit 與工作目錄是否有未提交變更"""
+    def run(*args) -> Optional[str]:
+        try:
+            return subprocess.check_output(['git', *args], cwd=PROJECT_ROOT,
+                                           stderr=subprocess.DEVNULL, text=True).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = run('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': run('rev-parse', 'HEAD'),
+        'branch': run('rev-parse', '--abbrev-ref', 'HEAD'),
+        'dirty': bool(status) if status is not None else None
+    }
+
+
+def bench_load(data_dir: str, cache_dir: str, repeat: int) -> Tuple[Dict, object]:
+    """load_all_data：冷啟動（空快取）與熱啟動（連續性報告已持久化），並返回載入完成的處理器"""
+    from backend.data_processor import DataProcessor
+
+    def load():
+        processor = DataProcessor(data_dir=data_dir, cache_dir=cache_dir)
+        processor.load_all_data()
+        return processor
+
+    cold_times = []
+    for _ in range(repeat):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        with quiet():
+            start = time.perf_counter()
+            load()
+            cold_times.append(time.perf_counter() - start)
+
+    with quiet():
+        warm = measure(load, repeat)
+        processor = load()
+
+    return {
+        'cold': _summarize(cold_times),
+        'warm': warm,
+        'rows': {tf: len(df) for tf, df in processor.data_cache.items()}
+    }, processor
+
+
+def bench_queries(processor, query_dates: int, seed: int) -> Dict:
+    """get_pre_market_data：各時間刻度、隨機日期"""
+    dates = _pick_dates(processor, query_dates, seed)
+
+    results = {}
+    for timeframe in processor.get_available_timeframes():
+        times = []
+        with quiet():
+            for target_date in dates:
+                start = time.perf_counter()
+                processor.get_pre_market_data(target_date, timeframe)
+                times.append(time.perf_counter() - start)
+        results[timeframe] = _summarize(times)
+    return results
+
+
+def bench_fvg(sizes: List[int], repeat: int, seed: int) -> Dict:
+    """FVGDetectorSimple：detect_fvg_table（欄式）、detect_fvgs（含K線細節的字典）與 find_formation_indices"""
+    from backend.fvg_detector_simple import FVGDetectorSimple
+
+    detector = FVGDetectorSimple()
+    results = {}
+    for size in sizes:
+        bars = generate_bars(size, 'M1', seed=seed)
+        entry = {
+            'detect_fvg_table': measure(
+                lambda: detector.detect_fvg_table(bars, timeframe='M1').to_frontend(), repeat),
+            'detect_fvgs': measure(lambda: detector.detect_fvgs(bars, timeframe='M1'), repeat),
+            # detect_fvg_table/detect_fvgs 只處理最近1000根，記錄實際處理量以免誤讀
+            'detect_fvgs_bars_processed': min(size, 1000),
+            'find_formation_indices': measure(lambda: detector.find_formation_indices(bars), repeat)
+        }
+        results[str(size)] = entry
+    return results
+
+
+def bench_fvg_confluence(days: int, repeat: int, seed: int) -> Dict:
+    """全歷史 M5/H1/H4 FVG 共振（FVGConfluence 計算與轉為字典）"""
+    from backend.fvg_detector_simple import FVGDetectorSimple
+    from backend.fvg_index import FVGPriceIndex
+    from backend.fvg_confluence import FVGConfluence
+
+    detector = FVGDetectorSimple()
+    m1 = generate_m1(days=days, seed=seed, gap_rate=0.0)
+    indexes = {}
+    for timeframe in ('M5', 'H1', 'H4'):
+        bars = resample_ohlcv(m1, timeframe).rename_axis('DateTime').reset_index()
+        indexes[timeframe] = FVGPriceIndex(detector.detect_history_table(bars, timeframe))
+    return {
+        'fvg_counts': {tf: len(index) for tf, index in indexes.items()},
+        'compute': measure(lambda: FVGConfluence(indexes, 'M5'), repeat),
+        'compute_and_zones': measure(lambda: FVGConfluence(indexes, 'M5').zones(), repeat)
+    }
+
+
+def bench_continuity(processor, rows: int, repeat: int) -> Dict:
+    """各連續性檢查模式（M1 資料）"""
+    from backend.candle_continuity_checker_v2 import CandleContinuityCheckerV2
+
+    m1 = processor.data_cache['M1']
+    results = {}
+    for mode in ('vectorized', 'hybrid', 'smart', 'parallel', 'basic'):
+        data = m1.iloc[:min(rows, SLOW_MODE_ROWS.get(mode, rows))]
+        checker = CandleContinuityCheckerV2(optimization_mode=mode, show_progress=False)
+        with quiet():
+            timing = measure(lambda: checker.check_continuity(data, 'M1'), repeat)
+        timing['rows'] = len(data)
+        timing['klines_per_sec'] = len(data) / timing['median'] if timing['median'] > 0 else None
+        results[mode] = timing
+    return results
+
+
+def bench_api(processor, requests_per_endpoint: int, seed: int) -> Dict:
+    """
+    Flask test client 端到端延遲
+
+    路由經由 symbol_registry 取得處理器，因此以只含 processor 的註冊表暫時取代全域註冊表。
+    任何回應不是200時拋出 RuntimeError（錯誤回應的耗時沒有意義）。
+    """
+    import backend.app as app_module
+    from benchmarks.synthetic_data import single_symbol_registry
+
+    saved_registry = app_module.symbol_registry
+    app_module.symbol_registry = single_symbol_registry(processor)
+    try:
+        return _bench_api_endpoints(app_module.app.test_client(), processor, requests_per_endpoint, seed)
+    finally:
+        app_module.symbol_registry = saved_registry
+
+
+def _bench_api_endpoints(client, processor, requests_per_endpoint: int, seed: int) -> Dict:
+    picks = _pick_dates(processor, requests_per_endpoint, seed)
+
+    endpoints = {
+        '/api/data/<date>/M15': [f'/api/data/{d}/M15' for d in picks],
+        '/api/data/<date>/H1': [f'/api/data/{d}/H1' for d in picks],
+        '/api/random-data?timeframe=M15': ['/api/random-data?timeframe=M15'] * requests_per_endpoint,
+        '/api/continuity-summary': ['/api/continuity-summary'] * requests_per_endpoint
+    }
+
+    results = {}
+    for name, urls in endpoints.items():
+        times = []
+        statuses = set()
+        with quiet():
+            for url in urls:
+                start = time.perf_counter()
+                response = client.get(url)
+                times.append(time.perf_counter() - start)
+                statuses.add(response.status_code)
+        if statuses != {200}:
+            raise RuntimeError(f'{name}: non-200 responses {sorted(statuses)}')
+        results[name] = dict(_summarize(times), status_codes=sorted(statuses))
+    return results
+
+
+def _pick_dates(processor, count: int, seed: int) -> list:
+    """以固定種子從可用日期中抽樣，使每次執行查詢相同日期"""
+    rng = np.random.default_rng(seed)
+    dates = sorted(processor.available_dates)
+    return [dates[i] for i in rng.integers(0, len(dates), count)]
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.10) -> List[str]:
+    """
+    比較兩次結果的中位數耗時
+
+    Returns:
+        List[str]: 每項指標一行（變慢超過 threshold 者標示 REGRESSION）
+    """
+    def flatten(node, prefix=''):
+        if isinstance(node, dict):
+            if 'median' in node and 'runs' in node:
+                yield prefix, node['median']
+                return
+            for key, value in node.items():
+                yield from flatten(value, f'{prefix}/{key}' if prefix else key)
+
+    base = dict(flatten(baseline.get('results', {})))
+    lines = []
+    for key, median in flatten(current.get('results', {})):
+        if key not in base or not base[key]:
+            continue
+        change = median / base[key] - 1
+        flag = 'REGRESSION' if change > threshold else ('improved' if change < -threshold else '')
+        lines.append(f'{key:<70} {base[key] * 1000:10.3f}ms -> {median * 1000:10.3f}ms '
+                     f'{change:+7.1%} {flag}'.rstrip())
+    return lines
+
+
+def run_suite(settings: Dict, seed: int = 0, sections: Optional[List[str]] = None) -> Dict:
+    """執行基準測試並返回結果（JSON 格式）"""
+    sections = sections or ['load', 'query', 'fvg', 'continuity', 'api']
+    work_dir = tempfile.mkdtemp(prefix='trading_bench_')
+    data_dir = os.path.join(work_dir, 'data')
+    cache_dir = os.path.join(work_dir, 'cache')
+
+    try:
+        generated = write_dataset(data_dir, CSV_FILES, days=settings['days'], seed=seed)
+        results = {}
+        processor = None
+
+        if {'load', 'query', 'continuity', 'api'} & set(sections):
+            print('load_all_data ...')
+            results['load_all_data'], processor = bench_load(data_dir, cache_dir, settings['repeat'])
+            if 'load' not in sections:
+                results.pop('load_all_data')
+        if 'query' in sections:
+            print('get_pre_market_data ...')
+            results['get_pre_market_data'] = bench_queries(processor, settings['query_dates'], seed)
+        if 'fvg' in sections:
+            print('FVG detection ...')
+            results['fvg_detection'] = bench_fvg(settings['fvg_sizes'], settings['repeat'], seed)
+            results['fvg_confluence'] = bench_fvg_confluence(settings['confluence_days'], settings['repeat'], seed)
+        if 'continuity' in sections:
+            print('continuity modes ...')
+            results['continuity'] = bench_continuity(processor, settings['continuity_rows'],
+                                                     settings['repeat'])
+        if 'api' in sections:
+            print('Flask test client ...')
+            results['api'] = bench_api(processor, settings['api_requests'], seed)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git': git_metadata(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'settings': settings,
+            'generated_rows': generated
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='交易圖表系統效能基準測試')
+    parser.add_argument('--quick', action='store_true', help='小資料量快速測試')
+    parser.add_argument('--days', type=int, help='合成資料的日曆天數')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sections', nargs='+',
+                        choices=['load', 'query', 'fvg', 'continuity', 'api'])
+    parser.add_argument('--output', help='結果JSON路徑（預設 benchmark_results/<時間>_<commit>.json）')
+    parser.add_argument('--compare', help='與指定的前次結果比較')
+    args = parser.parse_args()
+
+    settings = dict(QUICK_SETTINGS if args.quick else FULL_SETTINGS)
+    if args.days:
+        settings['days'] = args.days
+
+    report = run_suite(settings, seed=args.seed, sections=args.sections)
+
+    output = args.output
+    if not output:
+        commit = (report['meta']['git']['commit'] or 'nogit')[:10]
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f'{stamp}_{commit}.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'結果已寫入: {output}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\n與 {baseline['meta']['git'].get('commit')} 比較（中位數）:")
+        for line in compare_results(baseline, report):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+# 檔名：synthetic_data.py - 合成 MNQ 類型 OHLCV 資料（基準測試用）
+
+import contextlib
+import io
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+TICK_SIZE = 0.25  # MNQ 最小跳動點
+
+# 各時間刻度的重採樣規則
+RESAMPLE_RULES = {
+    'M5': '5min',
+    'M15': '15min',
+    'H1': '1h',
+    'H4': '4h',
+    'D1': '1D'
+}
+
+
+def trading_minutes(start: str, days: int) -> pd.DatetimeIndex:
+    """
+    CME 股指期貨交易時間的每分鐘時間戳
+
+    週日18:00開盤至週五17:00收盤，每日17:00-18:00休市（與連續性檢查器的停盤規則一致）。
+    """
+    start_ts = pd.Timestamp(start).normalize()
+    idx = pd.date_range(start_ts, start_ts + pd.Timedelta(days=days), freq='1min', inclusive='left')
+    weekday = idx.weekday
+    hour = idx.hour
+    keep = (hour != 17)
+    keep &= (weekday < 4) | ((weekday == 4) & (hour < 17)) | ((weekday == 6) & (hour >= 18))
+    return idx[keep]
+
+
+def generate_m1(days: int = 30, start: str = '2023-01-02', seed: int = 0,
+                start_price: float = 15000.0, gap_rate: float = 0.0005) -> pd.DataFrame:
+    """
+    產生 M1 OHLCV
+
+    價格為對齊 0.25 跳動點的隨機漫步，波動與成交量依紐約盤中時段放大，
+    並隨機移除少量K線以模擬資料缺失。
+
+    Args:
+        days: 日曆天數
+        start: 起始日期
+        seed: 隨機種子（相同參數產生相同資料）
+        start_price: 起始價格
+        gap_rate: 每根K線被移除的機率
+
+    Returns:
+        DataFrame: 以 DateTime 為索引，欄位 Open/High/Low/Close/Volume
+    """
+    rng = np.random.default_rng(seed)
+    idx = trading_minutes(start, days)
+    n = len(idx)
+
+    # 紐約開盤（9:30-16:00）波動較大
+    minute_of_day = idx.hour * 60 + idx.minute
+    session = ((minute_of_day >= 570) & (minute_of_day < 960)).astype(float)
+    volatility = 1.0 + 2.0 * session
+
+    steps = np.round(rng.normal(0, 1.5, n) * volatility / TICK_SIZE).astype(np.int64)
+    close_ticks = int(round(start_price / TICK_SIZE)) + np.cumsum(steps)
+    open_ticks = np.concatenate(([close_ticks[0]], close_ticks[:-1]))
+    wick_up = rng.integers(0, 6, n) * np.where(session > 0, 2, 1)
+    wick_down = rng.integers(0, 6, n) * np.where(session > 0, 2, 1)
+    high_ticks = np.maximum(open_ticks, close_ticks) + wick_up
+    low_ticks = np.minimum(open_ticks, close_ticks) - wick_down
+
+    volume = (rng.gamma(2.0, 60.0, n) * volatility).astype(np.int64) + 1
+
+    df = pd.DataFrame({
+        'Open': open_ticks * TICK_SIZE,
+        'High': high_ticks * TICK_SIZE,
+        'Low': low_ticks * TICK_SIZE,
+        'Close': close_ticks * TICK_SIZE,
+        'Volume': volume
+    }, index=idx)
+    df.index.name = 'DateTime'
+
+    if gap_rate > 0:
+        df = df[rng.random(n) >= gap_rate]
+    return df
+
+
+def resample_ohlcv(m1: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """由 M1 聚合為指定時間刻度"""
+    if timeframe == 'M1':
+        return m1
+    bars = m1.resample(RESAMPLE_RULES[timeframe]).agg({
+        'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
+    })
+    return bars.dropna()
+
+
+def generate_bars(count: int, timeframe: str = 'M1', seed: int = 0) -> pd.DataFrame:
+    """
+    產生指定根數的K線（DateTime 為欄位，可直接傳入檢測器）
+
+    Args:
+        count: K線數
+        timeframe: 時間刻度
+        seed: 隨機種子
+    """
+    minutes_per_bar = {'M1': 1, 'M5': 5, 'M15': 15, 'H1': 60, 'H4': 240, 'D1': 1440}[timeframe]
+    # 每週約 6900 分鐘交易時間，多取一週餘量
+    days = int(count * minutes_per_bar / 6900 * 7) + 8
+    bars = resample_ohlcv(generate_m1(days=days, seed=seed, gap_rate=0.0), timeframe)
+    bars = bars.iloc[:count].reset_index()
+    bars['Date_Only'] = bars['DateTime'].dt.date
+    return bars
+
+
+def write_csv_files(out_dir: str, m1: pd.DataFrame, csv_files: Dict[str, str]) -> Dict[str, int]:
+    """
+    由 M1 聚合並寫出與正式資料相同格式的CSV（Date[,Time],Open,High,Low,Close,Volume）
+
+    Args:
+        out_dir: 輸出目錄
+        m1: generate_m1 格式的 M1 K線
+        csv_files: {timeframe: 檔名}（通常為 CSV_FILES）
+
+    Returns:
+        Dict[str, int]: 各時間刻度的K線數
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = {}
+    for timeframe, filename in csv_files.items():
+        bars = resample_ohlcv(m1, timeframe)
+        out = pd.DataFrame({'Date': bars.index.strftime('%m/%d/%Y')})
+        if timeframe != 'D1':
+            out['Time'] = bars.index.strftime('%H:%M')
+        for column in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            out[column] = bars[column].to_numpy()
+        out.to_csv(os.path.join(out_dir, filename), index=False)
+        rows[timeframe] = len(out)
+    return rows
+
+
+def write_dataset(out_dir: str, csv_files: Dict[str, str], days: int = 30,
+                  start: str = '2023-01-02', seed: int = 0) -> Dict[str, int]:
+    """
+    寫出與正式資料相同格式的合成CSV
+
+    Args:
+        out_dir: 輸出目錄
+        csv_files: {timeframe: 檔名}（通常為 CSV_FILES）
+        days: 日曆天數
+        start: 起始日期
+        seed: 隨機種子
+
+    Returns:
+        Dict[str, int]: 各時間刻度的K線數
+    """
+    return write_csv_files(out_dir, generate_m1(days=days, start=start, seed=seed), csv_files)
+
+
+def load_processor(data_dir: str, cache_dir: str, **kwargs):
+    """
+    建立指向 data_dir/cache_dir 的 DataProcessor 並載入全部資料（隱藏載入進度輸出）
+
+    Args:
+        data_dir: CSV 目錄
+        cache_dir: 快取目錄（連續性報告、索引等持久化位置）
+        **kwargs: 其他 DataProcessor 參數（如 symbol）
+
+    Returns:
+        DataProcessor: 已載入的處理器
+    """
+    from backend.data_processor import DataProcessor
+
+    processor = DataProcessor(data_dir=data_dir, cache_dir=cache_dir, **kwargs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        processor.load_all_data()
+    return processor
+
+
+def synthetic_processor(root: str, days: int = 20, seed: int = 0, **kwargs):
+    """
+    在 root 下寫出全部時間刻度的合成資料（root/data）並載入（快取於 root/cache）
+
+    Returns:
+        DataProcessor: 已載入的處理器
+    """
+    from utils.config import CSV_FILES
+
+    data_dir = os.path.join(root, 'data')
+    write_dataset(data_dir, CSV_FILES, days=days, seed=seed)
+    return load_processor(data_dir, os.path.join(root, 'cache'), **kwargs)
+
+
+def single_symbol_registry(processor):
+    """
+    只含 processor 一個常駐商品的 SymbolRegistry
+
+    測試 API 時以 mock.patch.object(app, 'symbol_registry', ...) 取代全域註冊表，
+    請求不指定 symbol 即使用此處理器。
+    """
+    from backend.symbol_registry import SymbolRegistry, UnknownSymbolError
+    from utils.config import SYMBOL_CONFIG
+
+    def loader(symbol, files):
+        raise UnknownSymbolError(symbol)
+
+    registry = SymbolRegistry(processor.data_dir, default_symbol=processor.symbol,
+                              pattern=SYMBOL_CONFIG['file_pattern'], loader=loader,
+                              memory_budget_bytes=1 << 40, max_resident=8)
+    registry.register(processor.symbol, processor, processor.csv_files, pinned=True)
+    return registry
@@ -7,7 +7,8 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 
 # 資料檔案設定
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
-LOG_DIR = os.path.join(PROJECT_ROOT, 'logs')
+LOG_DIR = os.environ.get('TRADING_LOG_DIR') or os.path.join(PROJECT_ROOT, 'logs')  # 可由環境變數指定（測試指向暫存目錄）
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache')  # 持久化報告、索引等衍生資料
 
 # CSV 檔案對應 - 新增 M15 和 D1
 CSV_FILES = {
@@ -19,6 +20,17 @@ CSV_FILES = {
     'D1': 'MNQ_D1_2019-2024.csv'
 }
 
+# 多商品設定：資料目錄中符合檔名樣式（<商品>_<時間刻度>_*.csv）的檔案自動註冊。
+# 預設商品使用 CSV_FILES 並於啟動時載入；其他商品在第一次請求（?symbol=）時才載入，
+# 常駐商品超過記憶體預算或數量上限時淘汰最久未使用者
+SYMBOL_CONFIG = {
+    'default_symbol': 'MNQ',
+    'file_pattern': r'^(?P<symbol>[A-Za-z0-9]+)_(?P<timeframe>M1|M5|M15|H1|H4|D1)_.*\.csv$',
+    'memory_budget_mb': 4096,   # 常駐商品（含預設商品）的記憶體預算
+    'max_resident_symbols': 4,
+    'preload_symbols': []       # 啟動時（server.py fork 前）一併載入的其他商品
+}
+
 # 時間刻度對應的預設顯示K線數量 - 統一 400 根
 DEFAULT_CANDLE_COUNT = {
     'M1': 400,
@@ -29,6 +41,19 @@ DEFAULT_CANDLE_COUNT = {
     'D1': 400
 }
 
+# 分析用K線數量（目標日期往前取N根）
+ANALYSIS_CANDLE_COUNT = 400
+
+# 各時間刻度載入的記錄數上限（-1 表示載入完整歷史資料）
+FULL_DATA_LOADING = {
+    'M1': -1,
+    'M5': -1,
+    'M15': -1,
+    'H1': -1,
+    'H4': -1,
+    'D1': -1
+}
+
 # 隨機日期範圍配置
 RANDOM_DATE_CONFIG = {
     'start_date': None,  # 暫時停用固定起始日期，使用所有可用數據
@@ -55,7 +80,86 @@ CACHE_VERSION = 'v8'  # 緩存版本號
 MAX_RECORDS_LIMIT = 10000  # 最大記錄數限制（非M1時間框架）
 MEMORY_OPTIMIZATION_THRESHOLD = 400  # 內存優化閾值
 
+# 歷史資料端點 HTTP 快取（ETag/304、預先壓縮內容）
+HTTP_CACHE_CONFIG = {
+    'enabled': True,
+    'max_bytes': 256 * 1024 * 1024,  # 快取內容（含壓縮版本）總上限
+    'min_compress_bytes': 1024,      # 小於此大小不壓縮
+    'gzip_level': 6
+}
+
+# 批次圖表資料端點（/api/batch-data）
+BATCH_CONFIG = {
+    'max_dates': 500,          # 單次請求的日期上限
+    'default_format': 'ndjson' # ndjson: 每行一筆 JSON；frames: 每筆前置4位元組長度
+}
+
+# 任意時間範圍查詢（GET /api/range/<timeframe>）：點數超過上限時改用多解析度聚合。
+# 區間高低點（GET /api/range-stats/<timeframe>）的 sparse table 索引保存於 cache_dir/range_index
+RANGE_CONFIG = {
+    'default_max_points': 1000,
+    'max_points_limit': 10000,
+    'index_block_size': 64,   # 索引分塊大小（查詢時兩端最多各掃描這麼多根）
+    'persist_index': True     # 完整載入時依資料指紋保存/重用索引檔（熱重載與即時合併只在記憶體延伸）
+}
+
+# 依價格/時間查詢未回補FVG（GET /api/fvg-lookup）與多時間刻度FVG共振（GET /api/fvg-confluence）：
+# 全歷史FVG索引於第一次查詢時建立，資料更新後重建
+FVG_INDEX_CONFIG = {
+    'timeframes': ['M15', 'H1', 'H4'],             # fvg-lookup 未指定 timeframes 時查詢的時間刻度
+    'confluence_timeframes': ['M5', 'H1', 'H4'],   # fvg-confluence 預設時間刻度（最小者為錨點）
+    'max_results': 1000                            # 超過時只返回形成時間最近者
+}
+
+# 追加資料熱重載（POST /api/reload 或定期檢查CSV大小/修改時間）
+RELOAD_CONFIG = {
+    'watch': False,       # True: 服務啟動後定期檢查（prefork 時每個 worker 各自檢查）
+    'poll_seconds': 30
+}
+
+# 即時K線（POST /api/live/bars 送入 M1，GET /api/live/stream 以 Server-Sent Events 推送）
+LIVE_CONFIG = {
+    'merge_seconds': 60,         # 已收盤的即時K線併入歷史資料的間隔（<= 0 不自動合併）
+    'max_bars_per_request': 10000,
+    'subscriber_queue': 10000,   # 每個訂閱者的待送事件上限，超過時中斷該連線
+    'heartbeat_seconds': 15
+}
+
+# 日誌配置
+LOGGING_CONFIG = {
+    'level': 'INFO',          # DEBUG 時才輸出逐請求的診斷訊息
+    'structured': False,      # True: 輸出 JSON Lines
+    'async_handler': True,    # 經由 QueueHandler 交給背景執行緒寫出
+    'log_file': 'error.log'
+}
+
+# 請求計時指標配置（停用時不註冊任何計時 hook）
+METRICS_CONFIG = {
+    'enabled': True,
+    'buckets': (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+}
+
 # Flask 設定
 FLASK_HOST = '127.0.0.1'
 FLASK_PORT = 5001
-FLASK_DEBUG = False  # 生產環境應該設為False
\ No newline at end of file
+FLASK_DEBUG = False  # 生產環境應該設為False
+
+# 正式服務設定（src/backend/server.py）
+SERVER_CONFIG = {
+    'host': FLASK_HOST,
+    'port': FLASK_PORT,
+    'mode': 'auto',            # auto: 支援 fork 時用 prefork，否則 threaded
+    'workers': 4,              # prefork worker 數
+    'threads': 16,             # threaded 模式（waitress）的執行緒數
+    'request_timeout': 120,    # 單一請求上限（秒），超過時 master 重啟該 worker
+    'heartbeat_interval': 1.0  # worker 心跳間隔（秒）
+}
+
+# 非同步（ASGI）服務設定（src/backend/asgi_app.py）
+ASGI_CONFIG = {
+    'host': FLASK_HOST,
+    'port': FLASK_PORT,
+    'max_workers': 4,        # 重運算（圖表、播放）執行緒池大小
+    'max_pending': 64,       # 同時等待/執行中的重運算上限，超過時返回503
+    'fallback_workers': 8    # 轉交 Flask 路由的執行緒池大小
+}
@@ -9,6 +9,7 @@ K線連續性檢查優化配置
 - 'parallel': 並行處理，使用多線程加速
 - 'vectorized': 向量化運算，使用NumPy/Pandas加速
 - 'hybrid': 混合優化，結合向量化和智能跳躍
+- 'auto': 自動模式，依數據量與歷史實測速度選擇策略，超出時間預算時改用採樣檢查
 
 建議配置：
 - 開發環境: 'smart' (平衡速度和可讀性)
@@ -91,6 +92,27 @@ def get_optimal_mode(data_size: int, timeframe: str) -> str:
             # 低頻數據用並行
             return 'parallel'
 
+# 自動模式設置
+AUTO_MODE_CONFIG = {
+    # 參與自動選擇的候選策略（依探索優先順序排列）
+    # 候選策略必須產生相同的報告（同一套停盤判斷與缺失計算），否則持久化的報告、
+    # 間隔索引與 min_continuity 篩選會隨機器速度而不同；basic/parallel 以交易時段
+    # 偵測器判斷、smart 只檢查段內，結果與向量化策略不同，不列入
+    'candidate_modes': ['vectorized', 'hybrid'],
+    # 歷史實測速度的持久化檔案（相對於 CACHE_DIR）
+    'throughput_file': 'continuity_throughput.json',
+    # 低於此K線數的檢查不記錄速度（固定開銷佔比過高，會干擾大數據集的策略選擇）
+    'min_record_size': 2000,
+    # 速度的指數移動平均權重（新測量值所佔比例）
+    'throughput_ema_alpha': 0.3,
+    # 預估時間超出預算時，採樣檢查可使用的預算比例（預留安全邊際）
+    'sample_budget_ratio': 0.8,
+    # 採樣檢查時均勻分佈的區塊數
+    'sample_blocks': 10,
+    # 採樣的最少K線數
+    'min_sample_size': 1000
+}
+
 # Progress bar style configuration
 PROGRESS_BAR_CONFIG = {
     'width': 50,  # Progress bar width
@@ -23,12 +23,26 @@ OPTIMIZED_DTYPES = {
     'Volume': 'int32'  # 32位整數足夠處理交易量
 }
 
+# 價格編碼：啟用時 data_cache 的 OHLC 以 int32 跳動點數儲存（FVG 比較直接在整數上進行，
+# 序列化時才轉回浮點數）；價格不在跳動點格線上時自動保留浮點數
+PRICE_ENCODING_CONFIG = {
+    "enabled": False,
+    "tick_sizes": {  # 依商品（SYMBOL_CONFIG）
+        "MNQ": 0.25,
+        "NQ": 0.25,
+        "MES": 0.25,
+        "ES": 0.25
+    }
+}
+
 # 內存優化設置
 MEMORY_CONFIG = {
     "max_cache_size": 20,  # 減少緩存大小
     "preload_days": 7,     # 減少預載入天數
     "gc_frequency": 100,   # 垃圾回收頻率
-    "clear_unused_data": True
+    "clear_unused_data": True,  # 常駐K線超過預算時將最久未用的時間刻度換出到磁碟
+    "timeframe_budget_mb": 1024,  # 每個商品常駐K線資料的堆積記憶體預算（0 = 不限制）
+    "spill_dir_name": "frames"    # 換出檔案位於 CACHE_DIR（或商品快取目錄）下的子目錄
 }
 
 # FVG渲染性能配置
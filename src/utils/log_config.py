@@ -0,0 +1,84 @@
+# 檔名：log_config.py - 日誌設定（結構化格式、佇列非同步輸出）
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# LogRecord 內建屬性，結構化輸出時不當作額外欄位
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '[%(levelname)s] %(asctime)s %(name)s: %(message)s'
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    JSON Lines 格式
+
+    每筆紀錄一行 JSON：ts、level、logger、msg，以及透過 extra={...} 傳入的欄位。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(log_dir: str, config: Dict) -> Optional[logging.handlers.QueueListener]:
+    """
+    設定根日誌器
+
+    Args:
+        log_dir: 日誌檔目錄
+        config: LOGGING_CONFIG（level、structured、async_handler、log_file）
+
+    Returns:
+        QueueListener: 啟用非同步輸出時的監聽執行緒（程式結束時自動停止），否則None
+    """
+    os.makedirs(log_dir, exist_ok=True)
+
+    formatter = StructuredFormatter() if config.get('structured') else logging.Formatter(TEXT_FORMAT)
+
+    # 檔案Handler強制UTF-8
+    file_handler = logging.FileHandler(os.path.join(log_dir, config.get('log_file', 'error.log')),
+                                       encoding='utf-8')
+    console_handler = logging.StreamHandler()
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.handlers.clear()
+    root.setLevel(getattr(logging, str(config.get('level', 'INFO')).upper(), logging.INFO))
+
+    if not config.get('async_handler', True):
+        root.addHandler(file_handler)
+        root.addHandler(console_handler)
+        return None
+
+    # 請求執行緒只把紀錄放入佇列，實際寫檔與輸出由監聽執行緒完成
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                              respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    """送出佇列中剩餘的紀錄（已手動停止時略過）"""
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
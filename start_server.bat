@@ -0,0 +1,10 @@
+@echo off
+chcp 65001 > nul
+echo === Trading Chart System (Production Server) ===
+echo.
+
+rem Windows 不支援 fork，server.py 會自動使用 threaded 模式（已安裝 waitress 時使用 waitress）
+cd src\backend
+python server.py %*
+
+pause
@@ -0,0 +1,255 @@
+"""
+非同步 API 層（AsyncAPI）單元測試
+
+以最小的 ASGI 客戶端（直接呼叫 app(scope, receive, send) 並收集送出的訊息）測試，
+不需要 ASGI 伺服器。
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import backend.app as app_module
+from backend.asgi_app import AsyncAPI, ServerBusy, call_wsgi
+from backend.request_metrics import request_metrics
+from benchmarks.synthetic_data import single_symbol_registry, synthetic_processor
+
+
+def make_scope(path, query=b'', method='GET', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+            'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+            'http_version': '1.1', 'scheme': 'http', 'server': ('test', 80), 'client': ('127.0.0.1', 1)}
+
+
+async def call(app, path, query=b'', method='GET', body=b'', headers=(), send_hook=None):
+    """送出一個 HTTP 請求，返回 (status, headers, body 訊息列表)"""
+    messages = []
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()  # 連線持續到回應結束
+
+    async def send(message):
+        messages.append(message)
+        if send_hook is not None:
+            send_hook(message)
+
+    await app(make_scope(path, query, method, headers), receive, send)
+    start = messages[0]
+    return start['status'], dict(start['headers']), [m for m in messages[1:]]
+
+
+def body_of(messages):
+    return b''.join(m.get('body', b'') for m in messages)
+
+
+class TestAsyncAPI(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp, days=20)
+        cls.patch = mock.patch.object(app_module, 'symbol_registry', single_symbol_registry(cls.processor))
+        cls.patch.start()
+        cls.dates = [str(d) for d in sorted(cls.processor.available_dates)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patch.stop()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def setUp(self):
+        self.api = AsyncAPI(app_module.app, max_workers=2, max_pending=8, fallback_workers=2,
+                            load_on_startup=False)
+        self.processor.response_cache.clear()
+
+    def tearDown(self):
+        self.api.executor.shutdown(wait=True)
+        self.api.fallback_executor.shutdown(wait=True)
+
+    def test_heavy_route_matches_flask_and_records_metrics(self):
+        """測試重運算端點與 Flask 的內容相同，且記錄 total 與資料處理層的階段"""
+        date = self.dates[len(self.dates) // 2]
+        rule = '/api/data/<date>/<timeframe>'
+
+        def stage_counts():
+            return {stage: hist['count'] for (endpoint, timeframe, stage), hist in request_metrics.snapshot().items()
+                    if endpoint == rule and timeframe == 'H1'}
+
+        # 同一請求內重複執行的階段（date_lookup、serialization）只記錄一次
+        request_metrics.reset()
+        flask_body = app_module.app.test_client().get(f'/api/data/{date}/H1').get_json()
+        counts = stage_counts()
+        self.assertTrue({'total', 'date_lookup', 'fvg_detection', 'serialization'} <= set(counts))
+        self.assertEqual(set(counts.values()), {1})
+        self.processor.response_cache.clear()
+
+        request_metrics.reset()
+        status, headers, messages = asyncio.run(call(self.api, f'/api/data/{date}/H1'))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body_of(messages)), flask_body)
+        counts = stage_counts()
+        self.assertTrue({'total', 'date_lookup', 'fvg_detection', 'json_encoding'} <= set(counts))
+        self.assertEqual(set(counts.values()), {1})
+
+        # 快取命中（含304）也記錄 total
+        etag = headers[b'etag'].decode('latin-1')
+        status, _, _ = asyncio.run(call(self.api, f'/api/data/{date}/H1', headers=[('If-None-Match', etag)]))
+        self.assertEqual(status, 304)
+        total = request_metrics.snapshot()[('/api/data/<date>/<timeframe>', 'H1', 'total')]
+        self.assertEqual(total['count'], 2)
+
+    def test_malformed_date_returns_400(self):
+        """測試路徑日期格式錯誤時 ASGI 與 Flask 皆返回400"""
+        client = app_module.app.test_client()
+        for path in ('/api/data/2023-13-45/H1', '/api/playback-data/not-a-date/M15',
+                     '/api/m1-playback-data/20230105'):
+            status, _, messages = asyncio.run(call(self.api, path))
+            self.assertEqual(status, 400, path)
+            self.assertIn('error', json.loads(body_of(messages)))
+            self.assertEqual(client.get(path).status_code, 400, path)
+
+    def test_coalesces_identical_requests(self):
+        """測試相同 key 的同時請求只計算一次"""
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return 'result'
+
+        async def run():
+            tasks = [asyncio.ensure_future(self.api.run_coalesced(('k',), compute)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*tasks)
+
+        self.assertEqual(asyncio.run(run()), ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.api.stats['coalesced'], 4)
+        self.assertEqual(self.api.get_stats()['pending'], 0)
+
+    def test_rejects_beyond_max_pending(self):
+        """測試待處理數達上限時拒絕新計算，HTTP 回應為503並帶 Retry-After"""
+        release = threading.Event()
+
+        async def run():
+            first = asyncio.ensure_future(self.api.run_coalesced(('a',), lambda: release.wait(5)))
+            await asyncio.sleep(0)
+            self.api.max_pending = 1
+            with self.assertRaises(ServerBusy):
+                await self.api.run_coalesced(('b',), lambda: None)
+            release.set()
+            await first
+
+        asyncio.run(run())
+        self.assertEqual(self.api.stats['rejected'], 1)
+
+        self.api.max_pending = 0
+        status, headers, _ = asyncio.run(call(self.api, f'/api/data/{self.dates[3]}/M15'))
+        self.assertEqual(status, 503)
+        self.assertEqual(headers[b'retry-after'], b'1')
+
+    def test_wsgi_bridge(self):
+        """測試轉交 Flask 的輕量端點（事件迴圈上）與一般端點（執行緒池）"""
+        status, _, messages = asyncio.run(call(self.api, '/api/timeframes'))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body_of(messages)), self.processor.get_available_timeframes())
+
+        status, _, messages = asyncio.run(call(self.api, '/api/date-range'))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body_of(messages))['min_date'], self.dates[0])
+
+        status, headers, body = call_wsgi(app_module.app, make_scope('/api/no-such-route'), b'')
+        self.assertEqual(status, 404)
+
+    def test_batch_data_is_streamed(self):
+        """測試串流回應逐塊送出（多個 body 訊息、不帶 content-length），內容與 Flask 相同"""
+        query = f"dates={','.join(self.dates[2:7])}&timeframes=M15,H1".encode('latin-1')
+        expected = app_module.app.test_client().get('/api/batch-data?' + query.decode('latin-1')).data
+
+        status, headers, messages = asyncio.run(call(self.api, '/api/batch-data', query=query))
+        self.assertEqual(status, 200)
+        self.assertNotIn(b'content-length', headers)
+        self.assertGreaterEqual(len([m for m in messages if m.get('body')]), 10)
+        self.assertTrue(all(m.get('more_body') for m in messages[:-1]))
+        self.assertFalse(messages[-1].get('more_body', False))
+        self.assertEqual(body_of(messages), expected)
+
+    def test_stream_stops_when_client_disconnects(self):
+        """測試送出失敗（客戶端斷線）時串流結束，不會卡住產生端"""
+        query = f"dates={','.join(self.dates)}&timeframes=M1".encode('latin-1')
+        sent = []
+
+        def hook(message):
+            sent.append(message)
+            if len(sent) == 3:
+                raise OSError('client disconnected')
+
+        with self.assertRaises(OSError):
+            asyncio.run(call(self.api, '/api/batch-data', query=query, send_hook=hook))
+        self.assertEqual(len(sent), 3)
+
+    def test_lifespan(self):
+        """測試 lifespan 啟動與關閉"""
+        async def run():
+            inbox = asyncio.Queue()
+            sent = []
+            for message in ({'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}):
+                inbox.put_nowait(message)
+
+            async def send(message):
+                sent.append(message['type'])
+
+            await self.api({'type': 'lifespan'}, inbox.get, send)
+            return sent
+
+        self.assertEqual(asyncio.run(run()), ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_live_stream_sends_snapshot(self):
+        """測試即時推送先送出快照事件，客戶端斷線後結束並取消訂閱"""
+        async def run():
+            messages = []
+            disconnect = asyncio.Event()
+            first_event = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if message.get('body'):
+                    first_event.set()
+
+            task = asyncio.ensure_future(self.api(make_scope('/api/live/stream', b'timeframes=H1'), receive, send))
+            await asyncio.wait_for(first_event.wait(), 5)
+            disconnect.set()
+            await asyncio.wait_for(task, 5)
+            return messages
+
+        messages = asyncio.run(run())
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertTrue(messages[1]['body'].startswith(b'data: '))
+        event = json.loads(messages[1]['body'][len(b'data: '):])
+        self.assertEqual(event['type'], 'snapshot')
+        self.assertEqual(set(event['timeframes']), {'H1'})
+        self.assertEqual(self.processor.get_live_feed().get_stats()['subscribers'], 0)
+
+        status, _, _ = asyncio.run(call(self.api, '/api/live/stream', b'timeframes=M2'))
+        self.assertEqual(status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+批次開盤前資料（get_pre_market_batch 與 /api/batch-data）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import json
+import shutil
+import struct
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+import backend.app as app_module
+from backend.app import parse_batch_request
+from benchmarks.synthetic_data import single_symbol_registry, synthetic_processor
+
+
+class TestParseBatchRequest(unittest.TestCase):
+
+    def test_valid_payloads(self):
+        """測試逗號分隔字串與字串陣列"""
+        dates, timeframes, output_format = parse_batch_request(
+            {'dates': '2024-01-02, 2024-01-03', 'timeframes': 'M15,H1', 'format': 'frames'})
+        self.assertEqual(dates, [date(2024, 1, 2), date(2024, 1, 3)])
+        self.assertEqual(timeframes, ['M15', 'H1'])
+        self.assertEqual(output_format, 'frames')
+
+        dates, timeframes, output_format = parse_batch_request({'dates': ['2024-01-02']})
+        self.assertEqual(dates, [date(2024, 1, 2)])
+        self.assertEqual(len(timeframes), 1)
+        self.assertEqual(output_format, 'ndjson')
+
+    def test_invalid_payloads_raise_value_error(self):
+        """測試型別錯誤一律拋出 ValueError（端點返回400）"""
+        for payload in ([], ['2024-01-02'], '2024-01-02', 5,
+                        {'dates': 5}, {'dates': {'a': 1}}, {'dates': [20240102]},
+                        {'dates': '2024-01-02', 'timeframes': [{'tf': 'H1'}]},
+                        {'dates': '2024-01-02', 'timeframes': 7},
+                        {'dates': '2024-01-02', 'format': ['ndjson']},
+                        {'dates': '2024-13-45'}, {}, {'dates': '2024-01-02', 'timeframes': 'M2'}):
+            with self.assertRaises(ValueError, msg=repr(payload)):
+                parse_batch_request(payload)
+
+
+class TestBatchData(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp, days=10)
+        cls.patch = mock.patch.object(app_module, 'symbol_registry', single_symbol_registry(cls.processor))
+        cls.patch.start()
+        cls.dates = sorted(cls.processor.available_dates)
+        cls.client = app_module.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patch.stop()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_records_match_single_date_lookup(self):
+        """測試找到的紀錄與 get_pre_market_data 相同，缺少的日期或時間刻度產生錯誤紀錄"""
+        missing = date(2001, 1, 2)
+        dates = [self.dates[3], missing, self.dates[6]]
+        records = list(self.processor.get_pre_market_batch(dates, ['M15', 'H1', 'M2']))
+        self.assertEqual(len(records), 9)
+
+        for record in records:
+            if record['timeframe'] == 'M2':
+                self.assertIn('未載入', record['error'])
+            elif record['date'] == '2001-01-02':
+                self.assertEqual(set(record), {'date', 'timeframe', 'error'})
+            else:
+                target = date.fromisoformat(record['date'])
+                self.assertNotIn('error', record)
+                self.assertEqual(record, self.processor.get_pre_market_data(target, record['timeframe']))
+
+    def test_single_date_lookup_edges(self):
+        """測試單日查詢：第一個交易日（窗口被截短）、不存在的日期與週末"""
+        df = self.processor.data_cache['M15']
+        day_bars = df[df['Date_Only'] == self.dates[0]]
+        first = self.processor.get_pre_market_data(self.dates[0], 'M15')
+        self.assertEqual(first['date'], str(self.dates[0]))
+        self.assertEqual(len(first['data']), df.index.get_loc(day_bars.index[-1]) + 1)
+        self.assertEqual(first['data'][-1]['time'], int(day_bars['DateTime'].iloc[-1].timestamp()))
+        self.assertIsNone(self.processor.get_pre_market_data(date(2001, 1, 2), 'M15'))
+        saturday = next(d for d in (self.dates[0] + timedelta(days=k) for k in range(7)) if d.weekday() == 5)
+        self.assertIsNone(self.processor.get_pre_market_data(saturday, 'H1'))
+
+    def _get(self, output_format):
+        dates = ','.join(str(d) for d in self.dates[2:5])
+        response = self.client.get(f'/api/batch-data?dates={dates}&timeframes=M15,H1&format={output_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Record-Count'], '6')
+        return response
+
+    def test_ndjson_encoding(self):
+        """測試 ndjson 每行一筆，內容與 get_pre_market_batch 相同"""
+        response = self._get('ndjson')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode('utf-8').splitlines()
+        expected = list(self.processor.get_pre_market_batch(self.dates[2:5], ['M15', 'H1']))
+        self.assertEqual([json.loads(line) for line in lines], json.loads(json.dumps(expected)))
+
+    def test_frames_encoding(self):
+        """測試 frames 每筆為4位元組大端長度前綴加 UTF-8 JSON"""
+        response = self._get('frames')
+        self.assertEqual(response.mimetype, 'application/octet-stream')
+        data, offset, records = response.data, 0, []
+        while offset < len(data):
+            (length,) = struct.unpack('>I', data[offset:offset + 4])
+            records.append(json.loads(data[offset + 4:offset + 4 + length].decode('utf-8')))
+            offset += 4 + length
+        self.assertEqual(offset, len(data))
+        self.assertEqual(records, [json.loads(line) for line in self._get('ndjson').data.decode('utf-8').splitlines()])
+        self.assertEqual([(r['date'], r['timeframe']) for r in records],
+                         [(str(d), tf) for tf in ('M15', 'H1') for d in self.dates[2:5]])
+
+    def test_post_and_bad_requests(self):
+        """測試 POST 與型別錯誤的請求返回400（而非500）"""
+        body = {'dates': [str(self.dates[2])], 'timeframes': ['H1'], 'format': 'frames'}
+        response = self.client.post('/api/batch-data', json=body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Record-Count'], '1')
+
+        for body in ({'dates': 5}, ['2024-01-02'], 'x', {'dates': [str(self.dates[2])], 'timeframes': [1]}):
+            response = self.client.post('/api/batch-data', json=body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn('error', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+K線連續性檢查器V2單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+import pandas as pd
+from backend.candle_continuity_checker_v2 import CandleContinuityCheckerV2, ThroughputHistory
+from benchmarks.synthetic_data import generate_m1
+from utils.continuity_config import AUTO_MODE_CONFIG
+
+
+class TestTradingSegments(unittest.TestCase):
+
+    def setUp(self):
+        """測試設置"""
+        self.checker = CandleContinuityCheckerV2(optimization_mode='smart', show_progress=False)
+        # 2023-03-02(週四) 15:00 ~ 2023-03-03(週五) 19:00，每小時一根
+        times = pd.date_range('2023-03-02 15:00', '2023-03-03 19:00', freq='h')
+        self.df = pd.DataFrame({'DateTime': times})
+
+    def test_segments_split_on_close_hour(self):
+        """測試17點收盤時段切分交易時段"""
+        segments = self.checker._identify_trading_segments(self.df, 'H1')
+
+        # 15,16 | 18..16(次日) | 18,19
+        self.assertEqual(segments, [(0, 2), (3, 26), (27, 29)])
+        for start, end in segments:
+            hours = self.df['DateTime'].iloc[start:end].dt.hour
+            self.assertFalse((hours == 17).any())
+
+    def test_segments_skip_weekend(self):
+        """測試週末不屬於任何交易時段"""
+        times = pd.date_range('2023-03-03 10:00', '2023-03-06 02:00', freq='h')
+        df = pd.DataFrame({'DateTime': times})
+        segments = self.checker._identify_trading_segments(df, 'H1')
+
+        covered = [t for start, end in segments for t in df['DateTime'].iloc[start:end]]
+        self.assertTrue(all(t.weekday() < 5 for t in covered))
+        self.assertEqual(covered[-1], pd.Timestamp('2023-03-06 02:00'))
+
+    def test_smart_check_reports_missing_bar(self):
+        """測試段內缺失K線被識別為數據缺失"""
+        df = self.df.drop(index=[5]).reset_index(drop=True)
+        result = self.checker.check_continuity(df, 'H1')
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertEqual(result['summary']['total_data_gaps'], 1)
+        self.assertEqual(result['summary']['total_trading_gaps'], 2)
+        self.assertEqual(result['data_gaps'][0]['end_index'], 5)
+
+
+class TestAutoMode(unittest.TestCase):
+
+    def setUp(self):
+        """測試設置（速度紀錄不落盤）"""
+        self.history = ThroughputHistory(filepath=None)
+        self.checker = CandleContinuityCheckerV2(optimization_mode='auto', show_progress=False,
+                                                 throughput_history=self.history)
+
+    def test_prefers_fastest_measured_mode(self):
+        """測試優先選擇歷史實測最快的策略"""
+        self.history.record('M15', 'hybrid', 100000, 1.0)
+        self.history.record('M15', 'vectorized', 100000, 0.1)
+
+        plan = self.checker.select_auto_strategy(50000, 'M15')
+        self.assertEqual(plan['mode'], 'vectorized')
+        self.assertEqual(plan['source'], 'measured_throughput')
+        self.assertIsNone(plan['sample_size'])
+
+    def test_degrades_to_sampling_over_budget(self):
+        """測試預估超出時間預算時改用採樣檢查"""
+        self.history.record('H4', 'parallel', 10000, 1.0)
+        self.history.record('H4', 'vectorized', 10000, 1.0)
+
+        plan = self.checker.select_auto_strategy(200000, 'H4')
+        self.assertIsNotNone(plan['sample_size'])
+        self.assertLess(plan['sample_size'], 200000)
+
+    def test_report_contains_strategy(self):
+        """測試報告包含所用策略及目標達成情況"""
+        times = pd.date_range('2023-03-06 00:00', periods=500, freq='15min')
+        result = self.checker.check_continuity(pd.DataFrame({'DateTime': times}), 'M15')
+
+        self.assertEqual(result['status'], 'completed')
+        self.assertIn(result['auto']['strategy'], AUTO_MODE_CONFIG['candidate_modes'])
+        self.assertIn('target_met', result['auto'])
+
+    def test_candidate_modes_produce_identical_reports(self):
+        """測試自動模式的候選策略產生相同的報告（結果不隨選中的策略改變）"""
+        m1 = generate_m1(days=10, seed=4, gap_rate=0.002).reset_index()
+        df = pd.concat([m1, m1.iloc[[100, 2000]]]).sort_values('DateTime').reset_index(drop=True)
+
+        reports = {}
+        for mode in AUTO_MODE_CONFIG['candidate_modes']:
+            report = self.checker._run_mode(mode, df, 'M1')
+            reports[mode] = {k: v for k, v in report.items() if k not in ('performance', 'optimization_mode')}
+        reference = reports.pop(AUTO_MODE_CONFIG['candidate_modes'][0])
+        self.assertEqual(reference['summary']['total_duplicates'], 2)
+        self.assertGreater(reference['summary']['total_data_gaps'], 0)
+        for report in reports.values():
+            self.assertEqual(report, reference)
+
+    def test_no_sampling_without_measured_speed(self):
+        """測試沒有實測速度時完整檢查（目標速度預估超出預算也不採樣）"""
+        plan = self.checker.select_auto_strategy(2_000_000, 'M1')
+        self.assertIn(plan['mode'], AUTO_MODE_CONFIG['candidate_modes'])
+        self.assertGreater(plan['predicted_seconds'], plan['budget_seconds'])
+        self.assertIsNone(plan['sample_size'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+連續性報告持久化單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import tempfile
+import unittest
+import pandas as pd
+from backend.candle_continuity_checker_v2 import CandleContinuityCheckerV2
+from backend.continuity_store import ContinuityReportStore, paginate_report
+
+
+class TestContinuityReportStore(unittest.TestCase):
+
+    def setUp(self):
+        """測試設置：週一至週五的M15資料，移除部分K線製造間隔"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checker = CandleContinuityCheckerV2(optimization_mode='hybrid', show_progress=False,
+                                                 gap_list_limit=None)
+        times = pd.date_range('2023-03-06 00:00', periods=4000, freq='15min')
+        df = pd.DataFrame({'DateTime': times[times.weekday < 5]})
+        self.df = df.drop(index=[50, 51, 2500]).reset_index(drop=True)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_incremental_matches_full_check(self):
+        """測試增量檢查結果與完整檢查一致"""
+        full = self.checker.check_continuity(self.df, 'M15')
+
+        ContinuityReportStore(self.tmp_dir.name).update('M15', self.df.iloc[:2000], self.checker)
+        # 模擬重啟：新的存儲實例從磁碟讀取水位線
+        report = ContinuityReportStore(self.tmp_dir.name).update('M15', self.df, self.checker)
+
+        self.assertEqual(report['incremental']['mode'], 'incremental')
+        for key in ('total_candles', 'total_data_gaps', 'total_trading_gaps', 'total_missing_data'):
+            self.assertEqual(report['summary'][key], full['summary'][key])
+        self.assertEqual([g['end_index'] for g in report['data_gaps']],
+                         [g['end_index'] for g in full['data_gaps']])
+
+    def test_modified_prefix_triggers_full_check(self):
+        """測試已檢查前綴被修改時重新完整檢查"""
+        store = ContinuityReportStore(self.tmp_dir.name)
+        store.update('M15', self.df, self.checker)
+        self.assertEqual(store.update('M15', self.df, self.checker)['incremental']['mode'], 'cached')
+
+        modified = self.df.copy()
+        modified.loc[10, 'DateTime'] += pd.Timedelta(minutes=1)
+        self.assertEqual(store.update('M15', modified, self.checker)['incremental']['mode'], 'full')
+
+    def test_paginate_report(self):
+        """測試分頁返回完整間隔列表"""
+        report = ContinuityReportStore(self.tmp_dir.name).update('M15', self.df, self.checker)
+        page = paginate_report(report, page=2, page_size=3)
+
+        self.assertEqual(page['pagination']['totals']['trading_gaps'], len(report['trading_gaps']))
+        self.assertEqual(page['trading_gaps'], report['trading_gaps'][3:6])
+
+
+if __name__ == '__main__':
+    unittest.main()
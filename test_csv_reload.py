@@ -0,0 +1,153 @@
+"""
+追加CSV熱重載單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import io
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import backend.app as app_module
+from backend import worker_registry
+from backend.csv_reload import csv_file_state, read_appended_rows
+from backend.worker_registry import WorkerRegistry
+from benchmarks.synthetic_data import load_processor, single_symbol_registry, write_dataset
+from utils.config import CSV_FILES
+
+
+def read_lines(path):
+    with open(path, 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+
+def write_lines(path, lines, mode='wb'):
+    with open(path, mode) as f:
+        f.write(b''.join(lines))
+
+
+class TestReadAppendedRows(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        write_dataset(self.tmp, {'H1': 'MNQ_H1.csv'}, days=10)
+        self.path = os.path.join(self.tmp, 'MNQ_H1.csv')
+        self.lines = read_lines(self.path)
+        write_lines(self.path, self.lines[:-10])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_unchanged(self):
+        """測試檔案未變更時不讀取"""
+        state = csv_file_state(self.path)
+        mode, rows, new_state = read_appended_rows(self.path, state)
+        self.assertEqual(mode, 'unchanged')
+        self.assertIsNone(rows)
+        self.assertEqual(new_state, state)
+
+    def test_appended_rows_and_partial_line(self):
+        """測試只解析新增的完整列，未寫完的最後一列留待下次"""
+        state = csv_file_state(self.path)
+        write_lines(self.path, self.lines[-10:-4] + [self.lines[-4][:8]], mode='ab')
+
+        mode, rows, state = read_appended_rows(self.path, state)
+        self.assertEqual(mode, 'appended')
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(list(rows.columns), ['Date', 'Time', 'Open', 'High', 'Low', 'Close', 'Volume'])
+
+        write_lines(self.path, [self.lines[-4][8:]] + self.lines[-3:], mode='ab')
+        mode, rows, state = read_appended_rows(self.path, state)
+        self.assertEqual(len(rows), 4)
+        expected = pd.read_csv(io.BytesIO(self.lines[0] + b''.join(self.lines[-4:])))
+        pd.testing.assert_frame_equal(rows, expected)
+        self.assertEqual(state['size'], os.path.getsize(self.path))
+
+    def test_rewritten(self):
+        """測試檔案變小或已載入部分被修改時需完整載入"""
+        state = csv_file_state(self.path)
+        write_lines(self.path, self.lines[:-12])
+        self.assertEqual(read_appended_rows(self.path, state)[0], 'rewritten')
+
+        write_lines(self.path, self.lines[:-11] + [self.lines[-11].replace(b',', b';', 1)] + self.lines[-10:])
+        self.assertEqual(read_appended_rows(self.path, state)[0], 'rewritten')
+
+
+class TestReloadAppended(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.data_dir = os.path.join(self.tmp, 'data')
+        write_dataset(self.data_dir, CSV_FILES, days=21)
+        self.full = {}
+        for filename in CSV_FILES.values():
+            path = os.path.join(self.data_dir, filename)
+            self.full[path] = read_lines(path)
+            write_lines(path, self.full[path][:-max(2, len(self.full[path]) // 10)])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def load(self, name):
+        return load_processor(self.data_dir, os.path.join(self.tmp, name))
+
+    def test_reload_matches_full_load(self):
+        """測試追加後熱重載的結果與重新完整載入相同，且舊資料物件不被修改"""
+        processor = self.load('reloaded')
+        before = processor.data_cache['M1']
+        before_rows, before_dates = len(before), len(processor.available_dates)
+        index_dir = os.path.join(self.tmp, 'reloaded', 'range_index')
+        index_files = {tf: sorted(os.listdir(os.path.join(index_dir, tf))) for tf in os.listdir(index_dir)}
+
+        for path, lines in self.full.items():
+            write_lines(path, lines)
+        result = processor.reload_appended()
+
+        self.assertEqual(set(result['reloaded']), set(CSV_FILES))
+        self.assertEqual(len(before), before_rows)
+        self.assertGreater(len(processor.available_dates), before_dates)
+
+        reference = self.load('reference')
+        for timeframe in CSV_FILES:
+            pd.testing.assert_frame_equal(processor.data_cache[timeframe], reference.data_cache[timeframe])
+            self.assertTrue(np.array_equal(np.sort(processor.fvg_days[timeframe]),
+                                           np.sort(reference.fvg_days[timeframe])))
+            report = processor.continuity_reports[timeframe]
+            expected = reference.continuity_reports[timeframe]
+            self.assertEqual(report['incremental']['mode'], 'incremental')
+            self.assertEqual(report['summary'], expected['summary'])
+            self.assertEqual(report['data_gaps'], expected['data_gaps'])
+            # 多解析度K線與區間極值索引為尾端延伸的結果，與完整載入相同
+            for got, want in zip(processor.pyramids[timeframe].levels, reference.pyramids[timeframe].levels):
+                for name in want:
+                    np.testing.assert_array_equal(got[name], want[name])
+            for name, table in reference.range_indexes[timeframe].tables.items():
+                np.testing.assert_array_equal(processor.range_indexes[timeframe].tables[name], table)
+        self.assertEqual(processor.available_dates, reference.available_dates)
+        # 熱重載只更新記憶體中的索引，不重寫索引檔
+        self.assertEqual({tf: sorted(os.listdir(os.path.join(index_dir, tf))) for tf in os.listdir(index_dir)},
+                         index_files)
+        self.assertEqual(processor.reload_appended()['reloaded'], {})
+
+    def test_reload_endpoint_signals_other_workers(self):
+        """測試 prefork 多 worker 時 /api/reload 更新本 worker 並通知其他 worker"""
+        processor = self.load('endpoint')
+        for path, lines in self.full.items():
+            write_lines(path, lines)
+        registry = WorkerRegistry(3)
+        with mock.patch.object(app_module, 'symbol_registry', single_symbol_registry(processor)), \
+                mock.patch.object(worker_registry, '_active', (registry, 0)):
+            result = app_module.app.test_client().post('/api/reload').get_json()
+
+        self.assertEqual(set(result['reloaded']), set(CSV_FILES))
+        self.assertEqual(result['workers_signalled'], 3)
+        self.assertEqual(registry.reload_generation(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+CSV 日期掃描單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import tempfile
+import unittest
+import datetime
+from unittest import mock
+from backend.csv_scanner import scan_csv_dates
+
+
+class TestScanCsvDates(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_exact_dates_and_rows(self):
+        """測試取得精確交易日與記錄數（CRLF、無結尾換行、小區塊）"""
+        lines = [b'Date,Time,Open,High,Low,Close,Volume']
+        for day in (b'03/06/2023', b'03/07/2023', b'03/09/2023'):
+            for minute in range(30):
+                lines.append(day + b',10:%02d,1,2,0.5,1.5,10' % minute)
+        path = self._write('m1.csv', b'\r\n'.join(lines))
+
+        result = scan_csv_dates(path, chunk_bytes=256)
+        self.assertEqual(result['method'], 'mmap')
+        self.assertEqual(result['row_count'], 90)
+        self.assertEqual(result['dates'], {datetime.date(2023, 3, 6), datetime.date(2023, 3, 7),
+                                           datetime.date(2023, 3, 9)})
+        self.assertEqual(result['date_rows'][datetime.date(2023, 3, 7)], 30)
+        self.assertEqual(result['end_date'], datetime.date(2023, 3, 9))
+
+    def test_fallback_for_unpadded_dates(self):
+        """測試非固定寬度日期時退回 pandas 掃描"""
+        path = self._write('d1.csv', b'Date,Open,High,Low,Close,Volume\n3/6/2023,1,2,0.5,1.5,10\n3/7/2023,1,2,0.5,1.5,10\n')
+
+        result = scan_csv_dates(path)
+        self.assertEqual(result['method'], 'pandas')
+        self.assertEqual(result['row_count'], 2)
+        self.assertEqual(result['start_date'], datetime.date(2023, 3, 6))
+
+    @unittest.skipUnless(os.path.exists('/proc/self/maps'), '需要 /proc/self/maps')
+    def test_mapping_released_after_scan(self):
+        """測試掃描後（含格式不符與掃描中發生例外時）不再映射檔案"""
+        path = self._write('m5.csv', b'Date,Time,Open\n03/06/2023,10:00,1\n03/07/2023,10:00,1\n')
+
+        def mapped():
+            with open('/proc/self/maps') as f:
+                return os.path.realpath(path) in f.read()
+
+        self.assertEqual(scan_csv_dates(path)['method'], 'mmap')
+        self.assertFalse(mapped())
+
+        def failing_scan(buf, chunk_bytes):
+            head = buf[:10]  # 例外的 traceback 仍引用映射中的陣列
+            raise RuntimeError(bytes(head))
+
+        with mock.patch('backend.csv_scanner._scan_buffer', failing_scan):
+            self.assertEqual(scan_csv_dates(path)['method'], 'pandas')
+            self.assertFalse(mapped())
+
+
+if __name__ == '__main__':
+    unittest.main()
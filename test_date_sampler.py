@@ -0,0 +1,68 @@
+"""
+日期抽樣器單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+import datetime
+import numpy as np
+import pandas as pd
+from backend.date_sampler import DateSampler
+
+
+class TestDateSampler(unittest.TestCase):
+
+    def setUp(self):
+        """測試設置：2023年全年的平日"""
+        days = pd.bdate_range('2023-01-02', '2023-12-29')
+        self.dates = {d.date() for d in days}
+        self.sampler = DateSampler.from_dates(self.dates, seed=42)
+
+    def test_ordinals_sorted_int32(self):
+        """測試日期以排序的 int32 日序數保存"""
+        self.assertEqual(self.sampler.ordinals.dtype, np.int32)
+        self.assertTrue((np.diff(self.sampler.ordinals) > 0).all())
+        self.assertEqual(len(self.sampler), len(self.dates))
+
+    def test_unfiltered_sample(self):
+        """測試無條件抽樣只返回可用日期"""
+        picks = self.sampler.sample(500)
+        self.assertEqual(len(picks), 500)
+        self.assertTrue(set(picks) <= self.dates)
+
+    def test_calendar_filters(self):
+        """測試星期、月份、夏令時間篩選"""
+        picks = self.sampler.sample(200, weekdays=[0], months=[7])
+        self.assertTrue(all(d.weekday() == 0 and d.month == 7 for d in picks))
+
+        winter = self.sampler.sample(200, is_dst=False)
+        self.assertTrue(all(d.month in (1, 2, 3, 11, 12) for d in winter))
+
+    def test_holiday_distance(self):
+        """測試假日距離特徵（2023-07-04 獨立日）"""
+        picks = self.sampler.sample(500, max_holiday_distance=0)
+        self.assertIn(datetime.date(2023, 7, 4), picks)
+        self.assertEqual(self.sampler.count(max_holiday_distance=0), 9)
+        position = int(np.searchsorted(self.sampler.ordinals, datetime.date(2023, 7, 5).toordinal()))
+        self.assertEqual(self.sampler.features['holiday_distance'][position], 1)
+
+    def test_fvg_count_filter(self):
+        """測試依每日FVG數量篩選"""
+        busy_day = datetime.date(2023, 3, 15)
+        formation = np.array([busy_day.toordinal()] * 5 + [datetime.date(2023, 3, 16).toordinal()])
+        self.sampler.set_fvg_counts('M15', formation)
+
+        picks = self.sampler.sample(50, min_fvgs=3, fvg_timeframe='M15')
+        self.assertEqual(set(picks), {busy_day})
+        self.assertEqual(self.sampler.count(min_fvgs=1, fvg_timeframe='M15'), 2)
+
+    def test_no_match_returns_empty(self):
+        """測試沒有合格日期時返回空列表"""
+        self.assertEqual(self.sampler.sample(5, weekdays=[5]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
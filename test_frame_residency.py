@@ -0,0 +1,104 @@
+"""
+時間刻度記憶體預算與磁碟換出（FrameResidency）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from backend.frame_residency import FrameResidency, write_columnar, map_columnar
+from benchmarks.synthetic_data import generate_bars
+
+
+def make_frame(count, timeframe, seed):
+    """與 load_all_data 相同的欄位組成（Date/Time 字串、DateTime、Date_Only 日期物件）"""
+    bars = generate_bars(count, timeframe, seed=seed)
+    bars.insert(0, 'Date', bars['DateTime'].dt.strftime('%m/%d/%Y'))
+    bars.insert(1, 'Time', bars['DateTime'].dt.strftime('%H:%M'))
+    bars['Date_Only'] = bars['DateTime'].dt.date
+    return bars
+
+
+class TestFrameResidency(unittest.TestCase):
+
+    def setUp(self):
+        self.spill_root = tempfile.mkdtemp()
+        self.frames = {tf: make_frame(2000, tf, seed) for seed, tf in enumerate(['M5', 'M15', 'H1'])}
+        self.size = max(int(f.memory_usage(deep=True).sum()) for f in self.frames.values())
+
+    def tearDown(self):
+        shutil.rmtree(self.spill_root, ignore_errors=True)
+
+    def test_columnar_round_trip(self):
+        """測試欄式寫出後重新映射與原資料相同"""
+        frame = self.frames['M5']
+        path = os.path.join(self.spill_root, 'M5')
+        write_columnar(frame, path)
+        mapped, mapped_bytes = map_columnar(path)
+
+        pd.testing.assert_frame_equal(mapped, frame)
+        self.assertIs(type(mapped['Date_Only'].iloc[0]), type(frame['Date_Only'].iloc[0]))
+        self.assertGreater(mapped_bytes, 0)
+
+        # 寫入時複製：修改不影響磁碟上的檔案
+        mapped.loc[0, 'Close'] = -1.0
+        self.assertEqual(map_columnar(path)[0].loc[0, 'Close'], frame.loc[0, 'Close'])
+
+    def test_evicts_least_recently_used(self):
+        """測試超過預算時換出最久未存取的時間刻度，存取時重新映射"""
+        cache = FrameResidency(self.spill_root, budget_bytes=int(self.size * 2.5))
+        cache['M5'] = self.frames['M5']
+        cache['M15'] = self.frames['M15']
+        cache['M5']                          # M15 成為最久未存取
+        cache['H1'] = self.frames['H1']
+
+        self.assertTrue(cache.is_resident('M5'))
+        self.assertFalse(cache.is_resident('M15'))
+        self.assertEqual(list(cache), ['M5', 'M15', 'H1'])
+        self.assertIn('M15', cache)
+
+        # 重新映射的字串/日期欄位仍佔堆積記憶體，預算內換出下一個最久未存取的 M5
+        pd.testing.assert_frame_equal(cache['M15'], self.frames['M15'])
+        self.assertFalse(cache.is_resident('M5'))
+        stats = cache.get_stats()
+        self.assertEqual((stats['evictions'], stats['remaps'], stats['spill_writes']), (2, 1, 2))
+        self.assertGreater(stats['timeframes']['M15']['mapped_bytes'], 0)
+        self.assertLessEqual(cache.resident_bytes(), cache.budget_bytes)
+
+    def test_replacing_frame_invalidates_spill(self):
+        """測試替換資料後不再使用舊的換出檔案"""
+        cache = FrameResidency(self.spill_root, budget_bytes=self.size * 10)
+        cache['M5'] = self.frames['M5']
+        self.assertTrue(cache.evict('M5'))
+
+        appended = make_frame(2100, 'M5', 0)
+        cache['M5'] = appended
+        self.assertTrue(cache.evict('M5'))
+        self.assertEqual(len(cache['M5']), 2100)
+        self.assertEqual(cache.get_stats()['spill_writes'], 2)
+
+    def test_unsupported_frame_stays_resident(self):
+        """測試無法換出的資料保持常駐"""
+        cache = FrameResidency(self.spill_root, budget_bytes=self.size * 10)
+        frame = self.frames['M5'].copy()
+        frame['Note'] = [{'x': 1}] * len(frame)
+        cache['M5'] = frame
+        self.assertFalse(cache.evict('M5'))
+        self.assertTrue(cache.is_resident('M5'))
+        self.assertIsNotNone(cache.get_stats()['timeframes']['M5']['unspillable'])
+
+    def test_disabled_keeps_everything(self):
+        """測試停用時不換出"""
+        cache = FrameResidency(self.spill_root, budget_bytes=1, enabled=False)
+        for tf, frame in self.frames.items():
+            cache[tf] = frame
+        self.assertTrue(all(cache.is_resident(tf) for tf in self.frames))
+        self.assertEqual(cache.get_stats()['evictions'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+批次窗口 FVG 檢測單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+from backend.fvg_detector_simple import FVGDetectorSimple
+from benchmarks.synthetic_data import generate_bars
+
+
+class TestDetectFvgsWindows(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bars = generate_bars(1500, 'M5', seed=7)
+
+    def _per_window(self, windows):
+        detector = FVGDetectorSimple(clearing_window=40)
+        return [detector.convert_for_frontend(
+                    detector.detect_fvgs(self.bars.iloc[start:end + 1], timeframe='M5'))
+                for start, end in windows]
+
+    def test_matches_per_window_detection(self):
+        """測試重疊、相鄰與分離的窗口結果與逐窗口檢測相同"""
+        windows = [(300, 699), (0, 120), (500, 899), (900, 1000), (1200, 1499), (1210, 1260)]
+        batched = FVGDetectorSimple(clearing_window=40).detect_fvgs_windows(self.bars, windows, 'M5')
+
+        self.assertEqual(batched, self._per_window(windows))
+        self.assertTrue(any(fvg['status'] == 'cleared' for fvgs in batched for fvg in fvgs))
+
+    def test_window_end_limits_clearing(self):
+        """測試清除狀態只看窗口內的K線"""
+        detector = FVGDetectorSimple(clearing_window=40)
+        full = detector.detect_fvgs_windows(self.bars, [(0, 1499)], 'M5')[0]
+        cleared = next(fvg for fvg in full if fvg['status'] == 'cleared')
+        end = next(i for i, t in enumerate(self.bars['DateTime'])
+                   if int(t.timestamp()) == cleared['clearedAt']) - 1
+
+        truncated = detector.detect_fvgs_windows(self.bars, [(0, end)], 'M5')[0]
+        same = next(fvg for fvg in truncated if fvg['formationTime'] == cleared['formationTime'])
+        self.assertEqual(same['status'], 'valid')
+        self.assertNotIn('clearedAt', same)
+
+    def test_empty_and_short_windows(self):
+        """測試空窗口列表與不足3根K線的窗口"""
+        detector = FVGDetectorSimple()
+        self.assertEqual(detector.detect_fvgs_windows(self.bars, [], 'M5'), [])
+        self.assertEqual(detector.detect_fvgs_windows(self.bars, [(10, 11)], 'M5'), [[]])
+
+
+if __name__ == '__main__':
+    unittest.main()
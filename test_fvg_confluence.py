@@ -0,0 +1,122 @@
+"""
+多時間刻度FVG共振（FVGConfluence）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import time
+import unittest
+import pandas as pd
+from backend.fvg_detector_simple import FVGDetectorSimple
+from backend.fvg_index import FVGPriceIndex
+from backend.fvg_confluence import FVGConfluence
+from benchmarks.synthetic_data import generate_m1, resample_ohlcv, synthetic_processor
+
+
+def build_indexes(m1, timeframes):
+    detector = FVGDetectorSimple()
+    indexes = {}
+    for timeframe in timeframes:
+        bars = resample_ohlcv(m1, timeframe).rename_axis('DateTime').reset_index()
+        indexes[timeframe] = FVGPriceIndex(detector.detect_history_table(bars, timeframe))
+    return indexes
+
+
+def nested_loop_pairs(base, other, same_direction):
+    """逐對比較的參考結果"""
+    pairs = set()
+    for a in range(len(base)):
+        for b in range(len(other)):
+            if (other.formed[b] < base.until[a] and other.until[b] > base.formed[a]
+                    and other.bottom[b] <= base.top[a] and other.top[b] >= base.bottom[a]
+                    and (not same_direction or other.table.bullish[b] == base.table.bullish[a])):
+                pairs.add((a, b))
+    return pairs
+
+
+class TestFVGConfluence(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.indexes = build_indexes(generate_m1(days=45, seed=11, gap_rate=0.001), ('M5', 'H1', 'H4'))
+
+    def test_pairs_match_nested_loop(self):
+        """測試排序端點掃描的配對與逐對比較相同（同向與不限方向）"""
+        for same_direction in (True, False):
+            confluence = FVGConfluence(self.indexes, 'M5', same_direction=same_direction)
+            for k, timeframe in enumerate(confluence.others):
+                mask = confluence.pair_timeframe == k
+                found = set(zip(confluence.pair_anchor[mask].tolist(), confluence.pair_row[mask].tolist()))
+                expected = nested_loop_pairs(self.indexes['M5'], self.indexes[timeframe], same_direction)
+                self.assertEqual(found, expected)
+                self.assertGreater(len(found), 0)
+
+    def test_zones_report_common_range_and_timeframes(self):
+        """測試共振區的時間刻度、共同價格/時間範圍與各配對的重疊範圍"""
+        confluence = FVGConfluence(self.indexes, 'M5')
+        zones = confluence.zones()
+        self.assertEqual(len(zones), len(set(confluence.pair_anchor.tolist())))
+        for zone in zones:
+            anchor, matches = zone['anchor'], zone['matches']
+            self.assertEqual(zone['timeframes'][0], 'M5')
+            self.assertEqual(set(zone['timeframes'][1:]), {m['timeframe'] for m in matches})
+            self.assertTrue(all(m['type'] == anchor['type'] for m in matches))
+            bottom = max([anchor['bottomPrice']] + [m['bottomPrice'] for m in matches])
+            top = min([anchor['topPrice']] + [m['topPrice'] for m in matches])
+            if bottom <= top:
+                self.assertEqual((zone['bottom'], zone['top']), (bottom, top))
+            else:
+                self.assertIsNone(zone['top'])
+            for match in matches:
+                self.assertLessEqual(match['overlapBottom'], match['overlapTop'])
+                self.assertEqual(match['containsAnchor'], match['topPrice'] >= anchor['topPrice']
+                                 and match['bottomPrice'] <= anchor['bottomPrice'])
+
+        three = FVGConfluence(self.indexes, 'M5', min_timeframes=3).zones()
+        self.assertEqual(three, [z for z in zones if len(z['timeframes']) == 3])
+
+    def test_full_history_under_one_second(self):
+        """測試全歷史（數萬個錨點FVG）的共振計算在一秒內完成"""
+        indexes = build_indexes(generate_m1(days=540, seed=7, gap_rate=0.0), ('M5', 'H1', 'H4'))
+        self.assertGreater(len(indexes['M5']), 20000)
+        started = time.perf_counter()
+        confluence = FVGConfluence(indexes, 'M5')
+        confluence.zones()
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertGreater(len(confluence), 1000)
+
+
+class TestFVGConfluenceEndpoint(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_anchor_is_smallest_timeframe_and_range_filter(self):
+        result = self.processor.get_fvg_confluence(['H4', 'M5', 'H1'])
+        self.assertEqual(result['anchor'], 'M5')
+        self.assertEqual(result['timeframes'], ['M5', 'H1', 'H4'])
+        self.assertGreater(result['count'], 0)
+
+        middle = result['zones'][len(result['zones']) // 2]['anchor']['formationTime']
+        later = self.processor.get_fvg_confluence(['M5', 'H1', 'H4'], start=pd.Timestamp(middle, unit='s'))
+        self.assertEqual(later['zones'], [z for z in result['zones'] if z['anchor']['formationTime'] >= middle])
+
+    def test_invalid_arguments(self):
+        for kwargs in ({'timeframes': ['M5']}, {'timeframes': ['M5', 'M2']},
+                       {'timeframes': ['M5', 'H1'], 'min_timeframes': 3}):
+            with self.assertRaises(ValueError):
+                self.processor.get_fvg_confluence(**kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()
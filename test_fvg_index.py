@@ -0,0 +1,115 @@
+"""
+全歷史FVG時間/價格索引（FVGPriceIndex）與跨時間刻度查詢單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from backend.fvg_detector_simple import FVGDetectorSimple
+from backend.fvg_index import FVGPriceIndex
+from benchmarks.synthetic_data import generate_bars, synthetic_processor
+
+
+def brute_force(fvgs, start, end, low, high):
+    """逐筆比對：有效區間與 [start, end] 重疊且價格區間與 [low, high] 重疊"""
+    return [f for f in fvgs
+            if f['formationTime'] <= end
+            and (f['clearedAt'] if f['status'] == 'cleared' else f['endTime']) > start
+            and f['bottomPrice'] <= high and f['topPrice'] >= low]
+
+
+class TestFVGPriceIndex(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        bars = generate_bars(20000, 'M15', seed=5)
+        cls.table = FVGDetectorSimple().detect_history_table(bars, 'M15')
+        cls.fvgs = cls.table.to_frontend()
+        cls.index = FVGPriceIndex(cls.table)
+        cls.bars = bars
+
+    def test_full_history_is_not_limited(self):
+        """測試全歷史檢測不受最近1000根限制"""
+        self.assertGreater(self.table.right.max(), 19000)
+        self.assertLess(self.table.right.min(), 1000)
+
+    def test_queries_match_brute_force(self):
+        """測試時間點/時間範圍與價格點/價格範圍的查詢結果與逐筆比對相同"""
+        rng = np.random.default_rng(1)
+        seconds = self.bars['DateTime'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+        lows, highs = self.bars['Low'].to_numpy(), self.bars['High'].to_numpy()
+        for _ in range(200):
+            i = int(rng.integers(0, len(self.bars)))
+            span = int(rng.choice([0, 0, 3600, 86400 * 3]))
+            price = float(rng.uniform(lows[i], highs[i]))
+            band = float(rng.choice([0.0, 5.0, 50.0]))
+            start, end, low, high = int(seconds[i]), int(seconds[i]) + span, price - band, price + band
+            rows = self.index.query(start, end, low, high)
+            self.assertEqual(self.index.records(rows), brute_force(self.fvgs, start, end, low, high))
+
+    def test_type_filter(self):
+        start, end = int(self.table.formation_time[0]), int(self.table.formation_time[-1])
+        bullish = self.index.query(start, end, -1e9, 1e9, bullish=True)
+        bearish = self.index.query(start, end, -1e9, 1e9, bullish=False)
+        self.assertTrue(self.table.bullish[bullish].all())
+        self.assertFalse(self.table.bullish[bearish].any())
+        self.assertEqual(len(bullish) + len(bearish), len(self.table))
+
+
+class TestFindFVGs(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_price_at_time_across_timeframes(self):
+        """測試跨時間刻度的價格/時間點查詢只返回有效且包含該價格的FVG"""
+        detector = self.processor.fvg_detector_simple
+        h1 = self.processor.data_cache['H1']
+        # 取一個H1 FVG形成後的下一根K線時間與其缺口中間價
+        fvg = next(f for f in detector.detect_history_table(h1, 'H1').to_frontend()
+                   if f['status'] == 'valid' or f['clearedAt'] > f['formationTime'] + 3600)
+        at = pd.Timestamp(fvg['formationTime'] + 3600, unit='s')
+        price = (fvg['topPrice'] + fvg['bottomPrice']) / 2
+
+        result = self.processor.find_fvgs(price, price, at, at)
+        self.assertIn(dict(fvg, timeframe='H1'), result['fvgs'])
+        self.assertEqual(set(result['counts']), {'M15', 'H1', 'H4'})
+        seconds = int(at.timestamp())
+        for timeframe in ('M15', 'H1', 'H4'):
+            frame = self.processor.data_cache[timeframe]
+            expected = brute_force(detector.detect_history_table(frame, timeframe).to_frontend(),
+                                   seconds, seconds, price, price)
+            self.assertEqual([{k: v for k, v in f.items() if k != 'timeframe'}
+                              for f in result['fvgs'] if f['timeframe'] == timeframe], expected)
+
+    def test_index_rebuilt_when_data_version_changes(self):
+        """測試資料版本改變後重新建立索引，版本不變時重用"""
+        index = self.processor.get_fvg_index('H4')
+        self.assertIs(self.processor.get_fvg_index('H4'), index)
+        versions = dict(self.processor.data_versions)
+        versions['H4'] = dict(versions['H4'], fingerprint='changed')
+        self.processor.data_versions = versions
+        self.assertIsNot(self.processor.get_fvg_index('H4'), index)
+        self.assertEqual(self.processor.get_fvg_index('H4').version, 'changed')
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.processor.find_fvgs(1, 2, timeframes=['M2'])
+        with self.assertRaises(ValueError):
+            self.processor.find_fvgs(1, 2, fvg_type='up')
+
+
+if __name__ == '__main__':
+    unittest.main()
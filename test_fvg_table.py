@@ -0,0 +1,78 @@
+"""
+欄式 FVG 結果（FVGTable）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+import pandas as pd
+from backend.fvg_detector_simple import FVGDetectorSimple
+from backend.fvg_table import FVGTable
+
+
+def make_bars(rows):
+    """rows: [(open, high, low, close)]，每分鐘一根"""
+    frame = pd.DataFrame(rows, columns=['Open', 'High', 'Low', 'Close'])
+    frame.insert(0, 'DateTime', pd.date_range('2024-01-02 09:30', periods=len(rows), freq='min'))
+    return frame
+
+
+class TestFVGTable(unittest.TestCase):
+
+    def setUp(self):
+        # 位置2形成多頭FVG（L.High=101 < R.Low=103），位置4收盤100回填而清除
+        self.bars = make_bars([
+            (100.0, 101.0, 99.0, 100.5),
+            (101.0, 104.0, 100.5, 103.5),
+            (103.5, 105.0, 103.0, 104.5),
+            (104.5, 104.75, 102.0, 102.5),
+            (102.5, 103.25, 99.5, 100.0),
+            (100.0, 102.25, 99.0, 99.25),
+        ])
+        self.detector = FVGDetectorSimple(clearing_window=40)
+
+    def test_bullish_formation_and_clearing(self):
+        """測試欄位值與清除資訊"""
+        table = self.detector.detect_fvg_table(self.bars, timeframe='M1')
+
+        self.assertEqual(len(table), 1)
+        self.assertEqual((int(table.left[0]), int(table.right[0])), (0, 2))
+        self.assertEqual((float(table.start_price[0]), float(table.end_price[0])), (101.0, 103.0))
+        self.assertEqual(int(table.cleared_index[0]), 4)
+        self.assertEqual(int(table.end_time[0] - table.start_time[0]), 40 * 60)
+
+        fvg = table.to_frontend()[0]
+        self.assertEqual(fvg['status'], 'cleared')
+        self.assertEqual(fvg['clearedByPrice'], 100.0)
+        self.assertEqual((fvg['topPrice'], fvg['bottomPrice']), (103.0, 101.0))
+
+    def test_window_truncates_clearing(self):
+        """測試窗口結束前未回填時狀態為 valid"""
+        table = self.detector.detect_fvg_table(self.bars, timeframe='M1')
+        fvg = table.window(0, 3).to_frontend()[0]
+        self.assertEqual(fvg['status'], 'valid')
+        self.assertNotIn('clearedAt', fvg)
+        self.assertEqual(len(table.window(1, 5)), 0)
+
+    def test_legacy_views_are_consistent(self):
+        """測試舊版巢狀字典與前端格式一致"""
+        table = self.detector.detect_fvg_table(self.bars, timeframe='M1')
+        legacy = table.to_dicts()
+
+        self.assertEqual(legacy[0]['center_candle']['datetime'], '2024-01-02T09:31:00')
+        self.assertEqual(legacy[0]['cleared_at_index'], 4)
+        self.assertEqual(self.detector.convert_for_frontend(legacy), table.to_frontend())
+
+    def test_empty_table(self):
+        """測試沒有 FVG 時的空結果"""
+        flat = make_bars([(100.0, 100.5, 99.5, 100.0)] * 5)
+        table = self.detector.detect_fvg_table(flat, timeframe='M1')
+        self.assertIsInstance(table, FVGTable)
+        self.assertEqual(table.to_frontend(), [])
+        self.assertEqual(table.counts()['total'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+間隔區間索引單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+import datetime
+import pandas as pd
+from backend.gap_index import GapIntervalIndex
+
+
+class TestGapIntervalIndex(unittest.TestCase):
+
+    def setUp(self):
+        """測試設置：兩天的H1資料，各有一個缺失間隔"""
+        times = pd.date_range('2023-03-06 00:00', '2023-03-07 23:00', freq='h')
+        self.times = times.drop([pd.Timestamp('2023-03-06 05:00'),
+                                 pd.Timestamp('2023-03-07 10:00'),
+                                 pd.Timestamp('2023-03-07 11:00')])
+        gaps = [
+            {'start_time': '2023-03-07 09:00:00', 'end_time': '2023-03-07 12:00:00', 'missing_candles': 2},
+            {'start_time': '2023-03-06 04:00:00', 'end_time': '2023-03-06 06:00:00', 'missing_candles': 1},
+        ]
+        self.index = GapIntervalIndex.build(pd.Series(self.times), gaps)
+
+    def test_query_date(self):
+        """測試單日連續性查詢"""
+        day1 = self.index.query_date(datetime.date(2023, 3, 6))
+        self.assertEqual(day1['total_candles'], 23)
+        self.assertEqual(day1['gap_count'], 1)
+        self.assertEqual(day1['continuity_percentage'], round(23 / 24 * 100, 2))
+
+        day2 = self.index.query_date(datetime.date(2023, 3, 7))
+        self.assertEqual(day2['missing_candles'], 2)
+
+    def test_query_window(self):
+        """測試任意時間視窗查詢"""
+        stats = self.index.query(pd.Timestamp('2023-03-06 06:00'), pd.Timestamp('2023-03-07 09:00'))
+        # 起點K線所在的間隔不計入視窗
+        self.assertEqual(stats['gap_count'], 0)
+        self.assertEqual(stats['continuity_percentage'], 100.0)
+
+        stats = self.index.query(pd.Timestamp('2023-03-06 00:00'), pd.Timestamp('2023-03-07 23:00'))
+        self.assertEqual(stats['gap_count'], 2)
+        self.assertEqual(stats['missing_candles'], 3)
+
+    def test_gaps_between(self):
+        """測試列出範圍內的間隔"""
+        gaps = self.index.gaps_between(pd.Timestamp('2023-03-07'), pd.Timestamp('2023-03-08'))
+        self.assertEqual(len(gaps), 1)
+        self.assertEqual(gaps[0]['end_time'], '2023-03-07 12:00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+歷史資料 HTTP 快取單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import gzip
+import unittest
+from backend.http_cache import HistoricalResponseCache, choose_encoding
+
+
+class TestHistoricalResponseCache(unittest.TestCase):
+
+    def test_etag_depends_on_data_fingerprint(self):
+        """測試 ETag 穩定且資料檔變更時改變"""
+        etag = HistoricalResponseCache.make_etag('pre_market', '2024-01-02', 'H1', 'a-1-10')
+        self.assertEqual(etag, HistoricalResponseCache.make_etag('pre_market', '2024-01-02', 'H1', 'a-1-10'))
+        self.assertNotEqual(etag, HistoricalResponseCache.make_etag('pre_market', '2024-01-02', 'H1', 'a-2-11'))
+        self.assertNotEqual(etag, HistoricalResponseCache.make_etag('market_hours', '2024-01-02', 'H1', 'a-1-10'))
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+    def test_conditional_requests(self):
+        """測試 If-None-Match 與 If-Modified-Since"""
+        cache = HistoricalResponseCache()
+        etag = '"abc"'
+        self.assertTrue(cache.is_not_modified(etag, 1700000000, '"x", "abc"', None))
+        self.assertTrue(cache.is_not_modified(etag, 1700000000, 'W/"abc"', None))
+        self.assertFalse(cache.is_not_modified(etag, 1700000000, '"x"', None))
+        # If-None-Match 優先於 If-Modified-Since
+        self.assertFalse(cache.is_not_modified(etag, 1700000000, '"x"', 'Wed, 15 Nov 2023 00:00:00 GMT'))
+        self.assertTrue(cache.is_not_modified(etag, 1700000000, None, 'Wed, 15 Nov 2023 00:00:00 GMT'))
+        self.assertFalse(cache.is_not_modified(etag, 1700000000, None, 'Mon, 13 Nov 2023 00:00:00 GMT'))
+        self.assertFalse(cache.is_not_modified(etag, 1700000000, None, 'not a date'))
+        self.assertEqual(cache.get_stats()['not_modified'], 3)
+
+    def test_precompressed_response(self):
+        """測試依 Accept-Encoding 送出預先壓縮的內容"""
+        cache = HistoricalResponseCache(min_compress_bytes=100)
+        body = b'{"data":[' + b','.join(b'1.25' for _ in range(500)) + b']}\n'
+        entry = cache.put('"e"', body, 1700000000, immutable=True)
+
+        headers, payload = cache.response_parts(entry, 'gzip;q=1.0, identity;q=0.5')
+        headers = dict(headers)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(payload), body)
+
+        headers, payload = cache.response_parts(entry, None)
+        self.assertNotIn('Content-Encoding', dict(headers))
+        self.assertEqual(payload, body)
+
+    def test_choose_encoding(self):
+        """測試 q 值為0的格式不會被選用"""
+        available = {'gzip': b'', 'br': b''}
+        self.assertEqual(choose_encoding('gzip, br', available), 'br')
+        self.assertEqual(choose_encoding('br;q=0, gzip', available), 'gzip')
+        self.assertEqual(choose_encoding('*', available), 'br')
+        self.assertIsNone(choose_encoding('deflate', available))
+
+    def test_lru_eviction_by_bytes(self):
+        """測試超過位元組上限時淘汰最久未使用的項目"""
+        cache = HistoricalResponseCache(max_bytes=250, min_compress_bytes=10 ** 6)
+        for key in ('a', 'b'):
+            cache.put(key, b'x' * 100, 0, immutable=False)
+        cache.get('a')
+        cache.put('c', b'x' * 100, 0, immutable=False)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        stats = cache.get_stats()
+        self.assertEqual((stats['entries'], stats['bytes'], stats['evictions']), (2, 200, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""
+即時K線送入（LiveFeed）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+import backend.app as app_module
+from backend import worker_registry
+from backend.fvg_table import FVGTable
+from backend.worker_registry import WorkerRegistry
+from benchmarks.synthetic_data import generate_m1, load_processor, single_symbol_registry, write_csv_files
+from utils.config import CSV_FILES
+
+
+def as_bars(m1):
+    seconds = m1.index.to_numpy(dtype='datetime64[s]').astype(np.int64).tolist()
+    return [{'time': t, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for t, o, h, l, c, v in zip(seconds, *(m1[col].tolist() for col in
+                                                   ('Open', 'High', 'Low', 'Close', 'Volume')))]
+
+
+class TestLiveFeed(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        m1 = generate_m1(days=10, start='2023-01-02', seed=3, gap_rate=0.002)
+        # 切在小時中間：歷史資料的高時間刻度最後一根尚未收盤
+        cls.cut = m1.index[int(len(m1) * 0.6)].floor('h') + pd.Timedelta(minutes=37)
+        cls.live_m1 = m1[m1.index >= cls.cut]
+        write_csv_files(os.path.join(cls.tmp, 'history'), m1[m1.index < cls.cut], CSV_FILES)
+        write_csv_files(os.path.join(cls.tmp, 'full'), m1, CSV_FILES)
+        cls.reference = cls.load('full')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, name, cache=None):
+        return load_processor(os.path.join(cls.tmp, name), os.path.join(cls.tmp, 'cache', cache or name))
+
+    def setUp(self):
+        self.processor = self.load('history', cache=self.id())
+        self.feed = self.processor.get_live_feed()
+        self.feed.merge_seconds = 0
+        self.feed.subscriber_queue = 10 ** 6
+
+    def test_rollup_fvgs_and_gaps_match_full_load(self):
+        """測試逐根送入並合併後與完整載入相同，推送的FVG與間隔事件與批次檢測一致"""
+        subscription = self.feed.subscribe(['M1', 'M5'])
+        before = self.processor.data_cache['M1']
+        bars = as_bars(self.live_m1)
+        for start in range(0, len(bars), 97):
+            self.feed.ingest(bars[start:start + 97])
+        self.assertIs(self.processor.data_cache['M1'], before)  # 合併前不修改歷史資料
+
+        self.processor.merge_live_bars()
+        for timeframe in CSV_FILES:
+            merged = self.processor.data_cache[timeframe]
+            expected = self.reference.data_cache[timeframe]
+            self.assertGreaterEqual(len(merged), len(expected) - 1)  # 最後一根可能尚未收盤
+            pd.testing.assert_frame_equal(merged, expected.iloc[:len(merged)])
+        self.assertEqual(self.processor.available_dates, self.reference.available_dates)
+
+        events = subscription.drain()
+        self.assertEqual(events[0]['type'], 'snapshot')
+        self.assertEqual(set(events[0]['timeframes']), {'M1', 'M5'})
+        self.assertEqual({e['timeframe'] for e in events[1:]}, {'M1', 'M5'})
+
+        # K線間隔：即時區段內的每個時間差
+        cut = int(self.cut.value // 10 ** 9)
+        m1_times = self.reference.data_cache['M1']['DateTime'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+        live_diffs = np.diff(m1_times)[m1_times[1:] >= cut]
+        gaps = [e['gap'] for e in events if e['type'] == 'gap' and e['timeframe'] == 'M1']
+        self.assertEqual(len(gaps), int((live_diffs > 60).sum()))
+
+        # FVG：與收盤K線的批次檢測相同
+        m5 = self.processor.data_cache['M5']
+        detector = self.processor.fvg_detector_simple
+        formations = detector.find_formation_indices(m5)
+        table = FVGTable.from_formations(m5, formations['bullish'], formations['bearish'],
+                                         detector._extend_seconds('M5'), detector.clearing_window)
+        first_live = cut - cut % 300
+        batch = table.to_frontend()
+        formed = [e['fvg'] for e in events if e['type'] == 'fvg' and e['event'] == 'formed'
+                  and e['timeframe'] == 'M5']
+        as_formed = [{k: v for k, v in f.items() if k not in ('clearedAt', 'clearedByPrice')} for f in batch]
+        self.assertEqual(formed, [dict(f, status='valid') for f in as_formed if f['formationTime'] >= first_live])
+        cleared = sorted((e['fvg']['formationTime'], e['fvg']['clearedAt']) for e in events
+                         if e['type'] == 'fvg' and e['event'] == 'cleared' and e['timeframe'] == 'M5')
+        self.assertEqual(cleared, sorted((f['formationTime'], f['clearedAt']) for f in batch
+                                         if f['status'] == 'cleared' and f['clearedAt'] >= first_live))
+        self.assertGreater(len(formed), 0)
+        self.assertGreater(len(cleared), 0)
+
+    def test_rejects_duplicates_and_invalid_bars(self):
+        """測試重複/過時K線被略過，格式錯誤時整批不處理"""
+        bars = as_bars(self.live_m1.iloc[:3])
+        self.assertEqual(self.feed.ingest(bars[:2])['accepted'], 2)
+        result = self.feed.ingest(bars[1:])
+        self.assertEqual((result['accepted'], result['rejected']), (1, 1))
+
+        for invalid in ({'time': bars[2]['time'] + 90, 'open': 1, 'high': 2, 'low': 0, 'close': 1},
+                        {'time': bars[2]['time'] + 60, 'open': 1, 'high': 0.5, 'low': 0, 'close': 1},
+                        {'time': bars[2]['time'] + 60, 'open': 1}):
+            with self.assertRaises(ValueError):
+                self.feed.ingest([invalid])
+        self.assertEqual(self.feed.get_stats()['bars'], 3)
+
+    def test_slow_subscriber_is_dropped(self):
+        """測試待送事件超過上限的訂閱者被中斷，其他訂閱者不受影響"""
+        self.feed.subscriber_queue = 5
+        slow = self.feed.subscribe(['M1'])
+        self.feed.subscriber_queue = 1000
+        hourly = self.feed.subscribe(['H1'])
+        within_hour = self.live_m1[self.live_m1.index < self.cut + pd.Timedelta(minutes=20)]
+        self.feed.ingest(as_bars(within_hour))
+
+        self.assertTrue(slow.closed)
+        self.assertFalse(hourly.closed)
+        events = hourly.drain()
+        self.assertEqual(events[0]['type'], 'snapshot')
+        self.assertEqual(len(events), len(within_hour) + 1)  # 快照 + 每分鐘一次尚未收盤的H1更新
+        self.assertTrue(all(e['timeframe'] == 'H1' and not e['final'] for e in events[1:]))
+        self.assertEqual(self.feed.get_stats()['dropped_subscribers'], 1)
+
+
+class TestLiveEndpoints(unittest.TestCase):
+    """即時K線端點：prefork 多 worker 時各 worker 的即時狀態不一致，拒絕服務"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        m1 = generate_m1(days=5, start='2023-01-02', seed=3)
+        cls.live_m1 = m1.iloc[-3:]
+        write_csv_files(os.path.join(cls.tmp, 'data'), m1.iloc[:-3], CSV_FILES)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def setUp(self):
+        self.processor = load_processor(os.path.join(self.tmp, 'data'), os.path.join(self.tmp, 'cache', self.id()))
+        self.feed = self.processor.get_live_feed()
+        patch = mock.patch.object(app_module, 'symbol_registry', single_symbol_registry(self.processor))
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.client = app_module.app.test_client()
+        self.bars = as_bars(self.live_m1)
+
+    def test_single_process_accepts_bars(self):
+        response = self.client.post('/api/live/bars', json={'bars': self.bars})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/live/status').get_json()['bars'], 3)
+
+    def test_prefork_with_several_workers_returns_409(self):
+        with mock.patch.object(worker_registry, '_active', (WorkerRegistry(4), 0)):
+            for response in (self.client.post('/api/live/bars', json={'bars': self.bars}),
+                             self.client.get('/api/live/stream'),
+                             self.client.get('/api/live/status')):
+                self.assertEqual(response.status_code, 409)
+                self.assertEqual(response.get_json()['workers'], 4)
+        self.assertEqual(self.feed.get_stats()['bars'], 0)
+
+        with mock.patch.object(worker_registry, '_active', (WorkerRegistry(1), 0)):
+            self.assertEqual(self.client.post('/api/live/bars', json={'bars': self.bars}).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+日誌設定（StructuredFormatter、setup_logging）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import io
+import json
+import logging
+import logging.handlers
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date
+from unittest import mock
+from utils.log_config import StructuredFormatter, setup_logging
+
+
+class TestStructuredFormatter(unittest.TestCase):
+
+    def _format(self, msg, *args, extra=None, exc_info=None):
+        record = logging.getLogger('backend.test').makeRecord(
+            'backend.test', logging.WARNING, __file__, 1, msg, args, exc_info, extra=extra)
+        return json.loads(StructuredFormatter().format(record))
+
+    def test_fields_and_extra(self):
+        """測試基本欄位、extra 欄位與非 JSON 型別的值"""
+        entry = self._format('載入 %s 完成', 'M15', extra={'rows': 12, 'day': date(2024, 1, 2)})
+        self.assertEqual(entry['level'], 'WARNING')
+        self.assertEqual(entry['logger'], 'backend.test')
+        self.assertEqual(entry['msg'], '載入 M15 完成')
+        self.assertEqual(entry['rows'], 12)
+        self.assertEqual(entry['day'], '2024-01-02')
+        self.assertRegex(entry['ts'], r'^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}\+00:00$')
+        self.assertEqual(set(entry), {'ts', 'level', 'logger', 'msg', 'rows', 'day'})
+
+    def test_single_line_with_exception(self):
+        """測試例外資訊與非 ASCII 文字都在同一行 JSON 內"""
+        try:
+            raise ValueError('日期錯誤')
+        except ValueError:
+            exc_info = sys.exc_info()
+        line = StructuredFormatter().format(logging.getLogger('x').makeRecord(
+            'x', logging.ERROR, __file__, 1, '失敗', (), exc_info))
+        self.assertNotIn('\n', line)
+        self.assertIn('失敗', line)
+        entry = json.loads(line)
+        self.assertIn('ValueError: 日期錯誤', entry['exc_info'])
+
+
+class TestSetupLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = logging.getLogger()
+        self.saved = (self.root.handlers[:], self.root.level)
+        self.stderr = io.StringIO()
+        self.listener = None
+
+    def tearDown(self):
+        handlers = self.root.handlers + list(self.listener.handlers if self.listener else ())
+        for handler in handlers:
+            handler.close()
+        self.root.handlers[:], level = self.saved
+        self.root.setLevel(level)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _setup(self, config):
+        with mock.patch('sys.stderr', self.stderr), \
+                mock.patch('utils.log_config.atexit.register') as register:
+            self.listener = setup_logging(os.path.join(self.tmp, 'logs'), config)
+        return self.listener, register
+
+    def _file_lines(self, name='error.log'):
+        with open(os.path.join(self.tmp, 'logs', name), encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_sync_handlers(self):
+        """測試停用非同步時直接掛上檔案與主控台 Handler"""
+        listener, register = self._setup({'level': 'debug', 'async_handler': False, 'log_file': 'app.log'})
+        self.assertIsNone(listener)
+        register.assert_not_called()
+        self.assertEqual(self.root.level, logging.DEBUG)
+        self.assertEqual([type(h) for h in self.root.handlers], [logging.FileHandler, logging.StreamHandler])
+
+        logging.getLogger('backend.test').debug('診斷訊息')
+        self.assertEqual(len(self._file_lines('app.log')), 1)
+        self.assertIn('[DEBUG]', self._file_lines('app.log')[0])
+        self.assertIn('診斷訊息', self.stderr.getvalue())
+
+    def test_queue_listener_writes_structured_records(self):
+        """測試非同步輸出：根日誌器只有 QueueHandler，由監聽執行緒寫出 JSON Lines"""
+        listener, register = self._setup({'level': 'INFO', 'structured': True})
+        self.assertIsInstance(listener, logging.handlers.QueueListener)
+        self.assertEqual([type(h) for h in self.root.handlers], [logging.handlers.QueueHandler])
+        register.assert_called_once()
+
+        logger = logging.getLogger('backend.test')
+        logger.debug('不輸出')
+        logger.info('請求完成', extra={'endpoint': '/api/data'})
+        listener.stop()
+
+        lines = self._file_lines()
+        self.assertEqual(len(lines), 1)
+        entry = json.loads(lines[0])
+        self.assertEqual((entry['msg'], entry['endpoint']), ('請求完成', '/api/data'))
+        self.assertEqual(self.stderr.getvalue().splitlines(), lines)
+
+        # 已手動停止時，程式結束的回呼不再重複停止
+        callback, args = register.call_args[0][0], register.call_args[0][1:]
+        callback(*args)
+
+    def test_exit_callback_flushes_queue(self):
+        """測試程式結束時的回呼送出佇列中全部紀錄，不遺失"""
+        listener, register = self._setup({'level': 'INFO'})
+        logger = logging.getLogger('backend.test')
+
+        def emit(worker):
+            for i in range(500):
+                logger.warning('worker %d record %d', worker, i)
+
+        threads = [threading.Thread(target=emit, args=(k,)) for k in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        callback, args = register.call_args[0][0], register.call_args[0][1:]
+        self.assertIs(args[0], listener)
+        callback(*args)
+
+        lines = self._file_lines()
+        self.assertEqual(len(lines), 2000)
+        self.assertEqual({line.split(': ', 1)[1] for line in lines},
+                         {f'worker {k} record {i}' for k in range(4) for i in range(500)})
+        self.assertEqual(len(self.stderr.getvalue().splitlines()), 2000)
+        self.assertIsNone(listener._thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
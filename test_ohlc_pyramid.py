@@ -0,0 +1,103 @@
+"""
+多解析度OHLCV（OHLCPyramid）與任意時間範圍查詢單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from backend.ohlc_pyramid import OHLCPyramid
+from benchmarks.synthetic_data import generate_bars, synthetic_processor
+
+
+class TestOHLCPyramid(unittest.TestCase):
+
+    def setUp(self):
+        self.bars = generate_bars(1001, 'M5', seed=2)
+        self.pyramid = OHLCPyramid.build(self.bars)
+
+    def test_levels_match_grouped_aggregation(self):
+        """測試每層等於依位置每 2^k 根分組的聚合"""
+        self.assertEqual(len(self.pyramid.levels), 10)  # 1001 -> 501 -> ... -> 1
+        seconds = self.bars['DateTime'].to_numpy(dtype='datetime64[s]').astype(np.int64)
+        for k in (1, 3, 7, 10):
+            group = np.arange(len(self.bars)) >> k
+            expected = self.bars.groupby(group).agg(
+                {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+            level = self.pyramid.levels[k - 1]
+            np.testing.assert_array_equal(level['time'], seconds[::1 << k])
+            for name, column in (('open', 'Open'), ('high', 'High'), ('low', 'Low'),
+                                 ('close', 'Close'), ('volume', 'Volume')):
+                np.testing.assert_array_equal(level[name], expected[column].to_numpy())
+
+    def test_extend_matches_build(self):
+        """測試尾端追加後延伸的金字塔與重新建立相同，且不修改原金字塔"""
+        for old, new in ((0, 1), (0, 100), (1, 2), (2, 3), (511, 512), (512, 513), (640, 1001), (1000, 1001),
+                         (1001, 1001)):
+            prefix = OHLCPyramid.build(self.bars.iloc[:old])
+            levels = [dict(level) for level in prefix.levels]
+            extended = prefix.extend(self.bars.iloc[:new])
+            expected = OHLCPyramid.build(self.bars.iloc[:new])
+            self.assertEqual((extended.length, len(extended.levels)), (new, len(expected.levels)))
+            for got, want in zip(extended.levels, expected.levels):
+                for name in want:
+                    np.testing.assert_array_equal(got[name], want[name])
+            self.assertEqual(prefix.length, old)
+            self.assertTrue(all(level[name] is before[name] for level, before in zip(prefix.levels, levels)
+                                for name in level))
+
+    def test_level_for_is_finest_within_max_points(self):
+        """測試選擇的層點數不超過上限，且更細一層會超過"""
+        for lo, hi, max_points in ((0, 1001, 100), (13, 700, 50), (500, 510, 20), (3, 999, 1), (7, 8, 1)):
+            level = self.pyramid.level_for(lo, hi, max_points)
+            points = ((hi - 1) >> level) - (lo >> level) + 1
+            self.assertLessEqual(points, max_points)
+            if level:
+                self.assertGreater(((hi - 1) >> (level - 1)) - (lo >> (level - 1)) + 1, max_points)
+                self.assertEqual(len(self.pyramid.slice(level, lo, hi)['time']), points)
+
+
+class TestRangeData(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_small_range_returns_raw_bars(self):
+        """測試範圍內K線數不超過上限時返回原始K線"""
+        start, end = pd.Timestamp('2023-01-10 09:30'), pd.Timestamp('2023-01-10 11:00')
+        result = self.processor.get_range_data('M1', start, end, max_points=1000)
+        frame = self.processor.data_cache['M1']
+        window = frame[(frame['DateTime'] >= start) & (frame['DateTime'] <= end)]
+        self.assertEqual(result['level'], 0)
+        self.assertEqual(result['data'], self.processor._chart_points(window, 'M1'))
+
+    def test_large_range_is_bounded_and_covers_extremes(self):
+        """測試大範圍返回的點數有上限，且聚合後的高低點與原始資料一致"""
+        frame = self.processor.data_cache['M1']
+        result = self.processor.get_range_data('M1', max_points=500)
+        self.assertEqual(result['total_bars'], len(frame))
+        self.assertLessEqual(result['count'], 500)
+        self.assertGreater(result['level'], 0)
+        self.assertEqual(max(p['high'] for p in result['data']), frame['High'].max())
+        self.assertEqual(min(p['low'] for p in result['data']), frame['Low'].min())
+        self.assertEqual(sum(p['volume'] for p in result['data']), frame['Volume'].sum())
+        self.assertEqual(result['data'][0]['open'], frame['Open'].iloc[0])
+        self.assertEqual(result['data'][-1]['close'], frame['Close'].iloc[-1])
+
+    def test_unknown_timeframe(self):
+        self.assertIsNone(self.processor.get_range_data('M2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
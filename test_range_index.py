@@ -0,0 +1,129 @@
+"""
+區間極值索引（RangeExtremaIndex）與區間高低點查詢單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from backend.range_index import RangeExtremaIndex, TABLES
+from benchmarks.synthetic_data import generate_bars, load_processor, write_dataset
+from utils.config import CSV_FILES
+
+
+class TestRangeExtremaIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.bars = generate_bars(5000, 'M1', seed=4)
+        # 整數價格製造大量相同極值，驗證取最早一根
+        self.bars[['High', 'Low', 'Close']] = self.bars[['High', 'Low', 'Close']].round(-1)
+        self.index = RangeExtremaIndex.build(self.bars, block=16)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def assert_matches_scan(self, index, ranges):
+        for lo, hi in ranges:
+            for name, (column, is_max) in TABLES.items():
+                values = self.bars[column].to_numpy()[lo:hi]
+                expected = lo + int(values.argmax() if is_max else values.argmin())
+                self.assertEqual(index.query(name, self.bars, lo, hi), expected, (name, lo, hi))
+
+    def test_query_matches_linear_scan(self):
+        """測試任意範圍（含塊內、跨塊、整段）與逐根掃描相同"""
+        rng = np.random.default_rng(0)
+        ranges = [(0, 5000), (0, 1), (4999, 5000), (16, 48), (15, 49), (3, 40)]
+        ranges += [tuple(sorted(rng.integers(0, 5001, 2))) for _ in range(300)]
+        self.assert_matches_scan(self.index, [(lo, hi) for lo, hi in ranges if hi > lo])
+        self.assertIsNone(self.index.query('high_max', self.bars, 10, 10))
+
+    def test_extend_matches_build(self):
+        """測試尾端追加後延伸的索引與重新建立相同（含由映射檔延伸），且不修改原索引"""
+        path = os.path.join(self.tmp, 'M1')
+        for old, new in ((0, 40), (16, 17), (1000, 1000), (1000, 1016), (1001, 1500), (4000, 5000), (4999, 5000)):
+            prefix = RangeExtremaIndex.build(self.bars.iloc[:old], block=16)
+            prefix.save(path, f'v{old}')
+            mapped = RangeExtremaIndex.load(path, f'v{old}', old, 16)
+            expected = RangeExtremaIndex.build(self.bars.iloc[:new], block=16)
+            for base in (prefix, mapped):
+                extended = base.extend(self.bars.iloc[:new])
+                self.assertEqual(extended.rows, new)
+                for name in TABLES:
+                    np.testing.assert_array_equal(extended.tables[name], expected.tables[name])
+            self.assertEqual(prefix.rows, old)
+        with self.assertRaises(ValueError):
+            self.index.extend(self.bars.iloc[:10])
+
+    def test_persisted_index_is_mapped_and_validated(self):
+        """測試保存後以映射讀回結果相同，指紋或筆數不符時不使用"""
+        path = os.path.join(self.tmp, 'M1')
+        self.index.save(path, 'v1')
+        loaded = RangeExtremaIndex.load(path, 'v1', len(self.bars), 16)
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.nbytes(), 0)
+        self.assert_matches_scan(loaded, [(0, 5000), (7, 4000), (100, 133)])
+        self.assertIsNone(RangeExtremaIndex.load(path, 'v2', len(self.bars), 16))
+        self.assertIsNone(RangeExtremaIndex.load(path, 'v1', len(self.bars) + 1, 16))
+        self.assertIsNone(RangeExtremaIndex.load(path, 'v1', len(self.bars), 64))
+
+        # 新版本替換舊檔案
+        self.index.save(path, 'v2')
+        self.assertIsNotNone(RangeExtremaIndex.load(path, 'v2', len(self.bars), 16))
+        self.assertEqual(len([f for f in os.listdir(path) if f.endswith('.npy')]), len(TABLES))
+
+
+class TestRangeStats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        write_dataset(os.path.join(cls.tmp, 'data'), CSV_FILES, days=20)
+        cls.processor = cls.load()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls):
+        return load_processor(os.path.join(cls.tmp, 'data'), os.path.join(cls.tmp, 'cache'))
+
+    def test_stats_match_window(self):
+        """測試區間高低點與收盤極值等於時間範圍內K線的極值"""
+        start, end = pd.Timestamp('2023-01-05 10:07'), pd.Timestamp('2023-01-17 15:31')
+        for timeframe in ('M1', 'M15', 'H4'):
+            frame = self.processor.data_cache[timeframe]
+            window = frame[(frame['DateTime'] >= start) & (frame['DateTime'] <= end)]
+            stats = self.processor.get_range_stats(timeframe, start, end)
+            self.assertEqual(stats['bars'], len(window))
+            self.assertEqual(stats['high']['price'], window['High'].max())
+            self.assertEqual(stats['low']['price'], window['Low'].min())
+            self.assertEqual(stats['close_high']['price'], window['Close'].max())
+            self.assertEqual(stats['close_low']['price'], window['Close'].min())
+            self.assertEqual(stats['open'], window['Open'].iloc[0])
+            self.assertEqual(stats['close'], window['Close'].iloc[-1])
+            high_time = window['DateTime'].iloc[int(window['High'].to_numpy().argmax())]
+            self.assertEqual(stats['high']['time'], int(high_time.timestamp()))
+
+    def test_index_reused_after_restart(self):
+        """測試資料未變時重新啟動直接映射已保存的索引"""
+        restarted = self.load()
+        for timeframe in CSV_FILES:
+            self.assertIsInstance(restarted.range_indexes[timeframe].tables['high_max'], np.memmap)
+        self.assertEqual(restarted.get_range_stats('M5'), self.processor.get_range_stats('M5'))
+
+    def test_empty_range_and_unknown_timeframe(self):
+        stats = self.processor.get_range_stats('H1', pd.Timestamp('2030-01-01'))
+        self.assertEqual(stats['bars'], 0)
+        self.assertIsNone(stats['high'])
+        self.assertIsNone(self.processor.get_range_stats('M2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
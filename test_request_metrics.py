@@ -0,0 +1,70 @@
+"""
+請求計時指標單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+from backend.request_metrics import RequestMetrics, _NULL_STAGE
+
+
+class TestRequestMetrics(unittest.TestCase):
+
+    def test_disabled_is_noop(self):
+        """測試停用時返回共用空計時器且不記錄"""
+        metrics = RequestMetrics(enabled=False)
+        metrics.begin('/api/data/<date>/<timeframe>', 'M15')
+        self.assertIs(metrics.stage('slice'), _NULL_STAGE)
+        metrics.observe('total', 0.1)
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_stage_without_request_labels_is_noop(self):
+        """測試請求外（未設定標籤）的階段不記錄"""
+        metrics = RequestMetrics(enabled=True)
+        self.assertIs(metrics.stage('slice'), _NULL_STAGE)
+
+    def test_histogram_buckets(self):
+        """測試直方圖區間與 Prometheus 輸出"""
+        metrics = RequestMetrics(enabled=True, buckets=(0.01, 0.1))
+        for seconds in (0.005, 0.01, 0.05, 2.0):
+            metrics.observe('fvg_detection', seconds, endpoint='/api/data/<date>/<timeframe>', timeframe='H1')
+        metrics.begin('/api/data/<date>/<timeframe>', 'H1')
+        with metrics.stage('slice'):
+            pass
+        metrics.end()
+
+        hist = metrics.snapshot()[('/api/data/<date>/<timeframe>', 'H1', 'fvg_detection')]
+        self.assertEqual(hist['counts'], [2, 1, 1])
+        self.assertEqual(hist['count'], 4)
+
+        text = metrics.render_prometheus()
+        self.assertIn('# TYPE trading_request_stage_seconds histogram', text)
+        self.assertIn('trading_request_stage_seconds_bucket{endpoint="/api/data/<date>/<timeframe>",'
+                      'timeframe="H1",stage="fvg_detection",le="0.1"} 3', text)
+        self.assertIn('stage="fvg_detection",le="+Inf"} 4', text)
+        self.assertIn('stage="slice"} 1', text)
+
+    def test_repeated_stage_recorded_once_per_request(self):
+        """測試同一請求內重複的階段累計後只記錄一次"""
+        metrics = RequestMetrics(enabled=True, buckets=(0.01, 0.1))
+        for request in range(2):
+            metrics.begin('/api/batch-data', None)
+            for seconds in (0.004, 0.004, 0.004):
+                metrics.observe('serialization', seconds)
+            recorded = metrics.snapshot().get(('/api/batch-data', '', 'serialization'))
+            self.assertEqual(recorded['count'] if recorded else 0, request)  # 請求結束前不記錄
+            metrics.end()
+
+        hist = metrics.snapshot()[('/api/batch-data', '', 'serialization')]
+        self.assertEqual(hist['count'], 2)
+        self.assertEqual(hist['counts'], [0, 2, 0])
+        self.assertAlmostEqual(hist['sum'], 0.024)
+
+        metrics.observe('serialization', 1.0)  # 請求外不記錄
+        self.assertEqual(metrics.snapshot()[('/api/batch-data', '', 'serialization')]['count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
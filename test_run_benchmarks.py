@@ -0,0 +1,46 @@
+"""
+效能基準測試套件（run_benchmarks）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import backend.app as app_module
+from benchmarks.run_benchmarks import bench_api
+from benchmarks.synthetic_data import synthetic_processor
+
+
+class TestBenchApi(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp, days=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_requests_reach_processor(self):
+        """測試 API 基準經由註冊表使用指定的處理器（全部200），結束後還原全域註冊表"""
+        registry = app_module.symbol_registry
+        results = bench_api(self.processor, 3, seed=0)
+        self.assertIs(app_module.symbol_registry, registry)
+        for name, result in results.items():
+            self.assertEqual(result['status_codes'], [200], name)
+            self.assertEqual(result['runs'], 3)
+
+    def test_error_responses_fail(self):
+        """測試任何非200回應使基準失敗，而非記錄錯誤回應的耗時"""
+        with mock.patch.object(self.processor, 'get_pre_market_data', side_effect=RuntimeError('boom')):
+            with self.assertRaisesRegex(RuntimeError, '/api/data/<date>/M15'):
+                bench_api(self.processor, 2, seed=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+single-flight 請求合併單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import backend.app as app_module
+from backend.single_flight import SingleFlight
+from benchmarks.synthetic_data import single_symbol_registry, synthetic_processor
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def _run_concurrently(self, flight, key, fn, count):
+        results = [None] * count
+        barrier = threading.Barrier(count)
+
+        def worker(i):
+            barrier.wait()
+            try:
+                results[i] = flight.do(key, fn)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_concurrent_calls_share_one_computation(self):
+        """測試並行的相同 key 只計算一次並共用結果"""
+        flight = SingleFlight()
+        executions = []
+
+        def compute():
+            executions.append(1)
+            time.sleep(0.2)
+            return {'candles': 400}
+
+        results = self._run_concurrently(flight, ('pre_market', '2024-01-02', 'M1'), compute, 8)
+
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        stats = flight.get_stats()
+        self.assertEqual((stats['executed'], stats['coalesced'], stats['in_flight']), (1, 7, 0))
+
+    def test_error_propagates_to_waiters(self):
+        """測試計算失敗時所有等待者都收到例外，之後可重新計算"""
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        results = self._run_concurrently(flight, 'k', fail, 4)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.do('k', lambda: 1), 1)
+
+    def test_sequential_calls_are_not_cached(self):
+        """測試完成後不保留結果"""
+        flight = SingleFlight()
+        self.assertEqual(flight.do('k', lambda: 1), 1)
+        self.assertEqual(flight.do('k', lambda: 2), 2)
+        self.assertEqual(flight.get_stats()['coalesced'], 0)
+
+
+class TestSingleFlightStatsEndpoints(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.mnq = synthetic_processor(os.path.join(cls.tmp, 'mnq'), days=3)
+        cls.nq = synthetic_processor(os.path.join(cls.tmp, 'nq'), days=3, symbol='NQ')
+        registry = single_symbol_registry(cls.mnq)
+        registry.register(cls.nq.symbol, cls.nq, cls.nq.csv_files)
+        cls.patch = mock.patch.object(app_module, 'symbol_registry', registry)
+        cls.patch.start()
+        cls.client = app_module.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.patch.stop()
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_stats_reported_per_resident_symbol(self):
+        """測試 /api/health 與 /api/metrics 列出每個常駐商品的合併計數"""
+        for _ in range(3):
+            self.nq.single_flight.do('k', lambda: 1)
+        expected = {'MNQ': self.mnq.single_flight.get_stats(), 'NQ': self.nq.single_flight.get_stats()}
+
+        health = self.client.get('/api/health').get_json()
+        self.assertEqual(health['single_flight'], expected)
+        self.assertEqual(set(health['http_cache']), {'MNQ', 'NQ'})
+
+        body = self.client.get('/api/metrics').get_data(as_text=True)
+        self.assertEqual(body.count('# TYPE trading_single_flight_calls_total counter'), 1)
+        self.assertIn('# TYPE trading_single_flight_in_flight gauge', body)
+        for symbol, stats in expected.items():
+            self.assertIn(f'trading_single_flight_calls_total{{symbol="{symbol}"}} {stats["calls"]}', body)
+        self.assertIn('trading_single_flight_calls_total{symbol="NQ"} 3', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
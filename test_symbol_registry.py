@@ -0,0 +1,123 @@
+"""
+多商品註冊表（SymbolRegistry）單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from backend.symbol_registry import SymbolRegistry, UnknownSymbolError, discover_symbol_files
+from utils.config import SYMBOL_CONFIG
+
+MB = 1024 * 1024
+
+
+class FakeProcessor:
+    def __init__(self, symbol, files, size):
+        self.symbol = symbol
+        self.files = files
+        self.size = size
+
+    def memory_usage_bytes(self):
+        return self.size
+
+
+class TestSymbolRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        for name in ['MNQ_M1_2019-2024.csv', 'MNQ_H1_2019-2024.csv', 'NQ_M1_2020.csv',
+                     'ES_M5_2021.csv', 'CL_D1_2022.csv', 'notes.txt', 'ES_M3_2021.csv']:
+            open(os.path.join(self.data_dir, name), 'w').close()
+        self.loads = []
+        self.sizes = {'NQ': 10 * MB, 'ES': 10 * MB, 'CL': 10 * MB}
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def loader(self, symbol, files):
+        self.loads.append(symbol)
+        time.sleep(0.05)
+        return FakeProcessor(symbol, files, self.sizes[symbol])
+
+    def make_registry(self, budget_mb=100, max_resident=4):
+        registry = SymbolRegistry(self.data_dir, 'MNQ', SYMBOL_CONFIG['file_pattern'], self.loader,
+                                  budget_mb * MB, max_resident)
+        registry.register('MNQ', FakeProcessor('MNQ', {}, 5 * MB), {'M1': 'MNQ_M1_2019-2024.csv'})
+        registry.update_size('MNQ')
+        return registry
+
+    def test_discovery(self):
+        """測試依檔名樣式找出商品與時間刻度"""
+        found = discover_symbol_files(self.data_dir, SYMBOL_CONFIG['file_pattern'])
+        self.assertEqual(sorted(found), ['CL', 'ES', 'MNQ', 'NQ'])
+        self.assertEqual(found['MNQ'], {'M1': 'MNQ_M1_2019-2024.csv', 'H1': 'MNQ_H1_2019-2024.csv'})
+        self.assertEqual(found['ES'], {'M5': 'ES_M5_2021.csv'})
+
+    def test_lazy_load_once_under_concurrency(self):
+        """測試第一次請求才載入，並行請求只載入一次"""
+        registry = self.make_registry()
+        self.assertFalse(registry.is_resident('nq'))
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('nq'))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.loads, ['NQ'])
+        self.assertEqual(len({id(p) for p in results}), 1)
+        self.assertEqual(results[0].files, {'M1': 'NQ_M1_2020.csv'})
+        self.assertIs(registry.get(), registry.get('MNQ'))
+
+    def test_lru_eviction_by_budget(self):
+        """測試超過記憶體預算時淘汰最久未使用的商品，預設商品不淘汰"""
+        registry = self.make_registry(budget_mb=30)
+        registry.get('NQ')
+        registry.get('ES')
+        registry.get('NQ')      # ES 成為最久未使用
+        registry.get('CL')      # 5 + 30 MB > 30 MB
+
+        self.assertTrue(registry.is_resident('MNQ'))
+        self.assertTrue(registry.is_resident('NQ'))
+        self.assertFalse(registry.is_resident('ES'))
+        self.assertTrue(registry.is_resident('CL'))
+
+        registry.get('ES')
+        self.assertEqual(self.loads, ['NQ', 'ES', 'CL', 'ES'])
+        stats = registry.get_stats()
+        self.assertEqual(stats['evictions'], 2)
+        self.assertLessEqual(stats['resident_bytes'], 30 * MB)
+
+    def test_eviction_by_count(self):
+        """測試常駐商品數上限"""
+        registry = self.make_registry(max_resident=2)
+        registry.get('NQ')
+        registry.get('ES')
+        self.assertEqual(registry.get_stats()['resident'], ['MNQ', 'ES'])
+
+    def test_unknown_symbol(self):
+        """測試未知商品拋出 UnknownSymbolError"""
+        registry = self.make_registry()
+        with self.assertRaises(UnknownSymbolError) as ctx:
+            registry.get('XYZ')
+        self.assertEqual(ctx.exception.symbol, 'XYZ')
+        self.assertEqual(self.loads, [])
+
+    def test_refresh_keeps_registered_files(self):
+        """測試重新掃描後找到新商品，且預設商品的檔案設定不變"""
+        registry = self.make_registry()
+        open(os.path.join(self.data_dir, 'GC_H4_2023.csv'), 'w').close()
+        registry.refresh()
+        self.assertIn('GC', registry.symbols())
+        self.assertEqual(registry.files['MNQ'], {'M1': 'MNQ_M1_2019-2024.csv'})
+
+
+if __name__ == '__main__':
+    unittest.main()
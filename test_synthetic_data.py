@@ -0,0 +1,44 @@
+"""
+合成基準資料單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import tempfile
+import unittest
+import numpy as np
+from benchmarks.synthetic_data import generate_m1, generate_bars, write_dataset
+from backend.csv_scanner import scan_csv_dates
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def test_m1_shape(self):
+        """測試價格對齊跳動點、OHLC 一致、不含休市時段"""
+        m1 = generate_m1(days=14, seed=1)
+        prices = m1[['Open', 'High', 'Low', 'Close']].to_numpy()
+        self.assertTrue(np.allclose(prices * 4, np.round(prices * 4)))
+        self.assertTrue((m1['High'] >= m1[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((m1['Low'] <= m1[['Open', 'Close']].min(axis=1)).all())
+        self.assertFalse((m1.index.hour == 17).any())
+        self.assertFalse((m1.index.weekday == 5).any())
+
+    def test_deterministic(self):
+        """測試相同種子產生相同資料"""
+        self.assertTrue(generate_bars(500, 'M5', seed=3).equals(generate_bars(500, 'M5', seed=3)))
+        self.assertEqual(len(generate_bars(500, 'M5', seed=3)), 500)
+
+    def test_write_dataset_format(self):
+        """測試輸出CSV可由日期掃描器讀取"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rows = write_dataset(tmp_dir, {'M15': 'm15.csv', 'D1': 'd1.csv'}, days=10)
+            for name, timeframe in (('m15.csv', 'M15'), ('d1.csv', 'D1')):
+                result = scan_csv_dates(os.path.join(tmp_dir, name))
+                self.assertEqual(result['method'], 'mmap')
+                self.assertEqual(result['row_count'], rows[timeframe])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+價格整數跳動點編碼單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import unittest
+import numpy as np
+from backend.tick_encoding import encode_prices, decode_prices, encode_price_columns, tick_decimals
+from backend.fvg_detector_simple import FVGDetectorSimple
+from benchmarks.synthetic_data import generate_bars
+
+
+class TestTickEncoding(unittest.TestCase):
+
+    def test_round_trip(self):
+        """測試編碼後解碼回原本的浮點數"""
+        prices = np.array([18123.25, 18123.5, 18124.0, 0.25])
+        ticks = encode_prices(prices, 0.25)
+        self.assertEqual(ticks.dtype, np.int32)
+        self.assertEqual(ticks.tolist(), [72493, 72494, 72496, 1])
+        self.assertEqual(decode_prices(ticks, 0.25).tolist(), prices.tolist())
+
+    def test_decimal_tick_decodes_to_parsed_value(self):
+        """測試非二進位精確的跳動點（0.1）解碼結果與直接解析相同"""
+        self.assertEqual(tick_decimals(0.1), 1)
+        self.assertEqual(decode_prices(encode_prices([0.3, 12.7], 0.1), 0.1).tolist(), [0.3, 12.7])
+
+    def test_off_grid_prices_are_rejected(self):
+        """測試不在跳動點格線上的價格無法編碼，且 DataFrame 保持不變"""
+        with self.assertRaises(ValueError):
+            encode_prices([100.0, 100.1], 0.25)
+        with self.assertRaises(ValueError):
+            encode_prices([100.0, np.nan], 0.25)
+
+        bars = generate_bars(50, 'M5', seed=1)
+        bars.loc[10, 'Close'] += 0.01
+        before = bars.copy()
+        with self.assertRaises(ValueError):
+            encode_price_columns(bars, 0.25)
+        self.assertTrue(bars.equals(before))
+
+    def test_fvg_on_ticks_matches_floats(self):
+        """測試整數跳動點上的 FVG 檢測與浮點數結果相同"""
+        bars = generate_bars(900, 'M5', seed=3)
+        detector = FVGDetectorSimple()
+        expected = detector.detect_fvg_table(bars, 'M5')
+
+        encoded = bars.copy()
+        encode_price_columns(encoded, 0.25)
+        table = detector.detect_fvg_table(encoded, 'M5', tick_size=0.25)
+
+        self.assertEqual(table.start_price.dtype, np.int32)
+        self.assertEqual(table.to_frontend(), expected.to_frontend())
+        self.assertEqual(table.to_dicts(), expected.to_dicts())
+
+
+if __name__ == '__main__':
+    unittest.main()
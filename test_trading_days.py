@@ -0,0 +1,88 @@
+"""
+交易日位元矩陣單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import shutil
+import tempfile
+import unittest
+import datetime
+import numpy as np
+from backend.trading_days import TradingDayMatrix
+from benchmarks.synthetic_data import synthetic_processor
+
+
+def ordinals(*days):
+    return np.array([datetime.date(2023, 3, d).toordinal() for d in days], dtype=np.int32)
+
+
+class TestTradingDayMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = TradingDayMatrix({
+            'M1': ordinals(6, 7, 8, 9),
+            'H1': ordinals(6, 7, 9, 10),
+            'D1': ordinals(7, 8, 9, 10),
+        })
+
+    def test_intersection(self):
+        """測試交集與起始日期過濾"""
+        self.assertEqual(list(self.matrix.intersection()), list(ordinals(7, 9)))
+        self.assertEqual(list(self.matrix.intersection(start_date=datetime.date(2023, 3, 8))),
+                         list(ordinals(9)))
+        self.assertEqual(list(self.matrix.intersection(['M1', 'H1'])), list(ordinals(6, 7, 9)))
+
+    def test_missing_relative_to_union(self):
+        """測試各時間刻度相對於聯集的缺失日期"""
+        self.assertEqual(list(self.matrix.missing('M1')), list(ordinals(10)))
+        self.assertEqual(list(self.matrix.missing('D1')), list(ordinals(6)))
+
+    def test_consistency_report(self):
+        """測試一致性報告"""
+        report = self.matrix.consistency_report(all_timeframes=['D1', 'H4', 'H1', 'M1'])
+
+        self.assertEqual(report['intersection_dates'], ['2023-03-07', '2023-03-09'])
+        self.assertFalse(report['timeframe_info']['H4']['loaded'])
+        self.assertEqual(report['timeframe_info']['H1']['missing_sample'], ['2023-03-08'])
+        self.assertEqual(report['union_count'], 5)
+        self.assertTrue(any('交集過小' in issue for issue in report['consistency_issues']))
+
+
+class TestProcessorTradingDays(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.processor = synthetic_processor(cls.tmp, days=20)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def test_refresh_keeps_feature_filters(self):
+        """測試重建交易日矩陣後，FVG數量與連續性篩選仍可使用且結果不變"""
+        filters = ({'min_fvgs': 1, 'fvg_timeframe': 'M15'},
+                   {'min_continuity': 0.0, 'continuity_timeframe': 'M15'})
+        before = [self.processor.date_sampler.count(**f) for f in filters]
+        self.assertGreater(before[0], 0)
+
+        self.processor.check_data_range_consistency(refresh=True)
+        self.assertEqual([self.processor.date_sampler.count(**f) for f in filters], before)
+        for f in filters:
+            self.processor.get_random_date(**f)
+
+    def test_stale_timeframe_does_not_narrow_intersection(self):
+        """測試未載入的時間刻度（如載入失敗）殘留的交易日不參與交集"""
+        available = set(self.processor.available_dates)
+        self.processor.day_ordinals['W1'] = np.array([min(available).toordinal()], dtype=np.int32)
+
+        self.processor.check_data_range_consistency(refresh=True)
+        self.assertNotIn('W1', self.processor.day_ordinals)
+        self.assertEqual(self.processor.available_dates, available)
+
+
+if __name__ == '__main__':
+    unittest.main()
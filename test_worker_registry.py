@@ -0,0 +1,118 @@
+"""
+worker 狀態表單元測試
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import time
+import unittest
+from backend.worker_registry import WorkerRegistry, RequestTracker, start_reload_listener
+
+
+class TestWorkerRegistry(unittest.TestCase):
+
+    def test_reset_counts_restarts(self):
+        """測試重啟 worker 時累計重啟次數並清除就緒狀態"""
+        registry = WorkerRegistry(2)
+        registry.reset(1, 100)
+        registry.set(1, ready=1)
+        registry.reset(1, 101)
+
+        status = registry.snapshot()[1]
+        self.assertEqual(status['pid'], 101)
+        self.assertEqual(status['restarts'], 1)
+        self.assertFalse(status['ready'])
+
+    def test_tracker_records_in_flight(self):
+        """測試中介層在請求期間記錄進行中請求"""
+        registry = WorkerRegistry(1)
+        registry.reset(0, os.getpid())
+        seen = {}
+
+        def app(environ, start_response):
+            seen.update(registry.snapshot()[0])
+            start_response('200 OK', [])
+            return [b'ok']
+
+        tracker = RequestTracker(app, registry, 0)
+        response = tracker({}, lambda *args: None)
+        self.assertEqual(list(response), [b'ok'])
+        response.close()
+
+        self.assertEqual(seen['in_flight'], 1)
+        status = registry.snapshot()[0]
+        self.assertEqual(status['requests'], 1)
+        self.assertEqual(status['in_flight'], 0)
+        self.assertEqual(status['oldest_request_seconds'], 0)
+
+    def test_tracker_counts_streamed_body_until_close(self):
+        """測試串流回應在伺服器 close() 之前仍算進行中，close() 時也關閉原回應"""
+        registry = WorkerRegistry(1)
+        registry.reset(0, os.getpid())
+        closed = []
+
+        def app(environ, start_response):
+            def body():
+                try:
+                    for i in range(3):
+                        yield b'%d' % i
+                finally:
+                    closed.append(True)
+            start_response('200 OK', [])
+            return body()
+
+        tracker = RequestTracker(app, registry, 0)
+        response = tracker({}, lambda *args: None)
+        chunks = iter(response)
+        self.assertEqual(next(chunks), b'0')
+        self.assertEqual(registry.snapshot()[0]['in_flight'], 1)
+        self.assertGreater(registry.get(0, 'oldest_request_start'), 0)
+
+        response.close()
+        response.close()
+        self.assertEqual(closed, [True])
+        self.assertEqual(registry.snapshot()[0]['in_flight'], 0)
+
+        # app 拋出例外時立即釋放
+        def failing(environ, start_response):
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            RequestTracker(failing, registry, 0)({}, lambda *args: None)
+        self.assertEqual(registry.snapshot()[0]['in_flight'], 0)
+        self.assertEqual(registry.snapshot()[0]['requests'], 2)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), '需要 fork')
+    def test_reload_request_is_shared_across_fork(self):
+        """測試子行程（worker）要求重新載入後，其他行程看到新的世代"""
+        registry = WorkerRegistry(2)
+        pid = os.fork()
+        if pid == 0:
+            registry.request_reload()
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(registry.reload_generation(), 1)
+
+    def test_reload_listener_runs_once_per_request(self):
+        """測試監聽執行緒在世代改變時重新載入一次（啟動前已有的要求也會補上）"""
+        registry = WorkerRegistry(1)
+        registry.request_reload()
+        calls = []
+        start_reload_listener(registry, lambda: calls.append(registry.reload_generation()), 0.01)
+
+        def wait_for(count):
+            deadline = time.time() + 5
+            while len(calls) < count and time.time() < deadline:
+                time.sleep(0.01)
+
+        wait_for(1)
+        registry.request_reload()
+        wait_for(2)
+        time.sleep(0.05)
+        self.assertEqual(calls, [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()